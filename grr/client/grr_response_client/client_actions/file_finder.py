@@ -130,16 +130,21 @@ class FileFinderOS(actions.ActionPlugin):
       else:
         raise _SkipFileException()
 
-    for content_condition in self._content_conditions:
-      try:
-        with io.open(filepath, "rb") as fd:
-          result = list(content_condition.Search(fd))
-      except OSError as e:
-        logging.error("Error reading '%s': %s", filepath, e)
-        raise _SkipFileException() from e
-      if not result:
-        raise _SkipFileException()
-      matches.extend(result)
+    if not self._content_conditions:
+      return
+
+    # All the conditions are searched for in a single pass over the file.
+    try:
+      with io.open(filepath, "rb") as fd:
+        result = conditions.ContentCondition.SearchAll(
+            fd, self._content_conditions
+        )
+    except OSError as e:
+      logging.error("Error reading '%s': %s", filepath, e)
+      raise _SkipFileException() from e
+    if not result:
+      raise _SkipFileException()
+    matches.extend(result)
 
 
 def GetExpandedPaths(
@@ -168,6 +173,6 @@ def GetExpandedPaths(
       follow_links=args.follow_links, xdev=args.xdev, pathtype=pathtype
   )
 
-  for path in args.paths:
-    for expanded_path in globbing.ExpandPath(str(path), opts, heartbeat_cb):
-      yield expanded_path
+  paths = [str(path) for path in args.paths]
+  for expanded_path in globbing.ExpandPaths(paths, opts, heartbeat_cb):
+    yield expanded_path
@@ -2,7 +2,8 @@
 """Implementation of condition mechanism for client-side file-finder."""
 
 import abc
-from collections.abc import Iterator
+import collections
+from collections.abc import Iterator, Sequence
 import re
 from typing import NamedTuple, Optional
 
@@ -188,24 +189,110 @@ class ContentCondition(metaclass=abc.ABCMeta):
     Yields:
       `BufferReference` objects pointing to file parts with matching content.
     """
+    for chunk in self.StreamChunks(fd):
+      for match in self.ScanChunk(chunk, matcher):
+        yield match
+
+        if self.params.mode == self.params.Mode.FIRST_HIT:
+          return
+
+  def StreamChunks(self, fd) -> Iterator[streaming.Chunk]:
+    """Streams overlapping chunks of the part of the file being searched."""
     streamer = streaming.Streamer(
         chunk_size=self.CHUNK_SIZE, overlap_size=self.OVERLAP_SIZE
     )
 
     offset = self.params.start_offset
     amount = self.params.length
-    for chunk in streamer.StreamFile(fd, offset=offset, amount=amount):
-      for span in chunk.Scan(matcher):
-        ctx_begin = max(span.begin - self.params.bytes_before, 0)
-        ctx_end = min(span.end + self.params.bytes_after, len(chunk.data))
-        ctx_data = chunk.data[ctx_begin:ctx_end]
+    return streamer.StreamFile(fd, offset=offset, amount=amount)
 
-        yield rdf_client.BufferReference(
-            offset=chunk.offset + ctx_begin, length=len(ctx_data), data=ctx_data
-        )
+  def ScanChunk(
+      self,
+      chunk: streaming.Chunk,
+      matcher: "Matcher",
+  ) -> Iterator[rdf_client.BufferReference]:
+    """Yields matches of the pattern within a single chunk of the file."""
+    for span in chunk.Scan(matcher):
+      ctx_begin = max(span.begin - self.params.bytes_before, 0)
+      ctx_end = min(span.end + self.params.bytes_after, len(chunk.data))
+      ctx_data = chunk.data[ctx_begin:ctx_end]
 
-        if self.params.mode == self.params.Mode.FIRST_HIT:
-          return
+      yield rdf_client.BufferReference(
+          offset=chunk.offset + ctx_begin, length=len(ctx_data), data=ctx_data
+      )
+
+  @abc.abstractmethod
+  def GetMatcher(self) -> "Matcher":
+    """Returns a matcher object for the pattern of the condition."""
+    pass
+
+  @staticmethod
+  def SearchAll(
+      fd,
+      conditions: Sequence["ContentCondition"],
+  ) -> list[rdf_client.BufferReference]:
+    """Searches specified file for content matching all given conditions.
+
+    Conditions searching the same part of the file are scanned together, so
+    that the file is read once instead of once per condition. Results are the
+    same as if conditions were searched one by one.
+
+    Args:
+      fd: A seekable file descriptor of the file that needs to be searched.
+      conditions: Content conditions to search for.
+
+    Returns:
+      `BufferReference` objects pointing to file parts with matching content,
+      grouped by condition in the order of the conditions. If any of the
+      conditions does not match, an empty list is returned.
+    """
+    # Conditions with equal keys split the file into the same chunks.
+    groups = collections.defaultdict(list)
+    for index, condition in enumerate(conditions):
+      key = (
+          condition.params.start_offset,
+          condition.params.length,
+          condition.CHUNK_SIZE,
+          condition.OVERLAP_SIZE,
+      )
+      groups[key].append(index)
+
+    matches = [None] * len(conditions)
+    for indices in groups.values():
+      group = [conditions[index] for index in indices]
+      for index, group_matches in zip(indices, _ScanTogether(fd, group)):
+        if not group_matches:
+          return []
+
+        matches[index] = group_matches
+
+    return [match for group_matches in matches for match in group_matches]
+
+
+def _ScanTogether(
+    fd,
+    conditions: Sequence[ContentCondition],
+) -> list[list[rdf_client.BufferReference]]:
+  """Scans the file for conditions splitting it into the same chunks."""
+  matchers = [condition.GetMatcher() for condition in conditions]
+  matches = [[] for _ in conditions]
+  # Indices of conditions that still need to scan the following chunks.
+  pending = list(range(len(conditions)))
+
+  for chunk in conditions[0].StreamChunks(fd):
+    for index in pending[:]:
+      condition = conditions[index]
+      for match in condition.ScanChunk(chunk, matchers[index]):
+        matches[index].append(match)
+
+        if condition.params.mode == condition.params.Mode.FIRST_HIT:
+          pending.remove(index)
+          break
+
+    if not pending:
+      break
+
+  return matches
 
 
 class LiteralMatchCondition(ContentCondition):
@@ -216,10 +303,12 @@ class LiteralMatchCondition(ContentCondition):
     self.params = params.contents_literal_match
 
   def Search(self, fd):
-    matcher = LiteralMatcher(self.params.literal.AsBytes())
-    for match in self.Scan(fd, matcher):
+    for match in self.Scan(fd, self.GetMatcher()):
       yield match
 
+  def GetMatcher(self) -> "LiteralMatcher":
+    return LiteralMatcher(self.params.literal.AsBytes())
+
 
 class RegexMatchCondition(ContentCondition):
   """A content condition that lookups regular expressions."""
@@ -229,12 +318,13 @@ class RegexMatchCondition(ContentCondition):
     self.params = params.contents_regex_match
 
   def Search(self, fd) -> Iterator[rdf_client.BufferReference]:
-    regex = re.compile(self.params.regex.AsBytes(), flags=re.I | re.S | re.M)
-
-    matcher = RegexMatcher(regex)
-    for match in self.Scan(fd, matcher):
+    for match in self.Scan(fd, self.GetMatcher()):
       yield match
 
+  def GetMatcher(self) -> "RegexMatcher":
+    regex = re.compile(self.params.regex.AsBytes(), flags=re.I | re.S | re.M)
+    return RegexMatcher(regex)
+
 
 class Matcher(metaclass=abc.ABCMeta):
   """An abstract class for objects able to lookup byte strings."""
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""Benchmarks for searching files for content conditions."""
+
+import io
+import os
+import random
+import time
+
+from absl import app
+from absl import flags
+
+from grr_response_client.client_actions.file_finder_utils import conditions
+from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+_LARGE = flags.DEFINE_bool(
+    "large_conditions_benchmark",
+    default=False,
+    help="If true, a corpus of 50 files of 4 MiB each is searched.",
+)
+
+
+class ContentConditionsBenchmark(benchmark_test_lib.MicroBenchmarks):
+  """Benchmarks searching a corpus of synthetic files for content."""
+
+  units = "s"
+
+  NUM_FILES = 5
+  FILE_SIZE = 256 * 1024
+
+  LARGE_NUM_FILES = 50
+  LARGE_FILE_SIZE = 4 * 1024 * 1024
+
+  LITERALS = [b"password", b"BEGIN RSA PRIVATE KEY", b"AKIA", b"secret"]
+  REGEXES = [b"[0-9]{3}-[0-9]{2}-[0-9]{4}", b"https?://[a-z.]+/admin"]
+
+  def setUp(self):
+    super().setUp(extra_fields=["MiB/s"], extra_format=["<20"])
+
+    if _LARGE.value:
+      num_files, file_size = self.LARGE_NUM_FILES, self.LARGE_FILE_SIZE
+    else:
+      num_files, file_size = self.NUM_FILES, self.FILE_SIZE
+
+    rand = random.Random(0)
+    words = [b"lorem", b"ipsum", b"dolor", b"sit", b"amet", b"\n"]
+    words.extend(self.LITERALS)
+    # Rare words make sure that there are some, but not many, matches.
+    weights = [100] * 6 + [1] * len(self.LITERALS)
+
+    self.paths = []
+    for i in range(num_files):
+      path = os.path.join(self.temp_dir, "file%d" % i)
+      with io.open(path, "wb") as filedesc:
+        size = 0
+        while size < file_size:
+          data = b" ".join(rand.choices(words, weights, k=4096))
+          filedesc.write(data)
+          size += len(data)
+
+      self.paths.append(path)
+
+  def _Conditions(self):
+    result = []
+
+    for literal in self.LITERALS:
+      params = rdf_file_finder.FileFinderCondition()
+      params.contents_literal_match.literal = literal
+      params.contents_literal_match.mode = "ALL_HITS"
+      result.append(conditions.LiteralMatchCondition(params))
+
+    for regex in self.REGEXES:
+      params = rdf_file_finder.FileFinderCondition()
+      params.contents_regex_match.regex = regex
+      params.contents_regex_match.mode = "ALL_HITS"
+      result.append(conditions.RegexMatchCondition(params))
+
+    return result
+
+  def _Time(self, name, search):
+    total_size = 0
+
+    start = time.time()
+    for path in self.paths:
+      with io.open(path, "rb") as filedesc:
+        search(filedesc)
+      total_size += os.path.getsize(path)
+    time_taken = time.time() - start
+
+    throughput = "%.2f" % (total_size / 1024 / 1024 / time_taken)
+    self.AddResult(name, time_taken, len(self.paths), throughput)
+
+  def testSearch(self):
+    """Searches files for literal and regex conditions."""
+    conds = self._Conditions()
+
+    def SearchSeparately(filedesc):
+      for condition in conds:
+        list(condition.Search(filedesc))
+
+    def SearchAll(filedesc):
+      conditions.ContentCondition.SearchAll(filedesc, conds)
+
+    self._Time("Search (one pass per condition)", SearchSeparately)
+    self._Time("SearchAll (single pass)", SearchAll)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -5,6 +5,7 @@ import platform
 import re
 import subprocess
 import unittest
+from unittest import mock
 
 from absl import app
 from absl.testing import absltest
@@ -630,6 +631,97 @@ class RegexMatchCondition(ConditionTestMixin, absltest.TestCase):
     self.assertEmpty(results)
 
 
+class SearchAllTest(absltest.TestCase):
+
+  @staticmethod
+  def _Literal(literal, **kwargs):
+    params = rdf_file_finder.FileFinderCondition()
+    params.contents_literal_match.literal = literal
+    for name, value in kwargs.items():
+      setattr(params.contents_literal_match, name, value)
+    return conditions.LiteralMatchCondition(params)
+
+  @staticmethod
+  def _Regex(regex, **kwargs):
+    params = rdf_file_finder.FileFinderCondition()
+    params.contents_regex_match.regex = regex
+    for name, value in kwargs.items():
+      setattr(params.contents_regex_match, name, value)
+    return conditions.RegexMatchCondition(params)
+
+  def testMatchesGroupedByCondition(self):
+    content = io.BytesIO(b"foo 1 bar 23 foo baz")
+    conds = [
+        self._Literal(b"foo", mode="ALL_HITS"),
+        self._Regex(b"\\d+", mode="ALL_HITS"),
+        self._Literal(b"baz", mode="ALL_HITS"),
+    ]
+
+    results = conditions.ContentCondition.SearchAll(content, conds)
+    self.assertEqual(
+        [(result.offset, result.data) for result in results],
+        [(0, b"foo"), (13, b"foo"), (4, b"1"), (10, b"23"), (17, b"baz")],
+    )
+
+  def testNoResultsIfAnyConditionDoesNotMatch(self):
+    content = io.BytesIO(b"foo bar")
+    conds = [
+        self._Literal(b"foo", mode="ALL_HITS"),
+        self._Literal(b"quux", mode="ALL_HITS"),
+    ]
+
+    self.assertEmpty(conditions.ContentCondition.SearchAll(content, conds))
+
+  def testFirstHit(self):
+    content = io.BytesIO(b"foo bar foo bar")
+    conds = [
+        self._Literal(b"foo", mode="FIRST_HIT"),
+        self._Literal(b"bar", mode="ALL_HITS"),
+    ]
+
+    results = conditions.ContentCondition.SearchAll(content, conds)
+    self.assertEqual(
+        [(result.offset, result.data) for result in results],
+        [(0, b"foo"), (4, b"bar"), (12, b"bar")],
+    )
+
+  def testDifferentRanges(self):
+    content = io.BytesIO(b"oooooooo")
+    conds = [
+        self._Literal(b"ooo", mode="ALL_HITS", start_offset=2),
+        self._Regex(b"o+", mode="FIRST_HIT", start_offset=3),
+        self._Literal(b"oo", mode="ALL_HITS", length=4),
+    ]
+
+    results = conditions.ContentCondition.SearchAll(content, conds)
+    self.assertEqual(
+        [(result.offset, result.data) for result in results],
+        [(2, b"ooo"), (5, b"ooo"), (3, b"ooooo"), (0, b"oo"), (2, b"oo")],
+    )
+
+  @mock.patch.object(conditions.ContentCondition, "CHUNK_SIZE", 8)
+  @mock.patch.object(conditions.ContentCondition, "OVERLAP_SIZE", 3)
+  def testSameAsSeparateSearches(self):
+    data = b"foobarbazfoo quux 42 barfoo 1337 bazbar foofoo 7 quuxbaz" * 3
+    conds = [
+        self._Literal(b"foo", mode="ALL_HITS", bytes_before=2, bytes_after=1),
+        self._Regex(b"\\d+", mode="ALL_HITS"),
+        self._Literal(b"barfoo", mode="ALL_HITS"),
+        self._Regex(b"ba[rz]", mode="FIRST_HIT", bytes_after=4),
+        self._Literal(b"quux", mode="ALL_HITS", start_offset=5),
+    ]
+
+    expected = []
+    for condition in conds:
+      expected.extend(condition.Search(io.BytesIO(data)))
+
+    results = conditions.ContentCondition.SearchAll(io.BytesIO(data), conds)
+    self.assertEqual(
+        [(result.offset, result.data) for result in results],
+        [(result.offset, result.data) for result in expected],
+    )
+
+
 def main(argv):
   test_lib.main(argv)
 
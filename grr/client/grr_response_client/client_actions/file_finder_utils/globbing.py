@@ -10,7 +10,7 @@ import os
 import platform
 import re
 import stat
-from typing import Optional
+from typing import Any, NamedTuple, Optional
 
 import psutil
 
@@ -103,32 +103,43 @@ class RecursiveComponent(PathComponent):
 
       yield itempath
 
-      for childpath in self._Recurse(itempath, depth):
-        yield childpath
+      if self.ShouldRecurse(itempath, depth, self._allowed_devices):
+        for childpath in self._Generate(itempath, depth + 1):
+          yield childpath
 
-  def _Recurse(self, path, depth):
-    """Recurses to the given path if necessary up to the given depth."""
+  def ShouldRecurse(self, path, depth, allowed_devices):
+    """Checks whether to recurse to the given path found at the given depth.
+
+    Args:
+      path: A path found by the recursion.
+      depth: A depth at which the path was found.
+      allowed_devices: Devices the recursion is allowed to descend into, as
+        returned by `_GetAllowedDevices`.
+
+    Returns:
+      True if the path is a directory the recursion should descend into.
+    """
     if self.opts.pathtype == rdf_paths.PathSpec.PathType.OS:
       try:
         stat_entry = os.stat(path)
       except OSError as e:
         # Can happen for links pointing to non existent files/directories.
         logging.info("Failed to stat '%s': %s", path, e)
-        return
+        return False
 
       if (
-          self._allowed_devices is not _XDEV_ALL_ALLOWED
-          and stat_entry.st_dev not in self._allowed_devices
+          allowed_devices is not _XDEV_ALL_ALLOWED
+          and stat_entry.st_dev not in allowed_devices
       ):
-        return
+        return False
 
       if not stat.S_ISDIR(stat_entry.st_mode):
-        return
+        return False
 
       # Cannot use S_ISLNK here because we uses os.stat above which resolves
       # links.
       if not self.opts.follow_links and os.path.islink(path):
-        return
+        return False
 
     elif self.opts.pathtype == rdf_paths.PathSpec.PathType.REGISTRY:
       pathspec = rdf_paths.PathSpec(
@@ -137,9 +148,10 @@ class RecursiveComponent(PathComponent):
       try:
         with vfs.VFSOpen(pathspec) as filedesc:
           if not filedesc.IsDirectory():
-            return
+            return False
       except IOError:
-        return  # Skip inaccessible Registry parts (e.g. HKLM\SAM\SAM) silently.
+        # Skip inaccessible Registry parts (e.g. HKLM\SAM\SAM) silently.
+        return False
     else:
       # We allow recursive TSK/NTFS searches with a depth level up to 2.
       if depth > 2:
@@ -152,12 +164,11 @@ class RecursiveComponent(PathComponent):
       try:
         with vfs.VFSOpen(pathspec) as filedesc:
           if not filedesc.IsDirectory():
-            return
+            return False
       except IOError:
-        return  # Skip inaccessible Registry parts silently.
+        return False  # Skip inaccessible Registry parts silently.
 
-    for childpath in self._Generate(path, depth + 1):
-      yield childpath
+    return True
 
   def __repr__(self):
     return "RecursiveComponent(max_depth={}, opts={!r})".format(
@@ -239,6 +250,28 @@ class GlobComponent(PathComponent):
       return None  # Indicate "File not found" by returning None.
 
   def Generate(self, dirpath):
+    return self.GenerateFromListing(
+        dirpath,
+        lambda: _ListDir(
+            dirpath, self.opts.pathtype, self.opts.implementation_type
+        ),
+    )
+
+  def GenerateFromListing(
+      self,
+      dirpath: str,
+      listdir: Callable[[], Iterable[str]],
+  ) -> Iterator[str]:
+    """Yields children of a given directory matching the component.
+
+    Args:
+      dirpath: A path to the directory.
+      listdir: A function returning names of children of the directory. It is
+        not called for literal components naming existing children.
+
+    Yields:
+      Paths to the matching children.
+    """
     # TODO: The TSK implementation for VFS currently cannot list
     # the root path of mounted disks. To make VfsFileFinder work with TSK,
     # we try the literal match to allow VfsFileFinder to traverse into disk
@@ -250,9 +283,7 @@ class GlobComponent(PathComponent):
         yield os.path.join(dirpath, literal_match)
         return
 
-    for item in _ListDir(
-        dirpath, self.opts.pathtype, self.opts.implementation_type
-    ):
+    for item in listdir():
       if self.regex.match(item):
         yield os.path.join(dirpath, item)
 
@@ -382,6 +413,188 @@ def ExpandPath(
       yield globbed_path
 
 
+def ExpandPaths(
+    paths: Iterable[str],
+    opts: Optional[PathOpts] = None,
+    heartbeat_cb: Callable[[], None] = _NoOp,
+) -> Iterator[str]:
+  """Applies all expansion mechanisms to the given paths at once.
+
+  Unlike expanding each path with `ExpandPath`, globs of all the paths are
+  merged into a trie. The expansion walks the directories once for all the
+  globs: each directory is listed at most once and its children are matched
+  against all globs applicable to it. Every matching path is yielded once, in
+  the order in which the walk finds it.
+
+  Globs with parent directory components (`..`) are expanded one by one after
+  the others, so paths they match may be yielded again.
+
+  Args:
+    paths: Paths to expand.
+    opts: A `PathOpts` object.
+    heartbeat_cb: A function to be called regularly to send heartbeats.
+
+  Yields:
+    All paths possible to obtain from the given paths by performing expansions.
+
+  Raises:
+    ValueError: If any of the given paths is empty, relative or malformed.
+  """
+  roots: dict[str, _GlobTrieNode] = {}
+  ungrouped: list[tuple[str, list[PathComponent]]] = []
+
+  for path in paths:
+    precondition.AssertType(path, str)
+
+    for grouped_path in ExpandGroups(path):
+      root_dir, tail = _SplitRoot(grouped_path, opts)
+      components = list(ParsePath(tail, opts=opts))
+
+      if any(isinstance(c, ParentComponent) for c in components):
+        ungrouped.append((root_dir, components))
+        continue
+
+      # Keys of the trie are the path items, so that the same items (matching
+      # the same children) share the nodes.
+      items = tail.replace(os.path.sep, "/").split("/")
+
+      node = roots.setdefault(root_dir, _GlobTrieNode())
+      for item, component in zip(items, components):
+        node = node.Child(item, component)
+      node.terminal = True
+
+  opts = opts or PathOpts()
+
+  for root_dir, root in roots.items():
+    for path in _ExpandTrie(root_dir, [root], [], opts, heartbeat_cb):
+      yield path
+
+  for root_dir, components in ungrouped:
+    for path in _ExpandComponents(
+        root_dir, components, heartbeat_cb=heartbeat_cb
+    ):
+      yield path
+
+
+class _GlobTrieNode(object):
+  """A node of a trie of path globs with a common root directory.
+
+  Attributes:
+    children: A dictionary mapping path items (e.g. `foo*`) to tuples of the
+      path component parsed from the item and the node following it.
+    terminal: Whether any of the globs ends at this node.
+  """
+
+  def __init__(self):
+    self.children: dict[str, tuple[PathComponent, _GlobTrieNode]] = {}
+    self.terminal = False
+
+  def Child(self, item: str, component: PathComponent) -> "_GlobTrieNode":
+    """Returns the node following the given path item, adding it if needed."""
+    try:
+      _, node = self.children[item]
+    except KeyError:
+      node = _GlobTrieNode()
+      self.children[item] = (component, node)
+
+    return node
+
+
+class _Recursion(NamedTuple):
+  """A recursive component being expanded within a directory."""
+
+  component: RecursiveComponent
+  # A node following the recursive component in the trie.
+  node: _GlobTrieNode
+  depth: int
+  allowed_devices: Any
+
+
+def _ExpandTrie(
+    dirpath: str,
+    nodes: list[_GlobTrieNode],
+    recursions: list[_Recursion],
+    opts: PathOpts,
+    heartbeat_cb: Callable[[], None],
+) -> Iterator[str]:
+  """Expands trie globs that matched a given directory.
+
+  Args:
+    dirpath: A path to the directory.
+    nodes: Trie nodes of globs that matched the directory.
+    recursions: Recursive components expanded within the directory.
+    opts: A `PathOpts` object.
+    heartbeat_cb: A function to be called regularly to send heartbeats.
+
+  Yields:
+    The directory, if any of the globs ends at it, and paths expanded from it.
+  """
+  heartbeat_cb()
+
+  # Current directory components match the directory itself.
+  for node in nodes:
+    for component, child in node.children.values():
+      if isinstance(component, CurrentComponent) and child not in nodes:
+        nodes.append(child)
+
+  if any(node.terminal for node in nodes):
+    yield dirpath
+
+  listing = None
+
+  def ListDir() -> Iterable[str]:
+    nonlocal listing
+    if listing is None:
+      listing = _ListDir(dirpath, opts.pathtype, opts.implementation_type)
+    return listing
+
+  # Children are visited in the order they are matched. Each child is visited
+  # once, with all the nodes and recursions that matched it.
+  matches: dict[str, tuple[list[_GlobTrieNode], list[_Recursion]]] = {}
+
+  def AddNode(childpath: str, node: _GlobTrieNode) -> None:
+    child_nodes, _ = matches.setdefault(childpath, ([], []))
+    if node not in child_nodes:
+      child_nodes.append(node)
+
+  def AddRecursion(childpath: str, recursion: _Recursion) -> None:
+    _, child_recursions = matches.setdefault(childpath, ([], []))
+    if all(recursion.node is not r.node for r in child_recursions):
+      child_recursions.append(recursion)
+
+  recursions = list(recursions)
+  for node in nodes:
+    for component, child in node.children.values():
+      if isinstance(component, GlobComponent):
+        for childpath in component.GenerateFromListing(dirpath, ListDir):
+          AddNode(childpath, child)
+      elif isinstance(component, RecursiveComponent):
+        allowed_devices = _GetAllowedDevices(component.opts.xdev, dirpath)
+        recursions.append(_Recursion(component, child, 1, allowed_devices))
+
+  for recursion in recursions:
+    component = recursion.component
+    if recursion.depth > component.max_depth:
+      continue
+
+    for item in ListDir():
+      childpath = os.path.join(dirpath, item)
+      AddNode(childpath, recursion.node)
+
+      if component.ShouldRecurse(
+          childpath, recursion.depth, recursion.allowed_devices
+      ):
+        AddRecursion(
+            childpath, recursion._replace(depth=recursion.depth + 1)
+        )
+
+  for childpath, (child_nodes, child_recursions) in matches.items():
+    for path in _ExpandTrie(
+        childpath, child_nodes, child_recursions, opts, heartbeat_cb
+    ):
+      yield path
+
+
 def ExpandGroups(path):
   """Performs group expansion on a given path.
 
@@ -433,6 +646,26 @@ def ExpandGlobs(
     ValueError: If given path is empty or relative.
   """
   precondition.AssertType(path, str)
+
+  root_dir, tail = _SplitRoot(path, opts)
+  components = list(ParsePath(tail, opts=opts))
+
+  return _ExpandComponents(root_dir, components, heartbeat_cb=heartbeat_cb)
+
+
+def _SplitRoot(path: str, opts: Optional[PathOpts] = None) -> tuple[str, str]:
+  """Splits an absolute path glob into its root directory and the rest of it.
+
+  Args:
+    path: A path glob to split.
+    opts: A `PathOpts` object.
+
+  Returns:
+    A tuple of the root directory and the path glob relative to it.
+
+  Raises:
+    ValueError: If given path is empty or relative.
+  """
   if not path:
     raise ValueError("Path is empty")
 
@@ -442,13 +675,11 @@ def ExpandGlobs(
   if opts is not None and opts.pathtype == rdf_paths.PathSpec.PathType.REGISTRY:
     # Handle HKLM\Foo and /HKLM/Foo identically.
     root_dir, tail = path.replace("\\", "/").lstrip("/").split("/", 1)
-    components = list(ParsePath(tail, opts=opts))
-  else:
-    drive, tail = os.path.splitdrive(path)
-    root_dir = os.path.join(drive, os.path.sep).upper()
-    components = list(ParsePath(tail[1:], opts=opts))
+    return root_dir, tail
 
-  return _ExpandComponents(root_dir, components, heartbeat_cb=heartbeat_cb)
+  drive, tail = os.path.splitdrive(path)
+  root_dir = os.path.join(drive, os.path.sep).upper()
+  return root_dir, tail[1:]
 
 
 def _IsAbsolutePath(path: str, opts: Optional[PathOpts] = None) -> bool:
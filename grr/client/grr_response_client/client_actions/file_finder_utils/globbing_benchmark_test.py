@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""Benchmarks for expanding multiple path globs."""
+
+import os
+import time
+from unittest import mock
+
+from absl import app
+
+from grr_response_client.client_actions.file_finder_utils import globbing
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import test_lib
+
+
+class ExpandPathsBenchmark(benchmark_test_lib.MicroBenchmarks):
+  """Benchmarks expanding globs sharing directories of user profiles."""
+
+  units = "s"
+
+  NUM_USERS = 20
+  NUM_APPS = 10
+  NUM_FILES = 5
+
+  def setUp(self):
+    super().setUp(extra_fields=["listdir calls"], extra_format=["<20"])
+
+    for user in range(self.NUM_USERS):
+      for kind in ["Local", "Roaming"]:
+        for app_num in range(self.NUM_APPS):
+          dirpath = os.path.join(
+              self.temp_dir,
+              "Users",
+              "user%d" % user,
+              "AppData",
+              kind,
+              "app%d" % app_num,
+          )
+          os.makedirs(dirpath)
+
+          for i in range(self.NUM_FILES):
+            with open(os.path.join(dirpath, "file%d.db" % i), "wb"):
+              pass
+
+    self.paths = []
+    for kind in ["Local", "Roaming"]:
+      for app_num in range(self.NUM_APPS):
+        for pattern in ["*.db", "file[0-2].*"]:
+          self.paths.append(
+              os.path.join(
+                  self.temp_dir,
+                  "Users",
+                  "*",
+                  "AppData",
+                  kind,
+                  "app%d" % app_num,
+                  pattern,
+              )
+          )
+
+    self.paths.append(os.path.join(self.temp_dir, "Users", "**5", "*.db"))
+    self.paths.append(os.path.join(self.temp_dir, "Users", "*", "**3", "*.log"))
+
+  def _Time(self, name, expand):
+    list_dir = globbing._ListDir  # pylint: disable=protected-access
+    calls = [0]
+
+    def ListDir(*args):
+      calls[0] += 1
+      return list_dir(*args)
+
+    with mock.patch.object(globbing, "_ListDir", ListDir):
+      start = time.time()
+      for _ in expand():
+        pass
+      time_taken = time.time() - start
+
+    self.AddResult(name, time_taken, len(self.paths), calls[0])
+
+  def testExpandPaths(self):
+    """Expands 42 globs under user profile directories."""
+
+    def ExpandEach():
+      for path in self.paths:
+        yield from globbing.ExpandPath(path)
+
+    self._Time("ExpandPath (one walk per glob)", ExpandEach)
+    self._Time(
+        "ExpandPaths (single walk)", lambda: globbing.ExpandPaths(self.paths)
+    )
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
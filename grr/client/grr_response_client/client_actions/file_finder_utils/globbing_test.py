@@ -5,6 +5,7 @@ import io
 import os
 import platform
 import unittest
+from unittest import mock
 
 from absl import app
 from absl.testing import absltest
@@ -958,6 +959,121 @@ class ExpandPathTest(absltest.TestCase):
       )
 
 
+class ExpandPathsTest(absltest.TestCase):
+
+  def _ExpandPaths(self, paths):
+    """Expands given paths, returning them and listed directories."""
+    listed = []
+
+    def ListDir(dirpath, *args):
+      listed.append(dirpath)
+      return list_dir(dirpath, *args)
+
+    list_dir = globbing._ListDir  # pylint: disable=protected-access
+    with mock.patch.object(globbing, "_ListDir", ListDir):
+      results = list(globbing.ExpandPaths(paths))
+
+    return results, listed
+
+  def testSameAsExpandPath(self):
+    filepaths = [
+        ("foo", "bar", "0"),
+        ("foo", "bar", "1"),
+        ("foo", "baz", "quux", "0"),
+        ("norf", "bar", "0"),
+        ("norf", "thud", "1"),
+    ]
+
+    with DirHierarchy(filepaths) as hierarchy:
+      paths = [
+          hierarchy(("*", "bar", "*")),
+          hierarchy(("foo", "**", "0")),
+          hierarchy(("{foo,norf}", "thud", "1")),
+          hierarchy(("norf", ".", "*")),
+          hierarchy(("foo", "baz", "..", "bar", "1")),
+      ]
+
+      expected = set()
+      for path in paths:
+        expected.update(globbing.ExpandPath(path))
+
+      results, _ = self._ExpandPaths(paths)
+      self.assertCountEqual(set(results), expected)
+
+  def testListsDirectoriesOnce(self):
+    filepaths = [
+        ("foo", "bar", "0"),
+        ("foo", "bar", "1"),
+        ("foo", "baz", "0"),
+        ("quux", "bar", "0"),
+    ]
+
+    with DirHierarchy(filepaths) as hierarchy:
+      paths = [
+          hierarchy(("*", "bar", "*")),
+          hierarchy(("*", "baz", "*")),
+          hierarchy(("*", "ba?", "0")),
+          hierarchy(("**", "1")),
+      ]
+
+      results, listed = self._ExpandPaths(paths)
+      self.assertCountEqual(
+          results,
+          [
+              hierarchy(("foo", "bar", "0")),
+              hierarchy(("foo", "bar", "1")),
+              hierarchy(("foo", "baz", "0")),
+              hierarchy(("quux", "bar", "0")),
+          ],
+      )
+      self.assertCountEqual(listed, set(listed))
+
+  def testLiteralsDoNotListDirectories(self):
+    filepaths = [
+        ("foo", "bar", "0"),
+        ("foo", "bar", "1"),
+    ]
+
+    with DirHierarchy(filepaths) as hierarchy:
+      paths = [
+          hierarchy(("foo", "bar", "0")),
+          hierarchy(("foo", "bar", "1")),
+      ]
+
+      results, listed = self._ExpandPaths(paths)
+      self.assertEqual(results, paths)
+      self.assertEmpty(listed)
+
+  def testDuplicates(self):
+    filepaths = [
+        ("foo", "0"),
+        ("foo", "1"),
+    ]
+
+    with DirHierarchy(filepaths) as hierarchy:
+      paths = [
+          hierarchy(("foo", "*")),
+          hierarchy(("foo", "0")),
+          hierarchy(("foo", "{0,[0-1]}")),
+      ]
+
+      results, _ = self._ExpandPaths(paths)
+      self.assertCountEqual(
+          results,
+          [
+              hierarchy(("foo", "0")),
+              hierarchy(("foo", "1")),
+          ],
+      )
+
+  def testRelative(self):
+    with DirHierarchy([("foo", "0")]) as hierarchy:
+      paths = [hierarchy(("foo", "0")), os.path.join("foo", "bar")]
+
+      with self.assertRaises(ValueError):
+        list(globbing.ExpandPaths(paths))
+
+
 class DirHierarchyContext(object):
   """A context within which the file hierarchy exists."""
 
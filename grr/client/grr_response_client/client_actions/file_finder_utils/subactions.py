@@ -5,7 +5,10 @@ import abc
 
 from grr_response_client import client_utils
 from grr_response_client import client_utils_common
+from grr_response_client import hash_cache
 from grr_response_client.client_actions.file_finder_utils import uploading
+from grr_response_core import config
+from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 
 
 class Action(metaclass=abc.ABCMeta):
@@ -135,14 +138,30 @@ class DownloadAction(Action):
     max_size = self.opts.max_size
     chunk_size = self.opts.chunk_size
 
-    uploader = uploading.TransferStoreUploader(self.flow, chunk_size=chunk_size)
+    uploader = uploading.TransferStoreUploader(
+        self.flow,
+        chunk_size=chunk_size,
+        negotiate_blobs=self.opts.negotiate_blobs,
+        threads=config.CONFIG["Client.upload_threads"],
+    )
     return uploader.UploadFilePath(filepath, amount=max_size)
 
 
 def _HashEntry(stat, flow, max_size=None):
-  hasher = client_utils_common.MultiHasher(progress=flow.Progress)
-  try:
-    hasher.HashFilePath(stat.GetPath(), max_size or stat.GetSize())
+  byte_count = max_size or stat.GetSize()
+
+  def Hash():
+    hasher = client_utils_common.MultiHasher(progress=flow.Progress)
+    hasher.HashFilePath(stat.GetPath(), byte_count)
     return hasher.GetHashObject()
+
+  try:
+    return hash_cache.GetOrCompute(
+        flow,
+        stat.GetPath(),
+        hash_cache.MultiHasherKind(None, byte_count),
+        rdf_crypto.Hash,
+        Hash,
+    )
   except IOError:
     return None
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 """Utility classes for uploading files to the server."""
 
+import collections
+from concurrent import futures
 import hashlib
 import zlib
 
@@ -15,23 +17,43 @@ class TransferStoreUploader(object):
 
   Input is divided into chunks, then these chunks are compressed (using zlib)
   and then they are uploaded to the transfer store (a well-known flow).
+
+  When blobs are negotiated, chunks are only hashed. The server checks which
+  of the reported chunks it does not have yet and asks the client to transfer
+  just these.
+
+  With multiple threads, chunks are compressed and hashed by a pool of workers
+  while the following chunks are being read. Chunks are still sent in order,
+  from the thread that uploads the file.
   """
 
   DEFAULT_CHUNK_SIZE = 512 * 1024
 
+  # A number of chunks per worker thread read ahead of the chunk being sent. It
+  # bounds the memory used by the pipelined upload.
+  _PENDING_CHUNKS_PER_THREAD = 2
+
   _TRANSFER_STORE_SESSION_ID = rdfvalue.SessionID(flow_name="TransferStore")
 
-  def __init__(self, action, chunk_size=None):
+  def __init__(
+      self, action, chunk_size=None, negotiate_blobs=False, threads=0
+  ):
     """Initializes the uploader.
 
     Args:
       action: A parent action that creates the uploader. Used to communicate
         with the parent flow.
       chunk_size: A number of (uncompressed) bytes per a chunk.
+      negotiate_blobs: If set, chunks are not sent to the transfer store and
+        only their digests are reported.
+      threads: A number of threads compressing and hashing chunks. If 0, chunks
+        are processed one by one on the calling thread.
     """
     chunk_size = chunk_size or self.DEFAULT_CHUNK_SIZE
 
     self._action = action
+    self._negotiate_blobs = negotiate_blobs
+    self._threads = threads
     self._streamer = streaming.Streamer(chunk_size=chunk_size)
 
   def UploadFilePath(self, filepath, offset=0, amount=None):
@@ -67,14 +89,46 @@ class TransferStoreUploader(object):
     )
 
   def _UploadChunkStream(self, chunk_stream):
-    chunks = []
-    for chunk in chunk_stream:
-      chunks.append(self._UploadChunk(chunk))
+    if self._threads > 0:
+      chunks = list(self._UploadChunkStreamPipelined(chunk_stream))
+    else:
+      chunks = [self._UploadChunk(chunk) for chunk in chunk_stream]
 
     return rdf_client_fs.BlobImageDescriptor(
         chunks=chunks, chunk_size=self._streamer.chunk_size
     )
 
+  def _UploadChunkStreamPipelined(self, chunk_stream):
+    """Uploads chunks processing them on a pool of worker threads.
+
+    Args:
+      chunk_stream: An iterator over chunks to upload.
+
+    Yields:
+      `BlobImageChunkDescriptor` objects, in the order of the chunks.
+    """
+    executor = futures.ThreadPoolExecutor(
+        max_workers=self._threads, thread_name_prefix="TransferStoreUploader"
+    )
+    max_pending = self._threads * self._PENDING_CHUNKS_PER_THREAD
+    pending = collections.deque()
+
+    try:
+      for chunk in chunk_stream:
+        if len(pending) >= max_pending:
+          yield self._SendChunk(*pending.popleft().result())
+
+        pending.append(executor.submit(self._ProcessChunk, chunk))
+
+        # CPU time used by the workers is accounted to the client process, so
+        # the action still fails once it exceeds its CPU limit.
+        self._action.Progress()
+
+      while pending:
+        yield self._SendChunk(*pending.popleft().result())
+    finally:
+      executor.shutdown(wait=False, cancel_futures=True)
+
   def _UploadChunk(self, chunk):
     """Uploads a single chunk to the transfer store flow.
 
@@ -84,16 +138,35 @@ class TransferStoreUploader(object):
     Returns:
       A `BlobImageChunkDescriptor` object.
     """
-    blob = _CompressedDataBlob(chunk)
+    return self._SendChunk(*self._ProcessChunk(chunk))
+
+  def _ProcessChunk(self, chunk):
+    """Compresses and hashes a single chunk.
+
+    Args:
+      chunk: A chunk to process.
 
-    self._action.ChargeBytesToSession(len(chunk.data))
-    self._action.SendReply(blob, session_id=self._TRANSFER_STORE_SESSION_ID)
+    Returns:
+      A tuple of a `BlobImageChunkDescriptor` object and a `DataBlob` object to
+      send (or `None` if blobs are negotiated).
+    """
+    blob = None
+    if not self._negotiate_blobs:
+      blob = _CompressedDataBlob(chunk)
 
-    return rdf_client_fs.BlobImageChunkDescriptor(
+    descriptor = rdf_client_fs.BlobImageChunkDescriptor(
         digest=hashlib.sha256(chunk.data).digest(),
         offset=chunk.offset,
         length=len(chunk.data),
     )
+    return descriptor, blob
+
+  def _SendChunk(self, descriptor, blob):
+    if blob is not None:
+      self._action.ChargeBytesToSession(descriptor.length)
+      self._action.SendReply(blob, session_id=self._TRANSFER_STORE_SESSION_ID)
+
+    return descriptor
 
 
 def _CompressedDataBlob(chunk):
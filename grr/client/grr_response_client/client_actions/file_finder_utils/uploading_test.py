@@ -130,6 +130,33 @@ class UploaderTest(absltest.TestCase):
       self.assertEqual(blobdesc.chunks[2].length, 1)
       self.assertEqual(blobdesc.chunks[2].digest, Sha256(b"6"))
 
+  def testNegotiateBlobs(self):
+    action = FakeAction()
+    uploader = uploading.TransferStoreUploader(
+        action, chunk_size=3, negotiate_blobs=True
+    )
+
+    with temp.AutoTempFilePath() as temp_filepath:
+      with io.open(temp_filepath, "wb") as temp_file:
+        temp_file.write(b"1234567")
+
+      blobdesc = uploader.UploadFilePath(temp_filepath)
+
+      self.assertEqual(action.charged_bytes, 0)
+      self.assertEmpty(action.messages)
+
+      self.assertLen(blobdesc.chunks, 3)
+      self.assertEqual(blobdesc.chunk_size, 3)
+      self.assertEqual(blobdesc.chunks[0].offset, 0)
+      self.assertEqual(blobdesc.chunks[0].length, 3)
+      self.assertEqual(blobdesc.chunks[0].digest, Sha256(b"123"))
+      self.assertEqual(blobdesc.chunks[1].offset, 3)
+      self.assertEqual(blobdesc.chunks[1].length, 3)
+      self.assertEqual(blobdesc.chunks[1].digest, Sha256(b"456"))
+      self.assertEqual(blobdesc.chunks[2].offset, 6)
+      self.assertEqual(blobdesc.chunks[2].length, 1)
+      self.assertEqual(blobdesc.chunks[2].digest, Sha256(b"7"))
+
   def testIncorrectFile(self):
     action = FakeAction()
     uploader = uploading.TransferStoreUploader(action, chunk_size=10)
@@ -137,11 +164,82 @@ class UploaderTest(absltest.TestCase):
     with self.assertRaises(IOError):
       uploader.UploadFilePath("/foo/bar/baz")
 
+  def testPipelinedManyChunks(self):
+    action = FakeAction()
+    uploader = uploading.TransferStoreUploader(action, chunk_size=2, threads=2)
+
+    content = b"0123456789abcdefghij-"
+    with temp.AutoTempFilePath() as temp_filepath:
+      with io.open(temp_filepath, "wb") as temp_file:
+        temp_file.write(content)
+
+      blobdesc = uploader.UploadFilePath(temp_filepath)
+
+    parts = [content[i : i + 2] for i in range(0, len(content), 2)]
+
+    self.assertEqual(action.charged_bytes, len(content))
+    self.assertLen(action.messages, len(parts))
+    for message, part in zip(action.messages, parts):
+      self.assertEqual(message.item.data, zlib.compress(part))
+
+    self.assertLen(blobdesc.chunks, len(parts))
+    self.assertEqual(blobdesc.chunk_size, 2)
+    for i, (chunk, part) in enumerate(zip(blobdesc.chunks, parts)):
+      self.assertEqual(chunk.offset, 2 * i)
+      self.assertEqual(chunk.length, len(part))
+      self.assertEqual(chunk.digest, Sha256(part))
+
+  def testPipelinedNegotiateBlobs(self):
+    action = FakeAction()
+    uploader = uploading.TransferStoreUploader(
+        action, chunk_size=3, negotiate_blobs=True, threads=2
+    )
+
+    with temp.AutoTempFilePath() as temp_filepath:
+      with io.open(temp_filepath, "wb") as temp_file:
+        temp_file.write(b"1234567")
+
+      blobdesc = uploader.UploadFilePath(temp_filepath)
+
+    self.assertEqual(action.charged_bytes, 0)
+    self.assertEmpty(action.messages)
+
+    self.assertLen(blobdesc.chunks, 3)
+    self.assertEqual(blobdesc.chunks[0].digest, Sha256(b"123"))
+    self.assertEqual(blobdesc.chunks[1].digest, Sha256(b"456"))
+    self.assertEqual(blobdesc.chunks[2].digest, Sha256(b"7"))
+
+  def testPipelinedIncorrectFile(self):
+    action = FakeAction()
+    uploader = uploading.TransferStoreUploader(action, chunk_size=10, threads=2)
+
+    with self.assertRaises(IOError):
+      uploader.UploadFilePath("/foo/bar/baz")
+
+  def testPipelinedChargeFailure(self):
+    action = FakeAction()
+    action.charge_limit = 4
+    uploader = uploading.TransferStoreUploader(action, chunk_size=3, threads=2)
+
+    with temp.AutoTempFilePath() as temp_filepath:
+      with io.open(temp_filepath, "wb") as temp_file:
+        temp_file.write(b"1234567890")
+
+      with self.assertRaises(LimitExceededError):
+        uploader.UploadFilePath(temp_filepath)
+
+    self.assertLen(action.messages, 1)
+    self.assertEqual(action.messages[0].item.data, zlib.compress(b"123"))
+
 
 def Sha256(data):
   return hashlib.sha256(data).digest()
 
 
+class LimitExceededError(Exception):
+  pass
+
+
 class FakeAction(mock.MagicMock):
 
   Message = collections.namedtuple("Message", ("item", "session_id"))  # pylint: disable=invalid-name
@@ -149,10 +247,13 @@ class FakeAction(mock.MagicMock):
   def __init__(self, **kwargs):
     super().__init__(**kwargs)
     self.charged_bytes = 0
+    self.charge_limit = None
     self.messages = []
 
   def ChargeBytesToSession(self, amount):
     self.charged_bytes += amount
+    if self.charge_limit is not None and self.charged_bytes > self.charge_limit:
+      raise LimitExceededError()
 
   def SendReply(self, item, session_id):
     self.messages.append(self.Message(item=item, session_id=session_id))
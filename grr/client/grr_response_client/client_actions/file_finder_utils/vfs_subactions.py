@@ -2,14 +2,15 @@
 """Implementation of client-side file-finder subactions."""
 
 import abc
-from collections.abc import Callable
 import stat
 from typing import Optional
 
 from grr_response_client import actions
 from grr_response_client import client_utils_common
+from grr_response_client import hash_cache
 from grr_response_client import vfs
 from grr_response_client.client_actions.file_finder_utils import uploading
+from grr_response_core import config
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
@@ -89,7 +90,7 @@ class HashAction(Action):
     policy = self._opts.oversized_file_policy
 
     if stat_entry.st_size <= self._opts.max_size:
-      result.hash_entry = _HashEntry(stat_entry, fd, self._action.Progress)
+      result.hash_entry = _HashEntry(stat_entry, fd, self._action)
     elif policy == self._opts.OversizedFilePolicy.HASH_TRUNCATED:
       # self._opts.max_size has a type ByteSize - hence we have to convert it
       # an int before passing to _HashEntry.
@@ -97,7 +98,7 @@ class HashAction(Action):
           stat_entry,
           fd,
           max_size=int(self._opts.max_size),
-          progress=self._action.Progress,
+          action=self._action,
       )
     # else: Skip due to OversizedFilePolicy.SKIP.
 
@@ -139,7 +140,7 @@ class DownloadAction(Action):
       result.transferred_file = self._UploadFilePath(fd, truncate=truncate)
     elif policy == self._opts.OversizedFilePolicy.HASH_TRUNCATED:
       result.hash_entry = _HashEntry(
-          stat_entry, fd, self._action.Progress, max_size=max_size
+          stat_entry, fd, self._action, max_size=max_size
       )
     # else: Skip due to OversizedFilePolicy.SKIP.
 
@@ -150,7 +151,10 @@ class DownloadAction(Action):
     chunk_size = self._opts.chunk_size
 
     uploader = uploading.TransferStoreUploader(
-        self._action, chunk_size=chunk_size
+        self._action,
+        chunk_size=chunk_size,
+        negotiate_blobs=self._opts.negotiate_blobs,
+        threads=config.CONFIG["Client.upload_threads"],
     )
     return uploader.UploadFile(fd, amount=max_size)
 
@@ -158,12 +162,23 @@ class DownloadAction(Action):
 def _HashEntry(
     stat_entry: rdf_client_fs.StatEntry,
     fd: vfs.VFSHandler,
-    progress: Callable[[], None],
+    action: actions.ActionPlugin,
     max_size: Optional[int] = None,
 ) -> Optional[rdf_crypto.Hash]:
-  hasher = client_utils_common.MultiHasher(progress=progress)
-  try:
-    hasher.HashFile(fd, max_size or stat_entry.st_size)
+  byte_count = max_size or stat_entry.st_size
+
+  def Hash() -> rdf_crypto.Hash:
+    hasher = client_utils_common.MultiHasher(progress=action.Progress)
+    hasher.HashFile(fd, byte_count)
     return hasher.GetHashObject()
+
+  try:
+    return hash_cache.GetOrCompute(
+        action,
+        hash_cache.LocalPath(fd),
+        hash_cache.MultiHasherKind(None, byte_count),
+        rdf_crypto.Hash,
+        Hash,
+    )
   except IOError:
     return None
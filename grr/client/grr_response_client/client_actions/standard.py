@@ -14,6 +14,7 @@ import psutil
 
 from grr_response_client import actions
 from grr_response_client import client_utils_common
+from grr_response_client import hash_cache
 from grr_response_client import vfs
 from grr_response_client.client_actions import tempfiles
 from grr_response_core import config
@@ -22,6 +23,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import client_action as rdf_client_action
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
@@ -144,11 +146,23 @@ class HashFile(actions.ActionPlugin):
       for hash_name in t.hashers:
         hash_types.add(str(hash_name).lower())
 
-    hasher = client_utils_common.MultiHasher(hash_types, progress=self.Progress)
     with vfs.VFSOpen(args.pathspec, progress_callback=self.Progress) as fd:
-      hasher.HashFile(fd, args.max_filesize)
 
-    hash_object = hasher.GetHashObject()
+      def Hash():
+        hasher = client_utils_common.MultiHasher(
+            hash_types, progress=self.Progress
+        )
+        hasher.HashFile(fd, args.max_filesize)
+        return hasher.GetHashObject()
+
+      hash_object = hash_cache.GetOrCompute(
+          self,
+          hash_cache.LocalPath(fd),
+          hash_cache.MultiHasherKind(hash_types, args.max_filesize),
+          rdf_crypto.Hash,
+          Hash,
+      )
+
     response = rdf_client_action.FingerprintResponse(
         pathspec=fd.pathspec, bytes_read=hash_object.num_bytes, hash=hash_object
     )
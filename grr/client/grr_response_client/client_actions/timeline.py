@@ -1,20 +1,29 @@
 #!/usr/bin/env python
 """A module with a client action for timeline collection."""
 
+import collections
+from concurrent import futures
 import hashlib
+import io
+import logging
 import os
 import stat as stat_mode
+import struct
+import time
 from typing import Iterator, Optional
 
 import psutil
 
 from grr_response_client import actions
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import mig_timeline
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
 from grr_response_core.lib.util import iterator
 from grr_response_core.lib.util import statx
+from grr_response_core.lib.util import timeline
+from grr_response_proto import timeline_pb2
 
 
 # Indicates whether the timeline action will also collect file birth time.
@@ -32,20 +41,37 @@ class Timeline(actions.ActionPlugin):
   def Run(self, args: rdf_timeline.TimelineArgs) -> None:
     """Executes the client action."""
     fstype = GetFilesystemType(args.root)
-    entries = iterator.Counted(Walk(args.root))
+
+    threads = config.CONFIG["Client.timeline_walk_threads"]
+    if threads > 0:
+      walk = ParallelWalk(args.root, threads)
+    else:
+      walk = Walk(args.root)
+
+    throughput = _WalkThroughput(walk)
     proto_entries = (
-        mig_timeline.ToProtoTimelineEntry(entry) for entry in entries
+        mig_timeline.ToProtoTimelineEntry(entry) for entry in throughput
     )
-    for entry_batch in rdf_timeline.SerializeTimelineEntryStream(proto_entries):
-      entry_batch_blob = rdf_protodict.DataBlob(data=entry_batch)
-      self.SendReply(entry_batch_blob, session_id=self._TRANSFER_STORE_ID)
 
-      entry_batch_blob_id = hashlib.sha256(entry_batch).digest()
+    digest = None
+    base_digest = None
+    if args.timeline_id:
+      digest = TimelineDigest(args.timeline_id)
+      if args.base_timeline_id:
+        base_digest = LoadDigest(args.root, args.base_timeline_id)
+      proto_entries = DiffEntries(proto_entries, digest, base_digest)
+
+    entries = iterator.Counted(proto_entries)
+    for entry_batch in rdf_timeline.SerializeTimelineEntryStream(entries):
+      entry_batch_blob_id = self._SendBlob(entry_batch)
 
       result = rdf_timeline.TimelineResult()
       result.entry_batch_blob_ids.append(entry_batch_blob_id)
       result.entry_count = entries.count
       result.filesystem_type = fstype
+      if base_digest is not None:
+        result.base_timeline_id = base_digest.timeline_id
+      throughput.Fill(result)
       self.SendReply(result)
 
       # Each result should contain information only about the number of entries
@@ -53,6 +79,288 @@ class Timeline(actions.ActionPlugin):
       # counter.
       entries.Reset()
 
+    if base_digest is not None:
+      # The final result of an incremental collection lets the server know
+      # that the collection is incremental even if nothing changed.
+      result = rdf_timeline.TimelineResult()
+      result.filesystem_type = fstype
+      result.base_timeline_id = base_digest.timeline_id
+      throughput.Fill(result)
+
+      removed_path_hashes = base_digest.RemovedPathHashes(digest)
+      for batch in timeline.SerializePathHashStream(removed_path_hashes):
+        result.removed_path_hash_batch_blob_ids.append(self._SendBlob(batch))
+
+      self.SendReply(result)
+
+    if digest is not None:
+      SaveDigest(args.root, digest)
+
+    logging.info(
+        "Timeline of '%r' walked: %d entries in %.1fs (%.1f entries/s).",
+        args.root,
+        throughput.count,
+        throughput.elapsed_seconds,
+        throughput.entries_per_second,
+    )
+
+  def _SendBlob(self, data: bytes) -> bytes:
+    """Sends the given data to the blob store, returning its blob id."""
+    blob = rdf_protodict.DataBlob(data=data)
+    self.SendReply(blob, session_id=self._TRANSFER_STORE_ID)
+
+    return hashlib.sha256(data).digest()
+
+
+class _WalkThroughput(Iterator[rdf_timeline.TimelineEntry]):
+  """A walk iterator wrapper that measures the walk throughput."""
+
+  def __init__(self, walk: Iterator[rdf_timeline.TimelineEntry]) -> None:
+    super().__init__()
+    self._walk = walk
+    self._start_time = time.monotonic()
+    self.count = 0
+
+  def __iter__(self) -> Iterator[rdf_timeline.TimelineEntry]:
+    return self
+
+  def __next__(self) -> rdf_timeline.TimelineEntry:
+    entry = next(self._walk)
+    self.count += 1
+    return entry
+
+  @property
+  def elapsed_seconds(self) -> float:
+    return time.monotonic() - self._start_time
+
+  @property
+  def entries_per_second(self) -> float:
+    elapsed_seconds = self.elapsed_seconds
+    if not elapsed_seconds:
+      return 0.0
+    return self.count / elapsed_seconds
+
+  def Fill(self, result: rdf_timeline.TimelineResult) -> None:
+    """Fills the walk statistics in the given timeline result."""
+    result.walk_entry_count = self.count
+    result.walk_duration_micros = int(self.elapsed_seconds * 1_000_000)
+
+
+class TimelineDigest:
+  """A compact digest of a collected timeline.
+
+  For every directory, the digest keeps hashes of paths of entries in it along
+  with hashes of the entries themselves. This is enough to tell which entries
+  changed since the digest was computed and which were removed, without
+  keeping the entries. Grouping by directory keeps the number of objects in
+  memory proportional to the number of directories rather than entries.
+  """
+
+  def __init__(
+      self,
+      timeline_id: str,
+      directories: Optional[dict[bytes, bytes]] = None,
+  ) -> None:
+    """Initializes the digest.
+
+    Args:
+      timeline_id: An identifier of the timeline the digest describes.
+      directories: A mapping from hashes of directory paths to concatenated
+        path and entry hashes of entries in these directories.
+    """
+    self.timeline_id = timeline_id
+    self._directories = directories if directories is not None else {}
+    self._children_cache = collections.OrderedDict()
+
+  def Add(
+      self,
+      parent_hash: bytes,
+      path_hash: bytes,
+      entry_hash: bytes,
+  ) -> None:
+    """Adds an entry to the digest."""
+    records = self._directories.get(parent_hash)
+    if records is None:
+      records = self._directories[parent_hash] = bytearray()
+    records.extend(path_hash)
+    records.extend(entry_hash)
+
+  def EntryHash(self, parent_hash: bytes, path_hash: bytes) -> Optional[bytes]:
+    """Returns a hash of the entry with the given path or `None` if missing."""
+    children = self._children_cache.get(parent_hash)
+    if children is None:
+      children = dict(_ParseDigestRecords(self._directories.get(parent_hash)))
+      self._children_cache[parent_hash] = children
+      if len(self._children_cache) > _DIGEST_CHILDREN_CACHE_SIZE:
+        self._children_cache.popitem(last=False)
+    else:
+      self._children_cache.move_to_end(parent_hash)
+
+    return children.get(path_hash)
+
+  def RemovedPathHashes(self, other: "TimelineDigest") -> Iterator[bytes]:
+    """Yields path hashes of entries of this digest missing in the other."""
+    for parent_hash, records in self._directories.items():
+      other_records = other._directories.get(parent_hash)
+      other_path_hashes = {
+          path_hash for path_hash, _ in _ParseDigestRecords(other_records)
+      }
+      for path_hash, _ in _ParseDigestRecords(records):
+        if path_hash not in other_path_hashes:
+          yield path_hash
+
+  def SerializeToBytes(self) -> bytes:
+    """Serializes the digest to bytes."""
+    timeline_id = self.timeline_id.encode("utf-8")
+
+    buf = io.BytesIO()
+    buf.write(_DIGEST_HEADER.pack(_DIGEST_VERSION, len(timeline_id)))
+    buf.write(timeline_id)
+    for parent_hash, records in self._directories.items():
+      buf.write(parent_hash)
+      buf.write(_DIGEST_RECORDS_SIZE.pack(len(records)))
+      buf.write(records)
+
+    return buf.getvalue()
+
+  @classmethod
+  def FromSerializedBytes(cls, data: bytes) -> "TimelineDigest":
+    """Deserializes the digest from bytes.
+
+    Args:
+      data: A digest serialized with `SerializeToBytes`.
+
+    Returns:
+      The deserialized digest.
+
+    Raises:
+      ValueError: If the data is not a valid serialized digest.
+    """
+    try:
+      version, timeline_id_size = _DIGEST_HEADER.unpack_from(data)
+      if version != _DIGEST_VERSION:
+        raise ValueError(f"Unsupported timeline digest version: {version}")
+
+      offset = _DIGEST_HEADER.size
+      timeline_id = data[offset : offset + timeline_id_size].decode("utf-8")
+      offset += timeline_id_size
+
+      directories = {}
+      while offset < len(data):
+        parent_hash = data[offset : offset + timeline.PATH_HASH_SIZE]
+        offset += timeline.PATH_HASH_SIZE
+        (records_size,) = _DIGEST_RECORDS_SIZE.unpack_from(data, offset)
+        offset += _DIGEST_RECORDS_SIZE.size
+        directories[parent_hash] = data[offset : offset + records_size]
+        offset += records_size
+    except (struct.error, UnicodeDecodeError) as error:
+      raise ValueError(f"Malformed timeline digest: {error}") from error
+
+    if offset != len(data):
+      raise ValueError("Truncated timeline digest")
+
+    return cls(timeline_id, directories)
+
+
+def DiffEntries(
+    entries: Iterator[timeline_pb2.TimelineEntry],
+    digest: TimelineDigest,
+    base_digest: Optional[TimelineDigest] = None,
+) -> Iterator[timeline_pb2.TimelineEntry]:
+  """Records entries into a digest, yielding those changed since the base.
+
+  Args:
+    entries: Timeline entries to record.
+    digest: A digest to record the entries into.
+    base_digest: A digest of the base timeline. If not set, all the entries are
+      yielded.
+
+  Yields:
+    Entries that were added or changed since the base timeline.
+  """
+  for entry in entries:
+    parent_hash = timeline.PathHash(os.path.dirname(entry.path))
+    path_hash = timeline.PathHash(entry.path)
+    entry_hash = hashlib.blake2b(
+        entry.SerializeToString(deterministic=True),
+        digest_size=_DIGEST_ENTRY_HASH_SIZE,
+    ).digest()
+
+    digest.Add(parent_hash, path_hash, entry_hash)
+
+    if base_digest is None:
+      yield entry
+    elif base_digest.EntryHash(parent_hash, path_hash) != entry_hash:
+      yield entry
+
+
+def LoadDigest(root: bytes, timeline_id: str) -> Optional[TimelineDigest]:
+  """Loads a digest of the timeline of the given root kept by the client.
+
+  Args:
+    root: A root path of the timeline.
+    timeline_id: An identifier of the timeline to load the digest of.
+
+  Returns:
+    The digest or `None` if the client does not keep a digest of the timeline
+    with the given identifier (e.g. because a newer timeline was collected
+    since or because the digest was never stored).
+  """
+  try:
+    with open(_DigestPath(root), mode="rb") as digest_file:
+      digest = TimelineDigest.FromSerializedBytes(digest_file.read())
+  except FileNotFoundError:
+    return None
+  except (OSError, ValueError):
+    logging.exception("Failed to load timeline digest for '%r'", root)
+    return None
+
+  if digest.timeline_id != timeline_id:
+    return None
+
+  return digest
+
+
+def SaveDigest(root: bytes, digest: TimelineDigest) -> None:
+  """Saves the digest of the timeline of the given root, replacing old ones.
+
+  Failures are logged and otherwise ignored: without a digest the next
+  incremental collection falls back to sending the full timeline.
+
+  Args:
+    root: A root path of the timeline.
+    digest: A digest to save.
+  """
+  path = _DigestPath(root)
+  temp_path = f"{path}.tmp"
+  try:
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    with open(temp_path, mode="wb") as digest_file:
+      digest_file.write(digest.SerializeToBytes())
+    os.replace(temp_path, path)
+  except OSError:
+    logging.exception("Failed to save timeline digest for '%r'", root)
+
+
+def _DigestPath(root: bytes) -> str:
+  digest_dir = config.CONFIG["Client.timeline_digest_dir"]
+  return os.path.join(digest_dir, hashlib.sha256(root).hexdigest())
+
+
+def _ParseDigestRecords(
+    records: Optional[bytes],
+) -> Iterator[tuple[bytes, bytes]]:
+  """Yields pairs of path and entry hashes of the given digest records."""
+  if not records:
+    return
+
+  for offset in range(0, len(records), _DIGEST_RECORD_SIZE):
+    path_hash_end = offset + timeline.PATH_HASH_SIZE
+    record_end = offset + _DIGEST_RECORD_SIZE
+    yield bytes(records[offset:path_hash_end]), bytes(
+        records[path_hash_end:record_end]
+    )
+
 
 def Walk(root: bytes) -> Iterator[rdf_timeline.TimelineEntry]:
   """Walks the filesystem collecting stat information.
@@ -114,6 +422,125 @@ def Walk(root: bytes) -> Iterator[rdf_timeline.TimelineEntry]:
   return Recurse(root)
 
 
+def ParallelWalk(
+    root: bytes,
+    threads: int,
+    max_pending_directories: Optional[int] = None,
+) -> Iterator[rdf_timeline.TimelineEntry]:
+  """Walks the filesystem collecting stat information using multiple threads.
+
+  This method yields exactly the same entries in exactly the same order as
+  `Walk` does. The difference is that directories are listed and stat
+  information about their children is collected on a thread pool, ahead of the
+  walk reaching them. This helps on filesystems where latency of individual
+  calls rather than throughput is the limiting factor (e.g. network ones).
+
+  Args:
+    root: A path to the root folder at which the recursion should start.
+    threads: A number of threads listing directories.
+    max_pending_directories: A maximum number of directories listed ahead of the
+      walk. It bounds the memory used for keeping the listings. Defaults to a
+      small multiple of the number of threads.
+
+  Returns:
+    An iterator over timeline entries with stat information about each file.
+
+  Raises:
+    OSError: If it is not possible to collect information about the root folder.
+    ValueError: If the specified root path is not absolute.
+  """
+  if not os.path.isabs(root):
+    raise ValueError("Requested to traverse a non-root path")
+
+  if max_pending_directories is None:
+    max_pending_directories = threads * _PENDING_DIRECTORIES_PER_THREAD
+
+  # See `Walk` for why the root path is expanded and why errors on the root
+  # folder are not ignored.
+  root = os.path.realpath(root)
+  dev = os.lstat(root).st_dev
+
+  return _ParallelWalk(root, dev, threads, max_pending_directories)
+
+
+def _ParallelWalk(
+    root: bytes,
+    dev: int,
+    threads: int,
+    max_pending_directories: int,
+) -> Iterator[rdf_timeline.TimelineEntry]:
+  """Performs the parallel walk over the file hierarchy."""
+  try:
+    root_stat = statx.Get(root)
+  except OSError:
+    return
+
+  yield rdf_timeline.TimelineEntry.FromStatx(root, root_stat)
+
+  if not _IsDirOnDevice(root_stat, dev):
+    return
+
+  executor = futures.ThreadPoolExecutor(
+      max_workers=threads, thread_name_prefix="TimelineWalk"
+  )
+  pending: dict[bytes, futures.Future[list[tuple[bytes, statx.Result]]]] = {}
+
+  def List(path: bytes) -> list[tuple[bytes, statx.Result]]:
+    future = pending.pop(path, None)
+    if future is not None:
+      children = future.result()
+    else:
+      children = _ListDirectory(path)
+
+    # Subfolders of the listed folder are the next ones the walk will reach.
+    for child_path, child_stat in children:
+      if len(pending) >= max_pending_directories:
+        break
+      if _IsDirOnDevice(child_stat, dev):
+        pending[child_path] = executor.submit(_ListDirectory, child_path)
+
+    return children
+
+  try:
+    stack = [iter(List(root))]
+    while stack:
+      child = next(stack[-1], None)
+      if child is None:
+        stack.pop()
+        continue
+
+      path, stat = child
+      yield rdf_timeline.TimelineEntry.FromStatx(path, stat)
+
+      if _IsDirOnDevice(stat, dev):
+        stack.append(iter(List(path)))
+  finally:
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _ListDirectory(path: bytes) -> list[tuple[bytes, statx.Result]]:
+  """Lists a folder collecting stat information about its children."""
+  try:
+    childnames = os.listdir(path)
+  except OSError:
+    return []
+
+  children = []
+  for childname in childnames:
+    childpath = os.path.join(path, childname)
+    try:
+      children.append((childpath, statx.Get(childpath)))
+    except OSError:
+      continue
+
+  return children
+
+
+def _IsDirOnDevice(stat: statx.Result, dev: int) -> bool:
+  # We want to recurse only to folders on the same device.
+  return stat_mode.S_ISDIR(stat.mode) and stat.dev == dev
+
+
 def GetFilesystemType(root: bytes) -> Optional[str]:
   """Retrieves the type of a filesystem the given path belongs to.
 
@@ -146,3 +573,30 @@ def GetFilesystemType(root: bytes) -> Optional[str]:
       return part.fstype
 
   return None
+
+
+# The default number of folders listed ahead of the parallel walk per thread.
+_PENDING_DIRECTORIES_PER_THREAD = 4
+
+# A version of the timeline digest serialization format.
+_DIGEST_VERSION = 1
+
+# A header of serialized timeline digests: the format version and the size of
+# the timeline identifier that follows it.
+_DIGEST_HEADER = struct.Struct("<BH")
+
+# A size of records of a single directory in serialized timeline digests.
+_DIGEST_RECORDS_SIZE = struct.Struct("<I")
+
+# A size of entry hashes kept in timeline digests. Unlike path hashes, entry
+# hashes are only compared for entries with the same path, so they can be
+# shorter.
+_DIGEST_ENTRY_HASH_SIZE = 8
+
+_DIGEST_RECORD_SIZE = timeline.PATH_HASH_SIZE + _DIGEST_ENTRY_HASH_SIZE
+
+# The number of directories which parsed digest records are kept in memory
+# while diffing a walk. The walk is depth-first, so this only needs to be
+# larger than the depth of the directory tree for every directory to be parsed
+# only once.
+_DIGEST_CHILDREN_CACHE_SIZE = 256
@@ -15,8 +15,11 @@ from grr_response_client.client_actions import timeline
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
 from grr_response_core.lib.util import temp
+from grr_response_core.lib.util import timeline as timeline_util
+from grr_response_proto import timeline_pb2
 from grr.test_lib import client_test_lib
 from grr.test_lib import skip
+from grr.test_lib import test_lib
 from grr.test_lib import testing_startup
 
 
@@ -74,6 +77,158 @@ class TimelineTest(client_test_lib.EmptyActionTest):
         # The filesystem type should be the same for every result.
         self.assertEqual(result.filesystem_type, results[0].filesystem_type)
 
+      # Walk statistics are cumulative, so the last result covers all entries.
+      self.assertEqual(results[-1].walk_entry_count, file_count + 1)
+
+  def testRunIncremental(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as temp_dirpath:
+      root_dirpath = os.path.join(temp_dirpath, "root")
+      os.mkdir(root_dirpath)
+
+      foo_filepath = os.path.join(root_dirpath, "foo")
+      bar_filepath = os.path.join(root_dirpath, "bar")
+      baz_filepath = os.path.join(root_dirpath, "baz")
+      quux_filepath = os.path.join(root_dirpath, "quux")
+      _Touch(foo_filepath, content=b"foo")
+      _Touch(bar_filepath, content=b"bar")
+      _Touch(baz_filepath, content=b"baz")
+
+      args = rdf_timeline.TimelineArgs()
+      args.root = root_dirpath.encode("utf-8")
+      args.timeline_id = "F:1"
+
+      digest_dirpath = os.path.join(temp_dirpath, "digests")
+      with test_lib.ConfigOverrider({
+          "Client.timeline_digest_dir": digest_dirpath,
+      }):
+        results, entries, _ = self._RunTimeline(args)
+        self.assertLen(entries, 4)
+        for result in results:
+          self.assertFalse(result.base_timeline_id)
+
+        _Touch(foo_filepath, content=b"foofoo")
+        _Touch(quux_filepath, content=b"quux")
+        os.remove(bar_filepath)
+
+        args.timeline_id = "F:2"
+        args.base_timeline_id = "F:1"
+
+        results, entries, removed = self._RunTimeline(args)
+        for result in results:
+          self.assertEqual(result.base_timeline_id, "F:1")
+
+      # The root folder changes because files were added to and removed from it
+      # but `baz` should not be sent again.
+      self.assertCountEqual(
+          [entry.path for entry in entries],
+          [
+              root_dirpath.encode("utf-8"),
+              foo_filepath.encode("utf-8"),
+              quux_filepath.encode("utf-8"),
+          ],
+      )
+      self.assertEqual(
+          removed, [timeline_util.PathHash(bar_filepath.encode("utf-8"))]
+      )
+
+  def testRunIncrementalWithoutBaseDigest(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as temp_dirpath:
+      root_dirpath = os.path.join(temp_dirpath, "root")
+      os.mkdir(root_dirpath)
+      _Touch(os.path.join(root_dirpath, "foo"), content=b"foo")
+
+      args = rdf_timeline.TimelineArgs()
+      args.root = root_dirpath.encode("utf-8")
+      args.timeline_id = "F:2"
+      args.base_timeline_id = "F:1"
+
+      with test_lib.ConfigOverrider({
+          "Client.timeline_digest_dir": os.path.join(temp_dirpath, "digests"),
+      }):
+        results, entries, removed = self._RunTimeline(args)
+
+      self.assertLen(entries, 2)
+      self.assertEmpty(removed)
+      for result in results:
+        self.assertFalse(result.base_timeline_id)
+
+  def _RunTimeline(
+      self,
+      args: rdf_timeline.TimelineArgs,
+  ) -> tuple[
+      List[rdf_timeline.TimelineResult],
+      List[timeline_pb2.TimelineEntry],
+      List[bytes],
+  ]:
+    """Runs the action, returning its results, entries and removed hashes."""
+    results: List[rdf_timeline.TimelineResult] = []
+    blobs: dict[bytes, bytes] = {}
+
+    for response in self.RunAction(timeline.Timeline, args):
+      if isinstance(response, rdf_timeline.TimelineResult):
+        results.append(response)
+      elif isinstance(response, rdf_protodict.DataBlob):
+        blobs[hashlib.sha256(response.data).digest()] = response.data
+      else:
+        raise AssertionError(f"Unexpected response: f{response}")
+
+    entry_batches = []
+    removed_batches = []
+    for result in results:
+      entry_batches.extend(blobs[_] for _ in result.entry_batch_blob_ids)
+      removed_batches.extend(
+          blobs[_] for _ in result.removed_path_hash_batch_blob_ids
+      )
+
+    entries = timeline_util.DeserializeTimelineEntryProtoStream(
+        iter(entry_batches)
+    )
+    removed = timeline_util.DeserializePathHashStream(iter(removed_batches))
+    return results, list(entries), list(removed)
+
+
+class TimelineDigestTest(absltest.TestCase):
+
+  def testSerialization(self):
+    digest = timeline.TimelineDigest("F:1")
+    digest.Add(b"\x00" * 16, b"\x01" * 16, b"\x02" * 8)
+    digest.Add(b"\x00" * 16, b"\x03" * 16, b"\x04" * 8)
+    digest.Add(b"\x01" * 16, b"\x05" * 16, b"\x06" * 8)
+
+    serialized = digest.SerializeToBytes()
+    deserialized = timeline.TimelineDigest.FromSerializedBytes(serialized)
+
+    self.assertEqual(deserialized.timeline_id, "F:1")
+    self.assertEqual(
+        deserialized.EntryHash(b"\x00" * 16, b"\x03" * 16), b"\x04" * 8
+    )
+    self.assertEqual(
+        deserialized.EntryHash(b"\x01" * 16, b"\x05" * 16), b"\x06" * 8
+    )
+    self.assertIsNone(deserialized.EntryHash(b"\x01" * 16, b"\x01" * 16))
+
+  def testFromSerializedBytesRaisesOnTruncated(self):
+    digest = timeline.TimelineDigest("F:1")
+    digest.Add(b"\x00" * 16, b"\x01" * 16, b"\x02" * 8)
+
+    serialized = digest.SerializeToBytes()
+    with self.assertRaises(ValueError):
+      timeline.TimelineDigest.FromSerializedBytes(serialized[:-1])
+
+  def testRemovedPathHashes(self):
+    old_digest = timeline.TimelineDigest("F:1")
+    old_digest.Add(b"\x00" * 16, b"\x01" * 16, b"\x00" * 8)
+    old_digest.Add(b"\x00" * 16, b"\x02" * 16, b"\x00" * 8)
+    old_digest.Add(b"\x02" * 16, b"\x03" * 16, b"\x00" * 8)
+
+    new_digest = timeline.TimelineDigest("F:2")
+    new_digest.Add(b"\x00" * 16, b"\x01" * 16, b"\x01" * 8)
+
+    self.assertCountEqual(
+        old_digest.RemovedPathHashes(new_digest),
+        [b"\x02" * 16, b"\x03" * 16],
+    )
+
 
 class WalkTest(absltest.TestCase):
 
@@ -257,6 +412,55 @@ class WalkTest(absltest.TestCase):
       self.assertEqual(paths[1], os.path.join(dirpath, "foo", "bar"))
 
 
+class ParallelWalkTest(absltest.TestCase):
+
+  def testSameEntriesAsWalk(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as root_dirpath:
+      for dirnames in [("foo", "bar"), ("foo", "baz"), ("quux", "norf")]:
+        dirpath = os.path.join(root_dirpath, *dirnames)
+        os.makedirs(dirpath)
+        for idx in range(8):
+          _Touch(os.path.join(dirpath, f"file{idx}"))
+
+      root = root_dirpath.encode("utf-8")
+      entries = list(timeline.Walk(root))
+      parallel_entries = list(
+          timeline.ParallelWalk(root, threads=4, max_pending_directories=2)
+      )
+
+      self.assertLen(entries, 1 + 5 + 3 * 8)
+      self.assertEqual(
+          [entry.path for entry in parallel_entries],
+          [entry.path for entry in entries],
+      )
+      self.assertEqual(
+          [entry.mode for entry in parallel_entries],
+          [entry.mode for entry in entries],
+      )
+
+  def testSingleFile(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      filepath = os.path.join(dirpath, "foo")
+      _Touch(filepath)
+
+      entries = list(timeline.ParallelWalk(filepath.encode("utf-8"), threads=2))
+      self.assertLen(entries, 1)
+      self.assertEqual(entries[0].path, filepath.encode("utf-8"))
+
+  def testIncorrectPath(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      not_existing_path = os.path.join(dirpath, "not", "existing", "path")
+
+      with self.assertRaises(OSError):
+        timeline.ParallelWalk(not_existing_path.encode("utf-8"), threads=2)
+
+  def testRelativePath(self):
+    relpath = os.path.join("foo", "bar", "baz")
+
+    with self.assertRaises(ValueError):
+      timeline.ParallelWalk(relpath.encode("utf-8"), threads=2)
+
+
 class GetFilesystemType(absltest.TestCase):
 
   def testReturnsForExistingPath(self):
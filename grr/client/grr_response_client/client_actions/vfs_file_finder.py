@@ -71,24 +71,22 @@ class VfsFileFinder(actions.ActionPlugin):
 
 
 def _CheckConditionsShortCircuit(content_conditions, pathspec):
-  """Checks all `content_conditions` until one yields no matches."""
-  matches = []
-  for cond in content_conditions:
-    cur_matches = []
-    with vfs.VFSOpen(pathspec) as vfs_file:
-      is_registry = (
-          vfs_file.supported_pathtype == rdf_paths.PathSpec.PathType.REGISTRY
-      )
-      # Do the actual matching for registry files or for files with a well
-      # defined size.
-      if is_registry or (vfs_file.size is not None and vfs_file.size > 0):
-        cur_matches = list(cond.Search(vfs_file))
-
-    if cur_matches:
-      matches.extend(cur_matches)
-    else:  # As soon as one condition does not match, we skip the file.
-      return []  # Return no matches to indicate skipping this file.
-  return matches
+  """Checks all `content_conditions` in a single pass over the file."""
+  if not content_conditions:
+    return []
+
+  with vfs.VFSOpen(pathspec) as vfs_file:
+    is_registry = (
+        vfs_file.supported_pathtype == rdf_paths.PathSpec.PathType.REGISTRY
+    )
+    # Do the actual matching for registry files or for files with a well
+    # defined size.
+    if is_registry or (vfs_file.size is not None and vfs_file.size > 0):
+      # Returns no matches if any of the conditions does not match, to indicate
+      # skipping this file.
+      return conditions.ContentCondition.SearchAll(vfs_file, content_conditions)
+
+  return []
 
 
 def _GetExpandedPaths(
@@ -106,9 +104,9 @@ def _GetExpandedPaths(
       implementation_type=implementation_type,
   )
 
-  for path in args.paths:
-    for expanded_path in globbing.ExpandPath(str(path), opts, heartbeat_cb):
-      yield expanded_path
+  paths = [str(path) for path in args.paths]
+  for expanded_path in globbing.ExpandPaths(paths, opts, heartbeat_cb):
+    yield expanded_path
 
 
 # TODO: This is only used by artifact_collector. It should be
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+"""An on-disk cache of results of hashing files on the client.
+
+Repeated collections (e.g. hunts) hash the same, often big, files over and over
+again. The cache keeps results of hashing computations keyed by the device and
+inode of the hashed file along with its size, modification and change time. As
+long as these do not change, the file is not read again.
+
+The cache is opt-in: it is enabled by setting `Client.hash_cache_max_entries`.
+"""
+
+import logging
+import os
+import sqlite3
+import stat
+import threading
+import time
+from typing import Callable, Iterable, NamedTuple, Optional, Type, TypeVar
+
+from grr_response_client import actions
+from grr_response_client import vfs
+from grr_response_client.vfs_handlers import files
+from grr_response_core import config
+from grr_response_core.lib import rdfvalue
+
+_V = TypeVar("_V", bound=rdfvalue.RDFValue)
+
+# Share of entries evicted at once when the cache is full, so that eviction
+# does not happen on every insertion.
+_EVICTION_RATIO = 0.1
+
+
+class Key(NamedTuple):
+  """Identity and state of a hashed file."""
+
+  device: int
+  inode: int
+  size: int
+  mtime_ns: int
+  ctime_ns: int
+
+  @classmethod
+  def FromStat(cls, stat_result: os.stat_result) -> "Key":
+    return cls(
+        device=stat_result.st_dev,
+        inode=stat_result.st_ino,
+        size=stat_result.st_size,
+        mtime_ns=stat_result.st_mtime_ns,
+        ctime_ns=stat_result.st_ctime_ns,
+    )
+
+
+class HashCache:
+  """A size-bounded on-disk cache of results of hashing files.
+
+  Each entry holds a serialized result of a single kind of computation (e.g.
+  a particular set of hash algorithms applied to the first N bytes of a file).
+  Only the latest state of every file is kept: entries of files that changed
+  are replaced. When the cache is full, least recently used entries are
+  evicted.
+  """
+
+  def __init__(self, path: str, max_entries: int) -> None:
+    """Initializes the cache.
+
+    Args:
+      path: A path to the file backing the cache.
+      max_entries: Maximum number of entries kept in the cache.
+    """
+    self._max_entries = max(1, max_entries)
+    self._lock = threading.Lock()
+
+    self._conn = sqlite3.connect(
+        path, check_same_thread=False, isolation_level=None
+    )
+    self._conn.execute("PRAGMA synchronous=NORMAL")
+    self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+          device INTEGER NOT NULL,
+          inode INTEGER NOT NULL,
+          kind TEXT NOT NULL,
+          size INTEGER NOT NULL,
+          mtime_ns INTEGER NOT NULL,
+          ctime_ns INTEGER NOT NULL,
+          value BLOB NOT NULL,
+          last_used INTEGER NOT NULL,
+          PRIMARY KEY (device, inode, kind)
+        )
+    """)
+    self._conn.execute("""
+        CREATE INDEX IF NOT EXISTS entries_by_last_used
+        ON entries (last_used)
+    """)
+    self._num_entries = self._CountEntries()
+
+  def Close(self) -> None:
+    with self._lock:
+      self._conn.close()
+
+  def Get(self, key: Key, kind: str) -> Optional[bytes]:
+    """Returns the cached result for the file or `None` if there is none."""
+    with self._lock:
+      row = self._conn.execute(
+          """
+          SELECT value FROM entries
+          WHERE device = ? AND inode = ? AND kind = ?
+            AND size = ? AND mtime_ns = ? AND ctime_ns = ?
+          """,
+          (key.device, key.inode, kind, key.size, key.mtime_ns, key.ctime_ns),
+      ).fetchone()
+      if row is None:
+        return None
+
+      self._conn.execute(
+          """
+          UPDATE entries SET last_used = ?
+          WHERE device = ? AND inode = ? AND kind = ?
+          """,
+          (time.time_ns(), key.device, key.inode, kind),
+      )
+      return row[0]
+
+  def Put(self, key: Key, kind: str, value: bytes) -> None:
+    """Stores the result for the file, replacing results of older states."""
+    with self._lock:
+      self._conn.execute(
+          """
+          INSERT OR REPLACE INTO entries
+          (device, inode, kind, size, mtime_ns, ctime_ns, value, last_used)
+          VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+          """,
+          (
+              key.device,
+              key.inode,
+              kind,
+              key.size,
+              key.mtime_ns,
+              key.ctime_ns,
+              value,
+              time.time_ns(),
+          ),
+      )
+
+      # Replaced entries are counted as well, so the count is exact only after
+      # recounting.
+      self._num_entries += 1
+      if self._num_entries > self._max_entries:
+        self._num_entries = self._CountEntries()
+        if self._num_entries > self._max_entries:
+          self._Evict()
+
+  def _CountEntries(self) -> int:
+    return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+  def _Evict(self) -> None:
+    """Evicts least recently used entries to make room for new ones."""
+    count = self._num_entries - self._max_entries
+    count += int(self._max_entries * _EVICTION_RATIO)
+
+    self._conn.execute(
+        """
+        DELETE FROM entries WHERE rowid IN (
+          SELECT rowid FROM entries ORDER BY last_used LIMIT ?
+        )
+        """,
+        (count,),
+    )
+    self._num_entries = self._CountEntries()
+
+  def GetOrCompute(
+      self,
+      action: actions.ActionPlugin,
+      path: str,
+      kind: str,
+      value_cls: Type[_V],
+      compute: Callable[[], Optional[_V]],
+  ) -> Optional[_V]:
+    """Returns the cached result of hashing the file or computes it.
+
+    Cache hits are reported in the status of the action.
+
+    Args:
+      action: An action hashing the file.
+      path: A local path to the hashed file.
+      kind: A description of the computation, distinguishing its results from
+        results of other computations on the same file.
+      value_cls: A class of the result of the computation.
+      compute: A function computing the result. It is not called on cache hits.
+
+    Returns:
+      The result of the computation.
+    """
+    try:
+      stat_result = os.stat(path)
+    except OSError:
+      return compute()
+
+    # Contents of special files (e.g. devices) change without changing their
+    # modification time.
+    if not stat.S_ISREG(stat_result.st_mode):
+      return compute()
+
+    key = Key.FromStat(stat_result)
+    try:
+      value = self.Get(key, kind)
+    except sqlite3.Error:
+      logging.exception("Failed to look up '%s' in the hash cache", path)
+      return compute()
+
+    if value is not None:
+      action.status.hash_cache_hits += 1
+      return value_cls.FromSerializedBytes(value)
+
+    result = compute()
+    if result is None:
+      return None
+
+    try:
+      # Files modified while being hashed are not cached.
+      if Key.FromStat(os.stat(path)) == key:
+        self.Put(key, kind, result.SerializeToBytes())
+    except (OSError, sqlite3.Error):
+      logging.exception("Failed to store '%s' in the hash cache", path)
+
+    return result
+
+
+def MultiHasherKind(
+    algorithms: Optional[Iterable[str]],
+    byte_count: int,
+) -> str:
+  """Returns a kind of results of `MultiHasher` applied to a file."""
+  return "MultiHasher:%s:%d" % (",".join(sorted(algorithms or [])), byte_count)
+
+
+def LocalPath(fd: vfs.VFSHandler) -> Optional[str]:
+  """Returns a local path of the file if it is read through the OS."""
+  # Files read at an offset are not cached, as the offset is not a part of the
+  # cache key.
+  if isinstance(fd, files.File) and not fd.file_offset:
+    return fd.filename
+
+  return None
+
+
+_cache: Optional[HashCache] = None
+_cache_lock = threading.Lock()
+
+
+def GetCache() -> Optional[HashCache]:
+  """Returns the hash cache of the client or `None` if it is disabled."""
+  global _cache
+
+  max_entries = config.CONFIG["Client.hash_cache_max_entries"]
+  if max_entries <= 0:
+    return None
+
+  with _cache_lock:
+    if _cache is None:
+      path = config.CONFIG["Client.hash_cache_path"]
+      try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        _cache = HashCache(path, max_entries)
+      except (OSError, sqlite3.Error):
+        logging.exception("Failed to open the hash cache at '%s'", path)
+        return None
+
+    return _cache
+
+
+def GetOrCompute(
+    action: actions.ActionPlugin,
+    path: Optional[str],
+    kind: str,
+    value_cls: Type[_V],
+    compute: Callable[[], Optional[_V]],
+) -> Optional[_V]:
+  """Returns the result of hashing the file, cached if the cache is enabled.
+
+  Args:
+    action: An action hashing the file.
+    path: A local path to the hashed file. If `None` (e.g. for files not read
+      through the OS), the result is always computed.
+    kind: A description of the computation, distinguishing its results from
+      results of other computations on the same file.
+    value_cls: A class of the result of the computation.
+    compute: A function computing the result.
+
+  Returns:
+    The result of the computation.
+  """
+  cache = GetCache()
+  if cache is None or path is None:
+    return compute()
+
+  return cache.GetOrCompute(action, path, kind, value_cls, compute)
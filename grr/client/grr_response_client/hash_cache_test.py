@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+import os
+
+from absl.testing import absltest
+
+from grr_response_client import hash_cache
+from grr_response_core.lib.rdfvalues import crypto as rdf_crypto
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.util import temp
+
+
+class HashCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+
+    tempdir = temp.AutoTempDirPath(remove_non_empty=True)
+    self.tempdir = tempdir.__enter__()
+    self.addCleanup(tempdir.__exit__, None, None, None)
+
+    self.cache = hash_cache.HashCache(
+        os.path.join(self.tempdir, "hash_cache.db"), max_entries=100
+    )
+    self.addCleanup(self.cache.Close)
+
+    self.action = FakeAction()
+
+  def _WriteFile(self, name, content):
+    path = os.path.join(self.tempdir, name)
+    with open(path, "wb") as filedesc:
+      filedesc.write(content)
+    return path
+
+  def _GetOrCompute(self, path, kind="foo"):
+    computations = []
+
+    def Compute():
+      with open(path, "rb") as filedesc:
+        computations.append(path)
+        return rdf_crypto.Hash(num_bytes=len(filedesc.read()))
+
+    result = self.cache.GetOrCompute(
+        self.action, path, kind, rdf_crypto.Hash, Compute
+    )
+    return result, bool(computations)
+
+  def testHitAfterMiss(self):
+    path = self._WriteFile("foo", b"foobar")
+
+    result, computed = self._GetOrCompute(path)
+    self.assertTrue(computed)
+    self.assertEqual(result.num_bytes, 6)
+    self.assertEqual(self.action.status.hash_cache_hits, 0)
+
+    result, computed = self._GetOrCompute(path)
+    self.assertFalse(computed)
+    self.assertEqual(result.num_bytes, 6)
+    self.assertEqual(self.action.status.hash_cache_hits, 1)
+
+  def testModifiedFileIsRecomputed(self):
+    path = self._WriteFile("foo", b"foobar")
+    self._GetOrCompute(path)
+
+    self._WriteFile("foo", b"foobarbaz")
+    os.utime(path, ns=(0, 0))
+
+    result, computed = self._GetOrCompute(path)
+    self.assertTrue(computed)
+    self.assertEqual(result.num_bytes, 9)
+    self.assertEqual(self.action.status.hash_cache_hits, 0)
+
+  def testKindsAreCachedSeparately(self):
+    path = self._WriteFile("foo", b"foobar")
+
+    _, computed = self._GetOrCompute(path, kind="foo")
+    self.assertTrue(computed)
+    _, computed = self._GetOrCompute(path, kind="bar")
+    self.assertTrue(computed)
+
+    _, computed = self._GetOrCompute(path, kind="foo")
+    self.assertFalse(computed)
+    _, computed = self._GetOrCompute(path, kind="bar")
+    self.assertFalse(computed)
+
+  def testEvictsLeastRecentlyUsed(self):
+    cache = hash_cache.HashCache(
+        os.path.join(self.tempdir, "small_hash_cache.db"), max_entries=2
+    )
+    self.addCleanup(cache.Close)
+
+    paths = [self._WriteFile(name, b"foobar") for name in ["a", "b", "c"]]
+    keys = [hash_cache.Key.FromStat(os.stat(path)) for path in paths]
+
+    cache.Put(keys[0], "foo", b"a")
+    cache.Put(keys[1], "foo", b"b")
+    # Makes the first entry more recently used than the second one.
+    self.assertEqual(cache.Get(keys[0], "foo"), b"a")
+    cache.Put(keys[2], "foo", b"c")
+
+    self.assertEqual(cache.Get(keys[0], "foo"), b"a")
+    self.assertIsNone(cache.Get(keys[1], "foo"))
+    self.assertEqual(cache.Get(keys[2], "foo"), b"c")
+
+  def testNonRegularFileIsNotCached(self):
+    result, computed = self._GetOrCompute(os.devnull)
+    self.assertTrue(computed)
+    self.assertEqual(result.num_bytes, 0)
+
+    _, computed = self._GetOrCompute(os.devnull)
+    self.assertTrue(computed)
+    self.assertEqual(self.action.status.hash_cache_hits, 0)
+
+  def testMissingFileIsComputed(self):
+    path = os.path.join(self.tempdir, "missing")
+
+    with self.assertRaises(IOError):
+      self._GetOrCompute(path)
+
+
+class FakeAction:
+
+  def __init__(self):
+    self.status = rdf_flows.GrrStatus()
+
+
+if __name__ == "__main__":
+  absltest.main()
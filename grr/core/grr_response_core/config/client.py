@@ -157,6 +157,41 @@ config_lib.DEFINE_string(
     "The file where we write the agent transaction log.",
 )
 
+config_lib.DEFINE_string(
+    "Client.timeline_digest_dir",
+    "%(Logging.path)/timeline",
+    "A directory where the client keeps digests of collected timelines, used "
+    "to send only the differences in incremental timeline collections.",
+)
+
+config_lib.DEFINE_integer(
+    "Client.timeline_walk_threads",
+    4,
+    "Number of threads listing folders ahead of the filesystem walk of the "
+    "timeline collection. 0 disables the parallel walk.",
+)
+
+config_lib.DEFINE_integer(
+    "Client.upload_threads",
+    2,
+    "Number of threads compressing and hashing chunks of uploaded files while "
+    "the following chunks are being read. 0 processes chunks serially.",
+)
+
+config_lib.DEFINE_string(
+    "Client.hash_cache_path",
+    "%(Logging.path)/hash_cache.db",
+    "A file where the client caches hashes of files, keyed by the identity, "
+    "size and modification times of the hashed files.",
+)
+
+config_lib.DEFINE_integer(
+    "Client.hash_cache_max_entries",
+    0,
+    "Maximum number of files the client keeps hashes of in the hash cache. "
+    "Cached files are not read again when hashed. 0 disables the cache.",
+)
+
 config_lib.DEFINE_integer(
     "Network.api", 3, "The version of the network protocol the client "
     "uses.")
@@ -10,6 +10,15 @@ config_lib.DEFINE_integer("Datastore.maximum_blob_size", 512 * 1024,
 config_lib.DEFINE_string("Blobstore.implementation", "DbBlobStore",
                          "Blob storage subsystem to use.")
 
+config_lib.DEFINE_integer(
+    "Blobstore.cache_size_bytes",
+    default=0,
+    help=(
+        "Size of the in-memory LRU cache for blobs read from the blob store, "
+        "in bytes. The cache is disabled if set to 0."
+    ),
+)
+
 config_lib.DEFINE_string("Database.implementation", "",
                          "Relational database system to use.")
 
@@ -38,6 +47,24 @@ config_lib.DEFINE_integer(
     help="The maximum number of open connections to keep available in the pool."
 )
 
+config_lib.DEFINE_integer(
+    "Mysql.conn_pool_min",
+    default=5,
+    help="The number of connections opened when the pool is created and kept "
+    "open even when idle.")
+
+config_lib.DEFINE_integer(
+    "Mysql.conn_pool_idle_timeout",
+    default=600,
+    help="Number of seconds after which idle connections above the minimum "
+    "pool size are closed. 0 means idle connections are never closed.")
+
+config_lib.DEFINE_integer(
+    "Mysql.conn_pool_validation_interval",
+    default=60,
+    help="Connections that were idle for longer than this number of seconds "
+    "are pinged before being used. 0 disables the validation.")
+
 config_lib.DEFINE_integer(
     "Mysql.flow_processing_threads_min",
     default=1,
@@ -85,7 +112,6 @@ config_lib.DEFINE_string(
 config_lib.DEFINE_string(
     "Mysql.database_password", default="", help="Deprecated.")
 
-config_lib.DEFINE_integer("Mysql.conn_pool_min", 5, help="Deprecated.")
 
 config_lib.DEFINE_integer("Mysql.max_connect_wait", 600, help="Deprecated.")
 
@@ -121,3 +147,31 @@ config_lib.DEFINE_string(
         "Only used when Blobstore.implementation is GCSBlobStore."
     ),
 )
+
+# Local file system blobstore config
+config_lib.DEFINE_string(
+    "Blobstore.local_fs.path",
+    default=None,
+    help=(
+        "Directory (local or on a network file system) to store blobs in. "
+        "Only used when Blobstore.implementation is LocalFSBlobStore."
+    ),
+)
+config_lib.DEFINE_integer(
+    "Blobstore.local_fs.shard_levels",
+    default=2,
+    help=(
+        "Number of nested directory levels blobs are sharded into. Every "
+        "level is named after the next byte of the blob id, so each level "
+        "has at most 256 subdirectories. Only used when "
+        "Blobstore.implementation is LocalFSBlobStore."
+    ),
+)
+config_lib.DEFINE_integer(
+    "Blobstore.local_fs.io_threads",
+    default=16,
+    help=(
+        "Number of threads used to read and check blobs in parallel. Only "
+        "used when Blobstore.implementation is LocalFSBlobStore."
+    ),
+)
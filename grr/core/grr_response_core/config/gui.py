@@ -294,3 +294,31 @@ config_lib.DEFINE_list(
     "Policy header added. This is applied to URLs after applying "
     "AdminUI.csp_include_url_prefixes.",
 )
+
+config_lib.DEFINE_integer(
+    "AdminUI.archive_prefetch_threads",
+    4,
+    "Number of threads reading file contents ahead while generating files "
+    "archives for flows and hunts. 0 disables prefetching.",
+)
+
+config_lib.DEFINE_integer(
+    "AdminUI.archive_prefetch_max_bytes",
+    64 * 1024 * 1024,
+    "Maximum number of bytes of file contents read ahead while generating "
+    "files archives for flows and hunts.",
+)
+
+config_lib.DEFINE_integer(
+    "AdminUI.hunt_timelines_threads",
+    4,
+    "Number of threads converting timelines of individual clients while "
+    "generating hunt timelines archives. 0 disables parallel conversion.",
+)
+
+config_lib.DEFINE_integer(
+    "AdminUI.hunt_timelines_max_buffered_bytes",
+    256 * 1024 * 1024,
+    "Maximum number of bytes of converted timelines buffered, but not yet "
+    "written to hunt timelines archives.",
+)
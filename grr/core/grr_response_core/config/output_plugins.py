@@ -91,3 +91,47 @@ config_lib.DEFINE_bool(
     "with big security risks. Instead, when using self-signed certificates, "
     "set REQUESTS_CA_BUNDLE environment variable to the path of the cert file. "
     "See https://requests.readthedocs.io/en/master/user/advanced/.")
+
+# Delivery of events sent by HTTP-based output plugins (Splunk, Elasticsearch,
+# Webhook).
+config_lib.DEFINE_integer(
+    "HttpOutputPlugins.connections", 4,
+    "Number of persistent connections used to deliver events to each "
+    "endpoint.")
+
+config_lib.DEFINE_integer(
+    "HttpOutputPlugins.max_batch_bytes", 5 * 1024 * 1024,
+    "Maximum size of events (before compression) delivered in a single "
+    "request. Events of different flows are batched together.")
+
+config_lib.DEFINE_semantic_value(
+    rdfvalue.Duration, "HttpOutputPlugins.max_batch_delay", "1s",
+    "Maximum time events wait for a batch to fill when all connections to the "
+    "endpoint are busy.")
+
+config_lib.DEFINE_bool(
+    "HttpOutputPlugins.gzip", True,
+    "Compress request bodies with gzip. Disable if the endpoint does not "
+    "support the gzip Content-Encoding.")
+
+config_lib.DEFINE_integer("HttpOutputPlugins.retry_max_attempts", 3,
+                          "Total number of attempts to deliver a batch.")
+
+config_lib.DEFINE_semantic_value(rdfvalue.Duration,
+                                 "HttpOutputPlugins.retry_interval", "1s",
+                                 "Time to wait before first retry.")
+
+config_lib.DEFINE_integer("HttpOutputPlugins.retry_multiplier", 2,
+                          "For each retry, multiply last delay by this value.")
+
+config_lib.DEFINE_integer_list(
+    "HttpOutputPlugins.retry_status_codes", [429, 500, 502, 503, 504],
+    "HTTP status codes on which delivery is retried.")
+
+config_lib.DEFINE_semantic_value(
+    rdfvalue.Duration, "HttpOutputPlugins.metadata_cache_ttl", "60s",
+    "Time client and flow metadata attached to events is cached for.")
+
+config_lib.DEFINE_integer(
+    "HttpOutputPlugins.metadata_cache_size", 10000,
+    "Maximum number of clients and flows to cache the metadata of.")
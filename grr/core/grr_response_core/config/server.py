@@ -38,6 +38,33 @@ config_lib.DEFINE_integer(
     "Worker.queue_shards", 5, "Queue notifications will be sharded across "
     "this number of datastore subjects.")
 
+config_lib.DEFINE_integer(
+    "Worker.flow_processing_batch_size", 1,
+    "Number of flow processing requests a worker handles together, leasing, "
+    "reading and releasing the flows with bulk database queries. 1 disables "
+    "batching.")
+
+config_lib.DEFINE_bool(
+    "Worker.async_hunt_output_plugins", False,
+    "Process hunt results with output plugins asynchronously. Flow processing "
+    "only queues references to the results and output plugins consume them "
+    "on a dedicated thread pool, so slow output plugins do not slow down "
+    "hunts.")
+
+config_lib.DEFINE_integer(
+    "Worker.output_plugin_threads", 8,
+    "Number of threads processing queued hunt results with output plugins.")
+
+config_lib.DEFINE_integer(
+    "Worker.output_plugin_max_concurrency", 2,
+    "Maximum number of batches of queued hunt results processed concurrently "
+    "by a single output plugin.")
+
+config_lib.DEFINE_integer(
+    "Worker.output_plugin_max_backlog", 1000,
+    "Maximum number of batches of queued hunt results a worker accepts for "
+    "processing at a time. Further batches are left in the queue.")
+
 config_lib.DEFINE_list("Frontend.well_known_flows", [], "Unused, Deprecated.")
 
 # Smtp settings.
@@ -395,3 +422,11 @@ config_lib.DEFINE_string(
     default=None,
     help="An UTF-8 encoded Ed25519 encryption key to sign commands.",
 )
+
+config_lib.DEFINE_integer(
+    "Server.timeline_max_delta_depth",
+    7,
+    "Maximum number of consecutive incremental timeline collections before a "
+    "full timeline is collected again. Longer chains make reconstructing "
+    "timelines that were not converted to the columnar format slower.",
+)
@@ -370,6 +370,81 @@ class RDFValueBenchmark(benchmark_test_lib.AverageMicroBenchmarks):
     self.TimeIt(RDFStructDecodeEncode)
     self.TimeIt(ProtoDecodeEncode)
 
+  def testLazyDecodeEncode(self):
+    """Test parsing, field access and re-serialization of nested structs."""
+
+    repeats = self.REPEATS // 50
+    s = jobs_pb2.MessageList()
+    for i in range(self.REPEATS):
+      s.job.add(session_id="test", name="foobar", request_id=i)
+
+    data = s.SerializeToString()
+
+    def ProtoParse():
+      new_s = jobs_pb2.MessageList()
+      new_s.ParseFromString(data)
+
+    def ProtoFieldAccess():
+      new_s = jobs_pb2.MessageList()
+      new_s.ParseFromString(data)
+      for job in new_s.job:
+        _ = job.request_id
+
+    def ProtoSerializeAfterAccess():
+      new_s = jobs_pb2.MessageList()
+      new_s.ParseFromString(data)
+      for job in new_s.job:
+        _ = job.request_id
+
+      self.assertLen(new_s.SerializeToString(), len(data))
+
+    def SProtoParse():
+      FastGrrMessageList.FromSerializedBytes(data)
+
+    def SProtoFieldAccess():
+      new_s = FastGrrMessageList.FromSerializedBytes(data)
+      for job in new_s.job:
+        _ = job.request_id
+
+    def SProtoSerializeAfterAccess():
+      new_s = FastGrrMessageList.FromSerializedBytes(data)
+      for job in new_s.job:
+        _ = job.request_id
+
+      self.assertLen(new_s.SerializeToBytes(), len(data))
+
+    def SProtoSerializeAfterAccessReencoded():
+      # Marking decoded structs as dirty forces them to be encoded again, as
+      # if they were modified.
+      new_s = FastGrrMessageList.FromSerializedBytes(data)
+      for job in new_s.job:
+        _ = job.request_id
+        job.dirty = True
+
+      self.assertLen(new_s.SerializeToBytes(), len(data))
+
+    self.TimeIt(SProtoParse, "SProto Parse", repetitions=repeats)
+    self.TimeIt(ProtoParse, "Protobuf Parse", repetitions=repeats)
+
+    self.TimeIt(SProtoFieldAccess, "SProto Field Access", repetitions=repeats)
+    self.TimeIt(ProtoFieldAccess, "Protobuf Field Access", repetitions=repeats)
+
+    self.TimeIt(
+        SProtoSerializeAfterAccess,
+        "SProto Serialize Unmodified",
+        repetitions=repeats,
+    )
+    self.TimeIt(
+        SProtoSerializeAfterAccessReencoded,
+        "SProto Serialize Re-encoded",
+        repetitions=repeats,
+    )
+    self.TimeIt(
+        ProtoSerializeAfterAccess,
+        "Protobuf Serialize",
+        repetitions=repeats,
+    )
+
 
 def main(argv):
   # Run the full test suite
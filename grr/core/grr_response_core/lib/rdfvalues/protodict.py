@@ -350,6 +350,11 @@ class Dict(rdf_structs.RDFProtoStruct):
     self.dat = self._values.values()  # pytype: disable=annotation-type-mismatch
     return super().SerializeToBytes()
 
+  def _MarkAsParsed(self, serialized):
+    # Dicts are modified through `_values`, which the dirty flag does not
+    # track, so they are always serialized anew.
+    del serialized  # Unused.
+
   def __str__(self) -> Text:
     return str(self.ToDict())
 
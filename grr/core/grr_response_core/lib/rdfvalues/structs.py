@@ -848,6 +848,8 @@ class ProtoEmbedded(ProtoType):
     """The wire format is simply a string."""
     result = self.type()
     ReadIntoObject(value[2], 0, result)
+    # Until modified, the nested struct is re-serialized from its wire format.
+    result._MarkAsParsed(value[2])  # pylint: disable=protected-access
 
     return result
 
@@ -1164,9 +1166,11 @@ class RepeatedFieldHelper(abc.Sequence):
     if self.dirty:
       return True
 
-    # If any of the items is dirty we are also dirty.
-    for item in self.wrapped_list:
-      if self.type_descriptor.IsDirty(item[0]):
+    # If any of the decoded items is dirty we are also dirty.
+    for python_format, _ in self.wrapped_list:
+      if python_format is not None and self.type_descriptor.IsDirty(
+          python_format
+      ):
         self.dirty = True
         return True
 
@@ -1182,7 +1186,6 @@ class RepeatedFieldHelper(abc.Sequence):
     if rdf_value is utils.NotAValue:
       if wire_format is None:
         rdf_value = self.type_descriptor.type(**kwargs)
-        self.dirty = True
       else:
         rdf_value = None
     else:
@@ -1196,12 +1199,14 @@ class RepeatedFieldHelper(abc.Sequence):
         )
 
     self.wrapped_list.append((rdf_value, wire_format))
+    self.dirty = True
 
     return rdf_value
 
   def Pop(self, item):
     result = self[item]
     self.wrapped_list.pop(item)
+    self.dirty = True
     return result
 
   def Extend(self, iterable):
@@ -1675,6 +1680,10 @@ class RDFStruct(rdfvalue.RDFValue, metaclass=RDFStructMetaclass):  # pylint: dis
   # Stores the raw data here.
   _data = None
 
+  # The serialized form this object was parsed from. It is returned as is by
+  # SerializeToBytes() as long as the object is not modified.
+  _serialized = None
+
   def __init__(self, initializer=None, **kwargs):
     super().__init__()
 
@@ -1732,6 +1741,7 @@ class RDFStruct(rdfvalue.RDFValue, metaclass=RDFStructMetaclass):  # pylint: dis
   def Clear(self):
     """Clear all the fields."""
     self._data = {}
+    self.dirty = True
 
   def HasField(self, field_name):
     """Checks if the field exists."""
@@ -1800,7 +1810,27 @@ class RDFStruct(rdfvalue.RDFValue, metaclass=RDFStructMetaclass):  # pylint: dis
     self._data = data
     self.dirty = True
 
+  def _MarkAsParsed(self, serialized):
+    """Marks this object as an unmodified copy of the given serialized form."""
+    self._serialized = serialized
+    self.dirty = False
+
+  def _IsModified(self):
+    """Checks if this object or any of its decoded fields was modified."""
+    if self.dirty:
+      return True
+
+    for python_format, _, type_descriptor in self._data.values():
+      if python_format is not None and type_descriptor.IsDirty(python_format):
+        self.dirty = True
+        return True
+
+    return False
+
   def SerializeToBytes(self):
+    if self._serialized is not None and not self._IsModified():
+      return self._serialized
+
     return _SerializeEntries(_GetOrderedEntries(self._data))
 
   @classmethod
@@ -1818,7 +1848,7 @@ class RDFStruct(rdfvalue.RDFValue, metaclass=RDFStructMetaclass):  # pylint: dis
       )
       raise
 
-    instance.dirty = True
+    instance._MarkAsParsed(value)  # pylint: disable=protected-access
     return instance
 
   @classmethod
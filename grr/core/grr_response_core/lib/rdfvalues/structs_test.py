@@ -585,6 +585,55 @@ message DynamicTypeTest {{
     # old result instead.
     self.assertIn(b"booo", path.SerializeToBytes())
 
+  def _GenerateNestedSample(self):
+    sample = TestStruct(foobar="foo", int=1, repeated=["a", "b"])
+    sample.nested = TestStruct(foobar="nested", int=2)
+    sample.nested.nested = TestStruct(foobar="deeply nested")
+    sample.repeat_nested.Append(foobar="repeated 1")
+    sample.repeat_nested.Append(foobar="repeated 2")
+
+    return sample.SerializeToBytes()
+
+  def testUnmodifiedParsedStructIsSerializedFromWireFormat(self):
+    serialized = self._GenerateNestedSample()
+
+    parsed = TestStruct.FromSerializedBytes(serialized)
+    self.assertIs(parsed.SerializeToBytes(), serialized)
+
+    # Accessing fields decodes them, but does not make them dirty.
+    self.assertEqual(parsed.nested.nested.foobar, "deeply nested")
+    self.assertEqual(parsed.repeat_nested[1].foobar, "repeated 2")
+    self.assertEqual(list(parsed.repeated), ["a", "b"])
+    self.assertIs(parsed.SerializeToBytes(), serialized)
+
+  def testModifiedParsedStructIsSerializedAnew(self):
+    serialized = self._GenerateNestedSample()
+
+    def Modify(func):
+      parsed = TestStruct.FromSerializedBytes(serialized)
+      func(parsed)
+      result = parsed.SerializeToBytes()
+
+      self.assertNotEqual(result, serialized)
+      self.assertEqual(TestStruct.FromSerializedBytes(result), parsed)
+
+    Modify(lambda s: setattr(s, "int", 42))
+    Modify(lambda s: setattr(s.nested.nested, "foobar", "changed"))
+    Modify(lambda s: s.nested.nested.Clear())
+    Modify(lambda s: s.repeated.Append("c"))
+    Modify(lambda s: s.repeat_nested.Pop(0))
+    Modify(lambda s: setattr(s.repeat_nested[1], "foobar", "changed"))
+
+  def testUnmodifiedNestedStructIsSerializedFromWireFormat(self):
+    serialized = self._GenerateNestedSample()
+
+    parsed = TestStruct.FromSerializedBytes(serialized)
+    nested_serialized = parsed.nested.SerializeToBytes()
+    parsed.int = 42
+
+    self.assertIs(parsed.nested.SerializeToBytes(), nested_serialized)
+    self.assertIn(nested_serialized, parsed.SerializeToBytes())
+
   def testLateBinding(self):
     # The LateBindingTest protobuf is not fully defined.
     self.assertRaises(
@@ -4,7 +4,7 @@
 import contextlib
 import io
 import sqlite3
-from typing import IO, Iterator, Tuple
+from typing import IO, Any, Iterator, List, Sequence, Tuple
 
 from grr_response_core.lib.util import temp
 
@@ -65,6 +65,83 @@ def IOConnection(db_filedesc: IO[bytes]) -> Iterator[ConnectionContext]:
       yield ConnectionContext(conn)
 
 
+class TableDump:
+  """Renders rows of a single table as SQL statements, in bulk.
+
+  Rows are bulk-loaded into a scratch in-memory database and rendered into
+  `INSERT` statements by SQLite itself, the same way `Connection.iterdump` does
+  it, so that values are quoted exactly as SQLite expects them. Unlike
+  `iterdump`, the schema is not inspected again for every dump and only rows
+  added since the previous dump are rendered.
+  """
+
+  def __init__(self, table: str, columns: Sequence[Tuple[str, str]]) -> None:
+    """Initializes the dump.
+
+    Args:
+      table: A name of the table.
+      columns: Names and SQLite types of columns of the table.
+    """
+    self._conn = sqlite3.connect(":memory:")
+    # The scratch database is thrown away once the dump is done, there is no
+    # point in paying for durability.
+    self._conn.execute("PRAGMA journal_mode=OFF")
+    self._conn.execute("PRAGMA synchronous=OFF")
+
+    table = _QuoteIdentifier(table)
+    column_names = [_QuoteIdentifier(name) for name, _ in columns]
+
+    self.create_statement = "CREATE TABLE %s (\n  %s\n);" % (
+        table,
+        ",\n  ".join(
+            "%s %s" % (name, sqlite_type)
+            for name, (_, sqlite_type) in zip(column_names, columns)
+        ),
+    )
+    self._conn.execute(self.create_statement)
+
+    self._insert_query = "INSERT INTO %s VALUES (%s)" % (
+        table,
+        ",".join("?" * len(columns)),
+    )
+    self._dump_query = (
+        "SELECT 'INSERT INTO %s VALUES(%s);' FROM %s ORDER BY rowid"
+    ) % (
+        table.replace("'", "''"),
+        ",".join("'||quote(%s)||'" % name for name in column_names),
+        table,
+    )
+    self._delete_query = "DELETE FROM %s" % table
+
+  def Dump(self, rows: Sequence[Sequence[Any]]) -> List[str]:
+    """Renders given rows as `INSERT` statements.
+
+    Args:
+      rows: Rows with values of all the columns of the table, in order.
+
+    Returns:
+      `INSERT` statements, one per row.
+    """
+    with self._conn:
+      self._conn.executemany(self._insert_query, rows)
+
+    with contextlib.closing(self._conn.cursor()) as cursor:  # pytype: disable=wrong-arg-types
+      cursor.execute(self._dump_query)
+      statements = [statement for (statement,) in cursor.fetchall()]
+
+    with self._conn:
+      self._conn.execute(self._delete_query)
+
+    return statements
+
+  def Close(self) -> None:
+    self._conn.close()
+
+
+def _QuoteIdentifier(name: str) -> str:
+  return '"%s"' % name.replace('"', '""')
+
+
 def _CopyIO(input: IO[bytes], output: IO[bytes]) -> None:  # pylint: disable=redefined-builtin
   """Copies contents of one binary stream into another.
 
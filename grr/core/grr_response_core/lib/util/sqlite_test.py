@@ -79,5 +79,38 @@ class IOConnectionTest(absltest.TestCase):
           self.assertEqual(results[2], (blob(b"C"),))
 
 
+class TableDumpTest(absltest.TestCase):
+
+  def _Import(self, dump, statements):
+    with contextlib.closing(sqlite3.connect(":memory:")) as conn:
+      conn.executescript(
+          "BEGIN TRANSACTION;\n%s\n%s\nCOMMIT;"
+          % (dump.create_statement, "\n".join(statements))
+      )
+      return conn.execute('SELECT * FROM "foo.bar"').fetchall()
+
+  def testDumpsRows(self):
+    columns = [("quux", "TEXT"), ("norf", "INTEGER"), ("thud", "BLOB")]
+    with contextlib.closing(sqlite.TableDump("foo.bar", columns)) as dump:
+      statements = dump.Dump([
+          ("It's", 42, b"\x00\xff"),
+          ("中国", None, b""),
+      ])
+
+      self.assertLen(statements, 2)
+      self.assertEqual(
+          self._Import(dump, statements),
+          [("It's", 42, b"\x00\xff"), ("中国", None, b"")],
+      )
+
+  def testDumpsOnlyNewRows(self):
+    columns = [("quux", "INTEGER")]
+    with contextlib.closing(sqlite.TableDump("foo.bar", columns)) as dump:
+      first = dump.Dump([(1,), (2,)])
+      second = dump.Dump([(3,)])
+
+      self.assertEqual(self._Import(dump, first + second), [(1,), (2,), (3,)])
+
+
 if __name__ == "__main__":
   absltest.main()
@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 """A module defining timeline-related utility functions."""
 
-from typing import Iterator
+import hashlib
+from typing import Iterable, Iterator
 
 from grr_response_core.lib.util import gzchunked
 from grr_response_proto import timeline_pb2
 
+# A size of hashes identifying timeline entry paths in incremental timelines.
+PATH_HASH_SIZE = 16
+
 
 def _ParseTimelineEntryProto(bstr: bytes) -> timeline_pb2.TimelineEntry:
   r = timeline_pb2.TimelineEntry()
@@ -18,3 +22,29 @@ def DeserializeTimelineEntryProtoStream(
 ) -> Iterator[timeline_pb2.TimelineEntry]:
   """Deserializes given gzchunked stream chunks into TimelineEntry protos."""
   return map(_ParseTimelineEntryProto, gzchunked.Deserialize(entries))
+
+
+def PathHash(path: bytes) -> bytes:
+  """Computes a hash identifying the given path in incremental timelines.
+
+  The client sends hashes of paths of entries removed since the base timeline
+  was collected and the server uses them to drop these entries from the base
+  timeline, so both have to compute the hashes in exactly the same way.
+
+  Args:
+    path: A path of a timeline entry.
+
+  Returns:
+    A hash of the path.
+  """
+  return hashlib.blake2b(path, digest_size=PATH_HASH_SIZE).digest()
+
+
+def SerializePathHashStream(hashes: Iterable[bytes]) -> Iterator[bytes]:
+  """Serializes given path hashes into gzchunked stream chunks."""
+  return gzchunked.Serialize(iter(hashes))
+
+
+def DeserializePathHashStream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+  """Deserializes given gzchunked stream chunks into path hashes."""
+  return gzchunked.Deserialize(chunks)
@@ -19,6 +19,7 @@ from grr_response_core.lib import config_lib
 from grr_response_proto.api import config_pb2
 from grr_response_server import artifact
 from grr_response_server import artifact_registry
+from grr_response_server import data_store
 from grr_response_server import maintenance_utils
 from grr_response_server import server_startup
 from grr_response_server.bin import config_updater_keys_util
@@ -232,6 +233,19 @@ parser_show_user.add_argument(
     help="Username to display. If not specified, list all users.",
 )
 
+# Rebuild hunt counters.
+parser_rebuild_hunt_counters = subparsers.add_parser(
+    "rebuild_hunt_counters",
+    help="Rebuild incrementally maintained hunt counters from hunt flows.",
+)
+
+parser_rebuild_hunt_counters.add_argument(
+    "--hunt_id",
+    action="append",
+    default=None,
+    help="Hunt to rebuild counters for. If not specified, rebuild all hunts.",
+)
+
 # Generate Keys Arguments
 parser_generate_keys.add_argument(
     "--overwrite_keys",
@@ -449,6 +463,10 @@ def main(args):
     config_updater_util.SwitchToRelDB(grr_config.CONFIG)
     grr_config.CONFIG.Write()
 
+  elif args.subparser_name == "rebuild_hunt_counters":
+    data_store.REL_DB.RebuildHuntCounters(args.hunt_id)
+    print("Hunt counters rebuilt.")
+
   elif args.subparser_name == "upload_artifact":
     with io.open(args.file, "r") as filedesc:
       source = filedesc.read()
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 """This is a backend analysis worker which will be deployed on the server."""
 
+import signal
+from typing import Optional
+
 from absl import app
 from absl import flags
 
@@ -10,6 +13,8 @@ from grr_response_core.config import server as config_server
 from grr_response_server import fleetspeak_connector
 from grr_response_server import server_startup
 from grr_response_server import worker_lib
+from grr_response_server import worker_supervisor
+from grr_response_server.databases import db
 
 
 _VERSION = flags.DEFINE_bool(
@@ -28,6 +33,27 @@ _DISABLE_WORKER = flags.DEFINE_bool(
     help="Disable the worker.",
 )
 
+_NUM_PROCESSES = flags.DEFINE_integer(
+    "num_processes",
+    default=1,
+    allow_override=True,
+    help=(
+        "Number of worker processes to run. If larger than 1, flow processing"
+        " is sharded by client id between the processes."
+    ),
+)
+
+
+def _RunWorker(shard: Optional[db.FlowProcessingShard] = None) -> None:
+  """Initializes the server and runs a single worker."""
+  # Initialise flows and config_lib
+  server_startup.Init(disabled=_DISABLE_WORKER.value)
+
+  fleetspeak_connector.Init()
+
+  worker_obj = worker_lib.GRRWorker(disabled=_DISABLE_WORKER.value, shard=shard)
+  worker_obj.Run()
+
 
 def main(argv):
   """Main."""
@@ -41,13 +67,17 @@ def main(argv):
       contexts.WORKER_CONTEXT, "Context applied when running a worker."
   )
 
-  # Initialise flows and config_lib
-  server_startup.Init(disabled=_DISABLE_WORKER.value)
-
-  fleetspeak_connector.Init()
+  if _NUM_PROCESSES.value <= 1:
+    _RunWorker()
+    return
 
-  worker_obj = worker_lib.GRRWorker(disabled=_DISABLE_WORKER.value)
-  worker_obj.Run()
+  # Worker processes are forked before any server initialization happens, so
+  # that every process sets up its own threads and database connections.
+  supervisor = worker_supervisor.WorkerSupervisor(
+      _NUM_PROCESSES.value, _RunWorker
+  )
+  signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.Stop())
+  supervisor.Run()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,8 @@
 """The blob store abstraction."""
 
 import abc
+import collections
+import threading
 import time
 from typing import Dict, Iterable, List, Optional
 
@@ -23,6 +25,10 @@ BLOB_STORE_POLL_HIT_LATENCY = metrics.Event(
 BLOB_STORE_POLL_HIT_ITERATION = metrics.Event(
     "blob_store_poll_hit_iteration", bins=[1, 2, 5, 10, 20, 50]
 )
+BLOB_STORE_CACHE_HITS = metrics.Counter("blob_store_cache_hits")
+BLOB_STORE_CACHE_MISSES = metrics.Counter("blob_store_cache_misses")
+BLOB_STORE_CACHE_EVICTIONS = metrics.Counter("blob_store_cache_evictions")
+BLOB_STORE_CACHE_SIZE_BYTES = metrics.Gauge("blob_store_cache_size_bytes", int)
 
 
 class BlobStoreTimeoutError(Exception):
@@ -300,3 +306,123 @@ class BlobStoreValidationWrapper(BlobStore):
   ) -> Dict[models_blobs.BlobID, bool]:
     precondition.AssertIterableType(blob_ids, models_blobs.BlobID)
     return self.delegate.CheckBlobsExist(blob_ids)
+
+
+class CachingBlobStore(BlobStore):
+  """BlobStore wrapper keeping recently read blobs in memory.
+
+  Blobs are content-addressed and never change once written, so cached blobs
+  never have to be invalidated. The cache is bounded by the total size of the
+  cached blobs and evicts least recently used blobs first.
+  """
+
+  def __init__(self, delegate: BlobStore, max_size_bytes: int):
+    """Initializes the cache.
+
+    Args:
+      delegate: Blob store to read blobs from on cache misses.
+      max_size_bytes: Maximum total size of cached blobs. Blobs larger than
+        this are never cached.
+    """
+    super().__init__()
+    if max_size_bytes <= 0:
+      raise ValueError(f"Invalid cache size: {max_size_bytes}")
+
+    self.delegate = delegate
+    self._max_size_bytes = max_size_bytes
+    self._size_bytes = 0
+    self._blobs: collections.OrderedDict[models_blobs.BlobID, bytes] = (
+        collections.OrderedDict()
+    )
+    self._lock = threading.Lock()
+
+  def _GetCached(self, blob_id: models_blobs.BlobID) -> Optional[bytes]:
+    with self._lock:
+      blob = self._blobs.get(blob_id)
+      if blob is not None:
+        self._blobs.move_to_end(blob_id)
+      return blob
+
+  def _PutCached(self, blob_id: models_blobs.BlobID, blob: bytes) -> None:
+    if len(blob) > self._max_size_bytes:
+      return
+
+    with self._lock:
+      if blob_id in self._blobs:
+        self._blobs.move_to_end(blob_id)
+        return
+
+      self._blobs[blob_id] = blob
+      self._size_bytes += len(blob)
+
+      while self._size_bytes > self._max_size_bytes:
+        _, evicted = self._blobs.popitem(last=False)
+        self._size_bytes -= len(evicted)
+        BLOB_STORE_CACHE_EVICTIONS.Increment()
+
+      BLOB_STORE_CACHE_SIZE_BYTES.SetValue(self._size_bytes)
+
+  def Flush(self) -> None:
+    """Removes all blobs from the cache."""
+    with self._lock:
+      self._blobs.clear()
+      self._size_bytes = 0
+      BLOB_STORE_CACHE_SIZE_BYTES.SetValue(0)
+
+  @property
+  def size_bytes(self) -> int:
+    return self._size_bytes
+
+  def WriteBlobs(
+      self,
+      blob_id_data_map: Dict[models_blobs.BlobID, bytes],
+  ) -> None:
+    # Written blobs are not added to the cache: blobs uploaded by clients are
+    # usually not read back soon and would only evict hot entries.
+    return self.delegate.WriteBlobs(blob_id_data_map)
+
+  def ReadBlobs(
+      self, blob_ids: Iterable[models_blobs.BlobID]
+  ) -> Dict[models_blobs.BlobID, Optional[bytes]]:
+    result = {}
+    missing_blob_ids = []
+    for blob_id in blob_ids:
+      if blob_id in result:
+        continue
+
+      blob = self._GetCached(blob_id)
+      result[blob_id] = blob
+      if blob is None:
+        missing_blob_ids.append(blob_id)
+
+    num_hits = len(result) - len(missing_blob_ids)
+    if num_hits:
+      BLOB_STORE_CACHE_HITS.Increment(num_hits)
+    if not missing_blob_ids:
+      return result
+
+    BLOB_STORE_CACHE_MISSES.Increment(len(missing_blob_ids))
+    for blob_id, blob in self.delegate.ReadBlobs(missing_blob_ids).items():
+      result[blob_id] = blob
+      if blob is not None:
+        self._PutCached(blob_id, blob)
+
+    return result
+
+  def CheckBlobsExist(
+      self,
+      blob_ids: Iterable[models_blobs.BlobID],
+  ) -> Dict[models_blobs.BlobID, bool]:
+    result = {}
+    missing_blob_ids = []
+    for blob_id in blob_ids:
+      with self._lock:
+        cached = blob_id in self._blobs
+      result[blob_id] = cached
+      if not cached:
+        missing_blob_ids.append(blob_id)
+
+    if missing_blob_ids:
+      result.update(self.delegate.CheckBlobsExist(missing_blob_ids))
+
+    return result
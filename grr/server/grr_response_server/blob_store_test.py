@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""Tests for the blob store abstraction."""
+
+from unittest import mock
+
+from absl import app
+
+from grr_response_server import blob_store
+from grr_response_server import blob_store_test_mixin
+from grr_response_server.databases import mem as mem_db
+from grr_response_server.models import blobs as models_blobs
+from grr.test_lib import test_lib
+
+
+def _Blob(data: bytes) -> tuple[models_blobs.BlobID, bytes]:
+  return models_blobs.BlobID.Of(data), data
+
+
+class CachingBlobStoreTest(
+    blob_store_test_mixin.BlobStoreTestMixin,
+    test_lib.GRRBaseTest,
+):
+
+  def CreateBlobStore(self):
+    return blob_store.CachingBlobStore(mem_db.InMemoryDB(), 1024 * 1024), None
+
+  def testInvalidSizeRaises(self):
+    with self.assertRaises(ValueError):
+      blob_store.CachingBlobStore(mem_db.InMemoryDB(), 0)
+
+  def testCachedBlobsAreNotReadFromDelegate(self):
+    delegate = mem_db.InMemoryDB()
+    blob_id, blob = _Blob(b"foo")
+    delegate.WriteBlobs({blob_id: blob})
+    bs = blob_store.CachingBlobStore(delegate, 1024)
+
+    self.assertEqual(bs.ReadBlobs([blob_id]), {blob_id: blob})
+    with mock.patch.object(delegate, "ReadBlobs") as read_mock:
+      self.assertEqual(bs.ReadBlobs([blob_id]), {blob_id: blob})
+    read_mock.assert_not_called()
+
+  def testOnlyMissesAreReadFromDelegate(self):
+    delegate = mem_db.InMemoryDB()
+    foo_id, foo = _Blob(b"foo")
+    bar_id, bar = _Blob(b"bar")
+    delegate.WriteBlobs({foo_id: foo, bar_id: bar})
+    bs = blob_store.CachingBlobStore(delegate, 1024)
+    bs.ReadBlobs([foo_id])
+
+    with mock.patch.object(
+        delegate, "ReadBlobs", wraps=delegate.ReadBlobs
+    ) as read_mock:
+      result = bs.ReadBlobs([foo_id, bar_id])
+
+    self.assertEqual(result, {foo_id: foo, bar_id: bar})
+    read_mock.assert_called_once_with([bar_id])
+
+  def testMissingBlobsAreNotCached(self):
+    delegate = mem_db.InMemoryDB()
+    blob_id, blob = _Blob(b"foo")
+    bs = blob_store.CachingBlobStore(delegate, 1024)
+
+    self.assertEqual(bs.ReadBlobs([blob_id]), {blob_id: None})
+    delegate.WriteBlobs({blob_id: blob})
+    self.assertEqual(bs.ReadBlobs([blob_id]), {blob_id: blob})
+
+  def testLeastRecentlyUsedBlobsAreEvicted(self):
+    delegate = mem_db.InMemoryDB()
+    blobs = dict(_Blob(bytes([i]) * 100) for i in range(3))
+    delegate.WriteBlobs(blobs)
+    blob_ids = list(blobs)
+    bs = blob_store.CachingBlobStore(delegate, 250)
+
+    bs.ReadBlobs(blob_ids[:2])
+    # Make the first blob the most recently used one.
+    bs.ReadBlobs(blob_ids[:1])
+    bs.ReadBlobs(blob_ids[2:])
+
+    self.assertEqual(bs.size_bytes, 200)
+    with mock.patch.object(
+        delegate, "ReadBlobs", wraps=delegate.ReadBlobs
+    ) as read_mock:
+      bs.ReadBlobs(blob_ids)
+    read_mock.assert_called_once_with([blob_ids[1]])
+
+  def testBlobsLargerThanCacheAreNotCached(self):
+    delegate = mem_db.InMemoryDB()
+    blob_id, blob = _Blob(b"x" * 2048)
+    delegate.WriteBlobs({blob_id: blob})
+    bs = blob_store.CachingBlobStore(delegate, 1024)
+
+    self.assertEqual(bs.ReadBlobs([blob_id]), {blob_id: blob})
+    self.assertEqual(bs.size_bytes, 0)
+
+  def testCheckBlobsExistOnlyChecksMissesInDelegate(self):
+    delegate = mem_db.InMemoryDB()
+    foo_id, foo = _Blob(b"foo")
+    bar_id, _ = _Blob(b"bar")
+    delegate.WriteBlobs({foo_id: foo})
+    bs = blob_store.CachingBlobStore(delegate, 1024)
+    bs.ReadBlobs([foo_id])
+
+    with mock.patch.object(
+        delegate, "CheckBlobsExist", wraps=delegate.CheckBlobsExist
+    ) as check_mock:
+      result = bs.CheckBlobsExist([foo_id, bar_id])
+
+    self.assertEqual(result, {foo_id: True, bar_id: False})
+    check_mock.assert_called_once_with([bar_id])
+
+  def testFlushEmptiesCache(self):
+    delegate = mem_db.InMemoryDB()
+    blob_id, blob = _Blob(b"foo")
+    delegate.WriteBlobs({blob_id: blob})
+    bs = blob_store.CachingBlobStore(delegate, 1024)
+    bs.ReadBlobs([blob_id])
+
+    bs.Flush()
+
+    self.assertEqual(bs.size_bytes, 0)
+
+  def testHitsAndMissesAreCounted(self):
+    delegate = mem_db.InMemoryDB()
+    foo_id, foo = _Blob(b"foo")
+    bar_id, bar = _Blob(b"bar")
+    delegate.WriteBlobs({foo_id: foo, bar_id: bar})
+    bs = blob_store.CachingBlobStore(delegate, 1024)
+    bs.ReadBlobs([foo_id])
+
+    with self.assertStatsCounterDelta(1, blob_store.BLOB_STORE_CACHE_HITS):
+      with self.assertStatsCounterDelta(1, blob_store.BLOB_STORE_CACHE_MISSES):
+        bs.ReadBlobs([foo_id, bar_id])
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -1,26 +1,57 @@
 #!/usr/bin/env python
-"""Benchmark to compare different BlobStore implementations."""
+"""Benchmark to compare different BlobStore implementations.
 
-import io
+Every workload is run for every blob size against every BlobStore
+implementation, using a configurable number of concurrent threads. Latency
+percentiles and throughput are printed as a table and can additionally be
+written as JSON.
+"""
+
+import dataclasses
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
 import time
-from typing import IO
+from typing import Callable, Dict, List, Sequence
 
 from absl import app
 from absl import flags
 import numpy as np
 
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_server import blob_store
+from grr_response_server import data_store
 from grr_response_server import server_startup
+from grr_response_server.blob_stores import encrypted_blob_store
+from grr_response_server.blob_stores import local_fs_blob_store
+from grr_response_server.keystore import mem as mem_ks
 from grr_response_server.models import blobs as models_blobs
 
 
+# Not registered in `blob_store.REGISTRY` since it needs additional arguments
+# to be constructed.
+ENCRYPTED_TARGET = "EncryptedBlobStore"
+LOCAL_FS_TARGET = local_fs_blob_store.LocalFSBlobStore.__name__
+
+WRITE = "write"
+READ = "read"
+EXISTS = "exists"
+READ_AND_WAIT = "read_and_wait"
+MIXED = "mixed"
+
+WORKLOADS = (WRITE, READ, EXISTS, READ_AND_WAIT, MIXED)
+
 _TARGET = flags.DEFINE_list(
     "target",
     default=None,
     help=(
-        "Benchmark the given BlobStore implementation classes. "
-        "Separate multiple by comma."
+        "Benchmark the given BlobStore implementation classes. Separate"
+        f" multiple by comma. Besides registered classes, {ENCRYPTED_TARGET}"
+        " is supported."
     ),
 )
 
@@ -30,67 +61,326 @@ _SIZES = flags.DEFINE_list(
     help="Use the given blob sizes for the benchmark.",
 )
 
+_WORKLOADS = flags.DEFINE_list(
+    "workloads",
+    default=list(WORKLOADS),
+    help="Workloads to run. Any of: {}.".format(", ".join(WORKLOADS)),
+)
+
 _PER_SIZE_DURATION_SECONDS = flags.DEFINE_integer(
     "per_size_duration_seconds",
     default=30,
-    help="Benchmark duration per blob size in seconds.",
+    help="Benchmark duration per blob size and workload in seconds.",
+)
+
+_THREADS = flags.DEFINE_integer(
+    "threads",
+    default=1,
+    help="Number of threads concurrently issuing blob store calls.",
 )
 
+_BATCH_SIZE = flags.DEFINE_integer(
+    "batch_size",
+    default=1,
+    help="Number of blobs passed to a single blob store call.",
+)
+
+_POPULATION_SIZE = flags.DEFINE_integer(
+    "population_size",
+    default=100,
+    help="Number of blobs written upfront for reading workloads.",
+)
+
+_MIXED_READ_RATIO = flags.DEFINE_float(
+    "mixed_read_ratio",
+    default=0.8,
+    help="Fraction of reads in the mixed read/write workload.",
+)
+
+_ENCRYPTED_DELEGATE = flags.DEFINE_string(
+    "encrypted_delegate",
+    default="DbBlobStore",
+    help=(
+        f"BlobStore implementation wrapped by the {ENCRYPTED_TARGET} target."
+        " Blobs are encrypted with a test keystore, so results only reflect"
+        " the overhead of the encryption layer, not of real ciphers."
+    ),
+)
+
+_LOCAL_PATH = flags.DEFINE_string(
+    "local_path",
+    default=None,
+    help=(
+        f"Directory used by the {LOCAL_FS_TARGET} target. Defaults to the"
+        " configured directory or, if not set, a temporary directory."
+    ),
+)
+
+_JSON_OUTPUT = flags.DEFINE_string(
+    "json_output",
+    default=None,
+    help="Path to write the results to as JSON. Use '-' for stdout.",
+)
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+  """Result of running a single workload with a single blob size."""
+
+  target: str
+  workload: str
+  size: str
+  size_b: int
+  threads: int
+  batch_size: int
+  # Latencies of individual blob store calls in seconds.
+  durations: List[float]
+  # Wall-clock time it took to issue all the calls.
+  wall_time: float
+
+  @property
+  def qps(self) -> float:
+    if not self.wall_time:
+      return 0.0
+    return len(self.durations) / self.wall_time
+
+  @property
+  def bytes_per_second(self) -> float:
+    return self.qps * self.batch_size * self.size_b
+
+  def Percentile(self, percentile: float) -> float:
+    """Returns the given latency percentile in milliseconds."""
+    if not self.durations:
+      return 0.0
+    return float(np.percentile(np.array(self.durations) * 1000, percentile))
 
-def _MakeBlobStore(blobstore_name):
+  def ToJson(self):
+    return {
+        "target": self.target,
+        "workload": self.workload,
+        "size": self.size,
+        "size_bytes": self.size_b,
+        "threads": self.threads,
+        "batch_size": self.batch_size,
+        "num_calls": len(self.durations),
+        "wall_time_seconds": self.wall_time,
+        "qps": self.qps,
+        "bytes_per_second": self.bytes_per_second,
+        "latency_ms": {
+            "p50": self.Percentile(50),
+            "p90": self.Percentile(90),
+            "p95": self.Percentile(95),
+            "p99": self.Percentile(99),
+            "max": max(self.durations, default=0.0) * 1000,
+        },
+    }
+
+
+def _MakeBlobStore(blobstore_name: str) -> blob_store.BlobStore:
+  """Creates the blob store to benchmark given its name."""
+  if blobstore_name == ENCRYPTED_TARGET:
+    bs = encrypted_blob_store.EncryptedBlobStore(
+        _MakeBlobStore(_ENCRYPTED_DELEGATE.value),
+        data_store.REL_DB,
+        mem_ks.MemKeystore(["benchmark"]),
+        "benchmark",
+    )
+  elif blobstore_name == LOCAL_FS_TARGET:
+    path = (
+        _LOCAL_PATH.value
+        or config.CONFIG["Blobstore.local_fs.path"]
+        or tempfile.mkdtemp(prefix="grr_blob_benchmark")
+    )
+    bs = local_fs_blob_store.LocalFSBlobStore(path)
+  else:
+    try:
+      cls = blob_store.REGISTRY[blobstore_name]
+    except KeyError:
+      raise ValueError("No blob store %s found." % blobstore_name)
+    bs = cls()
+  return blob_store.BlobStoreValidationWrapper(bs)
+
+
+def _MakeRandomBlobs(
+    size_b: int,
+    count: int,
+) -> Dict[models_blobs.BlobID, bytes]:
+  blobs = {}
+  for _ in range(count):
+    blob_data = os.urandom(size_b)
+    blobs[models_blobs.BlobID.Of(blob_data)] = blob_data
+  return blobs
+
+
+def _MakeRandomBlobIDs(count: int) -> List[models_blobs.BlobID]:
+  return [models_blobs.BlobID.Of(os.urandom(16)) for _ in range(count)]
+
+
+def _MakeOperation(
+    bs: blob_store.BlobStore,
+    workload: str,
+    size_b: int,
+    batch_size: int,
+    population: Sequence[models_blobs.BlobID],
+    mixed_read_ratio: float,
+) -> Callable[[random.Random], None]:
+  """Returns a function issuing a single blob store call of the workload."""
+
+  def Write(rand: random.Random) -> None:
+    del rand  # Unused.
+    bs.WriteBlobs(_MakeRandomBlobs(size_b, batch_size))
+
+  def Read(rand: random.Random) -> None:
+    bs.ReadBlobs(rand.sample(population, batch_size))
+
+  def Exists(rand: random.Random) -> None:
+    # Half of the checked blobs exist, so both the hit and the miss paths of
+    # the implementation are exercised.
+    num_missing = batch_size // 2
+    blob_ids = rand.sample(population, batch_size - num_missing)
+    blob_ids.extend(_MakeRandomBlobIDs(num_missing))
+    bs.CheckBlobsExist(blob_ids)
+
+  def ReadAndWait(rand: random.Random) -> None:
+    bs.ReadAndWaitForBlobs(
+        rand.sample(population, batch_size),
+        timeout=rdfvalue.Duration.From(10, rdfvalue.SECONDS),
+    )
+
+  def Mixed(rand: random.Random) -> None:
+    if rand.random() < mixed_read_ratio:
+      Read(rand)
+    else:
+      Write(rand)
+
+  operations = {
+      WRITE: Write,
+      READ: Read,
+      EXISTS: Exists,
+      READ_AND_WAIT: ReadAndWait,
+      MIXED: Mixed,
+  }
   try:
-    cls = blob_store.REGISTRY[blobstore_name]
+    return operations[workload]
   except KeyError:
-    raise ValueError("No blob store %s found." % blobstore_name)
-  return blob_store.BlobStoreValidationWrapper(cls())
+    raise ValueError("Unknown workload: %s" % workload)
 
 
-def _MakeRandomBlob(
-    size_b: rdfvalue.ByteSize,
-    random_fd: IO[bytes],
-) -> tuple[models_blobs.BlobID, bytes]:
-  blob_data = random_fd.read(int(size_b))
-  blob_id = models_blobs.BlobID.Of(blob_data)
-  return blob_id, blob_data
+def RunBenchmark(
+    bs: blob_store.BlobStore,
+    target: str,
+    workload: str,
+    size: str,
+    duration_sec: float,
+    threads: int = 1,
+    batch_size: int = 1,
+    population_size: int = 100,
+    mixed_read_ratio: float = 0.8,
+) -> BenchmarkResult:
+  """Runs a single workload against the given blob store.
 
+  Args:
+    bs: The blob store to benchmark.
+    target: Name of the blob store, used for reporting only.
+    workload: One of `WORKLOADS`.
+    size: Human readable size of the blobs used, e.g. "500K".
+    duration_sec: Duration of the benchmark in seconds.
+    threads: Number of threads concurrently calling the blob store.
+    batch_size: Number of blobs passed to a single blob store call.
+    population_size: Number of blobs written before reading workloads start.
+    mixed_read_ratio: Fraction of reads in the mixed workload.
 
-def _Timed(fn, *args, **kwargs):
-  start = time.time()
-  result = fn(*args, **kwargs)
-  return result, time.time() - start
+  Returns:
+    The benchmark result.
+  """
+  size_b = int(rdfvalue.ByteSize(size))
+  population_size = max(population_size, batch_size)
 
+  population = []
+  if workload != WRITE:
+    blobs = _MakeRandomBlobs(size_b, population_size)
+    bs.WriteBlobs(blobs)
+    population = list(blobs)
 
-def _PrintStats(size, size_b, durations):
-  durations_ms = np.array(durations) * 1000
-  total_s = sum(durations)
-  qps = len(durations) / total_s
-  print(
-      "{size}\t{total:.1f}s\t{num}\t{qps:.2f}\t{bps: >7}\t{p50:.1f}\t{p90:.1f}"
-      "\t{p95:.1f}\t{p99:.1f}".format(
-          size=size,
-          total=total_s,
-          num=len(durations),
-          qps=qps,
-          bps=str(rdfvalue.ByteSize(int(size_b * qps))).replace("iB", ""),
-          p50=np.percentile(durations_ms, 50),
-          p90=np.percentile(durations_ms, 90),
-          p95=np.percentile(durations_ms, 95),
-          p99=np.percentile(durations_ms, 99),
+  operation = _MakeOperation(
+      bs, workload, size_b, batch_size, population, mixed_read_ratio
+  )
+
+  per_thread_durations = [[] for _ in range(threads)]
+  errors = []
+  deadline = time.monotonic() + duration_sec
+
+  def Loop(durations: List[float], seed: int) -> None:
+    rand = random.Random(seed)
+    try:
+      while time.monotonic() < deadline:
+        start = time.monotonic()
+        operation(rand)
+        durations.append(time.monotonic() - start)
+    except Exception as e:  # pylint: disable=broad-except
+      errors.append(e)
+
+  workers = [
+      threading.Thread(
+          name=f"blob_benchmark_{i}",
+          target=Loop,
+          args=(per_thread_durations[i], i),
       )
+      for i in range(threads)
+  ]
+  start = time.monotonic()
+  for worker in workers:
+    worker.start()
+  for worker in workers:
+    worker.join()
+  wall_time = time.monotonic() - start
+
+  if errors:
+    raise errors[0]
+
+  return BenchmarkResult(
+      target=target,
+      workload=workload,
+      size=size,
+      size_b=size_b,
+      threads=threads,
+      batch_size=batch_size,
+      durations=[d for durations in per_thread_durations for d in durations],
+      wall_time=wall_time,
   )
 
 
-def _RunBenchmark(bs, size_b, duration_sec, random_fd):
-  """Returns a list of runtimes for writes of the given size."""
-  start_timestamp = time.time()
-  durations = []
+def _PrintHeader() -> None:
+  print("workload\tsize\ttotal\tnum\tqps\t  b/sec\tp50\tp90\tp95\tp99")
 
-  # Monotonically increasing time would be nice, but is unavailable in Py2.
-  while time.time() < start_timestamp + duration_sec:
-    blob_id, blob_data = _MakeRandomBlob(size_b, random_fd)
-    _, write_time = _Timed(bs.WriteBlobs, {blob_id: blob_data})
-    durations.append(write_time)
-  return durations
+
+def _PrintStats(result: BenchmarkResult) -> None:
+  print(
+      "{workload}\t{size}\t{total:.1f}s\t{num}\t{qps:.2f}\t{bps: >7}"
+      "\t{p50:.1f}\t{p90:.1f}\t{p95:.1f}\t{p99:.1f}".format(
+          workload=result.workload,
+          size=result.size,
+          total=result.wall_time,
+          num=len(result.durations),
+          qps=result.qps,
+          bps=str(rdfvalue.ByteSize(int(result.bytes_per_second))).replace(
+              "iB", ""
+          ),
+          p50=result.Percentile(50),
+          p90=result.Percentile(90),
+          p95=result.Percentile(95),
+          p99=result.Percentile(99),
+      )
+  )
+
+
+def _WriteJson(results: Sequence[BenchmarkResult], path: str) -> None:
+  data = json.dumps([result.ToJson() for result in results], indent=2)
+  if path == "-":
+    print(data)
+  else:
+    with open(path, "w") as f:
+      f.write(data)
 
 
 def main(argv):
@@ -101,23 +391,48 @@ def main(argv):
   server_startup.Init()
 
   if not _TARGET.value:
-    store_names = ", ".join(sorted(blob_store.REGISTRY.keys()))
-    print("Missing --target. Use one or multiple of: {}.".format(store_names))
-    exit(1)
+    store_names = sorted(list(blob_store.REGISTRY.keys()) + [ENCRYPTED_TARGET])
+    print(
+        "Missing --target. Use one or multiple of: {}.".format(
+            ", ".join(store_names)
+        )
+    )
+    sys.exit(1)
+
+  for workload in _WORKLOADS.value:
+    if workload not in WORKLOADS:
+      print("Unknown workload: {}.".format(workload))
+      sys.exit(1)
 
   stores = [_MakeBlobStore(blobstore_name) for blobstore_name in _TARGET.value]
 
-  with io.open("/dev/urandom", "rb") as random_fd:
-    for blobstore_name, bs in zip(_TARGET.value, stores):
-      print()
-      print(blobstore_name)
-      print("size\ttotal\tnum\tqps\t  b/sec\tp50\tp90\tp95\tp99")
+  results = []
+  for blobstore_name, bs in zip(_TARGET.value, stores):
+    print()
+    print(
+        "{} ({} threads, {} blobs per call)".format(
+            blobstore_name, _THREADS.value, _BATCH_SIZE.value
+        )
+    )
+    _PrintHeader()
+    for workload in _WORKLOADS.value:
       for size in _SIZES.value:
-        size_b = rdfvalue.ByteSize(size)
-        durations = _RunBenchmark(
-            bs, size_b, _PER_SIZE_DURATION_SECONDS.value, random_fd
+        result = RunBenchmark(
+            bs,
+            blobstore_name,
+            workload,
+            size,
+            _PER_SIZE_DURATION_SECONDS.value,
+            threads=_THREADS.value,
+            batch_size=_BATCH_SIZE.value,
+            population_size=_POPULATION_SIZE.value,
+            mixed_read_ratio=_MIXED_READ_RATIO.value,
         )
-        _PrintStats(size, size_b, durations)
+        _PrintStats(result)
+        results.append(result)
+
+  if _JSON_OUTPUT.value:
+    _WriteJson(results, _JSON_OUTPUT.value)
 
 
 if __name__ == "__main__":
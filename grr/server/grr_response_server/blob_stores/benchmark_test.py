@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Tests for the blob store benchmark."""
+
+import json
+import os
+
+from absl.testing import absltest
+
+from grr_response_core.stats import default_stats_collector
+from grr_response_core.stats import stats_collector_instance
+from grr_response_server.blob_stores import benchmark
+from grr_response_server.blob_stores import local_fs_blob_store
+
+
+def setUpModule() -> None:
+  stats_collector_instance.Set(default_stats_collector.DefaultStatsCollector())
+
+
+class RunBenchmarkTest(absltest.TestCase):
+
+  def testRunsAllWorkloads(self):
+    bs = local_fs_blob_store.LocalFSBlobStore(
+        self.create_tempdir().full_path, shard_levels=1, io_threads=2
+    )
+
+    for workload in benchmark.WORKLOADS:
+      result = benchmark.RunBenchmark(
+          bs,
+          "LocalFSBlobStore",
+          workload,
+          "1K",
+          duration_sec=0.1,
+          threads=2,
+          batch_size=4,
+          population_size=10,
+      )
+
+      self.assertEqual(result.workload, workload)
+      self.assertEqual(result.size_b, 1024)
+      self.assertNotEmpty(result.durations)
+      self.assertGreater(result.qps, 0)
+      self.assertLessEqual(result.Percentile(50), result.Percentile(99))
+
+  def testWriteWorkloadWritesBlobs(self):
+    path = self.create_tempdir().full_path
+    bs = local_fs_blob_store.LocalFSBlobStore(
+        path, shard_levels=0, io_threads=1
+    )
+
+    result = benchmark.RunBenchmark(
+        bs, "LocalFSBlobStore", benchmark.WRITE, "100", duration_sec=0.1
+    )
+
+    self.assertNotEmpty(result.durations)
+    self.assertLen(os.listdir(path), len(result.durations))
+
+  def testUnknownWorkloadRaises(self):
+    with self.assertRaises(ValueError):
+      bs = local_fs_blob_store.LocalFSBlobStore(
+          self.create_tempdir().full_path, shard_levels=0, io_threads=1
+      )
+      benchmark.RunBenchmark(
+          bs, "LocalFSBlobStore", "foo", "1K", duration_sec=0.1
+      )
+
+  def testResultToJson(self):
+    result = benchmark.BenchmarkResult(
+        target="Foo",
+        workload=benchmark.READ,
+        size="1K",
+        size_b=1024,
+        threads=1,
+        batch_size=2,
+        durations=[0.001, 0.002, 0.003, 0.004],
+        wall_time=0.01,
+    )
+
+    data = json.loads(json.dumps(result.ToJson()))
+
+    self.assertEqual(data["target"], "Foo")
+    self.assertEqual(data["num_calls"], 4)
+    self.assertAlmostEqual(data["qps"], 400)
+    self.assertAlmostEqual(data["bytes_per_second"], 400 * 2 * 1024)
+    self.assertAlmostEqual(data["latency_ms"]["max"], 4)
+    self.assertBetween(data["latency_ms"]["p50"], 2, 3)
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""A BlobStore keeping blobs in a local or network file system directory."""
+
+from collections.abc import Callable, Iterable, Sequence
+from concurrent import futures
+import mmap
+import os
+import tempfile
+from typing import Optional, TypeVar
+
+from grr_response_core import config
+from grr_response_server import blob_store
+from grr_response_server.models import blobs as models_blobs
+
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+# Blob ids are SHA-256 digests, so there are at most 32 bytes to shard by.
+_MAX_SHARD_LEVELS = 32
+
+# Prefix of files being written. Blob files are named after the hex-encoded
+# blob id, so temporary files can never clash with them.
+_TEMP_FILE_PREFIX = ".tmp-"
+
+
+class ConfigError(Exception):
+  """Raised when the local file system blob store config is invalid."""
+
+
+class LocalFSBlobStore(blob_store.BlobStore):
+  """A content-addressed BlobStore backed by a directory tree.
+
+  Every blob is stored in a separate file named after its hex-encoded blob id.
+  Files are sharded into nested directories named after the leading bytes of
+  the blob id, e.g. with two shard levels a blob `abcdef...` is stored as
+  `<root>/ab/cd/abcdef...`.
+
+  Blobs are written to a temporary file first and atomically renamed into
+  place, so readers never observe partially written blobs, even if multiple
+  processes write the same blob concurrently.
+  """
+
+  def __init__(
+      self,
+      path: Optional[str] = None,
+      shard_levels: Optional[int] = None,
+      io_threads: Optional[int] = None,
+  ) -> None:
+    """Initializes the blob store.
+
+    Args:
+      path: Root directory of the blob store. Defaults to the
+        `Blobstore.local_fs.path` config option.
+      shard_levels: Number of nested shard directory levels. Defaults to the
+        `Blobstore.local_fs.shard_levels` config option.
+      io_threads: Number of threads used to access blob files in parallel.
+        Defaults to the `Blobstore.local_fs.io_threads` config option.
+
+    Raises:
+      ConfigError: If the configuration is invalid.
+    """
+    super().__init__()
+
+    if path is None:
+      path = config.CONFIG["Blobstore.local_fs.path"]
+    if shard_levels is None:
+      shard_levels = config.CONFIG["Blobstore.local_fs.shard_levels"]
+    if io_threads is None:
+      io_threads = config.CONFIG["Blobstore.local_fs.io_threads"]
+
+    if not path:
+      raise ConfigError("Missing config value for Blobstore.local_fs.path")
+    if not 0 <= shard_levels <= _MAX_SHARD_LEVELS:
+      raise ConfigError(f"Invalid number of shard levels: {shard_levels}")
+    if io_threads < 1:
+      raise ConfigError(f"Invalid number of I/O threads: {io_threads}")
+
+    os.makedirs(path, exist_ok=True)
+
+    self._path = path
+    self._shard_levels = shard_levels
+    self._executor = futures.ThreadPoolExecutor(
+        max_workers=io_threads, thread_name_prefix="LocalFSBlobStore"
+    )
+
+  def _GetPath(self, blob_id: models_blobs.BlobID) -> str:
+    hex_blob_id = bytes(blob_id).hex()
+    shards = [hex_blob_id[2 * i : 2 * i + 2] for i in range(self._shard_levels)]
+    return os.path.join(self._path, *shards, hex_blob_id)
+
+  def _Map(self, func: Callable[[_T], _R], items: Sequence[_T]) -> list[_R]:
+    """Applies the function to all items, in parallel if worthwhile."""
+    if len(items) <= 1:
+      return [func(item) for item in items]
+    return list(self._executor.map(func, items))
+
+  def _WriteBlob(self, item: tuple[models_blobs.BlobID, bytes]) -> None:
+    """Writes a single blob file unless it is already present."""
+    blob_id, blob = item
+    path = self._GetPath(blob_id)
+
+    # Blobs are content-addressed: an existing file for the blob id already
+    # holds exactly the data we are about to write.
+    if os.path.exists(path):
+      return
+
+    dirname = os.path.dirname(path)
+    os.makedirs(dirname, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=dirname, prefix=_TEMP_FILE_PREFIX)
+    try:
+      with os.fdopen(fd, "wb") as temp_file:
+        temp_file.write(blob)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+      os.replace(temp_path, path)
+    except:
+      try:
+        os.remove(temp_path)
+      except OSError:
+        pass
+      raise
+
+  def _ReadBlob(self, blob_id: models_blobs.BlobID) -> Optional[bytes]:
+    """Reads a single blob file, returning `None` if it does not exist."""
+    try:
+      with open(self._GetPath(blob_id), "rb") as blob_file:
+        if os.fstat(blob_file.fileno()).st_size == 0:
+          # Empty files cannot be memory-mapped.
+          return b""
+        with mmap.mmap(
+            blob_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as blob_map:
+          return blob_map[:]
+    except FileNotFoundError:
+      return None
+
+  def _CheckBlobExists(self, blob_id: models_blobs.BlobID) -> bool:
+    return os.path.isfile(self._GetPath(blob_id))
+
+  def WriteBlobs(
+      self,
+      blob_id_data_map: dict[models_blobs.BlobID, bytes],
+  ) -> None:
+    """Creates or overwrites blobs."""
+    self._Map(self._WriteBlob, list(blob_id_data_map.items()))
+
+  def ReadBlobs(
+      self,
+      blob_ids: Iterable[models_blobs.BlobID],
+  ) -> dict[models_blobs.BlobID, Optional[bytes]]:
+    """Reads given blobs."""
+    blob_ids = list(blob_ids)
+    return dict(zip(blob_ids, self._Map(self._ReadBlob, blob_ids)))
+
+  def CheckBlobsExist(
+      self,
+      blob_ids: Iterable[models_blobs.BlobID],
+  ) -> dict[models_blobs.BlobID, bool]:
+    """Checks if given blobs exist."""
+    blob_ids = list(blob_ids)
+    return dict(zip(blob_ids, self._Map(self._CheckBlobExists, blob_ids)))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""Tests for the local file system blob store implementation."""
+
+import os
+from unittest import mock
+
+from absl import app
+
+from grr_response_server import blob_store_test_mixin
+from grr_response_server.blob_stores import local_fs_blob_store
+from grr_response_server.models import blobs as models_blobs
+from grr.test_lib import test_lib
+
+
+class LocalFSBlobStoreTest(
+    blob_store_test_mixin.BlobStoreTestMixin,
+    test_lib.GRRBaseTest,
+):
+
+  def CreateBlobStore(self):
+    self.blob_store_path = self.create_tempdir().full_path
+    bs = local_fs_blob_store.LocalFSBlobStore(self.blob_store_path)
+    return bs, None
+
+  def testBlobsAreShardedByBlobIdPrefix(self):
+    blob = b"foo"
+    blob_id = models_blobs.BlobID.Of(blob)
+    self.blob_store.WriteBlobs({blob_id: blob})
+
+    hex_blob_id = bytes(blob_id).hex()
+    path = os.path.join(
+        self.blob_store_path, hex_blob_id[:2], hex_blob_id[2:4], hex_blob_id
+    )
+    with open(path, "rb") as f:
+      self.assertEqual(f.read(), blob)
+
+  def testShardLevelsAreConfigurable(self):
+    path = self.create_tempdir().full_path
+    bs = local_fs_blob_store.LocalFSBlobStore(path, shard_levels=0)
+
+    blob = b"foo"
+    blob_id = models_blobs.BlobID.Of(blob)
+    bs.WriteBlobs({blob_id: blob})
+
+    self.assertEqual(os.listdir(path), [bytes(blob_id).hex()])
+
+  def testEmptyBlobCanBeWrittenAndThenRead(self):
+    blob_id = models_blobs.BlobID.Of(b"")
+    self.blob_store.WriteBlobs({blob_id: b""})
+
+    self.assertEqual(self.blob_store.ReadBlobs([blob_id]), {blob_id: b""})
+
+  def testFailedWriteLeavesNoFiles(self):
+    blob = b"foo"
+    blob_id = models_blobs.BlobID.Of(blob)
+
+    with mock.patch.object(os, "replace", side_effect=OSError("failure")):
+      with self.assertRaises(OSError):
+        self.blob_store.WriteBlobs({blob_id: blob})
+
+    self.assertFalse(self.blob_store.CheckBlobExists(blob_id))
+    for _, _, filenames in os.walk(self.blob_store_path):
+      self.assertEmpty(filenames)
+
+  def testWritingExistingBlobDoesNotRewriteIt(self):
+    blob = b"foo"
+    blob_id = models_blobs.BlobID.Of(blob)
+    self.blob_store.WriteBlobs({blob_id: blob})
+
+    with mock.patch.object(os, "replace") as replace_mock:
+      self.blob_store.WriteBlobs({blob_id: blob})
+
+    replace_mock.assert_not_called()
+    self.assertEqual(self.blob_store.ReadBlob(blob_id), blob)
+
+  def testMissingPathRaises(self):
+    with test_lib.ConfigOverrider({"Blobstore.local_fs.path": None}):
+      with self.assertRaises(local_fs_blob_store.ConfigError):
+        local_fs_blob_store.LocalFSBlobStore()
+
+  def testPathIsReadFromConfig(self):
+    path = self.create_tempdir().full_path
+    with test_lib.ConfigOverrider({"Blobstore.local_fs.path": path}):
+      bs = local_fs_blob_store.LocalFSBlobStore(shard_levels=0)
+
+    blob = b"foo"
+    blob_id = models_blobs.BlobID.Of(blob)
+    bs.WriteBlobs({blob_id: blob})
+
+    self.assertEqual(os.listdir(path), [bytes(blob_id).hex()])
+
+  def testInvalidShardLevelsRaise(self):
+    path = self.create_tempdir().full_path
+    with self.assertRaises(local_fs_blob_store.ConfigError):
+      local_fs_blob_store.LocalFSBlobStore(path, shard_levels=33)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -4,6 +4,7 @@
 from grr_response_server import blob_store
 from grr_response_server.blob_stores import db_blob_store
 from grr_response_server.blob_stores import gcs_blob_store
+from grr_response_server.blob_stores import local_fs_blob_store
 
 
 def RegisterBlobStores():
@@ -14,3 +15,6 @@ def RegisterBlobStores():
   blob_store.REGISTRY[gcs_blob_store.GCSBlobStore.__name__] = (
       gcs_blob_store.GCSBlobStore
   )
+  blob_store.REGISTRY[local_fs_blob_store.LocalFSBlobStore.__name__] = (
+      local_fs_blob_store.LocalFSBlobStore
+  )
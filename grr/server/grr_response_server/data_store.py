@@ -94,4 +94,11 @@ def InitializeDataStore():
     cls = blob_store.REGISTRY[blobstore_name]
   except KeyError:
     raise ValueError("No blob store %s found." % blobstore_name)
-  BLOBS = blob_store.BlobStoreValidationWrapper(cls())
+  bs = cls()
+
+  cache_size = config.CONFIG["Blobstore.cache_size_bytes"]
+  if cache_size > 0:
+    logging.info("Using blob store cache of %d bytes", cache_size)
+    bs = blob_store.CachingBlobStore(bs, cache_size)
+
+  BLOBS = blob_store.BlobStoreValidationWrapper(bs)
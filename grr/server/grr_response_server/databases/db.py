@@ -449,6 +449,19 @@ class StringTooLongError(ValueError):
   """Validation error raised if a string is too long."""
 
 
+class ClientFullInfoField(enum.Enum):
+  """Parts of `ClientFullInfo` that can be read with MultiReadClientFullInfo."""
+
+  METADATA = enum.auto()
+  LAST_SNAPSHOT = enum.auto()
+  LAST_STARTUP_INFO = enum.auto()
+  LABELS = enum.auto()
+  LAST_RRG_STARTUP = enum.auto()
+
+
+ALL_CLIENT_FULL_INFO_FIELDS = frozenset(ClientFullInfoField)
+
+
 class HuntFlowsCondition(enum.Enum):
   """Constants to be used with ReadHuntFlows/CountHuntFlows methods."""
 
@@ -485,6 +498,26 @@ FlowStateAndTimestamps = collections.namedtuple(
 )
 
 
+@dataclasses.dataclass(frozen=True)
+class FlowProcessingShard:
+  """A disjoint subset of flow processing requests.
+
+  Requests are assigned to shards by their client id, so all requests of a
+  given client are always handled by the same shard.
+
+  Attributes:
+    index: Index of this shard, in the [0, count) range.
+    count: Total number of shards.
+  """
+
+  index: int
+  count: int
+
+  def Contains(self, client_id: str) -> bool:
+    """Checks if requests of a given client belong to this shard."""
+    return int(client_id[2:], 16) % self.count == self.index
+
+
 @dataclasses.dataclass
 class FlowErrorInfo:
   """Information about what caused flow to error-out."""
@@ -848,6 +881,7 @@ class Database(metaclass=abc.ABCMeta):
       self,
       client_ids: Collection[str],
       min_last_ping: Optional[rdfvalue.RDFDatetime] = None,
+      fields: Collection[ClientFullInfoField] = ALL_CLIENT_FULL_INFO_FIELDS,
   ) -> Mapping[str, objects_pb2.ClientFullInfo]:
     """Reads full client information for a list of clients.
 
@@ -859,6 +893,8 @@ class Database(metaclass=abc.ABCMeta):
         "C.ea3b2b71840d6fa8"]
       min_last_ping: If not None, only the clients with last ping time bigger
         than min_last_ping will be returned.
+      fields: Parts of the `ClientFullInfo` to read. Parts that are not
+        requested are left unset in the results.
 
     Returns:
       A map from client ids to `ClientFullInfo` instance.
@@ -867,11 +903,14 @@ class Database(metaclass=abc.ABCMeta):
   def ReadClientFullInfo(
       self,
       client_id: str,
+      fields: Collection[ClientFullInfoField] = ALL_CLIENT_FULL_INFO_FIELDS,
   ) -> objects_pb2.ClientFullInfo:
     """Reads full client information for a single client.
 
     Args:
       client_id: A GRR client id string, e.g. "C.ea3b2b71840d6fa7".
+      fields: Parts of the `ClientFullInfo` to read. Parts that are not
+        requested are left unset in the result.
 
     Returns:
       A `ClientFullInfo` instance for given client.
@@ -879,7 +918,7 @@ class Database(metaclass=abc.ABCMeta):
     Raises:
       UnknownClientError: if no client with such id was found.
     """
-    result = self.MultiReadClientFullInfo([client_id])
+    result = self.MultiReadClientFullInfo([client_id], fields=fields)
     try:
       return result[client_id]
     except KeyError:
@@ -1241,6 +1280,18 @@ class Database(metaclass=abc.ABCMeta):
   def RemoveExpiredForemanRules(self) -> None:
     """Removes all expired foreman rules from the database."""
 
+  @abc.abstractmethod
+  def ReadForemanRulesVersion(self) -> int:
+    """Reads the current version of the foreman rules table.
+
+    The version is increased every time the set of foreman rules changes (a
+    rule is written, removed or expired). It allows callers to cache the rules
+    and to re-read them only if they have actually changed.
+
+    Returns:
+      An integer version of the foreman rules.
+    """
+
   @abc.abstractmethod
   def WriteGRRUser(
       self,
@@ -2081,6 +2132,44 @@ class Database(metaclass=abc.ABCMeta):
       this method will return false and the flow will not be written.
     """
 
+  @abc.abstractmethod
+  def LeaseFlowsForProcessing(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+      processing_time: rdfvalue.Duration,
+  ) -> Dict[Tuple[str, str], flows_pb2.Flow]:
+    """Marks multiple flows as being processed on this worker and returns them.
+
+    Unlike `LeaseFlowForProcessing`, this method does not raise if a flow can't
+    be leased: flows that do not exist, are already being processed or whose
+    parent hunt is not running are omitted from the result.
+
+    Args:
+      flow_keys: A collection of (client_id, flow_id) tuples.
+      processing_time: Duration that the worker has to finish processing before
+        the flows are considered stuck.
+
+    Returns:
+      A dict mapping (client_id, flow_id) tuples to leased Flow objects.
+    """
+
+  @abc.abstractmethod
+  def ReleaseProcessedFlows(
+      self, flow_objs: Sequence[flows_pb2.Flow]
+  ) -> Dict[Tuple[str, str], bool]:
+    """Releases multiple flows that the worker was processing to the database.
+
+    This is a bulk version of `ReleaseProcessedFlow`: every flow is released
+    with the same semantics, but all of them in a single transaction.
+
+    Args:
+      flow_objs: Flow objects to return to the database.
+
+    Returns:
+      A dict mapping (client_id, flow_id) tuples to booleans indicating if it
+      was possible to return the flow to the database.
+    """
+
   @abc.abstractmethod
   def UpdateFlow(
       self,
@@ -2256,6 +2345,37 @@ class Database(metaclass=abc.ABCMeta):
       sorted list of responses for the request).
     """
 
+  @abc.abstractmethod
+  def MultiReadFlowRequests(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+  ) -> Dict[
+      Tuple[str, str],
+      Dict[
+          int,
+          Tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    """Reads all requests that can be processed by the worker for many flows.
+
+    Args:
+      flow_keys: A collection of (client_id, flow_id) tuples.
+
+    Returns:
+      A dict mapping (client_id, flow_id) tuples to the same request dicts as
+      returned by `ReadFlowRequests`. Flows without requests map to an empty
+      dict.
+    """
+
   @abc.abstractmethod
   def WriteFlowProcessingRequests(
       self,
@@ -2294,15 +2414,42 @@ class Database(metaclass=abc.ABCMeta):
 
   @abc.abstractmethod
   def RegisterFlowProcessingHandler(
-      self, handler: Callable[[flows_pb2.FlowProcessingRequest], None]
+      self,
+      handler: Callable[[flows_pb2.FlowProcessingRequest], None],
+      shard: Optional[FlowProcessingShard] = None,
   ) -> None:
     """Registers a handler to receive flow processing messages.
 
     Args:
       handler: Method, which will be called repeatedly with lists of
         rdf_flows.FlowProcessingRequest. Required.
+      shard: If set, only requests belonging to this shard are passed to the
+        handler.
     """
 
+  def RegisterBatchFlowProcessingHandler(
+      self,
+      handler: Callable[[Sequence[flows_pb2.FlowProcessingRequest]], None],
+      batch_size: int,
+      shard: Optional[FlowProcessingShard] = None,
+  ) -> None:
+    """Registers a handler to receive batches of flow processing messages.
+
+    Implementations that can't lease flow processing requests in batches call
+    the handler with single-element lists.
+
+    Args:
+      handler: Method, which will be called repeatedly with lists of at most
+        `batch_size` rdf_flows.FlowProcessingRequest. Required.
+      batch_size: Maximum number of requests passed to a single handler call.
+      shard: If set, only requests belonging to this shard are passed to the
+        handler.
+    """
+    del batch_size  # Unused.
+    self.RegisterFlowProcessingHandler(
+        lambda request: handler([request]), shard=shard
+    )
+
   @abc.abstractmethod
   def UnregisterFlowProcessingHandler(
       self, timeout: Optional[rdfvalue.Duration] = None
@@ -3133,6 +3280,21 @@ class Database(metaclass=abc.ABCMeta):
       A mapping from hunt_ids to HuntCounters objects.
     """
 
+  @abc.abstractmethod
+  def RebuildHuntCounters(
+      self,
+      hunt_ids: Optional[Collection[str]] = None,
+  ) -> None:
+    """Rebuilds hunt counters from the hunt flows.
+
+    Implementations that maintain hunt counters incrementally can use this to
+    backfill counters of existing hunts or to repair inconsistent counters.
+
+    Args:
+      hunt_ids: The ids of the hunts to rebuild counters for. If None,
+        counters of all hunts are rebuilt.
+    """
+
   @abc.abstractmethod
   def ReadHuntClientResourcesStats(
       self, hunt_id: str
@@ -3456,10 +3618,12 @@ class DatabaseValidationWrapper(Database):
       self,
       client_ids: Collection[str],
       min_last_ping: Optional[rdfvalue.RDFDatetime] = None,
+      fields: Collection[ClientFullInfoField] = ALL_CLIENT_FULL_INFO_FIELDS,
   ) -> Mapping[str, objects_pb2.ClientFullInfo]:
     _ValidateClientIds(client_ids)
+    precondition.AssertIterableType(fields, ClientFullInfoField)
     return self.delegate.MultiReadClientFullInfo(
-        client_ids, min_last_ping=min_last_ping
+        client_ids, min_last_ping=min_last_ping, fields=frozenset(fields)
     )
 
   def ReadClientLastPings(
@@ -3670,6 +3834,11 @@ class DatabaseValidationWrapper(Database):
   def RemoveExpiredForemanRules(self) -> None:
     return self.delegate.RemoveExpiredForemanRules()
 
+  def ReadForemanRulesVersion(self) -> int:
+    result = self.delegate.ReadForemanRulesVersion()
+    precondition.AssertType(result, int)
+    return result
+
   def WriteGRRUser(
       self,
       username: str,
@@ -4178,6 +4347,31 @@ class DatabaseValidationWrapper(Database):
     precondition.AssertType(flow_obj, flows_pb2.Flow)
     return self.delegate.ReleaseProcessedFlow(flow_obj)
 
+  def LeaseFlowsForProcessing(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+      processing_time: rdfvalue.Duration,
+  ) -> Dict[Tuple[str, str], flows_pb2.Flow]:
+    for client_id, flow_id in flow_keys:
+      precondition.ValidateClientId(client_id)
+      precondition.ValidateFlowId(flow_id)
+    _ValidateDuration(processing_time)
+
+    if not flow_keys:
+      return {}
+
+    return self.delegate.LeaseFlowsForProcessing(flow_keys, processing_time)
+
+  def ReleaseProcessedFlows(
+      self, flow_objs: Sequence[flows_pb2.Flow]
+  ) -> Dict[Tuple[str, str], bool]:
+    precondition.AssertIterableType(flow_objs, flows_pb2.Flow)
+
+    if not flow_objs:
+      return {}
+
+    return self.delegate.ReleaseProcessedFlows(flow_objs)
+
   def UpdateFlow(
       self,
       client_id: str,
@@ -4327,6 +4521,34 @@ class DatabaseValidationWrapper(Database):
     precondition.ValidateFlowId(flow_id)
     return self.delegate.ReadFlowRequests(client_id, flow_id)
 
+  def MultiReadFlowRequests(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+  ) -> Dict[
+      Tuple[str, str],
+      Dict[
+          int,
+          Tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    for client_id, flow_id in flow_keys:
+      precondition.ValidateClientId(client_id)
+      precondition.ValidateFlowId(flow_id)
+
+    if not flow_keys:
+      return {}
+
+    return self.delegate.MultiReadFlowRequests(flow_keys)
+
   def WriteFlowProcessingRequests(
       self,
       requests: Sequence[flows_pb2.FlowProcessingRequest],
@@ -4349,11 +4571,30 @@ class DatabaseValidationWrapper(Database):
     return self.delegate.DeleteAllFlowProcessingRequests()
 
   def RegisterFlowProcessingHandler(
-      self, handler: Callable[[flows_pb2.FlowProcessingRequest], None]
+      self,
+      handler: Callable[[flows_pb2.FlowProcessingRequest], None],
+      shard: Optional[FlowProcessingShard] = None,
   ) -> None:
     if handler is None:
       raise ValueError("handler must be provided")
-    return self.delegate.RegisterFlowProcessingHandler(handler)
+    _ValidateFlowProcessingShard(shard)
+    return self.delegate.RegisterFlowProcessingHandler(handler, shard=shard)
+
+  def RegisterBatchFlowProcessingHandler(
+      self,
+      handler: Callable[[Sequence[flows_pb2.FlowProcessingRequest]], None],
+      batch_size: int,
+      shard: Optional[FlowProcessingShard] = None,
+  ) -> None:
+    if handler is None:
+      raise ValueError("handler must be provided")
+    precondition.AssertType(batch_size, int)
+    if batch_size < 1:
+      raise ValueError("batch_size must be positive, got %d" % batch_size)
+    _ValidateFlowProcessingShard(shard)
+    return self.delegate.RegisterBatchFlowProcessingHandler(
+        handler, batch_size, shard=shard
+    )
 
   def UnregisterFlowProcessingHandler(
       self, timeout: Optional[rdfvalue.Duration] = None
@@ -4883,6 +5124,15 @@ class DatabaseValidationWrapper(Database):
       _ValidateHuntId(hunt_id)
     return self.delegate.ReadHuntsCounters(hunt_ids)
 
+  def RebuildHuntCounters(
+      self,
+      hunt_ids: Optional[Collection[str]] = None,
+  ) -> None:
+    if hunt_ids is not None:
+      for hunt_id in hunt_ids:
+        _ValidateHuntId(hunt_id)
+    return self.delegate.RebuildHuntCounters(hunt_ids)
+
   def ReadHuntClientResourcesStats(
       self, hunt_id: str
   ) -> jobs_pb2.ClientResourcesStats:
@@ -5205,6 +5455,14 @@ def _ValidateDuration(duration):
   precondition.AssertType(duration, rdfvalue.Duration)
 
 
+def _ValidateFlowProcessingShard(shard):
+  if shard is None:
+    return
+  precondition.AssertType(shard, FlowProcessingShard)
+  if not 0 <= shard.index < shard.count:
+    raise ValueError("Invalid flow processing shard: %s" % (shard,))
+
+
 def _ValidateBlobID(blob_id):
   precondition.AssertType(blob_id, models_blobs.BlobID)
 
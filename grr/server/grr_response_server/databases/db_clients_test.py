@@ -1270,6 +1270,81 @@ class DatabaseTestClientsMixin(object):
     self.assertEqual(full_info.labels[0].owner, "test_owner")
     self.assertEqual(full_info.labels[0].name, "test_label")
 
+  def testReadClientFullInfoOnlyRequestedFields(self):
+    self.db.WriteGRRUser("test_owner")
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    snapshot = objects_pb2.ClientSnapshot(client_id=client_id, kernel="12.3")
+    self.db.WriteClientSnapshot(snapshot)
+    self.db.WriteClientStartupInfo(client_id, jobs_pb2.StartupInfo(boot_time=1))
+    self.db.AddClientLabels(client_id, "test_owner", ["foo", "bar"])
+
+    full_info = self.db.ReadClientFullInfo(
+        client_id, fields=[db.ClientFullInfoField.LABELS]
+    )
+
+    self.assertCountEqual(
+        [label.name for label in full_info.labels], ["foo", "bar"]
+    )
+    self.assertFalse(full_info.HasField("metadata"))
+    self.assertFalse(full_info.HasField("last_snapshot"))
+    self.assertFalse(full_info.HasField("last_startup_info"))
+    self.assertFalse(full_info.HasField("last_rrg_startup"))
+
+  def testMultiReadClientFullInfoMultipleFields(self):
+    self.db.WriteGRRUser("test_owner")
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    snapshot = objects_pb2.ClientSnapshot(client_id=client_id, kernel="12.3")
+    self.db.WriteClientSnapshot(snapshot)
+    self.db.WriteClientStartupInfo(client_id, jobs_pb2.StartupInfo(boot_time=1))
+    self.db.AddClientLabels(client_id, "test_owner", ["foo", "bar"])
+
+    full_infos = self.db.MultiReadClientFullInfo(
+        [client_id],
+        fields=[
+            db.ClientFullInfoField.LAST_SNAPSHOT,
+            db.ClientFullInfoField.LAST_STARTUP_INFO,
+            db.ClientFullInfoField.LABELS,
+        ],
+    )
+
+    full_info = full_infos[client_id]
+    self.assertEqual(full_info.last_snapshot.kernel, "12.3")
+    self.assertEqual(full_info.last_startup_info.boot_time, 1)
+    self.assertCountEqual(
+        [label.name for label in full_info.labels], ["foo", "bar"]
+    )
+    self.assertFalse(full_info.HasField("metadata"))
+
+  def testMultiReadClientFullInfoMissingSnapshotWithFields(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+
+    full_infos = self.db.MultiReadClientFullInfo(
+        [client_id], fields=[db.ClientFullInfoField.LAST_SNAPSHOT]
+    )
+
+    self.assertEqual(full_infos[client_id].last_snapshot.client_id, client_id)
+
+  def testMultiReadClientFullInfoMinLastPingWithFields(self):
+    client_id_1 = db_test_utils.InitializeClient(self.db)
+    client_id_2 = db_test_utils.InitializeClient(self.db)
+
+    self.db.WriteClientMetadata(
+        client_id_1, last_ping=rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1)
+    )
+    self.db.WriteClientMetadata(
+        client_id_2, last_ping=rdfvalue.RDFDatetime.FromSecondsSinceEpoch(3)
+    )
+
+    full_infos = self.db.MultiReadClientFullInfo(
+        [client_id_1, client_id_2],
+        min_last_ping=rdfvalue.RDFDatetime.FromSecondsSinceEpoch(2),
+        fields=[db.ClientFullInfoField.LABELS],
+    )
+
+    self.assertCountEqual(full_infos, [client_id_2])
+
   def testReadClientFullInfoTimestamps(self):
     client_id = db_test_utils.InitializeClient(self.db)
 
@@ -1603,6 +1603,92 @@ class DatabaseTestFlowMixin(object):
     self.assertEqual(read_flow.next_request_to_process, 5)
     self.assertEqual(read_flow.num_replies_sent, 10)
 
+  def testLeaseFlowsForProcessingLeasesAllFlows(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id_1 = db_test_utils.InitializeFlow(self.db, client_id)
+    flow_id_2 = db_test_utils.InitializeFlow(self.db, client_id)
+    processing_time = rdfvalue.Duration.From(60, rdfvalue.SECONDS)
+
+    leased = self.db.LeaseFlowsForProcessing(
+        [(client_id, flow_id_1), (client_id, flow_id_2)], processing_time
+    )
+
+    self.assertCountEqual(
+        leased, [(client_id, flow_id_1), (client_id, flow_id_2)]
+    )
+    for (leased_client_id, leased_flow_id), flow in leased.items():
+      self.assertEqual(flow.client_id, leased_client_id)
+      self.assertEqual(flow.flow_id, leased_flow_id)
+      self.assertEqual(flow.processing_on, utils.ProcessIdString())
+
+      read_flow = self.db.ReadFlowObject(leased_client_id, leased_flow_id)
+      self.assertEqual(read_flow.processing_on, flow.processing_on)
+      self.assertEqual(read_flow.processing_deadline, flow.processing_deadline)
+
+  def testLeaseFlowsForProcessingSkipsFlowsThatCanNotBeLeased(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    processing_time = rdfvalue.Duration.From(60, rdfvalue.SECONDS)
+
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+    self.db.UpdateHuntObject(
+        hunt_id, hunt_state=hunts_pb2.Hunt.HuntState.STOPPED
+    )
+    stopped_hunt_flow_id = db_test_utils.InitializeFlow(
+        self.db, client_id, parent_hunt_id=hunt_id
+    )
+
+    processed_flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+    self.db.LeaseFlowForProcessing(
+        client_id, processed_flow_id, processing_time
+    )
+
+    flow_id = db_test_utils.InitializeFlow(self.db, client_id)
+
+    leased = self.db.LeaseFlowsForProcessing(
+        [
+            (client_id, stopped_hunt_flow_id),
+            (client_id, processed_flow_id),
+            (client_id, flow_id),
+            (client_id, "ABCDEF0123456789"),
+        ],
+        processing_time,
+    )
+    self.assertEqual(list(leased), [(client_id, flow_id)])
+
+  def testReleaseProcessedFlows(self):
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id_1 = db_test_utils.InitializeFlow(self.db, client_id)
+    flow_id_2 = db_test_utils.InitializeFlow(self.db, client_id)
+    processing_time = rdfvalue.Duration.From(60, rdfvalue.SECONDS)
+
+    leased = self.db.LeaseFlowsForProcessing(
+        [(client_id, flow_id_1), (client_id, flow_id_2)], processing_time
+    )
+    flow_1 = leased[(client_id, flow_id_1)]
+    flow_1.next_request_to_process = 2
+    flow_2 = leased[(client_id, flow_id_2)]
+    flow_2.next_request_to_process = 3
+
+    # Request #3 of the second flow is ready, so it can't be released.
+    self.db.WriteFlowRequests([
+        flows_pb2.FlowRequest(
+            client_id=client_id,
+            flow_id=flow_id_2,
+            request_id=3,
+            needs_processing=True,
+        )
+    ])
+
+    released = self.db.ReleaseProcessedFlows([flow_1, flow_2])
+    self.assertEqual(
+        released,
+        {(client_id, flow_id_1): True, (client_id, flow_id_2): False},
+    )
+
+    read_flow = self.db.ReadFlowObject(client_id, flow_id_1)
+    self.assertFalse(read_flow.processing_on)
+    self.assertEqual(read_flow.next_request_to_process, 2)
+
   def testFlowLastUpdateTime(self):
     processing_time = rdfvalue.Duration.From(60, rdfvalue.SECONDS)
 
@@ -1943,6 +2029,58 @@ class DatabaseTestFlowMixin(object):
     self.assertEqual(responses[0].flow_id, flow_id_1)
     self.assertEqual(responses[0].response_id, 2)
 
+  def testMultiReadFlowRequests(self):
+    client_id_1 = db_test_utils.InitializeClient(self.db)
+    flow_id_1 = db_test_utils.InitializeFlow(self.db, client_id_1)
+
+    client_id_2 = db_test_utils.InitializeClient(self.db)
+    flow_id_2 = db_test_utils.InitializeFlow(self.db, client_id_2)
+    flow_id_3 = db_test_utils.InitializeFlow(self.db, client_id_2)
+
+    requests = []
+    responses = []
+    for client_id, flow_id in (
+        (client_id_1, flow_id_1),
+        (client_id_2, flow_id_2),
+    ):
+      requests.append(
+          flows_pb2.FlowRequest(
+              client_id=client_id,
+              flow_id=flow_id,
+              request_id=1,
+          )
+      )
+      responses.append(
+          flows_pb2.FlowResponse(
+              client_id=client_id,
+              flow_id=flow_id,
+              request_id=1,
+              response_id=2,
+          )
+      )
+    self.db.WriteFlowRequests(requests)
+    self.db.WriteFlowResponses(responses)
+
+    flow_keys = [
+        (client_id_1, flow_id_1),
+        (client_id_2, flow_id_2),
+        (client_id_2, flow_id_3),
+    ]
+    multi_requests = self.db.MultiReadFlowRequests(flow_keys)
+
+    self.assertCountEqual(multi_requests, flow_keys)
+    self.assertEmpty(multi_requests[(client_id_2, flow_id_3)])
+    for client_id, flow_id in flow_keys[:2]:
+      self.assertEqual(
+          multi_requests[(client_id, flow_id)],
+          self.db.ReadFlowRequests(client_id, flow_id),
+      )
+      request, responses = multi_requests[(client_id, flow_id)][1]
+      self.assertEqual(request.client_id, client_id)
+      self.assertEqual(request.flow_id, flow_id)
+      self.assertLen(responses, 1)
+      self.assertEqual(responses[0].flow_id, flow_id)
+
   def testUpdateIncrementalFlowRequests(self):
     client_id = db_test_utils.InitializeClient(self.db)
     flow_id = db_test_utils.InitializeFlow(self.db, client_id)
@@ -2015,6 +2153,64 @@ class DatabaseTestFlowMixin(object):
           int(g.creation_time), pre_creation_time, post_creation_time
       )
 
+  def testFlowProcessingRequestsQueueWithShard(self):
+    client_ids = [
+        db_test_utils.InitializeClient(self.db, "C.%016X" % i) for i in range(4)
+    ]
+    flow_ids = {
+        client_id: db_test_utils.InitializeFlow(self.db, client_id)
+        for client_id in client_ids
+    }
+
+    request_queue = queue.Queue()
+
+    def Callback(request: flows_pb2.FlowProcessingRequest):
+      self.db.AckFlowProcessingRequests([request])
+      request_queue.put(request)
+
+    shard = db.FlowProcessingShard(index=1, count=2)
+    self.db.RegisterFlowProcessingHandler(Callback, shard=shard)
+    self.addCleanup(self.db.UnregisterFlowProcessingHandler)
+
+    self.db.WriteFlowProcessingRequests([
+        flows_pb2.FlowProcessingRequest(client_id=client_id, flow_id=flow_id)
+        for client_id, flow_id in flow_ids.items()
+    ])
+
+    got = []
+    while len(got) < 2:
+      try:
+        got.append(request_queue.get(True, timeout=6))
+      except queue.Empty:
+        self.fail(
+            "Timed out waiting for messages, expected 2, got %d" % len(got)
+        )
+
+    self.assertCountEqual(
+        [g.client_id for g in got], [client_ids[1], client_ids[3]]
+    )
+    # Requests of other shards are never handed out to this handler.
+    with self.assertRaises(queue.Empty):
+      request_queue.get(True, timeout=1)
+
+    remaining = self.db.ReadFlowProcessingRequests()
+    self.assertCountEqual(
+        [r.client_id for r in remaining], [client_ids[0], client_ids[2]]
+    )
+
+  def testRegisterFlowProcessingHandlerRaisesOnInvalidShard(self):
+    with self.assertRaises(ValueError):
+      self.db.RegisterFlowProcessingHandler(
+          lambda _: None, shard=db.FlowProcessingShard(index=2, count=2)
+      )
+
+  def testFlowProcessingShardContains(self):
+    shard = db.FlowProcessingShard(index=1, count=3)
+    self.assertTrue(shard.Contains("C.0000000000000001"))
+    self.assertTrue(shard.Contains("C.0000000000000004"))
+    self.assertFalse(shard.Contains("C.0000000000000002"))
+    self.assertFalse(shard.Contains("C.000000000000000F"))
+
   def testFlowProcessingRequestsQueueWithDelay(self):
     client_id = db_test_utils.InitializeClient(self.db)
 
@@ -99,5 +99,33 @@ class DatabaseTestForemanRulesMixin(object):
 
     self.assertLen(self.db.ReadAllForemanRules(), 2)
 
+  def testForemanRulesVersionChangesOnWriteAndRemove(self):
+    version = self.db.ReadForemanRulesVersion()
+
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+    self.db.WriteForemanRule(self._GetTestRule(hunt_id))
+    version_after_write = self.db.ReadForemanRulesVersion()
+    self.assertNotEqual(version_after_write, version)
+
+    self.db.RemoveForemanRule(hunt_id)
+    self.assertNotEqual(self.db.ReadForemanRulesVersion(), version_after_write)
+
+  def testForemanRulesVersionChangesOnlyWhenRulesExpire(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+    expires = self.db.Now() + rdfvalue.Duration("100s")
+    self.db.WriteForemanRule(self._GetTestRule(hunt_id, expires=expires))
+
+    version = self.db.ReadForemanRulesVersion()
+    self.db.RemoveExpiredForemanRules()
+    self.assertEqual(self.db.ReadForemanRulesVersion(), version)
+
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+    expires = self.db.Now() - rdfvalue.Duration("1s")
+    self.db.WriteForemanRule(self._GetTestRule(hunt_id, expires=expires))
+
+    version = self.db.ReadForemanRulesVersion()
+    self.db.RemoveExpiredForemanRules()
+    self.assertNotEqual(self.db.ReadForemanRulesVersion(), version)
+
 
 # This file is a test library and thus does not require a __main__ block.
@@ -2117,6 +2117,87 @@ class DatabaseTestHuntMixin(object):
     self.assertAlmostEqual(hunt_counters.total_cpu_seconds, 14.5)
     self.assertEqual(hunt_counters.total_network_bytes_sent, 42)
 
+  def testReadHuntCountersReflectsFlowUpdates(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+    client_id = db_test_utils.InitializeClient(self.db)
+    flow_id = db_test_utils.InitializeFlow(
+        self.db,
+        client_id,
+        flow_id=hunt_id,
+        flow_state=rdf_flow_objects.Flow.FlowState.RUNNING,
+        parent_hunt_id=hunt_id,
+    )
+
+    hunt_counters = self.db.ReadHuntCounters(hunt_id)
+    self.assertEqual(hunt_counters.num_clients, 1)
+    self.assertEqual(hunt_counters.num_running_clients, 1)
+    self.assertEqual(hunt_counters.num_successful_clients, 0)
+
+    flow_obj = self.db.ReadFlowObject(client_id, flow_id)
+    flow_obj.flow_state = flows_pb2.Flow.FlowState.FINISHED
+    flow_obj.network_bytes_sent = 42
+    self.db.UpdateFlow(client_id, flow_id, flow_obj=flow_obj)
+
+    hunt_counters = self.db.ReadHuntCounters(hunt_id)
+    self.assertEqual(hunt_counters.num_clients, 1)
+    self.assertEqual(hunt_counters.num_running_clients, 0)
+    self.assertEqual(hunt_counters.num_successful_clients, 1)
+    self.assertEqual(hunt_counters.total_network_bytes_sent, 42)
+
+  def testReadHuntCountersAfterClientDeletion(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+    client_id_1 = db_test_utils.InitializeClient(self.db)
+    client_id_2 = db_test_utils.InitializeClient(self.db)
+    db_test_utils.InitializeFlow(
+        self.db,
+        client_id_1,
+        flow_id=hunt_id,
+        flow_state=rdf_flow_objects.Flow.FlowState.FINISHED,
+        parent_hunt_id=hunt_id,
+        network_bytes_sent=13,
+    )
+    db_test_utils.InitializeFlow(
+        self.db,
+        client_id_2,
+        flow_id=hunt_id,
+        flow_state=rdf_flow_objects.Flow.FlowState.RUNNING,
+        parent_hunt_id=hunt_id,
+        network_bytes_sent=29,
+    )
+
+    self.db.DeleteClient(client_id_1)
+
+    hunt_counters = self.db.ReadHuntCounters(hunt_id)
+    self.assertEqual(hunt_counters.num_clients, 1)
+    self.assertEqual(hunt_counters.num_successful_clients, 0)
+    self.assertEqual(hunt_counters.num_running_clients, 1)
+    self.assertEqual(hunt_counters.total_network_bytes_sent, 29)
+
+  def testRebuildHuntCountersKeepsCounters(self):
+    hunt_id_1 = db_test_utils.InitializeHunt(self.db)
+    self._BuildFilterConditionExpectations(hunt_id_1)
+    hunt_id_2 = db_test_utils.InitializeHunt(self.db)
+    self._BuildFilterConditionExpectations(hunt_id_2)
+
+    expected = self.db.ReadHuntsCounters([hunt_id_1, hunt_id_2])
+
+    self.db.RebuildHuntCounters([hunt_id_1])
+    self.assertEqual(
+        self.db.ReadHuntsCounters([hunt_id_1, hunt_id_2]), expected
+    )
+
+    self.db.RebuildHuntCounters()
+    self.assertEqual(
+        self.db.ReadHuntsCounters([hunt_id_1, hunt_id_2]), expected
+    )
+
+  def testRebuildHuntCountersForHuntWithoutFlows(self):
+    hunt_id = db_test_utils.InitializeHunt(self.db)
+
+    self.db.RebuildHuntCounters([hunt_id])
+
+    self.assertEqual(self.db.ReadHuntCounters(hunt_id).num_clients, 0)
+
   def testReadHuntClientResourcesStatsIgnoresSubflows(self):
     hunt_id = db_test_utils.InitializeHunt(self.db)
 
@@ -4,7 +4,7 @@
 import collections
 import sys
 import threading
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
@@ -72,6 +72,7 @@ class InMemoryDB(
     # Serialized `jobs_pb2.ClientCrash`.
     self.crash_history: dict[str, dict[rdfvalue.RDFDatetime, bytes]] = {}
     self.foreman_rules: list[jobs_pb2.ForemanCondition] = []
+    self.foreman_rules_version: int = 0
     self.keywords: dict[str, dict[str, rdfvalue.RDFDatetime]] = {}
     self.labels: dict[str, dict[str, set[str]]] = {}
     # Maps handler_id to dict[request_id, lease expiration time in us].
@@ -140,6 +141,7 @@ class InMemoryDB(
         [flows_pb2.FlowProcessingRequest], None
     ] = None
     self.flow_handler_thread: threading.Thread = None
+    self.flow_handler_shard: Optional[db.FlowProcessingShard] = None
     self.flow_handler_stop = True
     self.flow_handler_num_being_processed = 0
     self.api_audit_entries: list[objects_pb2.APIAuditEntry] = []
@@ -171,6 +171,9 @@ class InMemoryDBClientMixin(object):
       self,
       client_ids: Collection[str],
       min_last_ping: Optional[rdfvalue.RDFDatetime] = None,
+      fields: Collection[db.ClientFullInfoField] = (
+          db.ALL_CLIENT_FULL_INFO_FIELDS
+      ),
   ) -> Mapping[str, objects_pb2.ClientFullInfo]:
     """Reads full client information for a list of clients."""
     res = {}
@@ -183,27 +186,34 @@ class InMemoryDBClientMixin(object):
 
       if md and min_last_ping and rdfvalue.RDFDatetime(md.ping) < min_last_ping:
         continue
-      # ReadClientSnapshot is implemented in the db.Database class.
-      last_snapshot = self.ReadClientSnapshot(client_id)  # pytype: disable=attribute-error
 
       full_info = objects_pb2.ClientFullInfo()
-      full_info.metadata.CopyFrom(md)
-      # ReadClientLabels is implemented in the db.Database class.
-      full_info.labels.extend(self.ReadClientLabels(client_id))  # pytype: disable=attribute-error
 
-      if last_snapshot is None:
-        full_info.last_snapshot.client_id = client_id
-      else:
-        full_info.last_snapshot.CopyFrom(last_snapshot)
+      if db.ClientFullInfoField.METADATA in fields:
+        full_info.metadata.CopyFrom(md)
+
+      if db.ClientFullInfoField.LABELS in fields:
+        # ReadClientLabels is implemented in the db.Database class.
+        full_info.labels.extend(self.ReadClientLabels(client_id))  # pytype: disable=attribute-error
+
+      if db.ClientFullInfoField.LAST_SNAPSHOT in fields:
+        # ReadClientSnapshot is implemented in the db.Database class.
+        last_snapshot = self.ReadClientSnapshot(client_id)  # pytype: disable=attribute-error
+        if last_snapshot is None:
+          full_info.last_snapshot.client_id = client_id
+        else:
+          full_info.last_snapshot.CopyFrom(last_snapshot)
 
-      if (startup_info := self.ReadClientStartupInfo(client_id)) is not None:
-        full_info.last_startup_info.CopyFrom(startup_info)
+      if db.ClientFullInfoField.LAST_STARTUP_INFO in fields:
+        if (startup_info := self.ReadClientStartupInfo(client_id)) is not None:
+          full_info.last_startup_info.CopyFrom(startup_info)
 
-      if self.rrg_startups[client_id]:
-        last_rrg_startup = self.rrg_startups[client_id][-1]
-        last_rrg_startup_bytes = last_rrg_startup.SerializeToString()
+      if db.ClientFullInfoField.LAST_RRG_STARTUP in fields:
+        if self.rrg_startups[client_id]:
+          last_rrg_startup = self.rrg_startups[client_id][-1]
+          last_rrg_startup_bytes = last_rrg_startup.SerializeToString()
 
-        full_info.last_rrg_startup.ParseFromString(last_rrg_startup_bytes)
+          full_info.last_rrg_startup.ParseFromString(last_rrg_startup_bytes)
 
       res[client_id] = full_info
 
@@ -316,6 +316,28 @@ class InMemoryDBFlowMixin(object):
     flow.processing_deadline = int(processing_deadline)
     return flow
 
+  @utils.Synchronized
+  def LeaseFlowsForProcessing(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+      processing_time: rdfvalue.Duration,
+  ) -> Dict[Tuple[str, str], flows_pb2.Flow]:
+    """Marks multiple flows as being processed and returns them."""
+    result = {}
+    for client_id, flow_id in flow_keys:
+      try:
+        result[(client_id, flow_id)] = self.LeaseFlowForProcessing(
+            client_id, flow_id, processing_time
+        )
+      except (
+          db.UnknownFlowError,
+          db.UnknownHuntError,
+          db.ParentHuntIsNotRunningError,
+          ValueError,
+      ):
+        continue
+    return result
+
   @utils.Synchronized
   def UpdateFlow(
       self,
@@ -689,6 +711,32 @@ class InMemoryDBFlowMixin(object):
 
     return res
 
+  @utils.Synchronized
+  def MultiReadFlowRequests(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+  ) -> Dict[
+      Tuple[str, str],
+      Dict[
+          int,
+          Tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    """Reads all requests that can be processed by the worker for many flows."""
+    return {
+        (client_id, flow_id): self.ReadFlowRequests(client_id, flow_id)
+        for client_id, flow_id in flow_keys
+    }
+
   @utils.Synchronized
   def ReleaseProcessedFlow(self, flow_obj: flows_pb2.Flow) -> bool:
     """Releases a flow that the worker was processing to the database."""
@@ -713,6 +761,22 @@ class InMemoryDBFlowMixin(object):
     )
     return True
 
+  @utils.Synchronized
+  def ReleaseProcessedFlows(
+      self, flow_objs: Sequence[flows_pb2.Flow]
+  ) -> Dict[Tuple[str, str], bool]:
+    """Releases multiple processed flows to the database."""
+    return {
+        (flow_obj.client_id, flow_obj.flow_id): self.ReleaseProcessedFlow(
+            flow_obj
+        )
+        for flow_obj in flow_objs
+    }
+
+  def _InFlowHandlerShard(self, r: flows_pb2.FlowProcessingRequest) -> bool:
+    shard = self.flow_handler_shard
+    return shard is None or shard.Contains(r.client_id)
+
   def _InlineProcessingOK(
       self, requests: Sequence[flows_pb2.FlowProcessingRequest]
   ) -> bool:
@@ -721,6 +785,9 @@ class InMemoryDBFlowMixin(object):
       if r.delivery_time:
         return False
 
+      if not self._InFlowHandlerShard(r):
+        return False
+
       # If the corresponding flow is already being processed, inline processing
       # won't work.
       flow = self.flows[r.client_id, r.flow_id]
@@ -776,7 +843,9 @@ class InMemoryDBFlowMixin(object):
     self.flow_processing_requests = {}
 
   def RegisterFlowProcessingHandler(
-      self, handler: Callable[[flows_pb2.FlowProcessingRequest], None]
+      self,
+      handler: Callable[[flows_pb2.FlowProcessingRequest], None],
+      shard: Optional[db.FlowProcessingShard] = None,
   ) -> None:
     """Registers a message handler to receive flow processing messages."""
     self.UnregisterFlowProcessingHandler()
@@ -784,6 +853,7 @@ class InMemoryDBFlowMixin(object):
     # For the in memory db, we just call the handler straight away if there is
     # no delay in starting times so we don't run the thread here.
     self.flow_handler_target = handler
+    self.flow_handler_shard = shard
 
     for request in self._GetFlowRequestsReadyForProcessing():
       handler(request)
@@ -810,6 +880,7 @@ class InMemoryDBFlowMixin(object):
   ) -> None:
     """Unregisters any registered flow processing handler."""
     self.flow_handler_target = None
+    self.flow_handler_shard = None
 
     if self.flow_handler_thread:
       self.flow_handler_stop = True
@@ -828,6 +899,8 @@ class InMemoryDBFlowMixin(object):
     now = rdfvalue.RDFDatetime.Now()
     todo = []
     for r in list(self.flow_processing_requests.values()):
+      if not self._InFlowHandlerShard(r):
+        continue
       if not r.delivery_time or r.delivery_time <= now:
         todo.append(r)
 
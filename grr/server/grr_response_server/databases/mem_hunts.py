@@ -528,6 +528,15 @@ class InMemoryDBHuntMixin(object):
       )
     return hunt_counters
 
+  def RebuildHuntCounters(
+      self,
+      hunt_ids: Optional[Collection[str]] = None,
+  ) -> None:
+    """Rebuilds hunt counters from the hunt flows."""
+    # Hunt counters are computed from the hunt flows on every read, there is
+    # nothing to rebuild.
+    del hunt_ids  # Unused.
+
   @utils.Synchronized
   def ReadHuntClientResourcesStats(
       self,
@@ -543,6 +552,7 @@ class InMemoryDBHuntMixin(object):
           client_id=str(rdf_client.ClientURN.FromHumanReadable(f.client_id)),
           cpu_usage=f.cpu_time_used,
           network_bytes_sent=f.network_bytes_sent,
+          hash_cache_hits=f.hash_cache_hits,
       )
       client_resources.append(cr)
 
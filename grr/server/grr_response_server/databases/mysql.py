@@ -539,7 +539,16 @@ class MysqlDB(
     _SetupDatabase(**self._connect_args)
 
     self._max_pool_size = config.CONFIG["Mysql.conn_pool_max"]
-    self.pool = mysql_pool.Pool(self._Connect, max_size=self._max_pool_size)
+    self.pool = mysql_pool.Pool(
+        self._Connect,
+        max_size=self._max_pool_size,
+        min_size=min(config.CONFIG["Mysql.conn_pool_min"], self._max_pool_size),
+        idle_timeout=config.CONFIG["Mysql.conn_pool_idle_timeout"] or None,
+        validation_interval=(
+            config.CONFIG["Mysql.conn_pool_validation_interval"] or None
+        ),
+    )
+    self.pool.Warmup()
 
     self.handler_thread = None
     self.handler_stop = True
@@ -456,88 +456,6 @@ class MySQLDBClientMixin(object):
     res.timestamp = int(mysql_utils.TimestampToRDFDatetime(timestamp))
     return res
 
-  def _ResponseToClientsFullInfo(self, response):
-    """Creates a ClientFullInfo object from a database response."""
-    c_full_info = None
-    prev_cid = None
-    for row in response:
-      (
-          cid,
-          crt,
-          ping,
-          foreman,
-          first,
-          last_client_ts,
-          last_crash_ts,
-          last_startup_ts,
-          client_obj,
-          client_startup_obj,
-          last_startup_obj,
-          last_rrg_startup_obj,
-          label_owner,
-          label_name,
-      ) = row
-
-      if cid != prev_cid:
-        if c_full_info:
-          yield db_utils.IntToClientID(prev_cid), c_full_info
-
-        c_full_info = objects_pb2.ClientFullInfo()
-
-        if crt is not None:
-          c_full_info.metadata.certificate = crt
-        if first is not None:
-          c_full_info.metadata.first_seen = int(
-              mysql_utils.TimestampToRDFDatetime(first)
-          )
-        if ping is not None:
-          c_full_info.metadata.ping = int(
-              mysql_utils.TimestampToRDFDatetime(ping)
-          )
-        if foreman is not None:
-          c_full_info.metadata.last_foreman_time = int(
-              mysql_utils.TimestampToRDFDatetime(foreman)
-          )
-        if last_startup_ts is not None:
-          c_full_info.metadata.startup_info_timestamp = int(
-              mysql_utils.TimestampToRDFDatetime(last_startup_ts)
-          )
-        if last_crash_ts is not None:
-          c_full_info.metadata.last_crash_timestamp = int(
-              mysql_utils.TimestampToRDFDatetime(last_crash_ts)
-          )
-
-        if client_obj is not None:
-          c_full_info.last_snapshot.ParseFromString(client_obj)
-          c_full_info.last_snapshot.timestamp = int(
-              mysql_utils.TimestampToRDFDatetime(last_client_ts)
-          )
-          c_full_info.last_snapshot.startup_info.ParseFromString(
-              client_startup_obj
-          )
-          c_full_info.last_snapshot.startup_info.timestamp = (
-              c_full_info.last_snapshot.timestamp
-          )
-        else:
-          c_full_info.last_snapshot.client_id = db_utils.IntToClientID(cid)
-
-        if last_startup_obj is not None:
-          c_full_info.last_startup_info.ParseFromString(last_startup_obj)
-          c_full_info.last_startup_info.timestamp = int(
-              mysql_utils.TimestampToRDFDatetime(last_startup_ts)
-          )
-
-        if last_rrg_startup_obj is not None:
-          c_full_info.last_rrg_startup.ParseFromString(last_rrg_startup_obj)
-
-        prev_cid = cid
-
-        if label_owner and label_name:
-          c_full_info.labels.add(name=label_name, owner=label_owner)
-
-    if c_full_info:
-      yield db_utils.IntToClientID(prev_cid), c_full_info
-
   @db_utils.CallLogged
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction(readonly=True)
@@ -545,6 +463,9 @@ class MySQLDBClientMixin(object):
       self,
       client_ids: Collection[str],
       min_last_ping: Optional[rdfvalue.RDFDatetime] = None,
+      fields: Collection[db.ClientFullInfoField] = (
+          db.ALL_CLIENT_FULL_INFO_FIELDS
+      ),
       cursor: Optional[MySQLdb.cursors.Cursor] = None,
   ) -> Mapping[str, objects_pb2.ClientFullInfo]:
     """Reads full client information for a list of clients."""
@@ -552,36 +473,19 @@ class MySQLDBClientMixin(object):
     if not client_ids:
       return {}
 
+    fields = [field for field in _CLIENT_FULL_INFO_FIELDS if field in fields]
+
+    columns = ["c.client_id"]
+    joins = []
+    for field in fields:
+      columns.extend(_CLIENT_FULL_INFO_COLUMNS[field])
+      joins.extend(_CLIENT_FULL_INFO_JOINS.get(field, []))
+
     query = """
-    SELECT c.client_id, c.certificate,
-           UNIX_TIMESTAMP(c.last_ping),
-           UNIX_TIMESTAMP(c.last_foreman),
-           UNIX_TIMESTAMP(c.first_seen),
-           UNIX_TIMESTAMP(c.last_snapshot_timestamp),
-           UNIX_TIMESTAMP(c.last_crash_timestamp),
-           UNIX_TIMESTAMP(c.last_startup_timestamp),
-           h.client_snapshot,
-           s.startup_info, s_last.startup_info, rrg_s_last.startup,
-           l.owner_username, l.label
+    SELECT {columns}
       FROM clients AS c FORCE INDEX (PRIMARY)
-           LEFT JOIN client_snapshot_history AS h FORCE INDEX (PRIMARY)
-                  ON c.client_id = h.client_id
-                 AND c.last_snapshot_timestamp = h.timestamp
-           LEFT JOIN client_startup_history AS s FORCE INDEX (PRIMARY)
-                  ON c.client_id = s.client_id
-                 AND c.last_snapshot_timestamp = s.timestamp
-           LEFT JOIN client_startup_history AS s_last FORCE INDEX (PRIMARY)
-                  ON c.client_id = s_last.client_id
-                 AND c.last_startup_timestamp = s_last.timestamp
-           LEFT JOIN client_rrg_startup_history AS rrg_s_last
-                  ON rrg_s_last.id = (SELECT id
-                                        FROM client_rrg_startup_history
-                                       WHERE client_id = c.client_id
-                                    ORDER BY timestamp DESC
-                                       LIMIT 1)
-           LEFT JOIN client_labels AS l FORCE INDEX (PRIMARY)
-                  ON c.client_id = l.client_id
-    """
+           {joins}
+    """.format(columns=", ".join(columns), joins="\n           ".join(joins))
 
     query += "WHERE c.client_id IN (%s) " % ", ".join(["%s"] * len(client_ids))
 
@@ -591,7 +495,33 @@ class MySQLDBClientMixin(object):
       values.append(mysql_utils.RDFDatetimeToTimestamp(min_last_ping))
 
     cursor.execute(query, values)
-    return dict(self._ResponseToClientsFullInfo(cursor.fetchall()))
+
+    result = {}
+    for row in cursor.fetchall():
+      client_id = db_utils.IntToClientID(row[0])
+      try:
+        full_info = result[client_id]
+      except KeyError:
+        full_info = result[client_id] = objects_pb2.ClientFullInfo()
+        is_first_row = True
+      else:
+        is_first_row = False
+
+      offset = 1
+      for field in fields:
+        num_columns = len(_CLIENT_FULL_INFO_COLUMNS[field])
+        field_values = row[offset : offset + num_columns]
+        offset += num_columns
+
+        if field == db.ClientFullInfoField.LABELS:
+          # Labels are the only part that differs between rows of a client.
+          label_owner, label_name = field_values
+          if label_owner and label_name:
+            full_info.labels.add(name=label_name, owner=label_owner)
+        elif is_first_row:
+          _CLIENT_FULL_INFO_PARSERS[field](full_info, client_id, *field_values)
+
+    return result
 
   def ReadClientLastPings(
       self,
@@ -954,6 +884,18 @@ class MySQLDBClientMixin(object):
     if cursor.fetchone()[0] == 0:
       raise db.UnknownClientError(client_id)
 
+    # Cascading deletes do not fire triggers, so hunt flows are deleted
+    # explicitly to have the `hunt_counters` triggers update the counters of
+    # hunts the client took part in.
+    cursor.execute(
+        """
+    DELETE FROM flows
+     WHERE client_id = %s
+       AND parent_hunt_id IS NOT NULL
+       AND parent_flow_id IS NULL""",
+        [db_utils.ClientIDToInt(client_id)],
+    )
+
     # Clean out foreign keys first.
     cursor.execute(
         """
@@ -975,3 +917,154 @@ class MySQLDBClientMixin(object):
 # measures for. However, MySQL has different performance characteristics and it
 # could be fine-tuned if possible.
 _DEFAULT_CLIENT_STATS_BATCH_SIZE = 10_000
+
+
+def _ParseClientMetadata(
+    full_info: objects_pb2.ClientFullInfo,
+    client_id: str,
+    certificate: Optional[bytes],
+    ping: Optional[float],
+    foreman: Optional[float],
+    first_seen: Optional[float],
+    last_startup_ts: Optional[float],
+    last_crash_ts: Optional[float],
+) -> None:
+  """Fills `ClientFullInfo.metadata` from the queried columns."""
+  del client_id  # Unused.
+  if certificate is not None:
+    full_info.metadata.certificate = certificate
+  if first_seen is not None:
+    full_info.metadata.first_seen = int(
+        mysql_utils.TimestampToRDFDatetime(first_seen)
+    )
+  if ping is not None:
+    full_info.metadata.ping = int(mysql_utils.TimestampToRDFDatetime(ping))
+  if foreman is not None:
+    full_info.metadata.last_foreman_time = int(
+        mysql_utils.TimestampToRDFDatetime(foreman)
+    )
+  if last_startup_ts is not None:
+    full_info.metadata.startup_info_timestamp = int(
+        mysql_utils.TimestampToRDFDatetime(last_startup_ts)
+    )
+  if last_crash_ts is not None:
+    full_info.metadata.last_crash_timestamp = int(
+        mysql_utils.TimestampToRDFDatetime(last_crash_ts)
+    )
+
+
+def _ParseClientLastSnapshot(
+    full_info: objects_pb2.ClientFullInfo,
+    client_id: str,
+    last_snapshot_ts: Optional[float],
+    snapshot: Optional[bytes],
+    snapshot_startup_info: Optional[bytes],
+) -> None:
+  """Fills `ClientFullInfo.last_snapshot` from the queried columns."""
+  if snapshot is None:
+    full_info.last_snapshot.client_id = client_id
+    return
+
+  full_info.last_snapshot.ParseFromString(snapshot)
+  full_info.last_snapshot.timestamp = int(
+      mysql_utils.TimestampToRDFDatetime(last_snapshot_ts)
+  )
+  full_info.last_snapshot.startup_info.ParseFromString(snapshot_startup_info)
+  full_info.last_snapshot.startup_info.timestamp = (
+      full_info.last_snapshot.timestamp
+  )
+
+
+def _ParseClientLastStartupInfo(
+    full_info: objects_pb2.ClientFullInfo,
+    client_id: str,
+    last_startup_ts: Optional[float],
+    startup_info: Optional[bytes],
+) -> None:
+  """Fills `ClientFullInfo.last_startup_info` from the queried columns."""
+  del client_id  # Unused.
+  if startup_info is not None:
+    full_info.last_startup_info.ParseFromString(startup_info)
+    full_info.last_startup_info.timestamp = int(
+        mysql_utils.TimestampToRDFDatetime(last_startup_ts)
+    )
+
+
+def _ParseClientLastRrgStartup(
+    full_info: objects_pb2.ClientFullInfo,
+    client_id: str,
+    rrg_startup: Optional[bytes],
+) -> None:
+  """Fills `ClientFullInfo.last_rrg_startup` from the queried columns."""
+  del client_id  # Unused.
+  if rrg_startup is not None:
+    full_info.last_rrg_startup.ParseFromString(rrg_startup)
+
+
+# Order in which `ClientFullInfo` parts are queried and parsed.
+_CLIENT_FULL_INFO_FIELDS = (
+    db.ClientFullInfoField.METADATA,
+    db.ClientFullInfoField.LAST_SNAPSHOT,
+    db.ClientFullInfoField.LAST_STARTUP_INFO,
+    db.ClientFullInfoField.LAST_RRG_STARTUP,
+    db.ClientFullInfoField.LABELS,
+)
+
+# Columns queried for every `ClientFullInfo` part.
+_CLIENT_FULL_INFO_COLUMNS = {
+    db.ClientFullInfoField.METADATA: (
+        "c.certificate",
+        "UNIX_TIMESTAMP(c.last_ping)",
+        "UNIX_TIMESTAMP(c.last_foreman)",
+        "UNIX_TIMESTAMP(c.first_seen)",
+        "UNIX_TIMESTAMP(c.last_startup_timestamp)",
+        "UNIX_TIMESTAMP(c.last_crash_timestamp)",
+    ),
+    db.ClientFullInfoField.LAST_SNAPSHOT: (
+        "UNIX_TIMESTAMP(c.last_snapshot_timestamp)",
+        "h.client_snapshot",
+        "s.startup_info",
+    ),
+    db.ClientFullInfoField.LAST_STARTUP_INFO: (
+        "UNIX_TIMESTAMP(c.last_startup_timestamp)",
+        "s_last.startup_info",
+    ),
+    db.ClientFullInfoField.LAST_RRG_STARTUP: ("rrg_s_last.startup",),
+    db.ClientFullInfoField.LABELS: ("l.owner_username", "l.label"),
+}
+
+# Tables joined for `ClientFullInfo` parts not stored in the `clients` table.
+_CLIENT_FULL_INFO_JOINS = {
+    db.ClientFullInfoField.LAST_SNAPSHOT: (
+        """LEFT JOIN client_snapshot_history AS h FORCE INDEX (PRIMARY)
+                  ON c.client_id = h.client_id
+                 AND c.last_snapshot_timestamp = h.timestamp""",
+        """LEFT JOIN client_startup_history AS s FORCE INDEX (PRIMARY)
+                  ON c.client_id = s.client_id
+                 AND c.last_snapshot_timestamp = s.timestamp""",
+    ),
+    db.ClientFullInfoField.LAST_STARTUP_INFO: (
+        """LEFT JOIN client_startup_history AS s_last FORCE INDEX (PRIMARY)
+                  ON c.client_id = s_last.client_id
+                 AND c.last_startup_timestamp = s_last.timestamp""",
+    ),
+    db.ClientFullInfoField.LAST_RRG_STARTUP: (
+        """LEFT JOIN client_rrg_startup_history AS rrg_s_last
+                  ON rrg_s_last.id = (SELECT id
+                                        FROM client_rrg_startup_history
+                                       WHERE client_id = c.client_id
+                                    ORDER BY timestamp DESC
+                                       LIMIT 1)""",
+    ),
+    db.ClientFullInfoField.LABELS: (
+        """LEFT JOIN client_labels AS l FORCE INDEX (PRIMARY)
+                  ON c.client_id = l.client_id""",
+    ),
+}
+
+_CLIENT_FULL_INFO_PARSERS = {
+    db.ClientFullInfoField.METADATA: _ParseClientMetadata,
+    db.ClientFullInfoField.LAST_SNAPSHOT: _ParseClientLastSnapshot,
+    db.ClientFullInfoField.LAST_STARTUP_INFO: _ParseClientLastStartupInfo,
+    db.ClientFullInfoField.LAST_RRG_STARTUP: _ParseClientLastRrgStartup,
+}
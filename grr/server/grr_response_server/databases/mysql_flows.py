@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """The MySQL database methods for flow handling."""
 
+import collections
 import logging
 import threading
 import time
@@ -26,6 +27,19 @@ from grr_response_server.models import hunts as models_hunts
 from grr_response_proto import rrg_pb2
 
 
+def _FlowKeysConditions(
+    flow_keys: Iterable[Tuple[str, str]],
+) -> Tuple[List[str], List[int]]:
+  """Builds SQL conditions matching the given (client_id, flow_id) keys."""
+  conditions = []
+  args = []
+  for client_id, flow_id in flow_keys:
+    conditions.append("(client_id=%s AND flow_id=%s)")
+    args.append(db_utils.ClientIDToInt(client_id))
+    args.append(db_utils.FlowIDToInt(flow_id))
+  return conditions, args
+
+
 class MySQLDBFlowMixin:
   """MySQLDB mixin for flow handling."""
 
@@ -522,6 +536,80 @@ class MySQLDBFlowMixin:
     flow.processing_deadline = int(processing_deadline)
     return flow
 
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction()
+  def LeaseFlowsForProcessing(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+      processing_time: rdfvalue.Duration,
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> Dict[Tuple[str, str], flows_pb2.Flow]:
+    """Marks multiple flows as being processed and returns them."""
+    assert cursor is not None
+
+    conditions, args = _FlowKeysConditions(flow_keys)
+    query = (
+        f"SELECT {self.FLOW_DB_FIELDS} FROM flows WHERE "
+        + " OR ".join(conditions)
+    )
+    cursor.execute(query, args)
+    flows = [self._FlowObjectFromRow(row) for row in cursor.fetchall()]
+
+    now = rdfvalue.RDFDatetime.Now()
+    flows = [
+        flow
+        for flow in flows
+        if not (flow.processing_on and flow.processing_deadline > int(now))
+    ]
+
+    hunt_ids = set(flow.parent_hunt_id for flow in flows if flow.parent_hunt_id)
+    if hunt_ids:
+      query = "SELECT hunt_id, hunt_state FROM hunts WHERE hunt_id IN %s"
+      cursor.execute(query, [[db_utils.HuntIDToInt(h) for h in hunt_ids]])
+      stopped_hunt_ids = set()
+      for hunt_id, hunt_state in cursor.fetchall():
+        if (
+            hunt_state is not None
+            and not models_hunts.IsHuntSuitableForFlowProcessing(hunt_state)
+        ):
+          stopped_hunt_ids.add(db_utils.IntToHuntID(hunt_id))
+
+      flows = [
+          flow for flow in flows if flow.parent_hunt_id not in stopped_hunt_ids
+      ]
+
+    if not flows:
+      return {}
+
+    processing_deadline = now + processing_time
+    process_id_string = utils.ProcessIdString()
+
+    conditions, args = _FlowKeysConditions(
+        [(flow.client_id, flow.flow_id) for flow in flows]
+    )
+    update_query = (
+        "UPDATE flows SET "
+        "processing_on=%s, "
+        "processing_since=FROM_UNIXTIME(%s), "
+        "processing_deadline=FROM_UNIXTIME(%s) "
+        "WHERE " + " OR ".join(conditions)
+    )
+    args = [
+        process_id_string,
+        mysql_utils.RDFDatetimeToTimestamp(now),
+        mysql_utils.RDFDatetimeToTimestamp(processing_deadline),
+    ] + args
+    cursor.execute(update_query, args)
+
+    result = {}
+    for flow in flows:
+      flow.processing_on = process_id_string
+      flow.processing_since = int(now)
+      flow.processing_deadline = int(processing_deadline)
+      result[(flow.client_id, flow.flow_id)] = flow
+    return result
+
   @db_utils.CallLogged
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction()
@@ -1238,17 +1326,73 @@ class MySQLDBFlowMixin:
     """Reads all requests for a flow that can be processed by the worker."""
     assert cursor is not None
 
-    args = [db_utils.ClientIDToInt(client_id), db_utils.FlowIDToInt(flow_id)]
+    return self._ReadFlowRequests([(client_id, flow_id)], cursor)[
+        (client_id, flow_id)
+    ]
+
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction(readonly=True)
+  def MultiReadFlowRequests(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> Dict[
+      Tuple[str, str],
+      Dict[
+          int,
+          Tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    """Reads all requests that can be processed by the worker for many flows."""
+    assert cursor is not None
+
+    return self._ReadFlowRequests(flow_keys, cursor)
+
+  def _ReadFlowRequests(
+      self,
+      flow_keys: Collection[Tuple[str, str]],
+      cursor: cursors.Cursor,
+  ) -> Dict[
+      Tuple[str, str],
+      Dict[
+          int,
+          Tuple[
+              flows_pb2.FlowRequest,
+              Sequence[
+                  Union[
+                      flows_pb2.FlowResponse,
+                      flows_pb2.FlowStatus,
+                      flows_pb2.FlowIterator,
+                  ],
+              ],
+          ],
+      ],
+  ]:
+    """Reads requests and their responses for the given flows."""
+    conditions, args = _FlowKeysConditions(flow_keys)
+    where = " OR ".join(conditions)
 
     query = (
-        "SELECT response, status, iterator, UNIX_TIMESTAMP(timestamp) "
+        "SELECT client_id, flow_id, "
+        "response, status, iterator, UNIX_TIMESTAMP(timestamp) "
         "FROM flow_responses "
-        "WHERE client_id=%s AND flow_id=%s"
+        f"WHERE {where}"
     )
     cursor.execute(query, args)
 
-    responses = {}
-    for res, status, iterator, ts in cursor.fetchall():
+    responses = collections.defaultdict(dict)
+    rows = cursor.fetchall()
+    for client_id_int, flow_id_int, res, status, iterator, ts in rows:
       if status:
         response = flows_pb2.FlowStatus()
         response.ParseFromString(status)
@@ -1259,19 +1403,26 @@ class MySQLDBFlowMixin:
         response = flows_pb2.FlowResponse()
         response.ParseFromString(res)
       response.timestamp = int(mysql_utils.TimestampToRDFDatetime(ts))
-      responses.setdefault(response.request_id, []).append(response)
+      flow_key = (
+          db_utils.IntToClientID(client_id_int),
+          db_utils.IntToFlowID(flow_id_int),
+      )
+      responses[flow_key].setdefault(response.request_id, []).append(response)
 
     query = (
-        "SELECT request, needs_processing, responses_expected, "
+        "SELECT client_id, flow_id, "
+        "request, needs_processing, responses_expected, "
         "callback_state, next_response_id, "
         "UNIX_TIMESTAMP(timestamp) "
         "FROM flow_requests "
-        "WHERE client_id=%s AND flow_id=%s"
+        f"WHERE {where}"
     )
     cursor.execute(query, args)
 
-    requests = {}
+    result = {flow_key: {} for flow_key in flow_keys}
     for (
+        client_id_int,
+        flow_id_int,
         req,
         needs_processing,
         responses_expected,
@@ -1287,14 +1438,19 @@ class MySQLDBFlowMixin:
       request.callback_state = callback_state
       request.next_response_id = next_response_id
       request.timestamp = int(mysql_utils.TimestampToRDFDatetime(ts))
-      requests[request.request_id] = (
+      flow_key = (
+          db_utils.IntToClientID(client_id_int),
+          db_utils.IntToFlowID(flow_id_int),
+      )
+      result.setdefault(flow_key, {})[request.request_id] = (
           request,
           sorted(
-              responses.get(request.request_id, []), key=lambda r: r.response_id
+              responses[flow_key].get(request.request_id, []),
+              key=lambda r: r.response_id,
           ),
       )
 
-    return requests
+    return result
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
@@ -1307,6 +1463,32 @@ class MySQLDBFlowMixin:
     """Releases a flow that the worker was processing to the database."""
     assert cursor is not None
 
+    return self._ReleaseProcessedFlow(flow_obj, cursor)
+
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction()
+  def ReleaseProcessedFlows(
+      self,
+      flow_objs: Sequence[flows_pb2.Flow],
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> Dict[Tuple[str, str], bool]:
+    """Releases multiple processed flows to the database."""
+    assert cursor is not None
+
+    return {
+        (flow_obj.client_id, flow_obj.flow_id): self._ReleaseProcessedFlow(
+            flow_obj, cursor
+        )
+        for flow_obj in flow_objs
+    }
+
+  def _ReleaseProcessedFlow(
+      self,
+      flow_obj: flows_pb2.Flow,
+      cursor: cursors.Cursor,
+  ) -> bool:
+    """Releases a flow using the given cursor."""
     update_query = """
     UPDATE flows
     LEFT OUTER JOIN (
@@ -1445,13 +1627,22 @@ class MySQLDBFlowMixin:
   @db_utils.CallAccounted
   @mysql_utils.WithTransaction()
   def _LeaseFlowProcessingRequests(
-      self, limit: int, cursor=None
+      self,
+      limit: int,
+      shard: Optional[db.FlowProcessingShard] = None,
+      cursor=None,
   ) -> Sequence[flows_pb2.FlowProcessingRequest]:
     """Leases a number of flow processing requests."""
     now = rdfvalue.RDFDatetime.Now()
     expiry = now + rdfvalue.Duration.From(10, rdfvalue.MINUTES)
 
-    query = """
+    shard_condition = ""
+    if shard is not None:
+      # `client_id` is stored as the integer value of the hex client id, which
+      # is what `FlowProcessingShard.Contains` shards on as well.
+      shard_condition = "AND client_id %% %(shard_count)s = %(shard_index)s"
+
+    query = f"""
       UPDATE flow_processing_requests
       SET leased_until=FROM_UNIXTIME(%(expiry)s), leased_by=%(id)s
       WHERE
@@ -1459,6 +1650,7 @@ class MySQLDBFlowMixin:
         delivery_time <= NOW(6)) AND
        (leased_until IS NULL OR
         leased_until < NOW(6))
+       {shard_condition}
       LIMIT %(limit)s
     """
 
@@ -1472,6 +1664,9 @@ class MySQLDBFlowMixin:
         "id": id_str,
         "limit": limit,
     }
+    if shard is not None:
+      args["shard_count"] = shard.count
+      args["shard_index"] = shard.index
 
     updated = cursor.execute(query, args)
 
@@ -1508,9 +1703,19 @@ class MySQLDBFlowMixin:
   _FLOW_REQUEST_POLL_TIME_SECS = 3
 
   def _FlowProcessingRequestHandlerLoop(
-      self, handler: Callable[[flows_pb2.FlowProcessingRequest], None]
+      self,
+      handler: Callable[[flows_pb2.FlowProcessingRequest], None],
+      batch_size: Optional[int] = None,
+      shard: Optional[db.FlowProcessingShard] = None,
   ) -> None:
-    """The main loop for the flow processing request queue."""
+    """The main loop for the flow processing request queue.
+
+    Args:
+      handler: Handler to call with leased requests.
+      batch_size: If set, the handler is called with lists of up to
+        `batch_size` requests instead of single requests.
+      shard: If set, only requests from this shard are leased.
+    """
     self.flow_processing_request_handler_pool.Start()
 
     while not self.flow_processing_request_handler_stop:
@@ -1520,8 +1725,15 @@ class MySQLDBFlowMixin:
         time.sleep(self._FLOW_REQUEST_POLL_TIME_SECS)
         continue
       try:
-        msgs = self._LeaseFlowProcessingRequests(free_threads)
-        if msgs:
+        msgs = self._LeaseFlowProcessingRequests(
+            free_threads * (batch_size or 1), shard=shard
+        )
+        if msgs and batch_size is not None:
+          for batch in collection.Batch(msgs, batch_size):
+            self.flow_processing_request_handler_pool.AddTask(
+                target=handler, args=(batch,)
+            )
+        elif msgs:
           for m in msgs:
             self.flow_processing_request_handler_pool.AddTask(
                 target=handler, args=(m,)
@@ -1536,7 +1748,9 @@ class MySQLDBFlowMixin:
     self.flow_processing_request_handler_pool.Stop()
 
   def RegisterFlowProcessingHandler(
-      self, handler: Callable[[flows_pb2.FlowProcessingRequest], None]
+      self,
+      handler: Callable[[flows_pb2.FlowProcessingRequest], None],
+      shard: Optional[db.FlowProcessingShard] = None,
   ) -> None:
     """Registers a handler to receive flow processing messages."""
     self.UnregisterFlowProcessingHandler()
@@ -1546,7 +1760,26 @@ class MySQLDBFlowMixin:
       self.flow_processing_request_handler_thread = threading.Thread(
           name="flow_processing_request_handler",
           target=self._FlowProcessingRequestHandlerLoop,
-          args=(handler,),
+          args=(handler, None, shard),
+      )
+      self.flow_processing_request_handler_thread.daemon = True
+      self.flow_processing_request_handler_thread.start()
+
+  def RegisterBatchFlowProcessingHandler(
+      self,
+      handler: Callable[[Sequence[flows_pb2.FlowProcessingRequest]], None],
+      batch_size: int,
+      shard: Optional[db.FlowProcessingShard] = None,
+  ) -> None:
+    """Registers a handler to receive batches of flow processing messages."""
+    self.UnregisterFlowProcessingHandler()
+
+    if handler:
+      self.flow_processing_request_handler_stop = False
+      self.flow_processing_request_handler_thread = threading.Thread(
+          name="flow_processing_request_handler",
+          target=self._FlowProcessingRequestHandlerLoop,
+          args=(handler, batch_size, shard),
       )
       self.flow_processing_request_handler_thread.daemon = True
       self.flow_processing_request_handler_thread.start()
@@ -42,6 +42,7 @@ class MySQLDBForemanRulesMixin(object):
             "rule_bytes": rule.SerializeToString(),
         },
     )
+    _IncrementForemanRulesVersion(cursor)
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
@@ -52,6 +53,7 @@ class MySQLDBForemanRulesMixin(object):
     assert cursor is not None
     query = "DELETE FROM foreman_rules WHERE hunt_id=%s"
     cursor.execute(query, [hunt_id])
+    _IncrementForemanRulesVersion(cursor)
 
   @db_utils.CallLogged
   @db_utils.CallAccounted
@@ -80,3 +82,25 @@ class MySQLDBForemanRulesMixin(object):
         "DELETE FROM foreman_rules WHERE expiration_time < FROM_UNIXTIME(%s)",
         [mysql_utils.MicrosecondsSinceEpochToTimestamp(now)],
     )
+    if cursor.rowcount:
+      _IncrementForemanRulesVersion(cursor)
+
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  @mysql_utils.WithTransaction(readonly=True)
+  def ReadForemanRulesVersion(
+      self, cursor: Optional[MySQLdb.cursors.Cursor] = None
+  ) -> int:
+    assert cursor is not None
+    cursor.execute("SELECT version FROM foreman_rules_version WHERE id = 0")
+    row = cursor.fetchone()
+    if row is None:
+      return 0
+    return int(row[0])
+
+
+def _IncrementForemanRulesVersion(cursor: MySQLdb.cursors.Cursor) -> None:
+  """Marks the set of foreman rules as changed."""
+  cursor.execute(
+      "UPDATE foreman_rules_version SET version = version + 1 WHERE id = 0"
+  )
@@ -184,6 +184,9 @@ class MySQLDBHuntMixin(object):
     query = "DELETE FROM hunt_output_plugins_states WHERE hunt_id = %s"
     cursor.execute(query, [hunt_id_int])
 
+    query = "DELETE FROM hunt_counters WHERE hunt_id = %s"
+    cursor.execute(query, [hunt_id_int])
+
     query = """
     DELETE
       FROM approval_request
@@ -958,20 +961,24 @@ class MySQLDBHuntMixin(object):
 
     hunt_ids_ints = [db_utils.HuntIDToInt(hunt_id) for hunt_id in hunt_ids]
 
+    # Counters are maintained by triggers on the `flows` table, see the
+    # `hunt_counters` table definition.
     query = """
-      SELECT parent_hunt_id, flow_state, COUNT(*)
-          FROM flows
-          FORCE INDEX(flows_by_hunt)
-          WHERE parent_hunt_id IN %(hunt_ids)s
-            AND parent_flow_id IS NULL
-          GROUP BY parent_hunt_id, flow_state
+      SELECT hunt_id,
+             num_clients,
+             num_successful_clients,
+             num_failed_clients,
+             num_clients_with_results,
+             num_crashed_clients,
+             num_running_clients,
+             num_results,
+             total_cpu_time_used_micros,
+             total_network_bytes_sent
+        FROM hunt_counters
+       WHERE hunt_id IN %(hunt_ids)s
     """
     cursor.execute(query, {"hunt_ids": tuple(hunt_ids_ints)})
 
-    counts_by_state_per_hunt = dict.fromkeys(hunt_ids_ints, {})
-    for hunt_id, state, count in cursor.fetchall():
-      counts_by_state_per_hunt[hunt_id][state] = count
-
     hunt_counters = dict.fromkeys(
         hunt_ids,
         db.HuntCounters(
@@ -987,43 +994,18 @@ class MySQLDBHuntMixin(object):
         ),
     )
 
-    query = """
-        SELECT
-          parent_hunt_id,
-          SUM(user_cpu_time_used_micros + system_cpu_time_used_micros),
-          SUM(network_bytes_sent),
-          SUM(num_replies_sent),
-          COUNT(IF(num_replies_sent > 0, client_id, NULL))
-        FROM flows
-        FORCE INDEX(flows_by_hunt)
-        WHERE parent_hunt_id IN %(hunt_ids)s
-          AND parent_flow_id IS NULL
-        GROUP BY parent_hunt_id
-    """
-    cursor.execute(query, {"hunt_ids": tuple(hunt_ids_ints)})
-
     for (
         hunt_id,
-        total_cpu_seconds,
-        total_network_bytes_sent,
-        num_results,
+        num_clients,
+        num_successful_clients,
+        num_failed_clients,
         num_clients_with_results,
+        num_crashed_clients,
+        num_running_clients,
+        num_results,
+        total_cpu_time_used_micros,
+        total_network_bytes_sent,
     ) in cursor.fetchall():
-      counts_by_state = counts_by_state_per_hunt[hunt_id]
-      num_successful_clients = counts_by_state.get(
-          int(flows_pb2.Flow.FlowState.FINISHED), 0
-      )
-      num_failed_clients = counts_by_state.get(
-          int(flows_pb2.Flow.FlowState.ERROR), 0
-      )
-      num_crashed_clients = counts_by_state.get(
-          int(flows_pb2.Flow.FlowState.CRASHED), 0
-      )
-      num_running_clients = counts_by_state.get(
-          int(flows_pb2.Flow.FlowState.RUNNING), 0
-      )
-      num_clients = sum(counts_by_state_per_hunt[hunt_id].values())
-
       hunt_counters[db_utils.IntToHuntID(hunt_id)] = db.HuntCounters(
           num_clients=num_clients,
           num_successful_clients=num_successful_clients,
@@ -1031,14 +1013,89 @@ class MySQLDBHuntMixin(object):
           num_clients_with_results=num_clients_with_results,
           num_crashed_clients=num_crashed_clients,
           num_running_clients=num_running_clients,
-          num_results=int(num_results or 0),
+          num_results=num_results,
           total_cpu_seconds=db_utils.MicrosToSeconds(
-              int(total_cpu_seconds or 0)
+              total_cpu_time_used_micros
           ),
-          total_network_bytes_sent=int(total_network_bytes_sent or 0),
+          total_network_bytes_sent=total_network_bytes_sent,
       )
     return hunt_counters
 
+  @db_utils.CallLogged
+  @db_utils.CallAccounted
+  def RebuildHuntCounters(
+      self,
+      hunt_ids: Optional[Collection[str]] = None,
+  ) -> None:
+    """Rebuilds hunt counters from the hunt flows."""
+    if hunt_ids is None:
+      hunt_ids = self._ReadCountedHuntIds()
+
+    # Every hunt is rebuilt in a separate transaction, so that rebuilding
+    # counters of all hunts does not lock the whole `flows` table at once.
+    for hunt_id in hunt_ids:
+      self._RebuildHuntCounters(db_utils.HuntIDToInt(hunt_id))
+
+  @mysql_utils.WithTransaction(readonly=True)
+  def _ReadCountedHuntIds(
+      self,
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> Sequence[str]:
+    """Reads ids of all hunts that have or may need counters."""
+    assert cursor is not None
+
+    cursor.execute("""
+      SELECT hunt_id FROM hunts
+       UNION
+      SELECT hunt_id FROM hunt_counters
+    """)
+    return [db_utils.IntToHuntID(hunt_id) for (hunt_id,) in cursor.fetchall()]
+
+  @mysql_utils.WithTransaction()
+  def _RebuildHuntCounters(
+      self,
+      hunt_id: int,
+      cursor: Optional[cursors.Cursor] = None,
+  ) -> None:
+    """Rebuilds counters of a single hunt."""
+    assert cursor is not None
+
+    cursor.execute("DELETE FROM hunt_counters WHERE hunt_id = %s", [hunt_id])
+
+    # InnoDB reads the source rows of INSERT ... SELECT with shared locks, so
+    # concurrent hunt flow updates (and the counter updates done by their
+    # triggers) wait until the rebuilt counters are committed.
+    query = """
+      INSERT INTO hunt_counters (hunt_id, num_clients, num_successful_clients,
+                                 num_failed_clients, num_crashed_clients,
+                                 num_running_clients, num_clients_with_results,
+                                 num_results, total_cpu_time_used_micros,
+                                 total_network_bytes_sent)
+      SELECT parent_hunt_id,
+             COUNT(*),
+             SUM(flow_state <=> %(finished)s),
+             SUM(flow_state <=> %(error)s),
+             SUM(flow_state <=> %(crashed)s),
+             SUM(flow_state <=> %(running)s),
+             SUM(IFNULL(num_replies_sent, 0) > 0),
+             SUM(IFNULL(num_replies_sent, 0)),
+             SUM(IFNULL(user_cpu_time_used_micros, 0) +
+                 IFNULL(system_cpu_time_used_micros, 0)),
+             SUM(IFNULL(network_bytes_sent, 0))
+        FROM flows FORCE INDEX (flows_by_hunt)
+       WHERE parent_hunt_id = %(hunt_id)s
+         AND parent_flow_id IS NULL
+       GROUP BY parent_hunt_id
+    """
+    args = {
+        "hunt_id": hunt_id,
+        "finished": int(flows_pb2.Flow.FlowState.FINISHED),
+        "error": int(flows_pb2.Flow.FlowState.ERROR),
+        "crashed": int(flows_pb2.Flow.FlowState.CRASHED),
+        "running": int(flows_pb2.Flow.FlowState.RUNNING),
+    }
+    cursor.execute(query, args)
+
   def _BinsToQuery(self, bins: list[int], column_name: str) -> str:
     """Builds an SQL query part to fetch counts corresponding to given bins."""
     result = []
@@ -1159,7 +1216,7 @@ class MySQLDBHuntMixin(object):
     query = """
       SELECT
         client_id, flow_id, user_cpu_time_used_micros,
-        system_cpu_time_used_micros, network_bytes_sent
+        system_cpu_time_used_micros, network_bytes_sent, flow
       FROM flows
       FORCE INDEX(flows_by_hunt)
       WHERE parent_hunt_id = %s AND parent_flow_id IS NULL AND flow_id = %s AND
@@ -1172,9 +1229,12 @@ class MySQLDBHuntMixin(object):
 
     cursor.execute(query, [hunt_id_int, hunt_id_int])
 
-    for cid, fid, ucpu, scpu, nbs in cursor.fetchall():
+    for cid, fid, ucpu, scpu, nbs, flow in cursor.fetchall():
       client_id = db_utils.IntToClientID(cid)
       flow_id = db_utils.IntToFlowID(fid)
+      # Hash cache hits are not stored in a separate column.
+      flow_obj = flows_pb2.Flow()
+      flow_obj.ParseFromString(flow)
       stats.worst_performers.append(
           jobs_pb2.ClientResources(
               client_id=str(rdf_client.ClientURN.FromHumanReadable(client_id)),
@@ -1184,6 +1244,7 @@ class MySQLDBHuntMixin(object):
                   system_cpu_time=db_utils.MicrosToSeconds(scpu),
               ),
               network_bytes_sent=nbs,
+              hash_cache_hits=flow_obj.hash_cache_hits,
           )
       )
 
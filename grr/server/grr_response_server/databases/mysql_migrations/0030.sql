@@ -0,0 +1,10 @@
+-- Single-row table holding a counter that is increased every time the set of
+-- foreman rules changes. Frontends and workers use it to cache foreman rules.
+CREATE TABLE `foreman_rules_version` (
+  `id` TINYINT UNSIGNED NOT NULL,
+  `version` BIGINT UNSIGNED NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (`id`)
+);
+
+INSERT INTO `foreman_rules_version` (`id`, `version`) VALUES (0, 0);
@@ -0,0 +1,165 @@
+-- Per-hunt counters maintained incrementally as hunt flows are written, so
+-- that reading hunt counters does not need to aggregate over all hunt flows.
+-- Columns are signed, so that transient inconsistencies (e.g. flows removed
+-- by cascading deletes, which do not fire triggers) never make
+-- updates fail. Such inconsistencies can be fixed by rebuilding the counters.
+CREATE TABLE `hunt_counters` (
+  `hunt_id` BIGINT UNSIGNED NOT NULL,
+  `num_clients` BIGINT NOT NULL DEFAULT 0,
+  `num_successful_clients` BIGINT NOT NULL DEFAULT 0,
+  `num_failed_clients` BIGINT NOT NULL DEFAULT 0,
+  `num_crashed_clients` BIGINT NOT NULL DEFAULT 0,
+  `num_running_clients` BIGINT NOT NULL DEFAULT 0,
+  `num_clients_with_results` BIGINT NOT NULL DEFAULT 0,
+  `num_results` BIGINT NOT NULL DEFAULT 0,
+  `total_cpu_time_used_micros` BIGINT NOT NULL DEFAULT 0,
+  `total_network_bytes_sent` BIGINT NOT NULL DEFAULT 0,
+
+  PRIMARY KEY (`hunt_id`)
+);
+
+-- Add a newly written hunt flow to the counters of its hunt.
+CREATE
+  TRIGGER
+    hunt_counters_flows_insert
+      AFTER INSERT
+ON
+  flows
+    FOR EACH ROW
+INSERT INTO hunt_counters (hunt_id, num_clients, num_successful_clients,
+                           num_failed_clients, num_crashed_clients,
+                           num_running_clients, num_clients_with_results,
+                           num_results, total_cpu_time_used_micros,
+                           total_network_bytes_sent)
+SELECT NEW.parent_hunt_id,
+       1,
+       NEW.flow_state <=> 2,
+       NEW.flow_state <=> 3,
+       NEW.flow_state <=> 4,
+       NEW.flow_state <=> 1,
+       IFNULL(NEW.num_replies_sent, 0) > 0,
+       IFNULL(NEW.num_replies_sent, 0),
+       IFNULL(NEW.user_cpu_time_used_micros, 0) +
+         IFNULL(NEW.system_cpu_time_used_micros, 0),
+       IFNULL(NEW.network_bytes_sent, 0)
+  FROM DUAL
+ WHERE NEW.parent_hunt_id IS NOT NULL
+   AND NEW.parent_flow_id IS NULL
+ON DUPLICATE KEY UPDATE
+  num_clients = num_clients + VALUES(num_clients),
+  num_successful_clients =
+    num_successful_clients + VALUES(num_successful_clients),
+  num_failed_clients = num_failed_clients + VALUES(num_failed_clients),
+  num_crashed_clients = num_crashed_clients + VALUES(num_crashed_clients),
+  num_running_clients = num_running_clients + VALUES(num_running_clients),
+  num_clients_with_results =
+    num_clients_with_results + VALUES(num_clients_with_results),
+  num_results = num_results + VALUES(num_results),
+  total_cpu_time_used_micros =
+    total_cpu_time_used_micros + VALUES(total_cpu_time_used_micros),
+  total_network_bytes_sent =
+    total_network_bytes_sent + VALUES(total_network_bytes_sent);
+
+-- Apply the difference between the old and the new version of an updated
+-- hunt flow to the counters of its hunt. Updates that do not touch any of the
+-- counted columns (e.g. flow processing leases) leave the counters alone, so
+-- that they do not contend for the counters row.
+CREATE
+  TRIGGER
+    hunt_counters_flows_update
+      AFTER UPDATE
+ON
+  flows
+    FOR EACH ROW
+INSERT INTO hunt_counters (hunt_id, num_clients, num_successful_clients,
+                           num_failed_clients, num_crashed_clients,
+                           num_running_clients, num_clients_with_results,
+                           num_results, total_cpu_time_used_micros,
+                           total_network_bytes_sent)
+SELECT NEW.parent_hunt_id,
+       0,
+       (NEW.flow_state <=> 2) - (OLD.flow_state <=> 2),
+       (NEW.flow_state <=> 3) - (OLD.flow_state <=> 3),
+       (NEW.flow_state <=> 4) - (OLD.flow_state <=> 4),
+       (NEW.flow_state <=> 1) - (OLD.flow_state <=> 1),
+       (IFNULL(NEW.num_replies_sent, 0) > 0) -
+         (IFNULL(OLD.num_replies_sent, 0) > 0),
+       CAST(IFNULL(NEW.num_replies_sent, 0) AS SIGNED) -
+         CAST(IFNULL(OLD.num_replies_sent, 0) AS SIGNED),
+       CAST(IFNULL(NEW.user_cpu_time_used_micros, 0) +
+            IFNULL(NEW.system_cpu_time_used_micros, 0) AS SIGNED) -
+         CAST(IFNULL(OLD.user_cpu_time_used_micros, 0) +
+              IFNULL(OLD.system_cpu_time_used_micros, 0) AS SIGNED),
+       CAST(IFNULL(NEW.network_bytes_sent, 0) AS SIGNED) -
+         CAST(IFNULL(OLD.network_bytes_sent, 0) AS SIGNED)
+  FROM DUAL
+ WHERE NEW.parent_hunt_id IS NOT NULL
+   AND NEW.parent_flow_id IS NULL
+   AND NOT (NEW.flow_state <=> OLD.flow_state
+            AND NEW.num_replies_sent <=> OLD.num_replies_sent
+            AND NEW.user_cpu_time_used_micros <=> OLD.user_cpu_time_used_micros
+            AND NEW.system_cpu_time_used_micros <=>
+                  OLD.system_cpu_time_used_micros
+            AND NEW.network_bytes_sent <=> OLD.network_bytes_sent)
+ON DUPLICATE KEY UPDATE
+  num_successful_clients =
+    num_successful_clients + VALUES(num_successful_clients),
+  num_failed_clients = num_failed_clients + VALUES(num_failed_clients),
+  num_crashed_clients = num_crashed_clients + VALUES(num_crashed_clients),
+  num_running_clients = num_running_clients + VALUES(num_running_clients),
+  num_clients_with_results =
+    num_clients_with_results + VALUES(num_clients_with_results),
+  num_results = num_results + VALUES(num_results),
+  total_cpu_time_used_micros =
+    total_cpu_time_used_micros + VALUES(total_cpu_time_used_micros),
+  total_network_bytes_sent =
+    total_network_bytes_sent + VALUES(total_network_bytes_sent);
+
+-- Remove a deleted hunt flow from the counters of its hunt.
+CREATE
+  TRIGGER
+    hunt_counters_flows_delete
+      AFTER DELETE
+ON
+  flows
+    FOR EACH ROW
+UPDATE hunt_counters
+   SET num_clients = num_clients - 1,
+       num_successful_clients =
+         num_successful_clients - (OLD.flow_state <=> 2),
+       num_failed_clients = num_failed_clients - (OLD.flow_state <=> 3),
+       num_crashed_clients = num_crashed_clients - (OLD.flow_state <=> 4),
+       num_running_clients = num_running_clients - (OLD.flow_state <=> 1),
+       num_clients_with_results =
+         num_clients_with_results - (IFNULL(OLD.num_replies_sent, 0) > 0),
+       num_results =
+         num_results - CAST(IFNULL(OLD.num_replies_sent, 0) AS SIGNED),
+       total_cpu_time_used_micros = total_cpu_time_used_micros -
+         CAST(IFNULL(OLD.user_cpu_time_used_micros, 0) +
+              IFNULL(OLD.system_cpu_time_used_micros, 0) AS SIGNED),
+       total_network_bytes_sent = total_network_bytes_sent -
+         CAST(IFNULL(OLD.network_bytes_sent, 0) AS SIGNED)
+ WHERE hunt_id = OLD.parent_hunt_id
+   AND OLD.parent_flow_id IS NULL;
+
+-- Backfill counters of existing hunts.
+INSERT INTO hunt_counters (hunt_id, num_clients, num_successful_clients,
+                           num_failed_clients, num_crashed_clients,
+                           num_running_clients, num_clients_with_results,
+                           num_results, total_cpu_time_used_micros,
+                           total_network_bytes_sent)
+SELECT parent_hunt_id,
+       COUNT(*),
+       SUM(flow_state <=> 2),
+       SUM(flow_state <=> 3),
+       SUM(flow_state <=> 4),
+       SUM(flow_state <=> 1),
+       SUM(IFNULL(num_replies_sent, 0) > 0),
+       SUM(IFNULL(num_replies_sent, 0)),
+       SUM(IFNULL(user_cpu_time_used_micros, 0) +
+           IFNULL(system_cpu_time_used_micros, 0)),
+       SUM(IFNULL(network_bytes_sent, 0))
+  FROM flows FORCE INDEX (flows_by_hunt)
+ WHERE parent_hunt_id IS NOT NULL
+   AND parent_flow_id IS NULL
+ GROUP BY parent_hunt_id;
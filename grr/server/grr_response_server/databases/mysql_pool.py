@@ -3,10 +3,13 @@
 
 import logging
 import threading
+import time
 import warnings
 
 import MySQLdb
 
+from grr_response_core.stats import metrics
+
 
 class Error(Exception):
   pass
@@ -20,19 +23,55 @@ class SemicolonNotAllowedInQueryError(Error):
   pass
 
 
+MYSQL_POOL_WAIT_TIME = metrics.Event(
+    "mysql_pool_wait_time",
+    bins=[0, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 50],
+    docstring="Time spent waiting for a connection from the MySQL pool.",
+    units="SECONDS",
+)
+MYSQL_POOL_CONNECTIONS_IN_USE = metrics.Gauge(
+    "mysql_pool_connections_in_use",
+    int,
+    docstring="Number of MySQL connections currently checked out of the pool.",
+)
+MYSQL_POOL_IDLE_CONNECTIONS = metrics.Gauge(
+    "mysql_pool_idle_connections",
+    int,
+    docstring="Number of idle MySQL connections kept in the pool.",
+)
+MYSQL_POOL_CONNECTION_FAILURES = metrics.Counter(
+    "mysql_pool_connection_failures",
+    fields=[("type", str)],
+    docstring="Number of MySQL connections that could not be created or "
+    "failed validation.",
+)
+
+
 class Pool(object):
   """A Pool of database connections.
 
-  A simple pool, with a maximum number of simultaneous connections. Primary goal
-  is to do the right thing when using MySQLdb in obvious ways (our use case),
-  but we also try to stay loosely within the PEP-249 standard.
+  A pool with a minimum and a maximum number of simultaneous connections.
+  Primary goal is to do the right thing when using MySQLdb in obvious ways (our
+  use case), but we also try to stay loosely within the PEP-249 standard.
+
+  Connections that stay idle for longer than `idle_timeout` are closed (as long
+  as at least `min_size` connections remain open) and connections that were
+  idle for longer than `validation_interval` are pinged before being handed
+  out, so that connections dropped by the server are never returned.
 
   Intends to be thread safe in that multiple connections can be requested and
   used by multiple threads without synchronization, but operations on each
   connection (and its associated cursors) are assumed to be serial.
   """
 
-  def __init__(self, connect_func, max_size=10):
+  def __init__(
+      self,
+      connect_func,
+      max_size=10,
+      min_size=0,
+      idle_timeout=None,
+      validation_interval=None,
+  ):
     """Creates a ConnectionPool.
 
     Args:
@@ -40,12 +79,48 @@ class Pool(object):
        database, i.e. a MySQLdb.Connection. Should raise or block if the
        database is unavailable.
      max_size: The maximum number of simultaneous connections.
+     min_size: The number of connections created by `Warmup` and never closed
+       because of idleness.
+     idle_timeout: Number of seconds after which an idle connection is closed.
+       If None, idle connections are kept forever.
+     validation_interval: Number of seconds a connection can stay idle before
+       it is validated with a ping on checkout. If None, connections are never
+       validated.
     """
+    if min_size > max_size:
+      raise ValueError(
+          "Minimum pool size (%d) is bigger than the maximum one (%d)."
+          % (min_size, max_size)
+      )
+
     self.connect_func = connect_func
+    self.min_size = min_size
+    self.max_size = max_size
+    self.idle_timeout = idle_timeout
+    self.validation_interval = validation_interval
     self.limiter = threading.BoundedSemaphore(max_size)
-    self.idle_conns = []  # Atomic access only!!
+    # Pairs of idle connections and times they were returned to the pool, most
+    # recently used last.
+    self.idle_conns = []
+    self._lock = threading.Lock()
+    self._in_use = 0
     self.closed = False
 
+  def Warmup(self):
+    """Opens connections until at least min_size connections are idle."""
+    while True:
+      with self._lock:
+        if self.closed or len(self.idle_conns) >= self.min_size:
+          return
+
+      try:
+        con = self._Connect()
+      except Exception:  # pylint: disable=broad-except
+        logging.exception("Failed to warm up the MySQL connection pool.")
+        return
+
+      self._PutIdle(con)
+
   def get(self, blocking=True):
     """Gets a connection.
 
@@ -66,27 +141,129 @@ class Pool(object):
     # NOTE: Once we acquire capacity from the semaphore, it is essential that we
     # return it eventually. On success, this responsibility is delegated to
     # _ConnectionProxy.
+    start_time = time.monotonic()
     if not self.limiter.acquire(blocking=blocking):
       return None
-    c = None
-    # pop is atomic, but if we did a check first, it would not be atomic with
-    # the pop.
+    MYSQL_POOL_WAIT_TIME.RecordEvent(time.monotonic() - start_time)
+
     try:
-      c = self.idle_conns.pop()
-    except IndexError:
-      # Create a connection, release the pool allocation if it fails.
-      try:
-        c = self.connect_func()
-      except Exception:
-        self.limiter.release()
-        raise
+      c = self._TakeIdle()
+      if c is None:
+        c = self._Connect()
+    except Exception:
+      # Release the pool allocation if we can't get a connection.
+      self.limiter.release()
+      raise
+
+    with self._lock:
+      self._in_use += 1
+      self._UpdateGauges()
     return _ConnectionProxy(self, c)
 
   def close(self):
-    self.closed = True
-    for conn in self.idle_conns:
+    with self._lock:
+      self.closed = True
+      idle_conns = self.idle_conns
+      self.idle_conns = []
+      self._UpdateGauges()
+
+    for conn, _ in idle_conns:
       conn.close()
 
+  def _Connect(self):
+    try:
+      return self.connect_func()
+    except Exception:
+      MYSQL_POOL_CONNECTION_FAILURES.Increment(fields=["connect"])
+      raise
+
+  def _TakeIdle(self):
+    """Returns a validated idle connection or None if there is none."""
+    while True:
+      expired = self._EvictExpired()
+      for con in expired:
+        _CloseQuietly(con)
+
+      with self._lock:
+        if not self.idle_conns:
+          return None
+        con, idle_since = self.idle_conns.pop()
+        self._UpdateGauges()
+
+      if self._IsValid(con, idle_since):
+        return con
+
+      MYSQL_POOL_CONNECTION_FAILURES.Increment(fields=["validation"])
+      _CloseQuietly(con)
+
+  def _EvictExpired(self):
+    """Removes idle connections that timed out, keeping min_size of them."""
+    if self.idle_timeout is None:
+      return []
+
+    deadline = time.monotonic() - self.idle_timeout
+    expired = []
+    with self._lock:
+      # Least recently used connections are at the front of the list.
+      while (
+          len(self.idle_conns) > self.min_size
+          and self.idle_conns[0][1] < deadline
+      ):
+        con, _ = self.idle_conns.pop(0)
+        expired.append(con)
+
+      if expired:
+        self._UpdateGauges()
+
+    return expired
+
+  def _IsValid(self, con, idle_since):
+    if self.validation_interval is None:
+      return True
+    if time.monotonic() - idle_since < self.validation_interval:
+      return True
+
+    try:
+      con.ping()
+      return True
+    except Exception:  # pylint: disable=broad-except
+      logging.warning("Dropping a broken idle MySQL connection.")
+      return False
+
+  def _PutIdle(self, con):
+    with self._lock:
+      if self.closed:
+        closed = True
+      else:
+        closed = False
+        self.idle_conns.append((con, time.monotonic()))
+        self._UpdateGauges()
+
+    if closed:
+      con.close()
+
+  def _Release(self, con):
+    """Returns a connection to the pool or closes it if con is None."""
+    try:
+      if con is not None:
+        self._PutIdle(con)
+    finally:
+      with self._lock:
+        self._in_use -= 1
+        self._UpdateGauges()
+      self.limiter.release()
+
+  def _UpdateGauges(self):
+    MYSQL_POOL_CONNECTIONS_IN_USE.SetValue(self._in_use)
+    MYSQL_POOL_IDLE_CONNECTIONS.SetValue(len(self.idle_conns))
+
+
+def _CloseQuietly(con):
+  try:
+    con.close()
+  except Exception:  # pylint: disable=broad-except
+    pass
+
 
 class _ConnectionProxy(object):
   """A proxy/wrapper of the underlying database connection object.
@@ -108,14 +285,14 @@ class _ConnectionProxy(object):
 
   def close(self):
     if self.con:
+      returned_con = None
       try:
         if not self.errored and not self.pool.closed:
           try:
             self.con.rollback()
-            # append is atomic.
-            self.pool.idle_conns.append(self.con)
+            returned_con = self.con
           except Exception:
-            # rollback raised and the connection didn't make it into the idle
+            # rollback raised and the connection won't make it into the idle
             # list, so close it.
             self.con.close()
             raise
@@ -123,7 +300,7 @@ class _ConnectionProxy(object):
           self.con.close()
       finally:
         self.con = None
-        self.pool.limiter.release()
+        self.pool._Release(returned_con)  # pylint: disable=protected-access
 
   def commit(self):
     assert self.con is not None
@@ -4,14 +4,14 @@
 from unittest import mock
 
 from absl import app
-from absl.testing import absltest
 import MySQLdb
 
 from grr_response_server.databases import mysql_pool
+from grr.test_lib import stats_test_lib
 from grr.test_lib import test_lib
 
 
-class TestPool(absltest.TestCase):
+class TestPool(stats_test_lib.StatsTestMixin, test_lib.GRRBaseTest):
 
   def testMaxSize(self):
     mocks = []
@@ -150,6 +150,110 @@ class TestPool(absltest.TestCase):
         # whitebox: make sure the connection did end up on the idle list
         self.assertLen(pool.idle_conns, 1)
 
+  def testWarmup(self):
+    connect_func = mock.MagicMock()
+    pool = mysql_pool.Pool(connect_func, max_size=5, min_size=3)
+    pool.Warmup()
+
+    self.assertEqual(connect_func.call_count, 3)
+    self.assertLen(pool.idle_conns, 3)
+
+    # Getting a connection reuses a warmed up one.
+    con = pool.get()
+    con.close()
+    self.assertEqual(connect_func.call_count, 3)
+
+  def testWarmupFailureIsNotFatal(self):
+
+    def gen_failure():
+      raise MySQLdb.OperationalError('Database unavailable')
+
+    pool = mysql_pool.Pool(gen_failure, max_size=5, min_size=3)
+    with self.assertStatsCounterDelta(
+        1, mysql_pool.MYSQL_POOL_CONNECTION_FAILURES, fields=['connect']
+    ):
+      pool.Warmup()
+    self.assertEmpty(pool.idle_conns)
+
+  def testMinSizeBiggerThanMaxSizeRaises(self):
+    with self.assertRaises(ValueError):
+      mysql_pool.Pool(mock.MagicMock(), max_size=2, min_size=3)
+
+  def testIdleConnectionsAreEvicted(self):
+    mocks = []
+
+    def gen_mock():
+      c = mock.MagicMock()
+      mocks.append(c)
+      return c
+
+    pool = mysql_pool.Pool(gen_mock, max_size=5, min_size=1, idle_timeout=60)
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=0):
+      proxies = [pool.get() for _ in range(3)]
+      for p in proxies:
+        p.close()
+    self.assertLen(pool.idle_conns, 3)
+
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=120):
+      con = pool.get()
+
+    # Two least recently used connections are closed, the minimum is kept and
+    # handed out.
+    self.assertLen(mocks, 3)
+    mocks[0].close.assert_called_once()
+    mocks[1].close.assert_called_once()
+    mocks[2].close.assert_not_called()
+    con.close()
+
+  def testBrokenIdleConnectionIsReplaced(self):
+    mocks = []
+
+    def gen_mock():
+      c = mock.MagicMock()
+      mocks.append(c)
+      return c
+
+    pool = mysql_pool.Pool(gen_mock, max_size=5, validation_interval=10)
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=0):
+      pool.get().close()
+    mocks[0].ping.side_effect = MySQLdb.OperationalError('Gone away')
+
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=20):
+      with self.assertStatsCounterDelta(
+          1, mysql_pool.MYSQL_POOL_CONNECTION_FAILURES, fields=['validation']
+      ):
+        con = pool.get()
+
+    self.assertLen(mocks, 2)
+    mocks[0].close.assert_called_once()
+    self.assertIs(con.con, mocks[1])
+    con.close()
+
+  def testRecentlyUsedConnectionIsNotValidated(self):
+    connection_mock = mock.MagicMock()
+    pool = mysql_pool.Pool(
+        lambda: connection_mock, max_size=5, validation_interval=10
+    )
+    with mock.patch.object(mysql_pool.time, 'monotonic', return_value=0):
+      pool.get().close()
+      pool.get().close()
+
+    connection_mock.ping.assert_not_called()
+
+  def testInUseAndIdleGauges(self):
+    pool = mysql_pool.Pool(mock.MagicMock, max_size=5)
+    con1 = pool.get()
+    con2 = pool.get()
+    self.assertEqual(mysql_pool.MYSQL_POOL_CONNECTIONS_IN_USE.GetValue(), 2)
+
+    con1.close()
+    self.assertEqual(mysql_pool.MYSQL_POOL_CONNECTIONS_IN_USE.GetValue(), 1)
+    self.assertEqual(mysql_pool.MYSQL_POOL_IDLE_CONNECTIONS.GetValue(), 1)
+
+    con2.close()
+    self.assertEqual(mysql_pool.MYSQL_POOL_CONNECTIONS_IN_USE.GetValue(), 0)
+    self.assertEqual(mysql_pool.MYSQL_POOL_IDLE_CONNECTIONS.GetValue(), 2)
+
 
 if __name__ == '__main__':
   app.run(test_lib.main)
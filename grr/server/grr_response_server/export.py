@@ -8,6 +8,9 @@ ExportConverters convert various complex RDFValues to simple RDFValues
 easily be written to a relational database or just to a set of files.
 """
 
+from typing import Optional, Sequence, Type
+
+from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.util import collection
 from grr_response_server import export_converters_registry
 from grr_response_server.export_converters import base
@@ -78,7 +81,41 @@ def GetMetadata(client_id, client_full_info):
   return metadata
 
 
-def ConvertValuesWithMetadata(metadata_value_pairs, options=None):
+class ConverterCache:
+  """Export converters of every value type, instantiated once.
+
+  Looking up converters in the registry and instantiating them for every batch
+  of values adds up when millions of values are exported. A cache is meant to
+  be used for the duration of a single export, so that changes of the converters
+  registry are picked up by subsequent exports.
+  """
+
+  def __init__(self, options: Optional[base.ExportOptions] = None) -> None:
+    self._options = options
+    self._converters: dict[
+        Type[rdfvalue.RDFValue], Sequence[base.ExportConverter]
+    ] = {}
+
+  def Get(
+      self, value_cls: Type[rdfvalue.RDFValue]
+  ) -> Sequence[base.ExportConverter]:
+    """Returns converters taking values of the given class as an input."""
+    try:
+      return self._converters[value_cls]
+    except KeyError:
+      pass
+
+    converters_classes = export_converters_registry.GetConvertersByClass(
+        value_cls
+    )
+    converters = [cls(self._options) for cls in converters_classes]
+    self._converters[value_cls] = converters
+    return converters
+
+
+def ConvertValuesWithMetadata(
+    metadata_value_pairs, options=None, converter_cache=None
+):
   """Converts a set of RDFValues into a set of export-friendly RDFValues.
 
   Args:
@@ -87,6 +124,9 @@ def ConvertValuesWithMetadata(metadata_value_pairs, options=None):
       instance to be exported.
     options: rdfvalue.ExportOptions instance that will be passed to
       ExportConverters.
+    converter_cache: ConverterCache to take converters from. Callers converting
+      values in multiple batches should pass the same cache for all batches.
+      If not given, converters are instantiated with `options`.
 
   Yields:
     Converted values. Converted values may be of different types.
@@ -100,22 +140,22 @@ def ConvertValuesWithMetadata(metadata_value_pairs, options=None):
                       converters, only the last one will be specified in the
                       exception message.
   """
+  if converter_cache is None:
+    converter_cache = ConverterCache(options)
+
   no_converter_found_error = None
   metadata_value_groups = collection.Group(
       metadata_value_pairs, lambda pair: pair[1].__class__.__name__
   )
   for metadata_values_group in metadata_value_groups.values():
     _, first_value = metadata_values_group[0]
-    converters_classes = export_converters_registry.GetConvertersByValue(
-        first_value
-    )
-    if not converters_classes:
+    converters = converter_cache.Get(first_value.__class__)
+    if not converters:
       no_converter_found_error = "No converters found for value: %s" % str(
           first_value
       )
       continue
 
-    converters = [cls(options) for cls in converters_classes]
     for converter in converters:
       for result in converter.BatchConvert(metadata_values_group):
         yield result
@@ -124,7 +164,9 @@ def ConvertValuesWithMetadata(metadata_value_pairs, options=None):
     raise NoConverterFound(no_converter_found_error)
 
 
-def ConvertValues(default_metadata, values, options=None):
+def ConvertValues(
+    default_metadata, values, options=None, converter_cache=None
+):
   """Converts a set of RDFValues into a set of export-friendly RDFValues.
 
   Args:
@@ -134,6 +176,7 @@ def ConvertValues(default_metadata, values, options=None):
     values: Values to convert. They should be of the same type.
     options: rdfvalue.ExportOptions instance that will be passed to
       ExportConverters.
+    converter_cache: ConverterCache to take converters from.
 
   Returns:
     Converted values. Converted values may be of different types
@@ -145,4 +188,6 @@ def ConvertValues(default_metadata, values, options=None):
     NoConverterFound: in case no suitable converters were found for the values.
   """
   batch_data = [(default_metadata, obj) for obj in values]
-  return ConvertValuesWithMetadata(batch_data, options=options)
+  return ConvertValuesWithMetadata(
+      batch_data, options=options, converter_cache=converter_cache
+  )
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""Benchmarks for the conversion of exported results."""
+
+import time
+
+from absl import app
+from absl import flags
+
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
+from grr_response_core.lib.rdfvalues import flows as rdf_flows
+from grr_response_core.lib.rdfvalues import paths as rdf_paths
+from grr_response_core.lib.util import collection
+from grr_response_core.lib.util import sqlite
+from grr_response_server import export
+from grr_response_server import instant_output_plugin
+from grr_response_server.export_converters import base
+from grr_response_server.output_plugins import csv_plugin
+from grr_response_server.output_plugins import sqlite_plugin
+from grr.test_lib import benchmark_test_lib
+from grr.test_lib import export_test_lib
+from grr.test_lib import test_lib
+
+_LARGE = flags.DEFINE_bool(
+    "large_export_benchmark",
+    default=False,
+    help="If true, a million results are exported instead of a thousand.",
+)
+
+
+class ExportBenchmark(benchmark_test_lib.MicroBenchmarks):
+  """Benchmarks exporting many results."""
+
+  units = "s"
+
+  NUM_RESULTS = 1000
+  LARGE_NUM_RESULTS = 1000000
+  NUM_CLIENTS = 100
+
+  def setUp(self):
+    super().setUp(extra_fields=["Rows/s"], extra_format=["<20"])
+    if _LARGE.value:
+      self.num_results = self.LARGE_NUM_RESULTS
+    else:
+      self.num_results = self.NUM_RESULTS
+    self.client_ids = self.SetupClients(self.NUM_CLIENTS)
+
+  def _StatEntries(self):
+    for i in range(self.num_results):
+      yield rdf_client_fs.StatEntry(
+          pathspec=rdf_paths.PathSpec.OS(path="/foo/bar/%d" % i),
+          st_mode=33184,
+          st_ino=1063090 + i,
+          st_size=i,
+          st_atime=1336469177,
+          st_mtime=1336129892,
+          st_ctime=1336129892,
+      )
+
+  def _Messages(self):
+    for i, stat_entry in enumerate(self._StatEntries()):
+      client_id = self.client_ids[i % self.NUM_CLIENTS]
+      yield rdf_flows.GrrMessage(source=client_id, payload=stat_entry)
+
+  def _Time(self, name, values):
+    start = time.time()
+    for _ in values:
+      pass
+    time_taken = time.time() - start
+
+    rows_per_second = "%d" % (self.num_results / time_taken)
+    self.AddResult(name, time_taken, self.num_results, rows_per_second)
+
+  @export_test_lib.WithAllExportConverters
+  def testConvertValues(self):
+    """Converts StatEntry values with `export.ConvertValues`."""
+    # Generating the values is included in the timings below.
+    self._Time("Generate StatEntry values", self._StatEntries())
+
+    metadata = base.ExportedMetadata(client_urn=self.client_ids[0])
+    self._Time(
+        "ConvertValues", export.ConvertValues(metadata, self._StatEntries())
+    )
+
+  @export_test_lib.WithAllExportConverters
+  def testInstantOutputPlugins(self):
+    """Exports StatEntry values with instant output plugins."""
+    # Generating the messages is included in the timings below.
+    self._Time("Generate GrrMessage values", self._Messages())
+
+    for plugin_cls in [
+        csv_plugin.CSVInstantOutputPlugin,
+        sqlite_plugin.SqliteInstantOutputPlugin,
+    ]:
+      plugin = plugin_cls(source_urn=rdfvalue.RDFURN("aff4:/foo/bar"))
+      chunks = instant_output_plugin.ApplyPluginToTypedCollection(
+          plugin,
+          [rdf_client_fs.StatEntry.__name__],
+          lambda _: self._Messages(),
+      )
+      self._Time(plugin_cls.plugin_name, chunks)
+
+  def testSqliteTableDump(self):
+    """Renders rows of exported values as SQL statements."""
+    columns = [("path", "TEXT"), ("size", "INTEGER"), ("hash", "BLOB")]
+    rows = (
+        ("/foo/bar/%d" % i, i, i.to_bytes(8, "little"))
+        for i in range(self.num_results)
+    )
+
+    def Statements():
+      dump = sqlite.TableDump("ExportedFile.from_StatEntry", columns)
+      try:
+        for batch in collection.Batch(rows, 1000):
+          yield from dump.Dump(batch)
+      finally:
+        dump.Close()
+
+    self._Time("sqlite.TableDump", Statements())
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
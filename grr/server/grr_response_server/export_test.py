@@ -123,6 +123,29 @@ class ConvertValuesTest(export_test_lib.ExportTestBase):
         )
     )
 
+  @export_test_lib.WithExportConverter(DummyRDFValueConverter)
+  def testConverterCacheReusesConverters(self):
+    cache = export.ConverterCache()
+
+    first = list(
+        export.ConvertValues(
+            self.metadata, [DummyRDFValue("foo")], converter_cache=cache
+        )
+    )
+    second = list(
+        export.ConvertValues(
+            self.metadata, [DummyRDFValue("bar")], converter_cache=cache
+        )
+    )
+
+    self.assertEqual(first, [rdfvalue.RDFString("foo")])
+    self.assertEqual(second, [rdfvalue.RDFString("bar")])
+
+    converters = cache.Get(DummyRDFValue)
+    self.assertLen(converters, 1)
+    self.assertIsInstance(converters[0], DummyRDFValueConverter)
+    self.assertIs(cache.Get(DummyRDFValue)[0], converters[0])
+
 
 class GetMetadataTest(test_lib.GRRBaseTest):
 
@@ -3,11 +3,12 @@
 
 import abc
 import collections
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
+from concurrent import futures
 import hashlib
 import io
 import os
-from typing import Collection, Dict, Iterable, NamedTuple, Optional
+from typing import Collection, Dict, Iterable, List, NamedTuple, Optional
 
 from grr_response_core import config
 from grr_response_core.lib import rdfvalue
@@ -443,6 +444,10 @@ def OpenFile(
 
 STREAM_CHUNKS_READ_AHEAD = 500
 
+# Maximum number of bytes of blobs StreamFilesChunks reads ahead when
+# prefetching blobs in parallel.
+STREAM_CHUNKS_MAX_PREFETCH_BYTES = 64 * 1024 * 1024
+
 
 class StreamedFileChunk:
   """An object representing a single streamed file chunk."""
@@ -475,10 +480,104 @@ class StreamedFileChunk:
     self.total_chunks = total_chunks
 
 
+class _ChunkToStream(NamedTuple):
+  client_path: db.ClientPath
+  blob_id: models_blob.BlobID
+  chunk_index: int
+  total_chunks: int
+  offset: int
+  total_size: int
+  size: int
+
+
+def _BatchChunksToStream(
+    chunks: Iterable[_ChunkToStream],
+    max_count: int,
+    max_bytes: int,
+) -> Iterator[List[_ChunkToStream]]:
+  """Batches chunks limiting both the number and the size of their blobs."""
+  batch = []
+  batch_bytes = 0
+  for chunk in chunks:
+    if batch and (
+        len(batch) >= max_count or batch_bytes + chunk.size > max_bytes
+    ):
+      yield batch
+      batch = []
+      batch_bytes = 0
+
+    batch.append(chunk)
+    batch_bytes += chunk.size
+
+  if batch:
+    yield batch
+
+
+def _ReadBlobBatches(
+    batches: Iterable[List[_ChunkToStream]],
+    prefetch_threads: int,
+    max_prefetch_bytes: int,
+) -> Iterator[Dict[models_blob.BlobID, Optional[bytes]]]:
+  """Reads blobs of the given batches, yielding results in batches order.
+
+  Args:
+    batches: Batches of chunks to read blobs for.
+    prefetch_threads: Number of threads reading batches ahead of the consumer.
+      If 0, every batch is read only once the previous one was consumed.
+    max_prefetch_bytes: Maximum total size of batches read, but not yet
+      consumed. A single batch is always read, even if it is bigger.
+
+  Yields:
+    Dictionaries mapping blob ids of a batch to the blobs' contents.
+  """
+
+  def ReadBatch(
+      batch: List[_ChunkToStream],
+  ) -> Dict[models_blob.BlobID, Optional[bytes]]:
+    return data_store.BLOBS.ReadBlobs([chunk.blob_id for chunk in batch])
+
+  if prefetch_threads <= 0:
+    for batch in batches:
+      yield ReadBatch(batch)
+    return
+
+  executor = futures.ThreadPoolExecutor(
+      max_workers=prefetch_threads, thread_name_prefix="StreamFilesChunks"
+  )
+  pending = collections.deque()
+  pending_bytes = 0
+  batches = iter(batches)
+  try:
+    next_batch = next(batches, None)
+    while next_batch is not None or pending:
+      # Schedule reads of upcoming batches as long as they fit into the
+      # prefetch budget.
+      while next_batch is not None and (
+          not pending
+          or (
+              len(pending) <= prefetch_threads
+              and pending_bytes + sum(c.size for c in next_batch)
+              <= max_prefetch_bytes
+          )
+      ):
+        batch_bytes = sum(c.size for c in next_batch)
+        pending.append((executor.submit(ReadBatch, next_batch), batch_bytes))
+        pending_bytes += batch_bytes
+        next_batch = next(batches, None)
+
+      future, batch_bytes = pending.popleft()
+      pending_bytes -= batch_bytes
+      yield future.result()
+  finally:
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
 def StreamFilesChunks(
     client_paths: Collection[db.ClientPath],
     max_timestamp: Optional[rdfvalue.RDFDatetime] = None,
     max_size: Optional[int] = None,
+    prefetch_threads: int = 0,
+    max_prefetch_bytes: int = STREAM_CHUNKS_MAX_PREFETCH_BYTES,
 ) -> Iterable[StreamedFileChunk]:
   """Streams contents of given files.
 
@@ -490,6 +589,10 @@ def StreamFilesChunks(
       each file.
     max_size: If specified, only the chunks covering max_size bytes will be
       returned.
+    prefetch_threads: If positive, blobs of upcoming chunks are read in
+      parallel by this many threads while earlier chunks are consumed.
+    max_prefetch_bytes: Maximum number of bytes of blobs read ahead when
+      prefetching.
 
   Yields:
     StreamedFileChunk objects for every file read. Chunks will be returned
@@ -541,20 +644,47 @@ def StreamFilesChunks(
 
     cur_size = 0
     for i, ref in enumerate(blob_refs):
-      blob_id = models_blob.BlobID(ref.blob_id)
-      all_chunks.append((cp, blob_id, i, num_blobs, ref.offset, total_size))
+      all_chunks.append(
+          _ChunkToStream(
+              client_path=cp,
+              blob_id=models_blob.BlobID(ref.blob_id),
+              chunk_index=i,
+              total_chunks=num_blobs,
+              offset=ref.offset,
+              total_size=total_size,
+              size=ref.size,
+          )
+      )
 
       cur_size += ref.size
       if max_size is not None and cur_size >= max_size:
         break
 
-  for batch in collection.Batch(all_chunks, STREAM_CHUNKS_READ_AHEAD):
-    blobs = data_store.BLOBS.ReadBlobs(
-        [blob_id for _, blob_id, _, _, _, _ in batch]
-    )
-    for cp, blob_id, i, num_blobs, offset, total_size in batch:
-      blob_data = blobs[blob_id]
-      if blob_data is None:
-        raise BlobNotFoundError(blob_id)
+  if prefetch_threads > 0:
+    # Split the prefetch budget, so that multiple batches can be in flight.
+    max_batch_bytes = max_prefetch_bytes // (prefetch_threads + 1)
+  else:
+    max_batch_bytes = max_prefetch_bytes
 
-      yield StreamedFileChunk(cp, blob_data, i, num_blobs, offset, total_size)
+  batches = list(
+      _BatchChunksToStream(
+          all_chunks, STREAM_CHUNKS_READ_AHEAD, max(max_batch_bytes, 1)
+      )
+  )
+  blob_batches = _ReadBlobBatches(
+      batches, prefetch_threads, max_prefetch_bytes
+  )
+  for batch, blobs in zip(batches, blob_batches):
+    for chunk in batch:
+      blob_data = blobs[chunk.blob_id]
+      if blob_data is None:
+        raise BlobNotFoundError(chunk.blob_id)
+
+      yield StreamedFileChunk(
+          chunk.client_path,
+          blob_data,
+          chunk.chunk_index,
+          chunk.total_chunks,
+          chunk.offset,
+          chunk.total_size,
+      )
@@ -696,6 +696,66 @@ class StreamFilesChunksTest(test_lib.GRRBaseTest):
     self.assertEqual(chunks[0].data, blob_data[0])
     self.assertEqual(chunks[1].data, blob_data[1])
 
+  def testPrefetchingPreservesChunksOrder(self):
+    client_path_1 = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    blob_data_1, _ = self._WriteFile(client_path_1, (0, 3))
+
+    client_path_2 = db.ClientPath.OS(self.client_id_other, ("foo", "bar"))
+    blob_data_2, _ = self._WriteFile(client_path_2, (3, 6))
+
+    # The prefetch budget allows only a single blob per batch, so all blobs are
+    # read by separate, concurrently running calls.
+    chunks = list(
+        file_store.StreamFilesChunks(
+            [client_path_1, client_path_2],
+            prefetch_threads=3,
+            max_prefetch_bytes=self.blob_size * 4,
+        )
+    )
+
+    self.assertEqual(
+        [(c.client_path, c.data) for c in chunks],
+        [(client_path_1, data) for data in blob_data_1]
+        + [(client_path_2, data) for data in blob_data_2],
+    )
+    self.assertEqual([c.chunk_index for c in chunks], [0, 1, 2, 0, 1, 2])
+
+  def testPrefetchingRespectsMaxPrefetchBytes(self):
+    client_path = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    self._WriteFile(client_path, (0, 6))
+
+    read_sizes = []
+    read_blobs = data_store.BLOBS.ReadBlobs
+
+    def ReadBlobs(blob_ids):
+      blob_ids = list(blob_ids)
+      read_sizes.append(len(blob_ids))
+      return read_blobs(blob_ids)
+
+    with mock.patch.object(data_store.BLOBS, "ReadBlobs", ReadBlobs):
+      chunks = list(
+          file_store.StreamFilesChunks(
+              [client_path],
+              prefetch_threads=1,
+              max_prefetch_bytes=self.blob_size * 4,
+          )
+      )
+
+    self.assertLen(chunks, 6)
+    # With one thread, the budget is split between two batches in flight.
+    self.assertEqual(read_sizes, [2, 2, 2])
+
+  def testPrefetchingRaisesIfChunkIsMissing(self):
+    client_path = db.ClientPath.OS(self.client_id, ("foo", "bar"))
+    self._WriteFile(client_path, (0, 2))
+
+    def ReadBlobs(blob_ids):
+      return {blob_id: None for blob_id in blob_ids}
+
+    with mock.patch.object(data_store.BLOBS, "ReadBlobs", ReadBlobs):
+      with self.assertRaises(file_store.BlobNotFoundError):
+        list(file_store.StreamFilesChunks([client_path], prefetch_threads=2))
+
 
 def main(argv):
   # Run the full test suite
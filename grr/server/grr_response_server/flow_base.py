@@ -11,6 +11,7 @@ from typing import Any, Callable, Collection, Dict, Generic, Iterator, List, Map
 
 from google.protobuf import any_pb2
 from google.protobuf import message as pb_message
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import flows as rdf_flows
@@ -18,6 +19,7 @@ from grr_response_core.lib.rdfvalues import mig_protodict
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.registry import FlowRegistry
+from grr_response_core.lib.util import random
 from grr_response_core.stats import metrics
 from grr_response_proto import flows_pb2
 from grr_response_proto import jobs_pb2
@@ -40,6 +42,7 @@ from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import mig_flow_objects
 from grr_response_server.rdfvalues import mig_flow_runner
 from grr_response_server.rdfvalues import mig_hunt_objects
+from grr_response_server.rdfvalues import mig_objects
 from grr_response_server.rdfvalues import objects as rdf_objects
 from grr_response_server.rdfvalues import output_plugin as rdf_output_plugin
 from grr_response_proto import rrg_pb2
@@ -58,6 +61,10 @@ HUNT_RESULTS_RAN_THROUGH_PLUGIN = metrics.Counter(
     "hunt_results_ran_through_plugin", fields=[("plugin", str)]
 )
 
+# Name of the message handler processing hunt results with output plugins
+# asynchronously (see `output_plugin_queue`).
+OUTPUT_PLUGIN_DELIVERY_HANDLER_NAME = "OutputPluginDeliveryHandler"
+
 _METRICS_UNKNOWN_EXCEPTION = "Unknown"
 # Captures the possible exception name (only group). String must have a
 # capitalized letter (only letters) followed by an opening parens.
@@ -229,6 +236,9 @@ class FlowBase(Generic[_ProtoArgsT, _ProtoStoreT], metaclass=FlowRegistry):
     self.proto_replies_to_process: list[flows_pb2.FlowResult] = []
     self.replies_to_write = []
     self.proto_replies_to_write: list[flows_pb2.FlowResult] = []
+    self.output_plugin_delivery_requests: list[
+        objects_pb2.MessageHandlerRequest
+    ] = []
 
     self._state = None
     self._store = None
@@ -1104,6 +1114,7 @@ class FlowBase(Generic[_ProtoArgsT, _ProtoStoreT], metaclass=FlowRegistry):
     self.rdf_flow.cpu_time_used.system_cpu_time += system_cpu
 
     self.rdf_flow.network_bytes_sent += status.network_bytes_sent
+    self.rdf_flow.hash_cache_hits += status.hash_cache_hits
 
     if not self.rdf_flow.runtime_us:
       self.rdf_flow.runtime_us = rdfvalue.Duration(0)
@@ -1183,6 +1194,7 @@ class FlowBase(Generic[_ProtoArgsT, _ProtoStoreT], metaclass=FlowRegistry):
           cpu_time_used=self.rdf_flow.cpu_time_used,
           network_bytes_sent=self.rdf_flow.network_bytes_sent,
           runtime_us=self.rdf_flow.runtime_us,
+          hash_cache_hits=self.rdf_flow.hash_cache_hits,
           error_message=error_message,
           flow_id=self.rdf_flow.parent_flow_id,
           backtrace=backtrace,
@@ -1279,6 +1291,7 @@ class FlowBase(Generic[_ProtoArgsT, _ProtoStoreT], metaclass=FlowRegistry):
           cpu_time_used=self.rdf_flow.cpu_time_used,
           network_bytes_sent=self.rdf_flow.network_bytes_sent,
           runtime_us=self.rdf_flow.runtime_us,
+          hash_cache_hits=self.rdf_flow.hash_cache_hits,
           flow_id=self.rdf_flow.parent_flow_id,
       )
       if self.rdf_flow.parent_flow_id:
@@ -1411,7 +1424,10 @@ class FlowBase(Generic[_ProtoArgsT, _ProtoStoreT], metaclass=FlowRegistry):
 
       if self.replies_to_process:
         if self.rdf_flow.parent_hunt_id and not self.rdf_flow.parent_flow_id:
-          self._ProcessRepliesWithHuntOutputPlugins(self.replies_to_process)
+          if config.CONFIG["Worker.async_hunt_output_plugins"]:
+            self._QueueRepliesForHuntOutputPlugins(self.replies_to_process)
+          else:
+            self._ProcessRepliesWithHuntOutputPlugins(self.replies_to_process)
         else:
           self._ProcessRepliesWithFlowOutputPlugins(self.replies_to_process)
 
@@ -1431,17 +1447,39 @@ class FlowBase(Generic[_ProtoArgsT, _ProtoStoreT], metaclass=FlowRegistry):
       msg = str(e)
       self.Error(error_message=msg, backtrace=traceback.format_exc())
 
-  def ProcessAllReadyRequests(self) -> tuple[int, int]:
+  def ProcessAllReadyRequests(
+      self,
+      request_dict: Optional[
+          Dict[
+              int,
+              Tuple[
+                  flows_pb2.FlowRequest,
+                  Sequence[
+                      Union[
+                          flows_pb2.FlowResponse,
+                          flows_pb2.FlowStatus,
+                          flows_pb2.FlowIterator,
+                      ],
+                  ],
+              ],
+          ]
+      ] = None,
+  ) -> tuple[int, int]:
     """Processes all requests that are due to run.
 
+    Args:
+      request_dict: Requests of this flow as returned by `ReadFlowRequests`. If
+        not set, the requests are read from the database.
+
     Returns:
       (processed, incrementally_processed) The number of completed processed
       requests and the number of incrementally processed ones.
     """
-    request_dict = data_store.REL_DB.ReadFlowRequests(
-        self.rdf_flow.client_id,
-        self.rdf_flow.flow_id,
-    )
+    if request_dict is None:
+      request_dict = data_store.REL_DB.ReadFlowRequests(
+          self.rdf_flow.client_id,
+          self.rdf_flow.flow_id,
+      )
 
     completed_requests = FindCompletedRequestsToProcess(
         request_dict,
@@ -1645,6 +1683,42 @@ class FlowBase(Generic[_ProtoArgsT, _ProtoStoreT], metaclass=FlowRegistry):
       self.proto_replies_to_write = []
       self.replies_to_write = []
 
+    if self.output_plugin_delivery_requests:
+      # Requests reference flow results, so they are written after the results.
+      data_store.REL_DB.WriteMessageHandlerRequests(
+          self.output_plugin_delivery_requests
+      )
+      self.output_plugin_delivery_requests = []
+
+  def _QueueRepliesForHuntOutputPlugins(
+      self, replies: Sequence[rdf_flow_objects.FlowResult]
+  ) -> None:
+    """Queues replies for asynchronous processing with hunt output plugins."""
+    if not data_store.REL_DB.ReadHuntOutputPluginsStates(
+        self.rdf_flow.parent_hunt_id
+    ):
+      return
+
+    # Replies are written as flow results when queued messages are flushed.
+    # They are referenced by their position among all the results of the flow.
+    delivery_request = rdf_output_plugin.OutputPluginDeliveryRequest(
+        client_id=self.rdf_flow.client_id,
+        flow_id=self.rdf_flow.flow_id,
+        hunt_id=self.rdf_flow.parent_hunt_id,
+        long_flow_id=self.rdf_flow.long_flow_id,
+        results_offset=self.rdf_flow.num_replies_sent - len(replies),
+        results_count=len(replies),
+    )
+    request = rdf_objects.MessageHandlerRequest(
+        client_id=self.rdf_flow.client_id,
+        handler_name=OUTPUT_PLUGIN_DELIVERY_HANDLER_NAME,
+        request_id=random.UInt64(),
+        request=delivery_request,
+    )
+    self.output_plugin_delivery_requests.append(
+        mig_objects.ToProtoMessageHandlerRequest(request)
+    )
+
   def _ProcessRepliesWithHuntOutputPlugins(
       self, replies: Sequence[rdf_flow_objects.FlowResult]
   ) -> None:
@@ -1703,6 +1703,23 @@ class WorkerTest(BasicFlowTest):
       with self.assertRaises(worker_lib.FlowHasNothingToProcessError):
         worker.ProcessFlow(fpr)
 
+  def testProcessFlowsProcessesBatchOfFlows(self):
+    flow_ids = [
+        flow.StartFlow(flow_cls=CallStateFlow, client_id=self.client_id)
+        for _ in range(3)
+    ]
+    requests = data_store.REL_DB.ReadFlowProcessingRequests()
+    self.assertLen(requests, 3)
+
+    worker = worker_lib.GRRWorker(flow_processing_batch_size=3)
+    worker.ProcessFlows(requests)
+
+    self.assertEmpty(data_store.REL_DB.ReadFlowProcessingRequests())
+    for flow_id in flow_ids:
+      flow_obj = data_store.REL_DB.ReadFlowObject(self.client_id, flow_id)
+      self.assertEqual(flow_obj.flow_state, flows_pb2.Flow.FlowState.FINISHED)
+      self.assertFalse(flow_obj.processing_on)
+
 
 def main(argv):
   # Run the full test suite
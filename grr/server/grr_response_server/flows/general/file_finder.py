@@ -5,11 +5,13 @@ from typing import Optional, Sequence, Set, Tuple, cast
 
 from google.protobuf import any_pb2
 from grr_response_core.lib import artifact_utils
+from grr_response_core.lib import constants
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
 from grr_response_core.lib.rdfvalues import mig_client_fs
 from grr_response_core.lib.rdfvalues import mig_file_finder
 from grr_response_core.lib.rdfvalues import mig_paths
+from grr_response_core.lib.util import collection
 from grr_response_proto import flows_pb2
 from grr_response_proto import jobs_pb2
 from grr_response_proto import knowledge_base_pb2
@@ -84,6 +86,10 @@ class ClientFileFinder(
   BLOB_CHECK_DELAY = rdfvalue.Duration("60s")
   MAX_BLOB_CHECKS = 60
 
+  # Number of chunk digests checked against the blob store at once when blobs
+  # are negotiated.
+  BLOB_NEGOTIATION_BATCH_SIZE = 1000
+
   proto_args_type = flows_pb2.FileFinderArgs
   proto_store_type = flows_pb2.FileFinderStore
   proto_progress_type = flows_pb2.FileFinderProgress
@@ -97,6 +103,19 @@ class ClientFileFinder(
 
     self.GetProgressProto().files_found = 0
 
+    download = self.proto_args.action.download
+    if (
+        download.negotiate_blobs
+        and download.chunk_size > constants.CLIENT_MAX_BUFFER_SIZE
+    ):
+      # Missing chunks are transferred with `TransferBuffer`, which refuses
+      # buffers larger than that.
+      raise flow_base.FlowError(
+          f"Chunk size {download.chunk_size} exceeds the maximum of "
+          f"{constants.CLIENT_MAX_BUFFER_SIZE} bytes supported when "
+          "negotiating blobs."
+      )
+
     # Do not do anything if no paths are specified in the arguments.
     if not self.proto_args.paths:
       self.Log("No paths provided, finishing.")
@@ -187,12 +206,88 @@ class ClientFileFinder(
     for r in stat_entry_responses:
       self.SendReplyProto(r)
 
-    if transferred_file_responses:
+    if not transferred_file_responses:
+      return
+
+    if self.proto_args.action.download.negotiate_blobs:
+      self._TransferMissingBlobs(transferred_file_responses)
+      # Client requests are processed in order, so the results are stored
+      # only after the client transferred all the missing chunks.
+      self.CallStateProto(
+          next_state=self.StoreResultsWithBlobs.__name__,
+          responses=transferred_file_responses,
+      )
+    else:
       self.CallStateInlineProto(
           next_state=self.StoreResultsWithBlobs.__name__,
           messages=transferred_file_responses,
       )
 
+  def _TransferMissingBlobs(
+      self,
+      responses: Sequence[flows_pb2.FileFinderResult],
+  ) -> None:
+    """Asks the client to transfer chunks that are not in the blob store."""
+    # Chunks shared by several files are transferred only once.
+    chunk_refs: dict[models_blobs.BlobID, jobs_pb2.BufferReference] = {}
+    for response in responses:
+      for chunk in response.transferred_file.chunks:
+        blob_id = models_blobs.BlobID(chunk.digest)
+        if blob_id not in chunk_refs:
+          chunk_refs[blob_id] = jobs_pb2.BufferReference(
+              pathspec=response.stat_entry.pathspec,
+              offset=chunk.offset,
+              length=chunk.length,
+          )
+
+    num_missing = 0
+    for blob_ids in collection.Batch(
+        chunk_refs, self.BLOB_NEGOTIATION_BATCH_SIZE
+    ):
+      blobs_present = data_store.BLOBS.CheckBlobsExist(blob_ids)
+      for blob_id, is_present in blobs_present.items():
+        if is_present:
+          continue
+
+        num_missing += 1
+        self.CallClientProto(
+            server_stubs.TransferBuffer,
+            action_args=chunk_refs[blob_id],
+            next_state=self.ReceiveMissingBlob.__name__,
+            request_data={"digest": bytes(blob_id)},
+        )
+
+    self.Log(
+        "Requested %d out of %d chunks missing from the blob store.",
+        num_missing,
+        len(chunk_refs),
+    )
+
+  @flow_base.UseProto2AnyResponses
+  def ReceiveMissingBlob(
+      self,
+      responses: flow_responses.Responses[any_pb2.Any],
+  ) -> None:
+    """Checks that the client transferred a missing chunk."""
+    digest = responses.request_data["digest"]
+
+    if not responses.success:
+      self.Log("Failed to transfer a chunk: %s", responses.status)
+      self.store.unavailable_blob_ids.append(digest)
+      return
+
+    for response_any in responses:
+      response = jobs_pb2.BufferReference()
+      response_any.Unpack(response)
+
+      # The file changed since the client reported its chunks, so the chunk
+      # with the expected digest will never be written to the blob store.
+      if response.data != digest:
+        self.Log(
+            "Chunk %s changed during the transfer.", models_blobs.BlobID(digest)
+        )
+        self.store.unavailable_blob_ids.append(digest)
+
   @flow_base.UseProto2AnyResponses
   def StoreResultsWithBlobs(
       self,
@@ -208,6 +303,11 @@ class ClientFileFinder(
       response.Unpack(res)
       unpacked_responses.append(res)
 
+    unavailable_blob_ids = set(
+        models_blobs.BlobID(blob_id)
+        for blob_id in self.store.unavailable_blob_ids
+    )
+
     response_pending_blob_ids = _GetPendingBlobIDs(unpacked_responses)
     # Needed in case we need to report an error (see below).
     sample_pending_blob_id: Optional[models_blobs.BlobID] = None
@@ -215,6 +315,13 @@ class ClientFileFinder(
     for response, pending_blob_ids in response_pending_blob_ids:
       if not pending_blob_ids:
         complete_responses.append(response)
+      elif pending_blob_ids & unavailable_blob_ids:
+        # Chunks of the file could not be transferred, it is skipped instead of
+        # failing the whole flow.
+        self.Log(
+            "Skipping '%s': some of its chunks could not be transferred.",
+            response.stat_entry.pathspec.path,
+        )
       else:
         incomplete_responses.append(response)
         sample_pending_blob_id = list(pending_blob_ids)[0]
@@ -17,6 +17,7 @@ from absl import app
 from google.protobuf import any_pb2
 from grr_response_client import vfs
 from grr_response_client.client_actions.file_finder_utils import uploading
+from grr_response_core.lib import constants
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import file_finder as rdf_file_finder
@@ -1400,6 +1401,115 @@ class TestClientFileFinderFlow(flow_test_lib.FlowTestsBaseclass):
 
     self._VerifyDownloadedFiles(results)
 
+  def testNegotiateBlobsTransfersOnlyMissingChunks(self):
+    path = os.path.join(self.base_path, "History.plist")
+    s = os.stat(path).st_size
+    chunk_size = s // 4
+    num_chunks = (s + chunk_size - 1) // chunk_size
+    action = rdf_file_finder.FileFinderAction.Download(
+        chunk_size=chunk_size, negotiate_blobs=True
+    )
+
+    def RunFlowAndReadLogs():
+      flow_id = flow_test_lib.StartAndRunFlow(
+          file_finder.ClientFileFinder,
+          action_mocks.ClientFileFinderClientMock(),
+          client_id=self.client_id,
+          flow_args=rdf_file_finder.FileFinderArgs(
+              paths=[path],
+              pathtype=rdf_paths.PathSpec.PathType.OS,
+              action=action,
+              process_non_regular_files=True,
+          ),
+          creator=self.test_username,
+      )
+
+      results = flow_test_lib.GetFlowResults(self.client_id, flow_id)
+      self.assertLen(results, 1)
+      self._VerifyDownloadedFiles(results)
+
+      log_entries = data_store.REL_DB.ReadFlowLogEntries(
+          client_id=self.client_id, flow_id=flow_id, offset=0, count=1024
+      )
+      return [entry.message for entry in log_entries]
+
+    self.assertIn(
+        "Requested %d out of %d chunks missing from the blob store."
+        % (num_chunks, num_chunks),
+        RunFlowAndReadLogs(),
+    )
+    # All the chunks are in the blob store after the first download.
+    self.assertIn(
+        "Requested 0 out of %d chunks missing from the blob store."
+        % num_chunks,
+        RunFlowAndReadLogs(),
+    )
+
+  def testNegotiateBlobsSkipsFilesModifiedDuringTransfer(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as temp_dirpath:
+      foo_path = os.path.join(temp_dirpath, "foo")
+      bar_path = os.path.join(temp_dirpath, "bar")
+      with io.open(foo_path, "wb") as fd:
+        fd.write(b"foo" * 4)
+      with io.open(bar_path, "wb") as fd:
+        fd.write(b"bar" * 4)
+
+      class ClientMock(action_mocks.ClientFileFinderClientMock):
+
+        def HandleMessage(self, message):
+          # Modifies the file after the client reported its chunks.
+          if message.name == "TransferBuffer":
+            with io.open(foo_path, "wb") as fd:
+              fd.write(b"FOO" * 4)
+
+          return super().HandleMessage(message)
+
+      flow_id = flow_test_lib.StartAndRunFlow(
+          file_finder.ClientFileFinder,
+          ClientMock(),
+          client_id=self.client_id,
+          flow_args=rdf_file_finder.FileFinderArgs(
+              paths=[os.path.join(temp_dirpath, "*")],
+              pathtype=rdf_paths.PathSpec.PathType.OS,
+              action=rdf_file_finder.FileFinderAction.Download(
+                  chunk_size=6, negotiate_blobs=True
+              ),
+          ),
+          creator=self.test_username,
+      )
+
+      results = flow_test_lib.GetFlowResults(self.client_id, flow_id)
+      self.assertLen(results, 1)
+      self.assertEqual(results[0].stat_entry.pathspec.path, bar_path)
+      self._VerifyDownloadedFiles(results)
+
+      log_entries = data_store.REL_DB.ReadFlowLogEntries(
+          client_id=self.client_id, flow_id=flow_id, offset=0, count=1024
+      )
+      self.assertIn(
+          f"Skipping '{foo_path}': some of its chunks could not be "
+          "transferred.",
+          [entry.message for entry in log_entries],
+      )
+
+  def testNegotiateBlobsRaisesOnTooLargeChunkSize(self):
+    action = rdf_file_finder.FileFinderAction.Download(
+        chunk_size=constants.CLIENT_MAX_BUFFER_SIZE + 1, negotiate_blobs=True
+    )
+
+    with self.assertRaisesRegex(RuntimeError, "exceeds the maximum"):
+      flow_test_lib.StartAndRunFlow(
+          file_finder.ClientFileFinder,
+          action_mocks.ClientFileFinderClientMock(),
+          client_id=self.client_id,
+          flow_args=rdf_file_finder.FileFinderArgs(
+              paths=[os.path.join(self.base_path, "History.plist")],
+              pathtype=rdf_paths.PathSpec.PathType.OS,
+              action=action,
+          ),
+          creator=self.test_username,
+      )
+
   def testClientFileFinderDownload(self):
     paths = [os.path.join(self.base_path, "{**,.}/*.plist")]
     action = rdf_file_finder.FileFinderAction.Action.DOWNLOAD
@@ -1,24 +1,38 @@
 #!/usr/bin/env python
 """A module that defines the timeline flow."""
 
+import dataclasses
+import fnmatch
+import logging
 from typing import Iterator
 from typing import Optional
+from typing import Set
 
 from google.protobuf import any_pb2
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
 from grr_response_core.lib.util import timeline
+from grr_response_core.stats import metrics
+from grr_response_proto import flows_pb2
 from grr_response_proto import timeline_pb2
 from grr_response_server import data_store
 from grr_response_server import flow_base
 from grr_response_server import flow_responses
 from grr_response_server import server_stubs
+from grr_response_server.flows.general import timeline_columnar
 from grr_response_server.models import blobs as models_blobs
 from grr_response_server.rdfvalues import mig_flow_objects
 from grr_response_proto import rrg_pb2
 from grr_response_proto.rrg.action import get_filesystem_timeline_pb2 as rrg_get_filesystem_timeline_pb2
 
 
+TIMELINE_WALK_ENTRIES_PER_SECOND = metrics.Event(
+    "timeline_walk_entries_per_second",
+    bins=[2**i for i in range(6, 20)],
+)
+
+
 class TimelineFlow(flow_base.FlowBase):
   """A flow recursively collecting stat information under the given directory.
 
@@ -45,6 +59,8 @@ class TimelineFlow(flow_base.FlowBase):
   progress_type = rdf_timeline.TimelineProgress
   result_types = (rdf_timeline.TimelineResult,)
 
+  proto_store_type = timeline_pb2.TimelineStore
+
   def Start(self) -> None:
     super().Start()
 
@@ -66,12 +82,62 @@ class TimelineFlow(flow_base.FlowBase):
           next_state=self.HandleRRGGetFilesystemTimeline.__name__,
       )
     else:
+      request = self.args
+      if self.args.incremental:
+        request = self.args.Copy()
+        request.timeline_id = self.rdf_flow.flow_id
+
+        base_flow_id = self._FindBaseTimelineFlowId()
+        if base_flow_id is not None:
+          request.base_timeline_id = base_flow_id
+          self.store.base_flow_id = base_flow_id
+
       self.CallClient(
           action_cls=server_stubs.Timeline,
-          request=self.args,
+          request=request,
           next_state=self.Process.__name__,
       )
 
+  def _FindBaseTimelineFlowId(self) -> Optional[str]:
+    """Finds the latest incremental timeline flow of the same root.
+
+    Returns:
+      An identifier of the flow or `None` if there is no such flow or if a full
+      timeline should be collected because the chain of incremental timelines
+      is already too long.
+    """
+    flow_objs = data_store.REL_DB.ReadAllFlowObjects(
+        client_id=self.rdf_flow.client_id,
+        include_child_flows=False,
+    )
+
+    base_flow_obj = None
+    for flow_obj in flow_objs:
+      if flow_obj.flow_class_name != TimelineFlow.__name__:
+        continue
+      if flow_obj.flow_state != flows_pb2.Flow.FlowState.FINISHED:
+        continue
+
+      args = timeline_pb2.TimelineArgs()
+      flow_obj.args.Unpack(args)
+      if not args.incremental or args.root != self.args.root:
+        continue
+
+      if (
+          base_flow_obj is None
+          or flow_obj.create_time > base_flow_obj.create_time
+      ):
+        base_flow_obj = flow_obj
+
+    if base_flow_obj is None:
+      return None
+
+    max_delta_depth = config.CONFIG["Server.timeline_max_delta_depth"]
+    if _UnpackStore(base_flow_obj).delta_depth >= max_delta_depth:
+      return None
+
+    return base_flow_obj.flow_id
+
   def Process(
       self,
       responses: flow_responses.Responses[rdf_timeline.TimelineResult],
@@ -80,16 +146,87 @@ class TimelineFlow(flow_base.FlowBase):
       raise flow_base.FlowError(responses.status)
 
     blob_ids = []
+    removed_path_hash_blob_ids = []
+    base_timeline_ids = set()
     for response in responses:
       for blob_id in response.entry_batch_blob_ids:
         blob_ids.append(models_blobs.BlobID(blob_id))
+      for blob_id in response.removed_path_hash_batch_blob_ids:
+        removed_path_hash_blob_ids.append(models_blobs.BlobID(blob_id))
+      base_timeline_ids.add(response.base_timeline_id)
 
-    data_store.BLOBS.WaitForBlobs(blob_ids, timeout=_BLOB_STORE_TIMEOUT)
+    if len(base_timeline_ids) > 1:
+      raise flow_base.FlowError(
+          f"Inconsistent base timelines: {sorted(base_timeline_ids)}"
+      )
+    base_timeline_id = base_timeline_ids.pop() if base_timeline_ids else ""
+
+    # The client falls back to collecting the full timeline if it does not have
+    # the digest of the base one anymore.
+    if not base_timeline_id:
+      self.store.ClearField("base_flow_id")
+    elif base_timeline_id != self.store.base_flow_id:
+      raise flow_base.FlowError(
+          f"Unexpected base timeline: '{base_timeline_id}'"
+      )
+
+    data_store.BLOBS.WaitForBlobs(
+        blob_ids + removed_path_hash_blob_ids, timeout=_BLOB_STORE_TIMEOUT
+    )
 
     for response in responses:
       self.SendReply(response)
       self.state.progress.total_entry_count += response.entry_count
 
+    self._RecordWalkThroughput(responses)
+
+    blobs = (_ReadBlob(blob_id) for blob_id in blob_ids)
+    entries = timeline.DeserializeTimelineEntryProtoStream(blobs)
+
+    if self.store.base_flow_id:
+      base_store = _ReadStore(self.rdf_flow.client_id, self.store.base_flow_id)
+      self.store.delta_depth = base_store.delta_depth + 1
+      self.store.removed_path_hash_batch_blob_ids.extend(
+          map(bytes, removed_path_hash_blob_ids)
+      )
+
+      entries = _ApplyDelta(
+          _FullProtoEntries(self.rdf_flow.client_id, self.store.base_flow_id),
+          entries,
+          _RemovedPathHashes(self.store),
+      )
+
+    self._WriteColumnarTimeline(entries)
+
+  def _RecordWalkThroughput(
+      self,
+      responses: flow_responses.Responses[rdf_timeline.TimelineResult],
+  ) -> None:
+    """Records the throughput of the filesystem walk done by the client."""
+    walk_entry_count = 0
+    walk_duration_micros = 0
+    for response in responses:
+      walk_entry_count = max(walk_entry_count, response.walk_entry_count)
+      walk_duration_micros = max(
+          walk_duration_micros, response.walk_duration_micros
+      )
+
+    # Older clients do not report walk statistics.
+    if not walk_duration_micros:
+      return
+
+    entries_per_second = walk_entry_count / (walk_duration_micros / 1_000_000)
+    self.state.progress.walk_entries_per_second = entries_per_second
+    TIMELINE_WALK_ENTRIES_PER_SECOND.RecordEvent(entries_per_second)
+
+    logging.info(
+        "Timeline flow %s walked %d entries in %.1fs (%.1f entries/s).",
+        self.rdf_flow.flow_id,
+        walk_entry_count,
+        walk_duration_micros / 1_000_000,
+        entries_per_second,
+    )
+
   @flow_base.UseProto2AnyResponses
   def HandleRRGGetFilesystemTimeline(
       self,
@@ -121,6 +258,32 @@ class TimelineFlow(flow_base.FlowBase):
     for flow_result in flow_results:
       self.SendReply(flow_result)
 
+    blobs = (_ReadBlob(blob_id) for blob_id in blob_ids)
+    self._WriteColumnarTimeline(
+        timeline.DeserializeTimelineEntryProtoStream(blobs)
+    )
+
+  def _WriteColumnarTimeline(
+      self,
+      entries: Iterator[timeline_pb2.TimelineEntry],
+  ) -> None:
+    """Converts the full collected timeline to the columnar format."""
+    # The columnar timeline is only an optimization for exports and queries,
+    # which fall back to the collected blobs if it is missing, so failing to
+    # convert the timeline should not fail the whole flow.
+    try:
+      index_blob_id = timeline_columnar.Write(entries)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+      logging.exception(
+          "Failed to convert timeline of flow %s/%s",
+          self.rdf_flow.client_id,
+          self.rdf_flow.flow_id,
+      )
+      self.Log("Failed to convert the timeline to columnar format: %s", error)
+      return
+
+    self.store.columnar_index_blob_id = bytes(index_blob_id)
+
   def GetProgress(self) -> rdf_timeline.TimelineProgress:
     if hasattr(self.state, "progress"):
       return self.state.progress
@@ -133,6 +296,9 @@ def ProtoEntries(
 ) -> Iterator[timeline_pb2.TimelineEntry]:
   """Retrieves timeline entries for the specified flow.
 
+  If the timeline was collected incrementally, the full timeline is
+  reconstructed from the base timeline and the collected differences.
+
   Args:
     client_id: An identifier of a client of the flow to retrieve the blobs for.
     flow_id: An identifier of the flow to retrieve the blobs for.
@@ -140,8 +306,15 @@ def ProtoEntries(
   Returns:
     An iterator over timeline entries protos for the specified flow.
   """
-  blobs = Blobs(client_id, flow_id)
-  return timeline.DeserializeTimelineEntryProtoStream(blobs)
+  store = _ReadStore(client_id, flow_id)
+
+  blobs = _CollectedBlobs(client_id, flow_id)
+  entries = timeline.DeserializeTimelineEntryProtoStream(blobs)
+  if not store.base_flow_id:
+    return entries
+
+  base_entries = _FullProtoEntries(client_id, store.base_flow_id)
+  return _ApplyDelta(base_entries, entries, _RemovedPathHashes(store))
 
 
 def Blobs(
@@ -150,8 +323,32 @@ def Blobs(
 ) -> Iterator[bytes]:
   """Retrieves timeline blobs for the specified flow.
 
+  If the timeline was collected incrementally, the blobs are serialized from
+  the reconstructed full timeline rather than being the collected ones.
+
   Args:
-    client_id: An identifier of a client of the flow to retrieve the blobs for.
+    client_id: An identifier of the client of the flow to retrieve blobs for.
+    flow_id: An identifier of the flow to retrieve the blobs for.
+
+  Returns:
+    Blobs of the timeline data in the gzchunked format for the specified flow.
+  """
+  store = _ReadStore(client_id, flow_id)
+  if store.base_flow_id:
+    entries = ProtoEntries(client_id, flow_id)
+    return rdf_timeline.SerializeTimelineEntryStream(entries)
+
+  return _CollectedBlobs(client_id, flow_id)
+
+
+def _CollectedBlobs(
+    client_id: str,
+    flow_id: str,
+) -> Iterator[bytes]:
+  """Retrieves timeline blobs collected by the specified flow.
+
+  Args:
+    client_id: An identifier of the client of the flow to retrieve blobs for.
     flow_id: An identifier of the flow to retrieve the blobs for.
 
   Yields:
@@ -180,14 +377,225 @@ def Blobs(
       raise TypeError(message)
 
     for entry_batch_blob_id in payload.entry_batch_blob_ids:
-      blob_id = models_blobs.BlobID(entry_batch_blob_id)
-      blob = data_store.BLOBS.ReadBlob(blob_id)
+      yield _ReadBlob(models_blobs.BlobID(entry_batch_blob_id))
 
-      if blob is None:
-        message = "Reference to non-existing blob: '{}'".format(blob_id)
-        raise AssertionError(message)
 
-      yield blob
+def _FullProtoEntries(
+    client_id: str,
+    flow_id: str,
+) -> Iterator[timeline_pb2.TimelineEntry]:
+  """Retrieves the full timeline, from its columnar version if possible."""
+  index = ColumnarIndex(client_id=client_id, flow_id=flow_id)
+  if index is not None:
+    return timeline_columnar.Entries(index)
+
+  return ProtoEntries(client_id=client_id, flow_id=flow_id)
+
+
+def _ApplyDelta(
+    base_entries: Iterator[timeline_pb2.TimelineEntry],
+    changed_entries: Iterator[timeline_pb2.TimelineEntry],
+    removed_path_hashes: Set[bytes],
+) -> Iterator[timeline_pb2.TimelineEntry]:
+  """Applies differences collected incrementally to the base timeline.
+
+  Changed entries replace base entries with the same path in place, so the
+  order of the base timeline is preserved. Added entries follow all the
+  entries of the base timeline.
+
+  Args:
+    base_entries: Entries of the base timeline.
+    changed_entries: Entries added or changed since the base timeline.
+    removed_path_hashes: Hashes of paths of entries removed since the base
+      timeline.
+
+  Yields:
+    Entries of the full timeline.
+  """
+  # There should be few changed entries compared to the size of the whole
+  # timeline, so it is fine to keep them in memory.
+  changed_entries_by_path = {entry.path: entry for entry in changed_entries}
+
+  for entry in base_entries:
+    changed_entry = changed_entries_by_path.pop(entry.path, None)
+    if changed_entry is not None:
+      yield changed_entry
+    elif timeline.PathHash(entry.path) not in removed_path_hashes:
+      yield entry
+
+  yield from changed_entries_by_path.values()
+
+
+def _RemovedPathHashes(store: timeline_pb2.TimelineStore) -> Set[bytes]:
+  """Reads hashes of paths removed since the base timeline of the store."""
+  blobs = (
+      _ReadBlob(models_blobs.BlobID(blob_id))
+      for blob_id in store.removed_path_hash_batch_blob_ids
+  )
+  return set(timeline.DeserializePathHashStream(blobs))
+
+
+@dataclasses.dataclass(frozen=True)
+class EntryFilter:
+  """A filter of timeline entries.
+
+  Attributes:
+    path_prefix: If set, only entries with paths starting with it match.
+    path_glob: If set, only entries with paths matching this `fnmatch`-style
+      pattern match. Note that wildcards match path separators as well.
+    time_field: A name of the timestamp field that the time bounds apply to.
+    min_time_ns: If set, only entries with the timestamp not earlier match.
+    max_time_ns: If set, only entries with the timestamp earlier match.
+    min_size: If set, only entries with the size not smaller match.
+    max_size: If set, only entries with the size smaller match.
+  """
+
+  path_prefix: Optional[bytes] = None
+  path_glob: Optional[bytes] = None
+  time_field: str = "mtime_ns"
+  min_time_ns: Optional[int] = None
+  max_time_ns: Optional[int] = None
+  min_size: Optional[int] = None
+  max_size: Optional[int] = None
+
+  def __post_init__(self):
+    if self.time_field not in _TIME_FIELDS:
+      raise ValueError(f"Invalid timeline time field: '{self.time_field}'")
+
+  @property
+  def columns(self) -> tuple[str, str, str]:
+    """Names of the columns the filter needs to check entries."""
+    return ("path", self.time_field, "size")
+
+  def Matches(self, path: bytes, time_ns: int, size: int) -> bool:
+    """Checks whether an entry with the given values matches the filter."""
+    if self.path_prefix is not None and not path.startswith(self.path_prefix):
+      return False
+    if self.path_glob is not None and not fnmatch.fnmatchcase(
+        path, self.path_glob
+    ):
+      return False
+    if self.min_time_ns is not None and time_ns < self.min_time_ns:
+      return False
+    if self.max_time_ns is not None and time_ns >= self.max_time_ns:
+      return False
+    if self.min_size is not None and size < self.min_size:
+      return False
+    if self.max_size is not None and size >= self.max_size:
+      return False
+    return True
+
+  def MatchesEntry(self, entry: timeline_pb2.TimelineEntry) -> bool:
+    return self.Matches(
+        entry.path, getattr(entry, self.time_field), entry.size
+    )
+
+  def MatchesRowGroup(self, row_group: timeline_pb2.TimelineRowGroup) -> bool:
+    """Checks whether a columnar timeline row group may have matching rows."""
+    path_prefix = self.path_prefix
+    if path_prefix is None and self.path_glob is not None:
+      path_prefix = _GlobLiteralPrefix(self.path_glob)
+
+    filters = [
+        timeline_columnar.PathPrefixFilter(path_prefix or b""),
+        timeline_columnar.RangeFilter(
+            self.time_field, self.min_time_ns, self.max_time_ns
+        ),
+        timeline_columnar.RangeFilter("size", self.min_size, self.max_size),
+    ]
+    return all(row_group_filter(row_group) for row_group_filter in filters)
+
+
+def FilteredProtoEntries(
+    client_id: str,
+    flow_id: str,
+    entry_filter: EntryFilter,
+    start: int = 0,
+) -> Iterator[tuple[int, timeline_pb2.TimelineEntry]]:
+  """Retrieves timeline entries of the specified flow matching the filter.
+
+  If the timeline was converted to the columnar format, filters are pushed
+  down to it: row groups that cannot contain matching entries are skipped and
+  only columns the filter needs are read for non-matching rows. Otherwise, all
+  of the collected entries are scanned.
+
+  Args:
+    client_id: An identifier of a client of the flow.
+    flow_id: An identifier of the flow.
+    entry_filter: A filter that the entries have to match.
+    start: A position of the first entry to consider. It can be used to resume
+      iteration using a position of the last entry retrieved previously.
+
+  Yields:
+    Pairs of positions (in the collection order) and matching entries.
+  """
+  index = ColumnarIndex(client_id=client_id, flow_id=flow_id)
+  if index is not None:
+    yield from timeline_columnar.MatchingEntries(
+        index,
+        predicate_columns=entry_filter.columns,
+        predicate=entry_filter.Matches,
+        row_group_filter=entry_filter.MatchesRowGroup,
+        start=start,
+    )
+    return
+
+  entries = ProtoEntries(client_id=client_id, flow_id=flow_id)
+  for position, entry in enumerate(entries):
+    if position >= start and entry_filter.MatchesEntry(entry):
+      yield position, entry
+
+
+def _GlobLiteralPrefix(glob: bytes) -> bytes:
+  """Returns the longest prefix of the glob without any wildcards."""
+  for position, char in enumerate(glob):
+    if char in _GLOB_WILDCARDS:
+      return glob[:position]
+  return glob
+
+
+def ColumnarIndex(
+    client_id: str,
+    flow_id: str,
+) -> Optional[timeline_pb2.TimelineColumnarIndex]:
+  """Retrieves the columnar index of the timeline of the specified flow.
+
+  Args:
+    client_id: An identifier of a client of the flow.
+    flow_id: An identifier of the flow.
+
+  Returns:
+    The columnar timeline index or `None` if the timeline was not converted to
+    the columnar format (e.g. because it was collected before the format was
+    introduced).
+  """
+  store = _ReadStore(client_id, flow_id)
+  if not store.columnar_index_blob_id:
+    return None
+
+  index_blob_id = models_blobs.BlobID(store.columnar_index_blob_id)
+  return timeline_columnar.ReadIndex(index_blob_id)
+
+
+def _ReadStore(client_id: str, flow_id: str) -> timeline_pb2.TimelineStore:
+  flow_obj = data_store.REL_DB.ReadFlowObject(client_id, flow_id)
+  return _UnpackStore(flow_obj)
+
+
+def _UnpackStore(flow_obj: flows_pb2.Flow) -> timeline_pb2.TimelineStore:
+  store = timeline_pb2.TimelineStore()
+  if flow_obj.HasField("store"):
+    flow_obj.store.Unpack(store)
+  return store
+
+
+def _ReadBlob(blob_id: models_blobs.BlobID) -> bytes:
+  blob = data_store.BLOBS.ReadBlob(blob_id)
+  if blob is None:
+    message = "Reference to non-existing blob: '{}'".format(blob_id)
+    raise AssertionError(message)
+
+  return blob
 
 
 def FilesystemType(client_id: str, flow_id: str) -> Optional[str]:
@@ -215,6 +623,12 @@ def FilesystemType(client_id: str, flow_id: str) -> Optional[str]:
   return result.filesystem_type
 
 
+# Timeline entry fields that can be used to filter entries by time.
+_TIME_FIELDS = frozenset(["atime_ns", "mtime_ns", "ctime_ns", "btime_ns"])
+
+# Byte values of characters with a special meaning in `fnmatch` patterns.
+_GLOB_WILDCARDS = frozenset(b"*?[")
+
 # Number of results should never be big, usually no more than 2 or 3 results
 # per flow (because each result is just a block of references to much bigger
 # blobs). Just to be on the safe side, we use a number two orders of magnitude
@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+"""A module with the columnar storage format of collected timelines.
+
+Timeline entries are grouped into row groups of consecutive entries. Values of
+every `TimelineEntry` field within a row group are stored together (as a
+column) in a separate compressed blob. The row group layout and per-column
+statistics (minimum and maximum values) are kept in a `TimelineColumnarIndex`
+which is stored in the blob store as well.
+
+This allows exports and queries to read only the columns they need and to skip
+row groups that cannot contain any matching entries, without decompressing and
+parsing the whole timeline.
+"""
+
+import array
+from collections.abc import Callable, Iterable, Iterator, Sequence
+import struct
+import sys
+from typing import NamedTuple, Optional, Union
+import zlib
+
+from grr_response_core.lib.util import collection
+from grr_response_proto import timeline_pb2
+from grr_response_server import data_store
+from grr_response_server.models import blobs as models_blobs
+
+# The default number of timeline entries in a single row group.
+ROW_GROUP_SIZE = 65_536
+
+# `array` type codes of integer columns. `TimelineEntry` integer fields are all
+# 64-bit wide.
+_INT = "q"
+_UINT = "Q"
+# A pseudo type code of byte string columns.
+_BYTES = "bytes"
+
+_ZLIB_LEVEL = 6
+
+# Values of a single column of a row group.
+ColumnValues = Union[array.array, Sequence[bytes]]
+
+# A predicate deciding whether a row group may contain entries of interest.
+RowGroupFilter = Callable[[timeline_pb2.TimelineRowGroup], bool]
+
+
+class Column(NamedTuple):
+  """A column of the columnar timeline, i.e. a `TimelineEntry` field."""
+
+  name: str
+  typecode: str
+
+
+COLUMNS = (
+    Column("path", _BYTES),
+    Column("mode", _INT),
+    Column("size", _UINT),
+    Column("dev", _INT),
+    Column("ino", _UINT),
+    Column("uid", _INT),
+    Column("gid", _INT),
+    Column("atime_ns", _INT),
+    Column("mtime_ns", _INT),
+    Column("ctime_ns", _INT),
+    Column("btime_ns", _INT),
+    Column("attributes", _UINT),
+)
+
+_COLUMNS_BY_NAME = {column.name: column for column in COLUMNS}
+
+COLUMN_NAMES = tuple(column.name for column in COLUMNS)
+
+
+def _EncodeIntColumn(typecode: str, values: Iterable[int]) -> bytes:
+  data = array.array(typecode, values)
+  if sys.byteorder != "little":
+    data.byteswap()
+  return data.tobytes()
+
+
+def _DecodeIntColumn(typecode: str, data: bytes) -> array.array:
+  values = array.array(typecode)
+  values.frombytes(data)
+  if sys.byteorder != "little":
+    values.byteswap()
+  return values
+
+
+def _EncodeBytesColumn(values: Sequence[bytes]) -> bytes:
+  # Byte strings are stored as an array of their lengths followed by all of
+  # the byte strings concatenated.
+  lengths = _EncodeIntColumn(_UINT, map(len, values))
+  return struct.pack("<Q", len(values)) + lengths + b"".join(values)
+
+
+def _DecodeBytesColumn(data: bytes) -> list[bytes]:
+  (count,) = struct.unpack_from("<Q", data)
+  offset = struct.calcsize("<Q")
+  lengths = _DecodeIntColumn(_UINT, data[offset : offset + 8 * count])
+  offset += 8 * count
+
+  values = []
+  for length in lengths:
+    values.append(data[offset : offset + length])
+    offset += length
+  return values
+
+
+def _EncodeColumn(
+    column: Column,
+    entries: Sequence[timeline_pb2.TimelineEntry],
+) -> tuple[bytes, timeline_pb2.TimelineColumnChunk]:
+  """Encodes values of the given column and computes their statistics."""
+  values = [getattr(entry, column.name) for entry in entries]
+
+  chunk = timeline_pb2.TimelineColumnChunk(name=column.name)
+  if column.typecode == _BYTES:
+    data = _EncodeBytesColumn(values)
+    chunk.min_bytes = min(values)
+    chunk.max_bytes = max(values)
+  else:
+    data = _EncodeIntColumn(column.typecode, values)
+    if column.typecode == _INT:
+      chunk.min_int = min(values)
+      chunk.max_int = max(values)
+    else:
+      chunk.min_uint = min(values)
+      chunk.max_uint = max(values)
+
+  return zlib.compress(data, _ZLIB_LEVEL), chunk
+
+
+def _DecodeColumn(column: Column, blob: bytes) -> ColumnValues:
+  data = zlib.decompress(blob)
+  if column.typecode == _BYTES:
+    return _DecodeBytesColumn(data)
+  return _DecodeIntColumn(column.typecode, data)
+
+
+def _WriteRowGroup(
+    entries: Sequence[timeline_pb2.TimelineEntry],
+) -> timeline_pb2.TimelineRowGroup:
+  """Writes column blobs of a single row group to the blob store."""
+  row_group = timeline_pb2.TimelineRowGroup(entry_count=len(entries))
+
+  blobs = {}
+  for column in COLUMNS:
+    blob, chunk = _EncodeColumn(column, entries)
+    blob_id = models_blobs.BlobID.Of(blob)
+    blobs[blob_id] = blob
+
+    chunk.blob_id = bytes(blob_id)
+    row_group.columns.append(chunk)
+
+  data_store.BLOBS.WriteBlobs(blobs)
+  return row_group
+
+
+def Write(
+    entries: Iterable[timeline_pb2.TimelineEntry],
+    row_group_size: int = ROW_GROUP_SIZE,
+) -> models_blobs.BlobID:
+  """Converts timeline entries to the columnar format.
+
+  Note that the format does not distinguish unset fields from fields set to
+  the default (zero) value.
+
+  Args:
+    entries: Timeline entries to convert.
+    row_group_size: The maximum number of entries in a single row group.
+
+  Returns:
+    An identifier of the blob with the index of the converted timeline.
+  """
+  index = timeline_pb2.TimelineColumnarIndex()
+
+  for batch in collection.Batch(entries, row_group_size):
+    index.row_groups.append(_WriteRowGroup(batch))
+    index.entry_count += len(batch)
+
+  index_blob = index.SerializeToString()
+  index_blob_id = models_blobs.BlobID.Of(index_blob)
+  data_store.BLOBS.WriteBlobs({index_blob_id: index_blob})
+  return index_blob_id
+
+
+def ReadIndex(
+    index_blob_id: models_blobs.BlobID,
+) -> timeline_pb2.TimelineColumnarIndex:
+  """Reads the columnar timeline index from the blob store."""
+  index_blob = data_store.BLOBS.ReadBlob(index_blob_id)
+  if index_blob is None:
+    raise AssertionError(f"Reference to non-existing blob: '{index_blob_id}'")
+
+  index = timeline_pb2.TimelineColumnarIndex()
+  index.ParseFromString(index_blob)
+  return index
+
+
+def _CheckColumns(columns: Iterable[str]) -> None:
+  for name in columns:
+    if name not in _COLUMNS_BY_NAME:
+      raise ValueError(f"Unknown timeline column: '{name}'")
+
+
+def _ReadRowGroupColumns(
+    row_group: timeline_pb2.TimelineRowGroup,
+    columns: Sequence[str],
+) -> dict[str, ColumnValues]:
+  """Reads the given columns of a single row group."""
+  if not columns:
+    return {}
+
+  chunks = {chunk.name: chunk for chunk in row_group.columns}
+  blob_ids = {
+      name: models_blobs.BlobID(chunks[name].blob_id) for name in columns
+  }
+  blobs = data_store.BLOBS.ReadBlobs(list(blob_ids.values()))
+
+  values = {}
+  for name, blob_id in blob_ids.items():
+    blob = blobs[blob_id]
+    if blob is None:
+      raise AssertionError(f"Reference to non-existing blob: '{blob_id}'")
+    values[name] = _DecodeColumn(_COLUMNS_BY_NAME[name], blob)
+
+  return values
+
+
+def _MakeEntry(
+    values: dict[str, ColumnValues],
+    row: int,
+) -> timeline_pb2.TimelineEntry:
+  entry = timeline_pb2.TimelineEntry()
+  for name, column_values in values.items():
+    value = column_values[row]
+    if value:
+      setattr(entry, name, value)
+  return entry
+
+
+def ReadColumns(
+    index: timeline_pb2.TimelineColumnarIndex,
+    columns: Sequence[str] = COLUMN_NAMES,
+    row_group_filter: Optional[RowGroupFilter] = None,
+) -> Iterator[dict[str, ColumnValues]]:
+  """Reads the given columns of a columnar timeline.
+
+  Args:
+    index: An index of the columnar timeline to read.
+    columns: Names of the columns to read.
+    row_group_filter: If set, only row groups for which it returns `True` are
+      read.
+
+  Yields:
+    A mapping from column names to column values for every read row group.
+  """
+  _CheckColumns(columns)
+
+  for row_group in index.row_groups:
+    if row_group_filter is not None and not row_group_filter(row_group):
+      continue
+
+    yield _ReadRowGroupColumns(row_group, columns)
+
+
+def Entries(
+    index: timeline_pb2.TimelineColumnarIndex,
+    columns: Sequence[str] = COLUMN_NAMES,
+    row_group_filter: Optional[RowGroupFilter] = None,
+) -> Iterator[timeline_pb2.TimelineEntry]:
+  """Reconstructs timeline entries from a columnar timeline.
+
+  Args:
+    index: An index of the columnar timeline to read.
+    columns: Names of the columns to read. Other entry fields are left unset.
+    row_group_filter: If set, only row groups for which it returns `True` are
+      read.
+
+  Yields:
+    Timeline entries in the order in which they were collected.
+  """
+  for values in ReadColumns(index, columns, row_group_filter):
+    count = len(next(iter(values.values()), ()))
+    for row in range(count):
+      yield _MakeEntry(values, row)
+
+
+def MatchingEntries(
+    index: timeline_pb2.TimelineColumnarIndex,
+    predicate_columns: Sequence[str],
+    predicate: Callable[..., bool],
+    row_group_filter: Optional[RowGroupFilter] = None,
+    start: int = 0,
+) -> Iterator[tuple[int, timeline_pb2.TimelineEntry]]:
+  """Yields timeline entries matching the given predicate.
+
+  Only the predicate columns are read for all rows of the row groups that pass
+  the row group filter. The remaining columns are read only for row groups
+  that have at least one matching row.
+
+  Args:
+    index: An index of the columnar timeline to read.
+    predicate_columns: Names of the columns the predicate needs.
+    predicate: A function called with values of the predicate columns (in the
+      given order) of every row, returning whether the row matches.
+    row_group_filter: If set, only row groups for which it returns `True` are
+      read.
+    start: A position of the first entry to consider.
+
+  Yields:
+    Pairs of positions (in the collection order) and matching entries.
+  """
+  _CheckColumns(predicate_columns)
+
+  position = 0
+  for row_group in index.row_groups:
+    group_start = position
+    position += row_group.entry_count
+
+    if position <= start:
+      continue
+    if row_group_filter is not None and not row_group_filter(row_group):
+      continue
+
+    values = _ReadRowGroupColumns(row_group, predicate_columns)
+    predicate_values = [values[name] for name in predicate_columns]
+
+    first_row = max(start - group_start, 0)
+    rows = [
+        row
+        for row in range(first_row, row_group.entry_count)
+        if predicate(*(column[row] for column in predicate_values))
+    ]
+    if not rows:
+      continue
+
+    other_columns = [name for name in COLUMN_NAMES if name not in values]
+    values.update(_ReadRowGroupColumns(row_group, other_columns))
+
+    for row in rows:
+      yield group_start + row, _MakeEntry(values, row)
+
+
+def _Chunk(
+    row_group: timeline_pb2.TimelineRowGroup,
+    name: str,
+) -> timeline_pb2.TimelineColumnChunk:
+  for chunk in row_group.columns:
+    if chunk.name == name:
+      return chunk
+  raise ValueError(f"Unknown timeline column: '{name}'")
+
+
+def RangeFilter(
+    name: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> RowGroupFilter:
+  """Creates a filter of row groups that may have values in the given range.
+
+  Args:
+    name: A name of an integer column, e.g. `mtime_ns`.
+    start: An inclusive lower bound of the range (unbounded if not set).
+    end: An exclusive upper bound of the range (unbounded if not set).
+
+  Returns:
+    A row group filter.
+  """
+  column = _COLUMNS_BY_NAME.get(name)
+  if column is None or column.typecode == _BYTES:
+    raise ValueError(f"Not an integer timeline column: '{name}'")
+
+  def Filter(row_group: timeline_pb2.TimelineRowGroup) -> bool:
+    chunk = _Chunk(row_group, name)
+    if column.typecode == _INT:
+      min_value, max_value = chunk.min_int, chunk.max_int
+    else:
+      min_value, max_value = chunk.min_uint, chunk.max_uint
+
+    if start is not None and max_value < start:
+      return False
+    if end is not None and min_value >= end:
+      return False
+    return True
+
+  return Filter
+
+
+def PathPrefixFilter(prefix: bytes) -> RowGroupFilter:
+  """Creates a filter of row groups that may have paths with the given prefix.
+
+  Args:
+    prefix: A path prefix.
+
+  Returns:
+    A row group filter.
+  """
+
+  def Filter(row_group: timeline_pb2.TimelineRowGroup) -> bool:
+    chunk = _Chunk(row_group, "path")
+    # All paths starting with the prefix sort between the prefix itself and
+    # the prefix followed by an arbitrary long sequence of `\xff` bytes, so the
+    # group may contain such paths only if its range overlaps with that.
+    if chunk.max_bytes < prefix:
+      return False
+    if chunk.min_bytes[: len(prefix)] > prefix:
+      return False
+    return True
+
+  return Filter
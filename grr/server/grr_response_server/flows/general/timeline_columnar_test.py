@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+from absl.testing import absltest
+
+from grr_response_proto import timeline_pb2
+from grr_response_server import blob_store as abstract_bs
+from grr_response_server.databases import db as abstract_db
+from grr_response_server.flows.general import timeline_columnar
+from grr.test_lib import db_test_lib
+
+
+def _Entry(path: bytes, **kwargs) -> timeline_pb2.TimelineEntry:
+  return timeline_pb2.TimelineEntry(path=path, **kwargs)
+
+
+class TimelineColumnarTest(absltest.TestCase):
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testEmpty(self, db: abstract_db.Database, bs: abstract_bs.BlobStore):
+    del db, bs  # Unused.
+
+    index_blob_id = timeline_columnar.Write([])
+    index = timeline_columnar.ReadIndex(index_blob_id)
+
+    self.assertEqual(index.entry_count, 0)
+    self.assertEmpty(list(timeline_columnar.Entries(index)))
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testRoundTrip(
+      self,
+      db: abstract_db.Database,
+      bs: abstract_bs.BlobStore,
+  ):
+    del db, bs  # Unused.
+
+    entries = [
+        _Entry(b"/foo", mode=0o40755, size=4096, uid=1000, gid=1000),
+        _Entry(b"/foo/bar", size=2**63 + 1, ino=2**64 - 1, mtime_ns=-1),
+        _Entry(b"/foo/\xff\x00baz", atime_ns=1, ctime_ns=2, btime_ns=3),
+        _Entry(b"/", dev=42, attributes=7),
+    ]
+
+    index_blob_id = timeline_columnar.Write(entries, row_group_size=3)
+    index = timeline_columnar.ReadIndex(index_blob_id)
+
+    self.assertEqual(index.entry_count, 4)
+    self.assertLen(index.row_groups, 2)
+    self.assertEqual(list(timeline_columnar.Entries(index)), entries)
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testReadColumnsSubset(
+      self,
+      db: abstract_db.Database,
+      bs: abstract_bs.BlobStore,
+  ):
+    del db, bs  # Unused.
+
+    entries = [_Entry(f"/{i}".encode("ascii"), size=i) for i in range(5)]
+
+    index_blob_id = timeline_columnar.Write(entries, row_group_size=2)
+    index = timeline_columnar.ReadIndex(index_blob_id)
+
+    row_groups = list(timeline_columnar.ReadColumns(index, columns=["size"]))
+    self.assertLen(row_groups, 3)
+    for values in row_groups:
+      self.assertEqual(list(values), ["size"])
+
+    sizes = [size for values in row_groups for size in values["size"]]
+    self.assertEqual(sizes, [0, 1, 2, 3, 4])
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testReadColumnsUnknownColumn(
+      self,
+      db: abstract_db.Database,
+      bs: abstract_bs.BlobStore,
+  ):
+    del db, bs  # Unused.
+
+    index_blob_id = timeline_columnar.Write([_Entry(b"/foo")])
+    index = timeline_columnar.ReadIndex(index_blob_id)
+
+    with self.assertRaises(ValueError):
+      list(timeline_columnar.ReadColumns(index, columns=["foo"]))
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testRangeFilter(
+      self,
+      db: abstract_db.Database,
+      bs: abstract_bs.BlobStore,
+  ):
+    del db, bs  # Unused.
+
+    entries = [_Entry(b"/foo", mtime_ns=i * 10) for i in range(10)]
+
+    index_blob_id = timeline_columnar.Write(entries, row_group_size=2)
+    index = timeline_columnar.ReadIndex(index_blob_id)
+
+    row_group_filter = timeline_columnar.RangeFilter("mtime_ns", 25, 50)
+    result = timeline_columnar.Entries(
+        index, columns=["mtime_ns"], row_group_filter=row_group_filter
+    )
+
+    # Row groups are skipped as a whole, so only entries that share a row
+    # group with matching entries are returned.
+    self.assertEqual([entry.mtime_ns for entry in result], [20, 30, 40, 50])
+
+  def testRangeFilterRaisesOnBytesColumn(self):
+    with self.assertRaises(ValueError):
+      timeline_columnar.RangeFilter("path", 0, 1)
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testPathPrefixFilter(
+      self,
+      db: abstract_db.Database,
+      bs: abstract_bs.BlobStore,
+  ):
+    del db, bs  # Unused.
+
+    entries = [
+        _Entry(b"/bar/1"),
+        _Entry(b"/bar/2"),
+        _Entry(b"/etc/1"),
+        _Entry(b"/etc/2"),
+        _Entry(b"/foo/1"),
+        _Entry(b"/foo/2"),
+    ]
+
+    index_blob_id = timeline_columnar.Write(entries, row_group_size=2)
+    index = timeline_columnar.ReadIndex(index_blob_id)
+
+    row_group_filter = timeline_columnar.PathPrefixFilter(b"/etc/")
+    result = timeline_columnar.Entries(
+        index, columns=["path"], row_group_filter=row_group_filter
+    )
+
+    self.assertEqual([entry.path for entry in result], [b"/etc/1", b"/etc/2"])
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testMatchingEntries(
+      self,
+      db: abstract_db.Database,
+      bs: abstract_bs.BlobStore,
+  ):
+    del db, bs  # Unused.
+
+    entries = [_Entry(f"/{i}".encode("ascii"), size=i, uid=i) for i in range(9)]
+
+    index_blob_id = timeline_columnar.Write(entries, row_group_size=3)
+    index = timeline_columnar.ReadIndex(index_blob_id)
+
+    result = timeline_columnar.MatchingEntries(
+        index,
+        predicate_columns=["size"],
+        predicate=lambda size: size % 4 == 0,
+    )
+    expected = [(0, entries[0]), (4, entries[4]), (8, entries[8])]
+    self.assertEqual(list(result), expected)
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testMatchingEntriesStart(
+      self,
+      db: abstract_db.Database,
+      bs: abstract_bs.BlobStore,
+  ):
+    del db, bs  # Unused.
+
+    entries = [_Entry(f"/{i}".encode("ascii"), size=i) for i in range(9)]
+
+    index_blob_id = timeline_columnar.Write(entries, row_group_size=3)
+    index = timeline_columnar.ReadIndex(index_blob_id)
+
+    result = timeline_columnar.MatchingEntries(
+        index,
+        predicate_columns=["path", "size"],
+        predicate=lambda path, size: size > 0,
+        start=4,
+    )
+    self.assertEqual([position for position, _ in result], [4, 5, 6, 7, 8])
+
+
+if __name__ == "__main__":
+  absltest.main()
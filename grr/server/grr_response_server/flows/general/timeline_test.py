@@ -13,17 +13,21 @@ from grr_response_core.lib.util import temp
 from grr_response_proto import objects_pb2
 from grr_response_proto import timeline_pb2
 from grr_response_server import blob_store as abstract_bs
+from grr_response_server import data_store
 from grr_response_server import flow_responses
 from grr_response_server.databases import db as abstract_db
 from grr_response_server.databases import db_test_utils
 from grr_response_server.flows.general import timeline as timeline_flow
+from grr_response_server.flows.general import timeline_columnar
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import mig_flow_objects
 from grr.test_lib import action_mocks
 from grr.test_lib import db_test_lib
 from grr.test_lib import filesystem_test_lib
 from grr.test_lib import flow_test_lib
+from grr.test_lib import test_lib
 from grr.test_lib import testing_startup
+from grr.test_lib import timeline_test_lib
 from grr_response_proto.rrg.action import get_filesystem_timeline_pb2 as rrg_get_filesystem_timeline_pb2
 
 
@@ -200,6 +204,122 @@ class TimelineTest(flow_test_lib.FlowTestsBaseclass):
   # TODO(hanuszczak): Add tests for symlinks.
   # TODO(hanuszczak): Add tests for timestamps.
 
+  def testColumnarTimeline(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      filesystem_test_lib.CreateFile(os.path.join(dirpath, "foo"), b"foo")
+      filesystem_test_lib.CreateFile(os.path.join(dirpath, "bar"), b"barbaz")
+
+      flow_id = flow_test_lib.StartAndRunFlow(
+          timeline_flow.TimelineFlow,
+          action_mocks.ActionMock(timeline_action.Timeline),
+          client_id=self.client_id,
+          creator=self.test_username,
+          flow_args=rdf_timeline.TimelineArgs(root=dirpath.encode("utf-8")),
+      )
+
+    entries = list(
+        timeline_flow.ProtoEntries(client_id=self.client_id, flow_id=flow_id)
+    )
+
+    index = timeline_flow.ColumnarIndex(self.client_id, flow_id)
+    self.assertIsNotNone(index)
+    self.assertEqual(index.entry_count, 3)
+
+    columnar_entries = list(timeline_columnar.Entries(index))
+    self.assertEqual(
+        [(entry.path, entry.size) for entry in columnar_entries],
+        [(entry.path, entry.size) for entry in entries],
+    )
+
+  def testIncremental(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as tempdir:
+      dirpath = os.path.join(tempdir, "root")
+      digest_dirpath = os.path.join(tempdir, "digests")
+
+      foo_filepath = os.path.join(dirpath, "foo")
+      bar_filepath = os.path.join(dirpath, "bar")
+      baz_filepath = os.path.join(dirpath, "baz")
+      filesystem_test_lib.CreateFile(foo_filepath, b"foo")
+      filesystem_test_lib.CreateFile(bar_filepath, b"bar")
+
+      args = rdf_timeline.TimelineArgs()
+      args.root = dirpath.encode("utf-8")
+      args.incremental = True
+
+      with test_lib.ConfigOverrider({
+          "Client.timeline_digest_dir": digest_dirpath,
+      }):
+        base_flow_id = self._RunFlow(args)
+
+        filesystem_test_lib.CreateFile(foo_filepath, b"foofoo")
+        filesystem_test_lib.CreateFile(baz_filepath, b"baz")
+        os.remove(bar_filepath)
+
+        flow_id = self._RunFlow(args)
+
+      expected_entries = list(timeline_action.Walk(dirpath.encode("utf-8")))
+
+    flow_obj = data_store.REL_DB.ReadFlowObject(self.client_id, flow_id)
+    store = timeline_pb2.TimelineStore()
+    flow_obj.store.Unpack(store)
+    self.assertEqual(store.base_flow_id, base_flow_id)
+    self.assertEqual(store.delta_depth, 1)
+
+    # Only the root folder and the changed and added files are collected.
+    results = data_store.REL_DB.ReadFlowResults(
+        client_id=self.client_id, flow_id=flow_id, offset=0, count=1024
+    )
+    results = [mig_flow_objects.ToRDFFlowResult(r) for r in results]
+    self.assertEqual(sum(r.payload.entry_count for r in results), 3)
+
+    entries = list(timeline_flow.ProtoEntries(self.client_id, flow_id))
+    self.assertCountEqual(
+        [(entry.path, entry.size) for entry in entries],
+        [(entry.path, entry.size) for entry in expected_entries],
+    )
+
+    index = timeline_flow.ColumnarIndex(self.client_id, flow_id)
+    self.assertIsNotNone(index)
+    self.assertEqual(index.entry_count, 3)
+
+  def testIncrementalMaxDeltaDepth(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as tempdir:
+      dirpath = os.path.join(tempdir, "root")
+      filesystem_test_lib.CreateFile(os.path.join(dirpath, "foo"), b"foo")
+
+      args = rdf_timeline.TimelineArgs()
+      args.root = dirpath.encode("utf-8")
+      args.incremental = True
+
+      with test_lib.ConfigOverrider({
+          "Client.timeline_digest_dir": os.path.join(tempdir, "digests"),
+          "Server.timeline_max_delta_depth": 0,
+      }):
+        self._RunFlow(args)
+        flow_id = self._RunFlow(args)
+
+    flow_obj = data_store.REL_DB.ReadFlowObject(self.client_id, flow_id)
+    store = timeline_pb2.TimelineStore()
+    flow_obj.store.Unpack(store)
+    self.assertFalse(store.base_flow_id)
+    self.assertEqual(store.delta_depth, 0)
+
+    entries = list(timeline_flow.ProtoEntries(self.client_id, flow_id))
+    self.assertLen(entries, 2)
+
+  def _RunFlow(self, args: rdf_timeline.TimelineArgs) -> str:
+    flow_id = flow_test_lib.StartAndRunFlow(
+        timeline_flow.TimelineFlow,
+        action_mocks.ActionMock(timeline_action.Timeline),
+        client_id=self.client_id,
+        creator=self.test_username,
+        flow_args=args,
+    )
+
+    flow_test_lib.FinishAllFlowsOnClient(self.client_id)
+
+    return flow_id
+
   def _Collect(self, root: bytes) -> Iterator[timeline_pb2.TimelineEntry]:
     args = rdf_timeline.TimelineArgs(root=root)
 
@@ -295,5 +415,109 @@ class FilesystemTypeTest(absltest.TestCase):
     self.assertEqual(timeline_flow.FilesystemType(client_id, flow_id), "ntfs")
 
 
+class ColumnarIndexTest(absltest.TestCase):
+
+  @db_test_lib.WithDatabase
+  def testFlowWithoutColumnarIndex(self, db: abstract_db.Database) -> None:
+    client_id = db_test_utils.InitializeClient(db)
+    flow_id = db_test_utils.InitializeFlow(db, client_id)
+
+    self.assertIsNone(timeline_flow.ColumnarIndex(client_id, flow_id))
+
+
+class EntryFilterTest(absltest.TestCase):
+
+  def testInvalidTimeFieldRaises(self):
+    with self.assertRaises(ValueError):
+      timeline_flow.EntryFilter(time_field="foo_ns")
+
+  def testEmptyMatchesEverything(self):
+    entry_filter = timeline_flow.EntryFilter()
+
+    self.assertTrue(entry_filter.Matches(b"/foo", time_ns=0, size=0))
+    self.assertTrue(entry_filter.Matches(b"", time_ns=-1, size=2**64 - 1))
+
+  def testPathPrefix(self):
+    entry_filter = timeline_flow.EntryFilter(path_prefix=b"/foo/")
+
+    self.assertTrue(entry_filter.Matches(b"/foo/bar", time_ns=0, size=0))
+    self.assertFalse(entry_filter.Matches(b"/foobar", time_ns=0, size=0))
+
+  def testPathGlob(self):
+    entry_filter = timeline_flow.EntryFilter(path_glob=b"/foo/*.txt")
+
+    self.assertTrue(entry_filter.Matches(b"/foo/bar.txt", time_ns=0, size=0))
+    self.assertTrue(entry_filter.Matches(b"/foo/b/a.txt", time_ns=0, size=0))
+    self.assertFalse(entry_filter.Matches(b"/foo/bar.log", time_ns=0, size=0))
+
+  def testBoundsAreHalfOpen(self):
+    entry_filter = timeline_flow.EntryFilter(
+        min_time_ns=10, max_time_ns=20, min_size=1, max_size=2
+    )
+
+    self.assertTrue(entry_filter.Matches(b"/", time_ns=10, size=1))
+    self.assertFalse(entry_filter.Matches(b"/", time_ns=9, size=1))
+    self.assertFalse(entry_filter.Matches(b"/", time_ns=20, size=1))
+    self.assertFalse(entry_filter.Matches(b"/", time_ns=10, size=0))
+    self.assertFalse(entry_filter.Matches(b"/", time_ns=10, size=2))
+
+  def testMatchesEntryUsesTimeField(self):
+    entry_filter = timeline_flow.EntryFilter(
+        time_field="btime_ns", min_time_ns=10
+    )
+
+    entry = timeline_pb2.TimelineEntry(path=b"/", mtime_ns=42, btime_ns=1)
+    self.assertFalse(entry_filter.MatchesEntry(entry))
+
+    entry = timeline_pb2.TimelineEntry(path=b"/", mtime_ns=1, btime_ns=42)
+    self.assertTrue(entry_filter.MatchesEntry(entry))
+
+  def testMatchesRowGroupUsesGlobLiteralPrefix(self):
+    row_group = timeline_pb2.TimelineRowGroup()
+    column = row_group.columns.add()
+    column.name = "path"
+    column.min_bytes = b"/bar/1"
+    column.max_bytes = b"/bar/9"
+    row_group.columns.add(name="mtime_ns")
+    row_group.columns.add(name="size")
+
+    entry_filter = timeline_flow.EntryFilter(path_glob=b"/foo/*")
+    self.assertFalse(entry_filter.MatchesRowGroup(row_group))
+
+    entry_filter = timeline_flow.EntryFilter(path_glob=b"/ba?/*")
+    self.assertTrue(entry_filter.MatchesRowGroup(row_group))
+
+
+class FilteredProtoEntriesTest(absltest.TestCase):
+
+  @db_test_lib.WithDatabase
+  @db_test_lib.WithDatabaseBlobstore
+  def testStart(self, db: abstract_db.Database, bs: abstract_bs.BlobStore):
+    del bs  # Unused.
+
+    client_id = db_test_utils.InitializeClient(db)
+    entries = [
+        timeline_pb2.TimelineEntry(path=f"/foo/{i}".encode("ascii"), size=i)
+        for i in range(10)
+    ]
+
+    for columnar in [False, True]:
+      with self.subTest(columnar=columnar):
+        flow_id = timeline_test_lib.WriteTimeline(
+            client_id, entries, columnar=columnar
+        )
+
+        result = timeline_flow.FilteredProtoEntries(
+            client_id=client_id,
+            flow_id=flow_id,
+            entry_filter=timeline_flow.EntryFilter(min_size=3, max_size=8),
+            start=5,
+        )
+        self.assertEqual(
+            [(position, entry.size) for position, entry in result],
+            [(5, 5), (6, 6), (7, 7)],
+        )
+
+
 if __name__ == "__main__":
   absltest.main()
@@ -1,16 +1,29 @@
 #!/usr/bin/env python
 """The GRR Foreman."""
 
+import bisect
 import logging
+import threading
+from typing import Optional, Sequence
 
 from grr_response_core.lib import rdfvalue
+from grr_response_proto import objects_pb2
 from grr_response_server import data_store
 from grr_response_server import flow
+from grr_response_server import foreman_rules
 from grr_response_server import hunt
 from grr_response_server import message_handlers
 from grr_response_server import mig_foreman_rules
 from grr_response_server.databases import db
 from grr_response_server.rdfvalues import mig_objects
+from grr_response_server.rdfvalues import objects as rdf_objects
+
+# Parts of the client information that foreman rules are evaluated against.
+_FOREMAN_RULES_CLIENT_FULL_INFO_FIELDS = frozenset([
+    db.ClientFullInfoField.LAST_SNAPSHOT,
+    db.ClientFullInfoField.LAST_STARTUP_INFO,
+    db.ClientFullInfoField.LABELS,
+])
 
 
 class Error(Exception):
@@ -21,6 +34,147 @@ class UnknownHuntTypeError(Error):
   pass
 
 
+class ForemanRuleIndex(object):
+  """A precompiled index over a set of foreman rules.
+
+  The index keeps the rules sorted by creation time so that rules that a client
+  has not seen yet can be found without scanning all of them. Rules that can be
+  (partially) decided using client labels alone are marked as such, so that
+  full client information only has to be read if at least one candidate rule
+  passes the label check.
+  """
+
+  def __init__(self, rules: Sequence[foreman_rules.ForemanCondition]):
+    self.rules = sorted(rules, key=lambda rule: rule.creation_time)
+    self._creation_times = [rule.creation_time for rule in self.rules]
+    self._label_rules = {
+        rule.hunt_id: self._LabelRules(rule) for rule in self.rules
+    }
+
+    if self.rules:
+      self.latest_creation_time = self._creation_times[-1]
+      self.earliest_expiration_time = min(
+          rule.expiration_time for rule in self.rules
+      )
+    else:
+      self.latest_creation_time = None
+      self.earliest_expiration_time = None
+
+  @staticmethod
+  def _LabelRules(
+      rule: foreman_rules.ForemanCondition,
+  ) -> Sequence[foreman_rules.ForemanLabelClientRule]:
+    """Returns label rules that have to hold for the given rule to match."""
+    rule_set = rule.client_rule_set
+    label_type = foreman_rules.ForemanClientRule.Type.LABEL
+    match_mode = foreman_rules.ForemanClientRuleSet.MatchMode
+
+    if rule_set.match_mode == match_mode.MATCH_ALL:
+      return [r.label for r in rule_set.rules if r.rule_type == label_type]
+
+    # With `MATCH_ANY` the label rules are only decisive if there is nothing
+    # else in the set.
+    rule_types = [r.rule_type for r in rule_set.rules]
+    if rule_types and all(t == label_type for t in rule_types):
+      return [_AnyLabelRule([r.label for r in rule_set.rules])]
+
+    return []
+
+  def HasExpiredRules(self, now: rdfvalue.RDFDatetime) -> bool:
+    return (
+        self.earliest_expiration_time is not None
+        and self.earliest_expiration_time < now
+    )
+
+  def ExpiredRules(
+      self, now: rdfvalue.RDFDatetime
+  ) -> Sequence[foreman_rules.ForemanCondition]:
+    if not self.HasExpiredRules(now):
+      return []
+    return [rule for rule in self.rules if rule.expiration_time < now]
+
+  def CandidateRules(
+      self,
+      last_foreman_run: rdfvalue.RDFDatetime,
+      now: rdfvalue.RDFDatetime,
+  ) -> Sequence[foreman_rules.ForemanCondition]:
+    """Returns non-expired rules created after the last foreman run."""
+    start = bisect.bisect_right(self._creation_times, last_foreman_run)
+    return [rule for rule in self.rules[start:] if rule.expiration_time >= now]
+
+  def RequiresLabels(self, rule: foreman_rules.ForemanCondition) -> bool:
+    return bool(self._label_rules[rule.hunt_id])
+
+  def MatchesLabels(
+      self,
+      rule: foreman_rules.ForemanCondition,
+      client_info: rdf_objects.ClientFullInfo,
+  ) -> bool:
+    """Checks the label rules of a rule against labels-only client info."""
+    return all(r.Evaluate(client_info) for r in self._label_rules[rule.hunt_id])
+
+
+class _AnyLabelRule(object):
+  """A label rule matching if any of the wrapped label rules match."""
+
+  def __init__(self, rules: Sequence[foreman_rules.ForemanLabelClientRule]):
+    self._rules = rules
+
+  def Evaluate(self, client_info) -> bool:
+    return any(r.Evaluate(client_info) for r in self._rules)
+
+
+class ForemanRulesCache(object):
+  """A process-wide cache of the foreman rule index.
+
+  The cache is validated against the foreman rules version stored in the
+  database, so it is refreshed as soon as any process writes or removes a rule.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._db: Optional[db.Database] = None
+    self._version: Optional[int] = None
+    self._index: Optional[ForemanRuleIndex] = None
+
+  def GetIndex(self) -> ForemanRuleIndex:
+    """Returns an up-to-date index of all foreman rules."""
+    rel_db = data_store.REL_DB
+    # The version has to be read before the rules: if the rules change in
+    # between, the stored version is outdated and the index is rebuilt on the
+    # next call.
+    version = rel_db.ReadForemanRulesVersion()
+
+    with self._lock:
+      if (
+          self._index is not None
+          and self._db is rel_db
+          and self._version == version
+      ):
+        return self._index
+
+    proto_rules = rel_db.ReadAllForemanRules()
+    index = ForemanRuleIndex(
+        [mig_foreman_rules.ToRDFForemanCondition(cond) for cond in proto_rules]
+    )
+
+    with self._lock:
+      self._db = rel_db
+      self._version = version
+      self._index = index
+
+    return index
+
+  def Flush(self) -> None:
+    with self._lock:
+      self._db = None
+      self._version = None
+      self._index = None
+
+
+RULES_CACHE = ForemanRulesCache()
+
+
 # TODO(amoser): Now that Foreman rules are directly stored in the db,
 # consider removing this class altogether once the AFF4 Foreman has
 # been removed.
@@ -97,35 +251,39 @@ class Foreman(object):
     Returns:
       Number of assigned tasks.
     """
-    proto_rules = data_store.REL_DB.ReadAllForemanRules()
-    rules = [
-        mig_foreman_rules.ToRDFForemanCondition(cond) for cond in proto_rules
-    ]
-    if not rules:
+    index = RULES_CACHE.GetIndex()
+    if not index.rules:
       return 0
 
     last_foreman_run = self._GetLastForemanRunTime(client_id)
 
-    latest_rule_creation_time = max(rule.creation_time for rule in rules)
-
-    if latest_rule_creation_time > last_foreman_run:
+    if index.latest_creation_time > last_foreman_run:
       # Update the latest checked rule on the client.
-      self._SetLastForemanRunTime(client_id, latest_rule_creation_time)
-
-    relevant_rules = []
-    expired_rules = []
+      self._SetLastForemanRunTime(client_id, index.latest_creation_time)
 
     now = rdfvalue.RDFDatetime.Now()
 
-    for rule in rules:
-      if rule.expiration_time < now:
-        expired_rules.append(rule)
-      elif rule.creation_time > last_foreman_run:
-        relevant_rules.append(rule)
+    relevant_rules = index.CandidateRules(last_foreman_run, now)
+    expired_rules = index.ExpiredRules(now)
+
+    if any(index.RequiresLabels(rule) for rule in relevant_rules):
+      labels = data_store.REL_DB.ReadClientLabels(client_id)
+      labels_info = mig_objects.ToRDFClientFullInfo(
+          objects_pb2.ClientFullInfo(labels=labels)
+      )
+      relevant_rules = [
+          rule
+          for rule in relevant_rules
+          if index.MatchesLabels(rule, labels_info)
+      ]
 
     actions_count = 0
     if relevant_rules:
-      client_data = data_store.REL_DB.ReadClientFullInfo(client_id)
+      # Foreman rules only look at snapshots, startup information and labels.
+      client_data = data_store.REL_DB.ReadClientFullInfo(
+          client_id,
+          fields=_FOREMAN_RULES_CLIENT_FULL_INFO_FIELDS,
+      )
       if client_data is None:
         return
 
@@ -148,10 +306,6 @@ class ForemanMessageHandler(message_handlers.MessageHandler):
   handler_name = "ForemanHandler"
 
   def ProcessMessages(self, msgs):
-    # TODO(amoser): The foreman reads the rules from the database for each
-    # client. In the old implementation we used to have a cache. If this is a
-    # performance hit, lets consider putting the cache back.
-
     foreman_obj = Foreman()
     for msg in msgs:
       foreman_obj.AssignTasksToClient(msg.client_id)
@@ -300,6 +300,76 @@ class ForemanTests(test_lib.GRRBaseTest):
         rules = data_store.REL_DB.ReadAllForemanRules()
         self.assertLen(rules, num_rules)
 
+  def _WriteLabelRule(self, hunt_id, label):
+    now = rdfvalue.RDFDatetime.Now()
+    rule = foreman_rules.ForemanCondition(
+        creation_time=now,
+        expiration_time=now + rdfvalue.Duration.From(1, rdfvalue.HOURS),
+        description="Test rule",
+        hunt_id=hunt_id,
+    )
+    rule.client_rule_set = foreman_rules.ForemanClientRuleSet(
+        rules=[
+            foreman_rules.ForemanClientRule(
+                rule_type=foreman_rules.ForemanClientRule.Type.LABEL,
+                label=foreman_rules.ForemanLabelClientRule(
+                    label_names=[label]
+                ),
+            )
+        ]
+    )
+    proto_foreman_condition = mig_foreman_rules.ToProtoForemanCondition(rule)
+    data_store.REL_DB.WriteForemanRule(proto_foreman_condition)
+
+  def testLabelRulesDoNotReadFullInfoForNonMatchingClients(self):
+    client_id = self.SetupClient(0)
+    self._WriteLabelRule("11111111", "foo")
+
+    with mock.patch.object(
+        hunt, "StartHuntFlowOnClient", self.StartHuntFlowOnClient
+    ):
+      with mock.patch.object(
+          data_store.REL_DB,
+          "ReadClientFullInfo",
+          wraps=data_store.REL_DB.ReadClientFullInfo,
+      ) as read_full_info:
+        self.clients_started = []
+        foreman.Foreman().AssignTasksToClient(client_id)
+
+        self.assertEmpty(self.clients_started)
+        read_full_info.assert_not_called()
+
+  def testLabelRulesMatchLabeledClients(self):
+    client_id = self.SetupClient(0)
+    self.AddClientLabel(client_id, "GRR", "foo")
+    self._WriteLabelRule("11111111", "foo")
+
+    with mock.patch.object(
+        hunt, "StartHuntFlowOnClient", self.StartHuntFlowOnClient
+    ):
+      self.clients_started = []
+      foreman.Foreman().AssignTasksToClient(client_id)
+
+      self.assertEqual(self.clients_started, [("11111111", client_id)])
+
+  def testRulesAreCachedUntilChanged(self):
+    client_id = self.SetupClient(0)
+    self._WriteLabelRule("11111111", "foo")
+
+    with mock.patch.object(
+        data_store.REL_DB,
+        "ReadAllForemanRules",
+        wraps=data_store.REL_DB.ReadAllForemanRules,
+    ) as read_all_rules:
+      foreman_obj = foreman.Foreman()
+      foreman_obj.AssignTasksToClient(client_id)
+      foreman_obj.AssignTasksToClient(client_id)
+      self.assertEqual(read_all_rules.call_count, 1)
+
+      self._WriteLabelRule("22222222", "bar")
+      foreman_obj.AssignTasksToClient(client_id)
+      self.assertEqual(read_all_rules.call_count, 2)
+
 
 def main(argv):
   # Run the full test suite
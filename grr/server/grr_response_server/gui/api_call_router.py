@@ -748,6 +748,14 @@ class ApiCallRouterStub(ApiCallRouter):
     """Exports results of a timeline flow to the specific format."""
     raise NotImplementedError()
 
+  @Category("Flows")
+  @ArgsType(api_timeline.ApiListCollectedTimelineEntriesArgs)
+  @ResultType(api_timeline.ApiListCollectedTimelineEntriesResult)
+  @Http("GET", "/api/clients/<client_id>/flows/<flow_id>/timeline-entries")
+  def ListCollectedTimelineEntries(self, args, context=None):
+    """Lists filtered entries of a timeline flow page by page."""
+    raise NotImplementedError()
+
   @Category("Flows")
   @ArgsType(api_yara.ApiUploadYaraSignatureArgs)
   @ResultType(api_yara.ApiUploadYaraSignatureResult)
@@ -427,6 +427,15 @@ class ApiCallRouterWithApprovalChecks(api_call_router.ApiCallRouterStub):
     return self.delegate.ListFlowLogs(args, context=context)
 
   def GetCollectedTimeline(self, args, context=None):
+    self._CheckTimelineFlowAccess(args, context=context)
+    return self.delegate.GetCollectedTimeline(args, context=context)
+
+  def ListCollectedTimelineEntries(self, args, context=None):
+    self._CheckTimelineFlowAccess(args, context=context)
+    return self.delegate.ListCollectedTimelineEntries(args, context=context)
+
+  def _CheckTimelineFlowAccess(self, args, context=None):
+    """Checks access to a timeline flow results."""
     try:
       flow = data_store.REL_DB.ReadFlowObject(
           str(args.client_id), str(args.flow_id)
@@ -444,8 +453,6 @@ class ApiCallRouterWithApprovalChecks(api_call_router.ApiCallRouterStub):
     if flow.parent_hunt_id != flow.flow_id:
       self.approval_checker.CheckClientAccess(context, str(args.client_id))
 
-    return self.delegate.GetCollectedTimeline(args, context=context)
-
   def UploadYaraSignature(
       self,
       args: api_yara.ApiUploadYaraSignatureArgs,
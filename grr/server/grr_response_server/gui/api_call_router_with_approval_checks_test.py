@@ -237,6 +237,7 @@ class ApiCallRouterWithApprovalChecksTest(
 
   ACCESS_CHECKED_METHODS.extend([
       "GetCollectedTimeline",
+      "ListCollectedTimelineEntries",
   ])
 
   def testGetCollectedTimelineRaisesIfFlowIsNotFound(self):
@@ -289,6 +290,35 @@ class ApiCallRouterWithApprovalChecksTest(
     with self.assertRaises(ValueError):
       self.router.GetCollectedTimeline(args=args, context=self.context)
 
+  def testListCollectedTimelineEntriesGrantsAccessIfPartOfHunt(self):
+    client_id = self.SetupClient(0)
+    hunt_id = self.CreateHunt()
+    flow_id = flow_test_lib.StartFlow(
+        timeline.TimelineFlow,
+        client_id=client_id,
+        parent=flow.FlowParent.FromHuntID(hunt_id),
+    )
+
+    args = api_timeline.ApiListCollectedTimelineEntriesArgs(
+        client_id=client_id, flow_id=flow_id
+    )
+    self.CheckMethodIsNotAccessChecked(
+        self.router.ListCollectedTimelineEntries, args=args
+    )
+
+  def testListCollectedTimelineEntriesChecksClientAccessIfNotPartOfHunt(self):
+    client_id = self.SetupClient(0)
+    flow_id = flow_test_lib.StartFlow(
+        timeline.TimelineFlow, client_id=client_id
+    )
+
+    args = api_timeline.ApiListCollectedTimelineEntriesArgs(
+        client_id=client_id, flow_id=flow_id
+    )
+    self.CheckMethodIsAccessChecked(
+        self.router.ListCollectedTimelineEntries, "CheckClientAccess", args=args
+    )
+
   def testGetCollectedTimelineChecksClientAccessIfNotPartOfHunt(self):
     client_id = self.SetupClient(0)
     flow_id = flow_test_lib.StartFlow(
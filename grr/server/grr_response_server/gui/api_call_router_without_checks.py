@@ -210,6 +210,9 @@ class ApiCallRouterWithoutChecks(api_call_router.ApiCallRouterStub):
   def GetCollectedTimeline(self, args, context=None):
     return api_timeline.ApiGetCollectedTimelineHandler()
 
+  def ListCollectedTimelineEntries(self, args, context=None):
+    return api_timeline.ApiListCollectedTimelineEntriesHandler()
+
   def UploadYaraSignature(
       self,
       args: api_yara.ApiUploadYaraSignatureArgs,
@@ -204,21 +204,37 @@ class ApiLabelsRestrictedSearchClientsHandler(
       label_filter = ["label:" + label] + keywords
       all_client_ids.update(index.LookupClients(label_filter))
 
+    # Only labels are needed to verify clients, so full information is read
+    # just for the clients that end up on the requested page.
+    page_client_ids = []
     index = 0
     for cid_batch in collection.Batch(sorted(all_client_ids), batch_size):
-      client_infos = data_store.REL_DB.MultiReadClientFullInfo(cid_batch)
+      client_infos = data_store.REL_DB.MultiReadClientFullInfo(
+          cid_batch, fields=[db.ClientFullInfoField.LABELS]
+      )
 
       for client_id, client_info in sorted(client_infos.items()):
         if not self._VerifyLabels(client_info.labels):
           continue
         if index >= args.offset and index < end:
-          api_clients.append(
-              models_clients.ApiClientFromClientFullInfo(client_id, client_info)
-          )
+          page_client_ids.append(client_id)
         index += 1
         if index >= end:
-          UpdateClientsFromFleetspeak(api_clients)
-          return client_pb2.ApiSearchClientsResult(items=api_clients)
+          break
+
+      if index >= end:
+        break
+
+    client_infos = data_store.REL_DB.MultiReadClientFullInfo(page_client_ids)
+    for client_id in page_client_ids:
+      # Clients could have been deleted after their labels were verified.
+      if client_id not in client_infos:
+        continue
+      api_clients.append(
+          models_clients.ApiClientFromClientFullInfo(
+              client_id, client_infos[client_id]
+          )
+      )
 
     UpdateClientsFromFleetspeak(api_clients)
     return client_pb2.ApiSearchClientsResult(items=api_clients)
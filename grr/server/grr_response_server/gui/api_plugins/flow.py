@@ -107,6 +107,8 @@ def InitFlowContextFromFlowObject(
     )
   if flow_obj.HasField("cpu_time_used"):
     flow_context.client_resources.cpu_usage.CopyFrom(flow_obj.cpu_time_used)
+  if flow_obj.hash_cache_hits:
+    flow_context.client_resources.hash_cache_hits = flow_obj.hash_cache_hits
 
   state = GetFlowContextStateFromFlowObject(flow_obj)
   if state is not None:
@@ -45,3 +45,31 @@ def ToRDFApiGetCollectedHuntTimelinesArgs(
   return timeline.ApiGetCollectedHuntTimelinesArgs.FromSerializedBytes(
       proto.SerializeToString()
   )
+
+
+def ToProtoApiListCollectedTimelineEntriesArgs(
+    rdf: timeline.ApiListCollectedTimelineEntriesArgs,
+) -> timeline_pb2.ApiListCollectedTimelineEntriesArgs:
+  return rdf.AsPrimitiveProto()
+
+
+def ToRDFApiListCollectedTimelineEntriesArgs(
+    proto: timeline_pb2.ApiListCollectedTimelineEntriesArgs,
+) -> timeline.ApiListCollectedTimelineEntriesArgs:
+  return timeline.ApiListCollectedTimelineEntriesArgs.FromSerializedBytes(
+      proto.SerializeToString()
+  )
+
+
+def ToProtoApiListCollectedTimelineEntriesResult(
+    rdf: timeline.ApiListCollectedTimelineEntriesResult,
+) -> timeline_pb2.ApiListCollectedTimelineEntriesResult:
+  return rdf.AsPrimitiveProto()
+
+
+def ToRDFApiListCollectedTimelineEntriesResult(
+    proto: timeline_pb2.ApiListCollectedTimelineEntriesResult,
+) -> timeline.ApiListCollectedTimelineEntriesResult:
+  return timeline.ApiListCollectedTimelineEntriesResult.FromSerializedBytes(
+      proto.SerializeToString()
+  )
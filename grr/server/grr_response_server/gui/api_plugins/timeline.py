@@ -1,19 +1,27 @@
 #!/usr/bin/env python
 """A module with API handlers related to the timeline colllection."""
 
+import collections
+from concurrent import futures
+import itertools
+import threading
 from typing import Iterator
 from typing import Optional
 
+from grr_response_core import config
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
+from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
 from grr_response_core.lib.util import body
 from grr_response_core.lib.util import chunked
 from grr_response_proto import objects_pb2
 from grr_response_proto.api import timeline_pb2
 from grr_response_server import data_store
 from grr_response_server.flows.general import timeline
+from grr_response_server.flows.general import timeline_columnar
 from grr_response_server.gui import api_call_context
 from grr_response_server.gui import api_call_handler_base
+from grr_response_server.gui import archive_generator
 from grr_response_server.gui.api_plugins import client as api_client
 from grr_response_server.gui.api_plugins import flow as api_flow
 
@@ -45,6 +53,25 @@ class ApiGetCollectedHuntTimelinesArgs(rdf_structs.RDFProtoStruct):
   ]
 
 
+class ApiListCollectedTimelineEntriesArgs(rdf_structs.RDFProtoStruct):
+  """An RDF wrapper class for the arguments of timeline entries queries."""
+
+  protobuf = timeline_pb2.ApiListCollectedTimelineEntriesArgs
+  rdf_deps = [
+      api_client.ApiClientId,
+      api_flow.ApiFlowId,
+  ]
+
+
+class ApiListCollectedTimelineEntriesResult(rdf_structs.RDFProtoStruct):
+  """An RDF wrapper class for the results of timeline entries queries."""
+
+  protobuf = timeline_pb2.ApiListCollectedTimelineEntriesResult
+  rdf_deps = [
+      rdf_timeline.TimelineEntry,
+  ]
+
+
 class ApiGetCollectedTimelineHandler(api_call_handler_base.ApiCallHandler):
   """An API handler for the timeline exporter."""
 
@@ -98,7 +125,11 @@ class ApiGetCollectedTimelineHandler(api_call_handler_base.ApiCallHandler):
       if fstype is not None and fstype.lower() == "ntfs":
         opts.inode_format = body.Opts.InodeFormat.NTFS_FILE_REFERENCE
 
-    entries = timeline.ProtoEntries(client_id=client_id, flow_id=flow_id)
+    index = timeline.ColumnarIndex(client_id=client_id, flow_id=flow_id)
+    if index is not None:
+      entries = timeline_columnar.Entries(index, columns=_BODY_COLUMNS)
+    else:
+      entries = timeline.ProtoEntries(client_id=client_id, flow_id=flow_id)
     content = body.Stream(entries, opts=opts)
 
     filename = "timeline_{}.body".format(flow_id)
@@ -116,16 +147,111 @@ class ApiGetCollectedTimelineHandler(api_call_handler_base.ApiCallHandler):
     return api_call_handler_base.ApiBinaryStream(filename, content)
 
 
+class ApiListCollectedTimelineEntriesHandler(
+    api_call_handler_base.ApiCallHandler
+):
+  """An API handler for filtered and paginated timeline entries queries."""
+
+  args_type = ApiListCollectedTimelineEntriesArgs
+  result_type = ApiListCollectedTimelineEntriesResult
+  proto_args_type = timeline_pb2.ApiListCollectedTimelineEntriesArgs
+  proto_result_type = timeline_pb2.ApiListCollectedTimelineEntriesResult
+
+  def Handle(
+      self,
+      args: timeline_pb2.ApiListCollectedTimelineEntriesArgs,
+      context: Optional[api_call_context.ApiCallContext] = None,
+  ) -> timeline_pb2.ApiListCollectedTimelineEntriesResult:
+    """Handles requests for the timeline entries query API call."""
+    client_id = args.client_id
+    flow_id = args.flow_id
+
+    flow_obj = data_store.REL_DB.ReadFlowObject(client_id, flow_id)
+    if flow_obj.flow_class_name != timeline.TimelineFlow.__name__:
+      message = "Flow '{}' is not a timeline flow".format(flow_id)
+      raise ValueError(message)
+
+    count = args.count or _DEFAULT_ENTRIES_COUNT
+    if count > _MAX_ENTRIES_COUNT:
+      message = f"Too many timeline entries requested: {count}"
+      raise ValueError(message)
+
+    entries = timeline.FilteredProtoEntries(
+        client_id=client_id,
+        flow_id=flow_id,
+        entry_filter=_EntryFilter(args),
+        start=args.cursor,
+    )
+    # We fetch one entry more than requested to know whether there are more.
+    entries = list(itertools.islice(entries, count + 1))
+
+    result = timeline_pb2.ApiListCollectedTimelineEntriesResult()
+    for _, entry in entries[:count]:
+      result.items.append(entry)
+
+    if len(entries) > count:
+      last_position, _ = entries[count - 1]
+      result.next_cursor = last_position + 1
+
+    return result
+
+
+def _EntryFilter(
+    args: timeline_pb2.ApiListCollectedTimelineEntriesArgs,
+) -> timeline.EntryFilter:
+  """Creates a timeline entry filter from the API call arguments."""
+  path_prefix = None
+  if args.HasField("path_prefix"):
+    path_prefix = args.path_prefix.encode("utf-8", "surrogateescape")
+
+  path_glob = None
+  if args.HasField("path_glob"):
+    path_glob = args.path_glob.encode("utf-8", "surrogateescape")
+
+  return timeline.EntryFilter(
+      path_prefix=path_prefix,
+      path_glob=path_glob,
+      time_field=_TIME_FIELDS[args.time_field],
+      min_time_ns=args.min_time_ns if args.HasField("min_time_ns") else None,
+      max_time_ns=args.max_time_ns if args.HasField("max_time_ns") else None,
+      min_size=args.min_size if args.HasField("min_size") else None,
+      max_size=args.max_size if args.HasField("max_size") else None,
+  )
+
+
 class ApiGetCollectedHuntTimelinesHandler(api_call_handler_base.ApiCallHandler):
   """An API handler for the hunt timelines exporter."""
 
   args_type = ApiGetCollectedHuntTimelinesArgs
   proto_args_type = timeline_pb2.ApiGetCollectedHuntTimelinesArgs
 
-  def __init__(self):
+  def __init__(
+      self,
+      threads: Optional[int] = None,
+      max_buffered_bytes: Optional[int] = None,
+  ):
+    """Initializes the handler.
+
+    Args:
+      threads: Number of threads converting timelines of individual clients.
+        If 0, timelines are converted one after another as they are archived.
+        Defaults to the `AdminUI.hunt_timelines_threads` option.
+      max_buffered_bytes: Maximum number of bytes of converted timelines that
+        are buffered, but not yet archived. Defaults to the
+        `AdminUI.hunt_timelines_max_buffered_bytes` option.
+    """
     super().__init__()
     self._handler = ApiGetCollectedTimelineHandler()
 
+    if threads is None:
+      threads = config.CONFIG["AdminUI.hunt_timelines_threads"]
+    if max_buffered_bytes is None:
+      max_buffered_bytes = config.CONFIG[
+          "AdminUI.hunt_timelines_max_buffered_bytes"
+      ]
+    self._threads = threads
+    self._max_buffered_bytes = max_buffered_bytes
+
   def Handle(
       self,
       args: timeline_pb2.ApiGetCollectedHuntTimelinesArgs,
@@ -154,17 +280,48 @@ class ApiGetCollectedHuntTimelinesHandler(api_call_handler_base.ApiCallHandler):
   def _GenerateArchive(
       self,
       args: timeline_pb2.ApiGetCollectedHuntTimelinesArgs,
+  ) -> Iterator[bytes]:
+    progress = archive_generator.ArchiveProgress(
+        "hunt_timelines", f"timelines_{args.hunt_id}"
+    )
+    yield from progress.Track(self._GenerateZip(args, progress))
+
+  def _GenerateZip(
+      self,
+      args: timeline_pb2.ApiGetCollectedHuntTimelinesArgs,
+      progress: archive_generator.ArchiveProgress,
   ) -> Iterator[bytes]:
     zipgen = utils.StreamingZipGenerator()
-    yield from self._GenerateHuntTimelines(args, zipgen)
+    yield from self._GenerateHuntTimelines(args, zipgen, progress)
     yield zipgen.Close()
 
   def _GenerateHuntTimelines(
       self,
       args: timeline_pb2.ApiGetCollectedHuntTimelinesArgs,
       zipgen: utils.StreamingZipGenerator,
+      progress: archive_generator.ArchiveProgress,
   ) -> Iterator[bytes]:
+    timelines = self._ListHuntTimelines(args)
 
+    if self._threads > 0:
+      contents = self._ConvertTimelinesInParallel(timelines)
+    else:
+      contents = (
+          (filename, self._GenerateTimeline(subargs))
+          for filename, subargs in timelines
+      )
+
+    for filename, content in contents:
+      yield zipgen.WriteFileHeader(filename)
+      yield from map(zipgen.WriteFileChunk, content)
+      yield zipgen.WriteFileFooter()
+      progress.FileArchived()
+
+  def _ListHuntTimelines(
+      self,
+      args: timeline_pb2.ApiGetCollectedHuntTimelinesArgs,
+  ) -> Iterator[tuple[str, timeline_pb2.ApiGetCollectedTimelineArgs]]:
+    """Yields archive filenames and export arguments of hunt timelines."""
     offset = 0
     while True:
       flows = data_store.REL_DB.ReadHuntFlows(
@@ -184,13 +341,65 @@ class ApiGetCollectedHuntTimelinesHandler(api_call_handler_base.ApiCallHandler):
         subargs.format = args.format
         subargs.body_opts.CopyFrom(args.body_opts)
 
-        yield zipgen.WriteFileHeader(filename)
-        yield from map(zipgen.WriteFileChunk, self._GenerateTimeline(subargs))
-        yield zipgen.WriteFileFooter()
+        yield filename, subargs
 
       if len(flows) < _FLOW_BATCH_SIZE:
         break
 
+      offset += _FLOW_BATCH_SIZE
+
+  def _ConvertTimelinesInParallel(
+      self,
+      timelines: Iterator[tuple[str, timeline_pb2.ApiGetCollectedTimelineArgs]],
+  ) -> Iterator[tuple[str, Iterator[bytes]]]:
+    """Converts timelines on a thread pool, yielding them in the input order.
+
+    Args:
+      timelines: Archive filenames and export arguments of timelines.
+
+    Yields:
+      Archive filenames and contents of the timelines. Contents of a timeline
+      have to be consumed before the next one is requested.
+    """
+    buffers = _TimelineBuffers(self._max_buffered_bytes)
+
+    def Convert(
+        index: int,
+        args: timeline_pb2.ApiGetCollectedTimelineArgs,
+    ) -> None:
+      try:
+        for chunk in self._GenerateTimeline(args):
+          buffers.Put(index, chunk)
+      except _TimelineBuffersCancelledError:
+        return
+      except Exception as error:  # pylint: disable=broad-exception-caught
+        buffers.Finish(index, error)
+        return
+
+      buffers.Finish(index)
+
+    executor = futures.ThreadPoolExecutor(
+        max_workers=self._threads, thread_name_prefix="HuntTimelines"
+    )
+    pending = collections.deque()
+    try:
+      for index, (filename, args) in enumerate(timelines):
+        executor.submit(Convert, index, args)
+        pending.append((index, filename))
+
+        # Conversions are scheduled only a bit ahead of the archive, so that
+        # there is always work for all threads, but no unbounded backlog.
+        if len(pending) > 2 * self._threads:
+          index, filename = pending.popleft()
+          yield filename, buffers.Get(index)
+
+      while pending:
+        index, filename = pending.popleft()
+        yield filename, buffers.Get(index)
+    finally:
+      buffers.Cancel()
+      executor.shutdown(wait=False, cancel_futures=True)
+
   def _GenerateTimeline(
       self,
       args: timeline_pb2.ApiGetCollectedTimelineArgs,
@@ -198,6 +407,85 @@ class ApiGetCollectedHuntTimelinesHandler(api_call_handler_base.ApiCallHandler):
     return self._handler.Handle(args).GenerateContent()
 
 
+class _TimelineBuffersCancelledError(Exception):
+  """An error raised when putting chunks into cancelled timeline buffers."""
+
+
+class _TimelineBuffers:
+  """Chunks of timelines converted in parallel, buffered until archived.
+
+  Timelines are identified by their position in the archive and have to be
+  retrieved in that order. Converting threads wait while the total size of the
+  buffered chunks exceeds the limit. The only exception is the timeline being
+  archived, which can always buffer a chunk if its buffer is empty, so that
+  the archive generation cannot stall.
+  """
+
+  def __init__(self, max_bytes: int) -> None:
+    self._max_bytes = max_bytes
+    self._bytes = 0
+    self._current = 0
+    self._buffers = collections.defaultdict(collections.deque)
+    self._errors: dict[int, Optional[Exception]] = {}
+    self._cancelled = False
+    self._condition = threading.Condition()
+
+  def Put(self, index: int, chunk: bytes) -> None:
+    """Buffers a chunk of the timeline at the given position."""
+    with self._condition:
+      buffer = self._buffers[index]
+      while (
+          not self._cancelled
+          and self._bytes + len(chunk) > self._max_bytes
+          and (index != self._current or buffer)
+      ):
+        self._condition.wait()
+
+      if self._cancelled:
+        raise _TimelineBuffersCancelledError()
+
+      buffer.append(chunk)
+      self._bytes += len(chunk)
+      self._condition.notify_all()
+
+  def Finish(self, index: int, error: Optional[Exception] = None) -> None:
+    """Marks the timeline at the given position as fully converted."""
+    with self._condition:
+      self._errors[index] = error
+      self._condition.notify_all()
+
+  def Get(self, index: int) -> Iterator[bytes]:
+    """Yields chunks of the timeline at the given position as they come."""
+    with self._condition:
+      self._current = index
+      self._condition.notify_all()
+
+    while True:
+      with self._condition:
+        buffer = self._buffers[index]
+        while not buffer and index not in self._errors:
+          self._condition.wait()
+
+        if buffer:
+          chunk = buffer.popleft()
+          self._bytes -= len(chunk)
+          self._condition.notify_all()
+        else:
+          del self._buffers[index]
+          error = self._errors.pop(index)
+          if error is not None:
+            raise error
+          return
+
+      yield chunk
+
+  def Cancel(self) -> None:
+    """Makes all the threads waiting to buffer chunks stop."""
+    with self._condition:
+      self._cancelled = True
+      self._condition.notify_all()
+
+
 def _GetHuntTimelineFilename(
     snapshot: objects_pb2.ClientSnapshot,
     fmt: timeline_pb2.ApiGetCollectedTimelineArgs.Format,
@@ -215,3 +503,29 @@ def _GetHuntTimelineFilename(
 
 
 _FLOW_BATCH_SIZE = 32_768  # A number of flows to fetch in a database call.
+
+# The number of timeline entries returned by a query if not specified and the
+# maximum number of entries that can be requested at once.
+_DEFAULT_ENTRIES_COUNT = 1_000
+_MAX_ENTRIES_COUNT = 10_000
+
+_TIME_FIELDS = {
+    timeline_pb2.ApiListCollectedTimelineEntriesArgs.MTIME: "mtime_ns",
+    timeline_pb2.ApiListCollectedTimelineEntriesArgs.ATIME: "atime_ns",
+    timeline_pb2.ApiListCollectedTimelineEntriesArgs.CTIME: "ctime_ns",
+    timeline_pb2.ApiListCollectedTimelineEntriesArgs.BTIME: "btime_ns",
+}
+
+# Columns of columnar timelines needed to generate body files.
+_BODY_COLUMNS = (
+    "path",
+    "mode",
+    "size",
+    "ino",
+    "uid",
+    "gid",
+    "atime_ns",
+    "mtime_ns",
+    "ctime_ns",
+    "btime_ns",
+)
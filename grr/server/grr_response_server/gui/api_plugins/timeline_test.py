@@ -372,6 +372,165 @@ class ApiGetCollectedTimelineHandlerTest(api_test_lib.ApiCallHandlerTest):
     self.assertEqual(entries, deserialized)
 
 
+class ApiListCollectedTimelineEntriesHandlerTest(
+    api_test_lib.ApiCallHandlerTest
+):
+
+  @classmethod
+  def setUpClass(cls):
+    super().setUpClass()
+    testing_startup.TestInit()
+
+  def setUp(self):
+    super().setUp()
+    self.handler = api_timeline.ApiListCollectedTimelineEntriesHandler()
+
+  def testRaisesOnIncorrectFlowType(self):
+    client_id = db_test_utils.InitializeClient(data_store.REL_DB)
+    flow_id = "A1B3C5D7E"
+
+    flow_obj = flows_pb2.Flow()
+    flow_obj.client_id = client_id
+    flow_obj.flow_id = flow_id
+    flow_obj.flow_class_name = "NotTimelineFlow"
+    data_store.REL_DB.WriteFlowObject(flow_obj)
+
+    args = api_timeline_pb2.ApiListCollectedTimelineEntriesArgs()
+    args.client_id = client_id
+    args.flow_id = flow_id
+
+    with self.assertRaises(ValueError):
+      self.handler.Handle(args)
+
+  def testRaisesOnTooLargeCount(self):
+    client_id = db_test_utils.InitializeClient(data_store.REL_DB)
+    flow_id = timeline_test_lib.WriteTimeline(client_id, [])
+
+    args = api_timeline_pb2.ApiListCollectedTimelineEntriesArgs()
+    args.client_id = client_id
+    args.flow_id = flow_id
+    args.count = 10**9
+
+    with self.assertRaises(ValueError):
+      self.handler.Handle(args)
+
+  def testNoFilters(self):
+    entries = [_Entry(f"/foo/{i}", size=i) for i in range(5)]
+
+    for columnar in [False, True]:
+      with self.subTest(columnar=columnar):
+        args = self._Args(entries, columnar=columnar)
+
+        result = self.handler.Handle(args)
+        self.assertEqual(list(result.items), entries)
+        self.assertFalse(result.HasField("next_cursor"))
+
+  def testPathPrefix(self):
+    entries = [
+        _Entry("/bar/1"),
+        _Entry("/foo/1"),
+        _Entry("/foo/2"),
+        _Entry("/foobar"),
+    ]
+
+    for columnar in [False, True]:
+      with self.subTest(columnar=columnar):
+        args = self._Args(entries, columnar=columnar)
+        args.path_prefix = "/foo/"
+
+        result = self.handler.Handle(args)
+        paths = [entry.path for entry in result.items]
+        self.assertEqual(paths, [b"/foo/1", b"/foo/2"])
+
+  def testPathGlob(self):
+    entries = [
+        _Entry("/foo/bar.txt"),
+        _Entry("/foo/bar.log"),
+        _Entry("/foo/baz/quux.txt"),
+        _Entry("/norf/thud.txt"),
+    ]
+
+    for columnar in [False, True]:
+      with self.subTest(columnar=columnar):
+        args = self._Args(entries, columnar=columnar)
+        args.path_glob = "/foo/*.txt"
+
+        result = self.handler.Handle(args)
+        paths = [entry.path for entry in result.items]
+        self.assertEqual(paths, [b"/foo/bar.txt", b"/foo/baz/quux.txt"])
+
+  def testTimeRange(self):
+    entries = [
+        _Entry(f"/foo/{i}", mtime_ns=i * 10, atime_ns=100 - i * 10)
+        for i in range(1, 10)
+    ]
+
+    for columnar in [False, True]:
+      with self.subTest(columnar=columnar):
+        args = self._Args(entries, columnar=columnar)
+        args.min_time_ns = 30
+        args.max_time_ns = 60
+
+        result = self.handler.Handle(args)
+        mtimes = [entry.mtime_ns for entry in result.items]
+        self.assertEqual(mtimes, [30, 40, 50])
+
+        args.time_field = _TimeField.ATIME
+
+        result = self.handler.Handle(args)
+        atimes = [entry.atime_ns for entry in result.items]
+        self.assertEqual(atimes, [50, 40, 30])
+
+  def testSizeRange(self):
+    entries = [_Entry(f"/foo/{i}", size=i * 1024) for i in range(1, 10)]
+
+    for columnar in [False, True]:
+      with self.subTest(columnar=columnar):
+        args = self._Args(entries, columnar=columnar)
+        args.min_size = 8 * 1024
+
+        result = self.handler.Handle(args)
+        sizes = [entry.size for entry in result.items]
+        self.assertEqual(sizes, [8 * 1024, 9 * 1024])
+
+  def testPagination(self):
+    entries = [_Entry(f"/foo/{i}", size=i % 2) for i in range(1, 10)]
+
+    for columnar in [False, True]:
+      with self.subTest(columnar=columnar):
+        args = self._Args(entries, columnar=columnar)
+        args.min_size = 1
+        args.count = 2
+
+        paths = []
+        while True:
+          result = self.handler.Handle(args)
+          self.assertLessEqual(len(result.items), 2)
+          paths.extend(entry.path for entry in result.items)
+
+          if not result.HasField("next_cursor"):
+            break
+          args.cursor = result.next_cursor
+
+        expected = [f"/foo/{i}".encode("utf-8") for i in [1, 3, 5, 7, 9]]
+        self.assertEqual(paths, expected)
+
+  def _Args(
+      self,
+      entries: list[timeline_pb2.TimelineEntry],
+      columnar: bool,
+  ) -> api_timeline_pb2.ApiListCollectedTimelineEntriesArgs:
+    client_id = db_test_utils.InitializeClient(data_store.REL_DB)
+    flow_id = timeline_test_lib.WriteTimeline(
+        client_id, entries, columnar=columnar
+    )
+
+    args = api_timeline_pb2.ApiListCollectedTimelineEntriesArgs()
+    args.client_id = client_id
+    args.flow_id = flow_id
+    return args
+
+
 class ApiGetCollectedHuntTimelinesHandlerTest(api_test_lib.ApiCallHandlerTest):
 
   @classmethod
@@ -499,6 +658,60 @@ class ApiGetCollectedHuntTimelinesHandlerTest(api_test_lib.ApiCallHandlerTest):
         self.assertEqual(rows[0][8], "888")
         self.assertEqual(rows[0][9], "999")
 
+  def testParallelConversionPreservesOrder(self):
+    hunt_id = "B1C2E3D5"
+
+    hunt_obj = hunts_pb2.Hunt()
+    hunt_obj.hunt_id = hunt_id
+    hunt_obj.args.standard.flow_name = timeline.TimelineFlow.__name__
+    hunt_obj.hunt_state = hunts_pb2.Hunt.HuntState.PAUSED
+    data_store.REL_DB.WriteHuntObject(hunt_obj)
+
+    for idx in range(8):
+      client_id = db_test_utils.InitializeClient(data_store.REL_DB)
+
+      snapshot = objects_pb2.ClientSnapshot()
+      snapshot.client_id = client_id
+      snapshot.knowledge_base.fqdn = f"host{idx}.example.com"
+      data_store.REL_DB.WriteClientSnapshot(snapshot)
+
+      entries = []
+      for entry_idx in range(256):
+        entry = timeline_pb2.TimelineEntry()
+        entry.path = f"/foo/{idx}/bar{entry_idx}".encode("utf-8")
+        entry.size = random.randint(0, 1024)
+        entries.append(entry)
+
+      timeline_test_lib.WriteTimeline(client_id, entries, hunt_id=hunt_id)
+
+    args = api_timeline_pb2.ApiGetCollectedHuntTimelinesArgs()
+    args.hunt_id = hunt_id
+    args.format = api_timeline_pb2.ApiGetCollectedTimelineArgs.Format.BODY
+
+    sequential_handler = api_timeline.ApiGetCollectedHuntTimelinesHandler(
+        threads=0
+    )
+    # The buffer limit is tiny, so that the conversion threads have to wait
+    # for the archive generation all the time.
+    parallel_handler = api_timeline.ApiGetCollectedHuntTimelinesHandler(
+        threads=4, max_buffered_bytes=1
+    )
+
+    sequential = sequential_handler.Handle(args).GenerateContent()
+    parallel = parallel_handler.Handle(args).GenerateContent()
+
+    sequential_archive = zipfile.ZipFile(io.BytesIO(b"".join(sequential)))
+    parallel_archive = zipfile.ZipFile(io.BytesIO(b"".join(parallel)))
+
+    self.assertLen(parallel_archive.namelist(), 8)
+    self.assertEqual(
+        parallel_archive.namelist(), sequential_archive.namelist()
+    )
+    for filename in parallel_archive.namelist():
+      self.assertEqual(
+          parallel_archive.read(filename), sequential_archive.read(filename)
+      )
+
   def testRawGzchunkedMultipleClients(self):
     client_id_1 = db_test_utils.InitializeClient(data_store.REL_DB)
     client_id_2 = db_test_utils.InitializeClient(data_store.REL_DB)
@@ -608,5 +821,12 @@ class ApiGetCollectedHuntTimelinesHandlerTest(api_test_lib.ApiCallHandlerTest):
     self.assertEqual(rows[0][10], "1337.42")
 
 
+_TimeField = api_timeline_pb2.ApiListCollectedTimelineEntriesArgs.TimeField
+
+
+def _Entry(path: str, **kwargs) -> timeline_pb2.TimelineEntry:
+  return timeline_pb2.TimelineEntry(path=path.encode("utf-8"), **kwargs)
+
+
 if __name__ == "__main__":
   absltest.main()
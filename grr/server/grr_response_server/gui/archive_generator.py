@@ -3,14 +3,18 @@
 
 import enum
 import io
+import logging
 import os
+import time
 from typing import Callable, Dict, Iterable, Iterator, Optional
 import zipfile
 
 import yaml
 
+from grr_response_core import config
 from grr_response_core.lib import utils
 from grr_response_core.lib.util import collection
+from grr_response_core.stats import metrics
 from grr_response_proto import flows_pb2
 from grr_response_server import data_store
 from grr_response_server import file_store
@@ -23,11 +27,99 @@ from grr_response_server.models import clients as models_clients
 from grr_response_server.rdfvalues import objects as rdf_objects
 
 
+ARCHIVE_GENERATION_OUTPUT_BYTES = metrics.Counter(
+    "archive_generation_output_bytes", fields=[("generator", str)]
+)
+ARCHIVE_GENERATION_ARCHIVED_FILES = metrics.Counter(
+    "archive_generation_archived_files", fields=[("generator", str)]
+)
+ARCHIVE_GENERATION_THROUGHPUT = metrics.Event(
+    "archive_generation_throughput",
+    bins=[2**i * 1024 * 1024 for i in range(-4, 10)],
+    fields=[("generator", str)],
+)
+
+# Interval between progress log messages of a single archive generation.
+_PROGRESS_LOG_INTERVAL_SECONDS = 60
+
+
+class ArchiveProgress:
+  """Tracks progress and throughput of a single archive generation."""
+
+  def __init__(self, generator_name: str, prefix: str) -> None:
+    self.generator_name = generator_name
+    self.prefix = prefix
+    self.output_bytes = 0
+    self.archived_files = 0
+    self.start_time = time.monotonic()
+    self._last_log_time = self.start_time
+
+  @property
+  def elapsed_seconds(self) -> float:
+    return time.monotonic() - self.start_time
+
+  @property
+  def bytes_per_second(self) -> float:
+    elapsed = self.elapsed_seconds
+    if not elapsed:
+      return 0.0
+    return self.output_bytes / elapsed
+
+  def Track(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Passes through generated archive chunks, accounting for them."""
+    self.start_time = time.monotonic()
+    self._last_log_time = self.start_time
+    for chunk in chunks:
+      self.output_bytes += len(chunk)
+      ARCHIVE_GENERATION_OUTPUT_BYTES.Increment(
+          len(chunk), fields=[self.generator_name]
+      )
+
+      now = time.monotonic()
+      if now - self._last_log_time >= _PROGRESS_LOG_INTERVAL_SECONDS:
+        self._last_log_time = now
+        self._Log("in progress")
+
+      yield chunk
+
+    ARCHIVE_GENERATION_THROUGHPUT.RecordEvent(
+        self.bytes_per_second, fields=[self.generator_name]
+    )
+    self._Log("finished")
+
+  def FileArchived(self) -> None:
+    self.archived_files += 1
+    ARCHIVE_GENERATION_ARCHIVED_FILES.Increment(fields=[self.generator_name])
+
+  def _Log(self, state: str) -> None:
+    logging.info(
+        "Archive generation %s %s: %d files, %d bytes in %.1fs (%.1f KiB/s).",
+        self.prefix,
+        state,
+        self.archived_files,
+        self.output_bytes,
+        self.elapsed_seconds,
+        self.bytes_per_second / 1024,
+    )
+
+
 def _ClientPathToString(client_path: db.ClientPath, prefix: str = "") -> str:
   """Returns a path-like String of client_path with optional prefix."""
   return os.path.join(prefix, client_path.client_id, client_path.vfs_path)
 
 
+def _PrefetchSettings(
+    prefetch_threads: Optional[int],
+    max_prefetch_bytes: Optional[int],
+) -> tuple[int, int]:
+  """Returns file contents prefetch settings, falling back to the config."""
+  if prefetch_threads is None:
+    prefetch_threads = config.CONFIG["AdminUI.archive_prefetch_threads"]
+  if max_prefetch_bytes is None:
+    max_prefetch_bytes = config.CONFIG["AdminUI.archive_prefetch_max_bytes"]
+  return prefetch_threads, max_prefetch_bytes
+
+
 class ArchiveFormat(enum.Enum):
   ZIP = 1
   TAR_GZ = 2
@@ -54,6 +146,8 @@ class CollectionArchiveGenerator:
       prefix: Optional[str] = None,
       description: Optional[str] = None,
       predicate: Optional[Callable[db.ClientPath, bool]] = None,
+      prefetch_threads: Optional[int] = None,
+      max_prefetch_bytes: Optional[int] = None,
   ):
     """CollectionArchiveGenerator constructor.
 
@@ -68,6 +162,11 @@ class CollectionArchiveGenerator:
       predicate: If not None, only the files matching the predicate will be
         archived, all others will be skipped. The predicate receives a
         db.ClientPath as input.
+      prefetch_threads: Number of threads reading file contents ahead of the
+        archive writer. Defaults to the `AdminUI.archive_prefetch_threads`
+        config option.
+      max_prefetch_bytes: Maximum number of bytes of file contents read ahead.
+        Defaults to the `AdminUI.archive_prefetch_max_bytes` config option.
 
     Raises:
       ValueError: if prefix is None.
@@ -96,6 +195,11 @@ class CollectionArchiveGenerator:
 
     self.predicate = predicate or (lambda _: True)
 
+    self.prefetch_threads, self.max_prefetch_bytes = _PrefetchSettings(
+        prefetch_threads, max_prefetch_bytes
+    )
+    self.progress = ArchiveProgress("collection", self.prefix)
+
   @property
   def output_size(self) -> int:
     return self.archive_generator.output_size
@@ -168,7 +272,13 @@ class CollectionArchiveGenerator:
     Yields:
       Binary chunks comprising the generated archive.
     """
+    return self.progress.Track(self._Generate(items))
 
+  def _Generate(
+      self,
+      items: Iterable[flows_pb2.FlowResult],
+  ) -> Iterator[bytes]:
+    """Generates archive chunks, see `Generate`."""
     client_ids = set()
     for item_batch in collection.Batch(items, self.BATCH_SIZE):
 
@@ -187,7 +297,11 @@ class CollectionArchiveGenerator:
         client_ids.add(client_path.client_id)
         client_paths.add(client_path)
 
-      for chunk in file_store.StreamFilesChunks(client_paths):
+      for chunk in file_store.StreamFilesChunks(
+          client_paths,
+          prefetch_threads=self.prefetch_threads,
+          max_prefetch_bytes=self.max_prefetch_bytes,
+      ):
         self.processed_files.add(chunk.client_path)
         for output in self._WriteFileChunk(chunk=chunk):
           yield output
@@ -232,6 +346,7 @@ class CollectionArchiveGenerator:
     if chunk.chunk_index == chunk.total_chunks - 1:
       yield self.archive_generator.WriteFileFooter()
       self.archived_files.add(chunk.client_path)
+      self.progress.FileArchived()
 
 
 class FlowArchiveGenerator:
@@ -243,6 +358,8 @@ class FlowArchiveGenerator:
       self,
       flow: flows_pb2.Flow,
       archive_format: ArchiveFormat,
+      prefetch_threads: Optional[int] = None,
+      max_prefetch_bytes: Optional[int] = None,
   ) -> None:
     self.flow = flow
     self.archive_format = archive_format
@@ -263,6 +380,11 @@ class FlowArchiveGenerator:
     self.filename = f"{self.prefix}.{extension}"
     self.num_archived_files = 0
 
+    self.prefetch_threads, self.max_prefetch_bytes = _PrefetchSettings(
+        prefetch_threads, max_prefetch_bytes
+    )
+    self.progress = ArchiveProgress("flow", self.prefix)
+
   def _GenerateDescription(
       self,
       processed_files: Dict[str, str],
@@ -314,6 +436,7 @@ class FlowArchiveGenerator:
 
     if chunk.chunk_index == chunk.total_chunks - 1:
       self.num_archived_files += 1
+      self.progress.FileArchived()
       yield self.archive_generator.WriteFileFooter()
 
   def Generate(
@@ -331,6 +454,13 @@ class FlowArchiveGenerator:
     Yields:
       Chunks of bytes of the generated archive.
     """
+    return self.progress.Track(self._Generate(mappings))
+
+  def _Generate(
+      self,
+      mappings: Iterator[flow_base.ClientPathArchiveMapping],
+  ) -> Iterator[bytes]:
+    """Generates archive chunks, see `Generate`."""
     processed_files = {}
     missing_files = set()
     for mappings_batch in collection.Batch(mappings, self.BATCH_SIZE):
@@ -341,7 +471,9 @@ class FlowArchiveGenerator:
 
       processed_in_batch = set()
       for chunk in file_store.StreamFilesChunks(
-          [m.client_path for m in mappings_batch]
+          [m.client_path for m in mappings_batch],
+          prefetch_threads=self.prefetch_threads,
+          max_prefetch_bytes=self.max_prefetch_bytes,
       ):
         processed_in_batch.add(chunk.client_path.path_id)
         processed_files[chunk.client_path.vfs_path] = archive_paths_by_id[
@@ -185,6 +185,39 @@ class CollectionArchiveGeneratorTest(test_lib.GRRBaseTest):
           client_info["knowledge_base"]["fqdn"], "Host-0.example.com"
       )
 
+  def testTracksProgress(self):
+    self._InitializeFiles()
+
+    fd_path = os.path.join(self.temp_dir, "archive")
+    generator = archive_generator.CollectionArchiveGenerator(
+        prefix="test_prefix", description="Test description"
+    )
+    with open(fd_path, "wb") as out_fd:
+      for chunk in generator.Generate(self.flow_results):
+        out_fd.write(chunk)
+
+    self.assertEqual(generator.progress.archived_files, 2)
+    self.assertEqual(generator.progress.output_bytes, os.path.getsize(fd_path))
+    self.assertGreater(generator.progress.bytes_per_second, 0)
+
+  def testPassesPrefetchSettingsToFileStore(self):
+    self._InitializeFiles()
+
+    with test_lib.ConfigOverrider({
+        "AdminUI.archive_prefetch_threads": 3,
+        "AdminUI.archive_prefetch_max_bytes": 1024,
+    }):
+      with mock.patch.object(
+          file_store,
+          "StreamFilesChunks",
+          wraps=file_store.StreamFilesChunks,
+      ) as stream_mock:
+        self._GenerateArchive(self.flow_results)
+
+    stream_mock.assert_called_once()
+    self.assertEqual(stream_mock.call_args.kwargs["prefetch_threads"], 3)
+    self.assertEqual(stream_mock.call_args.kwargs["max_prefetch_bytes"], 1024)
+
   def testCorrectlyAccountsForFailedFiles(self):
     self._InitializeFiles()
 
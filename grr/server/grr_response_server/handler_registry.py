@@ -2,6 +2,7 @@
 """A registry of all new style well known flows."""
 
 from grr_response_server import foreman
+from grr_response_server import output_plugin_queue
 from grr_response_server.flows.general import administrative
 from grr_response_server.flows.general import transfer
 
@@ -10,6 +11,7 @@ message_handlers = [
     administrative.ClientStartupHandler,
     administrative.ClientStatsHandler,
     foreman.ForemanMessageHandler,
+    output_plugin_queue.OutputPluginDeliveryHandler,
     transfer.BlobHandler,
 ]
 
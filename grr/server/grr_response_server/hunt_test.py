@@ -1041,6 +1041,26 @@ class HuntTest(
       )
       prev = p
 
+  def testHashCacheHitsAreReportedInResourceUsageStats(self):
+    hunt_id, client_ids = self._CreateAndRunHunt(
+        num_clients=3,
+        client_mock=hunt_test_lib.SampleHuntMock(
+            failrate=-1, hash_cache_hits=7
+        ),
+        client_rule_set=foreman_rules.ForemanClientRuleSet(),
+        client_rate=0,
+        args=self.ClientFileFinderHuntArgs(),
+    )
+
+    for client_id in client_ids:
+      flow_obj = data_store.REL_DB.ReadFlowObject(client_id, hunt_id)
+      self.assertEqual(flow_obj.hash_cache_hits, 7)
+
+    usage_stats = data_store.REL_DB.ReadHuntClientResourcesStats(hunt_id)
+    self.assertLen(usage_stats.worst_performers, 3)
+    for performer in usage_stats.worst_performers:
+      self.assertEqual(performer.hash_cache_hits, 7)
+
   def testHuntFlowLogsAreCorrectlyWrittenAndCanBeRead(self):
     hunt_args = rdf_hunt_objects.HuntArguments.Standard(
         flow_name=flow_test_lib.DummyLogFlow.__name__
@@ -9,7 +9,6 @@ from grr_response_core.lib.registry import MetaclassRegistry
 from grr_response_core.lib.util import collection
 from grr_response_server import data_store
 from grr_response_server import export
-from grr_response_server import export_converters_registry
 from grr_response_server.export_converters import base
 from grr_response_server.rdfvalues import mig_objects
 
@@ -100,6 +99,9 @@ class InstantOutputPluginWithExportConversion(InstantOutputPlugin):
   def __init__(self, *args, **kwargs):
     super().__init__(*args, **kwargs)
     self._cached_metadata = {}
+    # Created on first use, as export options may depend on the state of
+    # subclasses.
+    self._converter_cache = None
 
   def _GetMetadataForClients(self, client_urns):
     """Fetches metadata for a given list of clients."""
@@ -209,43 +211,47 @@ class InstantOutputPluginWithExportConversion(InstantOutputPlugin):
 
       yield converted_response
 
-  def _GenerateConvertedValues(self, converter, grr_messages):
-    """Generates converted values using given converter from given messages.
+  def _GenerateConvertedValues(self, converters, grr_messages):
+    """Generates converted values using given converters from given messages.
 
-    Groups values in batches of BATCH_SIZE size and applies the converter
-    to each batch.
+    Groups values in batches of BATCH_SIZE size and applies all the converters
+    to each batch. This way messages are read, their payloads are decoded and
+    their metadata is fetched only once, no matter how many converters there
+    are.
 
     Args:
-      converter: ExportConverter instance.
+      converters: ExportConverter instances.
       grr_messages: An iterable (a generator is assumed) with GRRMessage values.
 
     Yields:
-      Values generated by the converter.
+      Values generated by the converters.
 
     Raises:
       ValueError: if any of the GrrMessage objects doesn't have "source" set.
     """
     for batch in collection.Batch(grr_messages, self.BATCH_SIZE):
       metadata_items = self._GetMetadataForClients([gm.source for gm in batch])
-      batch_with_metadata = zip(metadata_items, [gm.payload for gm in batch])
+      batch_with_metadata = list(
+          zip(metadata_items, [gm.payload for gm in batch])
+      )
 
-      for result in converter.BatchConvert(batch_with_metadata):
-        yield result
+      for converter in converters:
+        for result in converter.BatchConvert(batch_with_metadata):
+          yield result
 
   def ProcessValues(self, value_type, values_generator_fn):
-    converter_classes = export_converters_registry.GetConvertersByClass(
-        value_type
-    )
-    if not converter_classes:
+    if self._converter_cache is None:
+      self._converter_cache = export.ConverterCache(self.GetExportOptions())
+
+    converters = self._converter_cache.Get(value_type)
+    if not converters:
       return
-    converters = [cls(self.GetExportOptions()) for cls in converter_classes]
 
     next_types = set()
     processed_types = set()
     while True:
-      converted_responses = collection.Flatten(
-          self._GenerateConvertedValues(converter, values_generator_fn())
-          for converter in converters
+      converted_responses = self._GenerateConvertedValues(
+          converters, values_generator_fn()
       )
 
       generator = self._GenerateSingleTypeIteration(
@@ -22,6 +22,11 @@ class MessageHandler(object):
 
   handler_name = ""
 
+  # Requests of synchronous handlers are deleted once `ProcessMessages`
+  # returns. Asynchronous handlers delete them on their own once they are
+  # actually processed.
+  asynchronous = False
+
   def ProcessMessages(self, msgs):
     """This is where messages get processed.
 
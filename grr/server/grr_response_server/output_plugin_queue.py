@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+"""Asynchronous processing of hunt results with output plugins.
+
+When `Worker.async_hunt_output_plugins` is set, flows of hunts do not run
+output plugins on their results themselves. Instead, they queue references to
+the results (written as flow results to the database) as message handler
+requests. These are leased by workers and processed by `OutputPluginQueue` on
+a dedicated thread pool, so that slow output plugins do not slow down flow
+processing.
+
+Requests are deleted only after all output plugins of the hunt processed the
+referenced results. If a worker dies in the meantime, the lease of the request
+expires and another worker processes it again, so results are delivered to
+output plugins at least once.
+"""
+
+import collections
+from concurrent import futures
+import logging
+import threading
+from typing import Callable, Optional
+
+from grr_response_core import config
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib.rdfvalues import mig_protodict
+from grr_response_core.stats import metrics
+from grr_response_proto import flows_pb2
+from grr_response_server import data_store
+from grr_response_server import flow_base
+from grr_response_server import message_handlers
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
+from grr_response_server.rdfvalues import flow_runner as rdf_flow_runner
+from grr_response_server.rdfvalues import mig_flow_objects
+from grr_response_server.rdfvalues import mig_flow_runner
+from grr_response_server.rdfvalues import mig_objects
+from grr_response_server.rdfvalues import objects as rdf_objects
+from grr_response_server.rdfvalues import output_plugin as rdf_output_plugin
+
+OUTPUT_PLUGIN_QUEUE_BACKLOG = metrics.Gauge(
+    "output_plugin_queue_backlog", int, fields=[("plugin", str)]
+)
+OUTPUT_PLUGIN_QUEUE_LATENCY = metrics.Event(
+    "output_plugin_queue_latency",
+    bins=[0.1, 1, 10, 60, 5 * 60, 15 * 60, 60 * 60, 6 * 60 * 60],
+    fields=[("plugin", str)],
+)
+
+
+class _Lane:
+  """Batches waiting for and being processed by a single output plugin."""
+
+  def __init__(self) -> None:
+    self.running = 0
+    self.pending: collections.deque[Callable[[], None]] = collections.deque()
+
+
+class _Job:
+  """A queued batch of hunt results processed by all output plugins."""
+
+  def __init__(
+      self,
+      request: rdf_objects.MessageHandlerRequest,
+      delivery_request: rdf_output_plugin.OutputPluginDeliveryRequest,
+  ) -> None:
+    self.request = request
+    self.delivery_request = delivery_request
+    self.replies: list[rdf_flow_objects.FlowResult] = []
+    self.remaining = 0
+
+
+class OutputPluginQueue:
+  """Processes queued batches of hunt results with output plugins.
+
+  Every batch is processed by all output plugins of the hunt. Batches are
+  processed on a dedicated thread pool, but no single output plugin processes
+  more than the configured number of batches at a time, so that a slow plugin
+  cannot occupy all the threads.
+  """
+
+  def __init__(
+      self,
+      threads: int,
+      max_concurrency: int,
+      max_backlog: int,
+  ) -> None:
+    self._max_concurrency = max(1, max_concurrency)
+    self._max_backlog = max_backlog
+
+    self._executor = futures.ThreadPoolExecutor(
+        max_workers=max(1, threads),
+        thread_name_prefix="OutputPluginQueue",
+    )
+
+    self._lock = threading.Lock()
+    self._lanes: dict[str, _Lane] = collections.defaultdict(_Lane)
+    # Ids of requests accepted, but not processed yet. Leases of requests may
+    # expire while they are still being processed: we do not want to process
+    # these twice.
+    self._request_ids: set[int] = set()
+
+  def Submit(self, request: rdf_objects.MessageHandlerRequest) -> bool:
+    """Accepts a leased request for processing.
+
+    Args:
+      request: A request with an `OutputPluginDeliveryRequest` payload.
+
+    Returns:
+      Whether the request was accepted. Requests that are not accepted stay in
+      the queue and are processed once their lease expires.
+    """
+    with self._lock:
+      if request.request_id in self._request_ids:
+        return False
+
+      if len(self._request_ids) >= self._max_backlog:
+        return False
+
+      self._request_ids.add(request.request_id)
+
+    job = _Job(request, request.request.payload)
+    self._executor.submit(self._Prepare, job)
+    return True
+
+  def _Prepare(self, job: _Job) -> None:
+    """Reads results and plugins states of the job and schedules plugins."""
+    delivery_request = job.delivery_request
+
+    try:
+      states = data_store.REL_DB.ReadHuntOutputPluginsStates(
+          delivery_request.hunt_id
+      )
+      job.replies = [
+          mig_flow_objects.ToRDFFlowResult(result)
+          for result in data_store.REL_DB.ReadFlowResults(
+              delivery_request.client_id,
+              delivery_request.flow_id,
+              offset=delivery_request.results_offset,
+              count=delivery_request.results_count,
+          )
+      ]
+    except Exception:  # pylint: disable=broad-exception-caught
+      # The request stays in the queue and is retried once its lease expires.
+      logging.exception(
+          "Failed to read results queued for output plugins: %s",
+          delivery_request,
+      )
+      self._Release(job)
+      return
+
+    states = [mig_flow_runner.ToRDFOutputPluginState(s) for s in states]
+    if not states or not job.replies:
+      self._Finish(job)
+      return
+
+    job.remaining = len(states)
+    for index, state in enumerate(states):
+      plugin_name = state.plugin_descriptor.plugin_name
+      self._Schedule(
+          plugin_name,
+          lambda index=index, state=state: self._Run(job, index, state),
+      )
+
+  def _Schedule(self, plugin_name: str, func: Callable[[], None]) -> None:
+    """Runs the function in the lane of the given plugin."""
+    with self._lock:
+      lane = self._lanes[plugin_name]
+      if lane.running < self._max_concurrency:
+        lane.running += 1
+        self._executor.submit(self._RunInLane, plugin_name, func)
+      else:
+        lane.pending.append(func)
+
+      self._UpdateBacklog(plugin_name, lane)
+
+  def _RunInLane(self, plugin_name: str, func: Callable[[], None]) -> None:
+    try:
+      func()
+    finally:
+      with self._lock:
+        lane = self._lanes[plugin_name]
+        if lane.pending:
+          self._executor.submit(
+              self._RunInLane, plugin_name, lane.pending.popleft()
+          )
+        else:
+          lane.running -= 1
+
+        self._UpdateBacklog(plugin_name, lane)
+
+  def _UpdateBacklog(self, plugin_name: str, lane: _Lane) -> None:
+    backlog = lane.running + len(lane.pending)
+    OUTPUT_PLUGIN_QUEUE_BACKLOG.SetValue(backlog, fields=[plugin_name])
+
+  def _Run(
+      self,
+      job: _Job,
+      index: int,
+      state: rdf_flow_runner.OutputPluginState,
+  ) -> None:
+    """Processes results of the job with a single output plugin."""
+    try:
+      # The plugin might have processed other batches and updated its state
+      # since the job was prepared.
+      states = data_store.REL_DB.ReadHuntOutputPluginsStates(
+          job.delivery_request.hunt_id
+      )
+      state = mig_flow_runner.ToRDFOutputPluginState(states[index])
+
+      _ProcessReplies(job.delivery_request, index, state, job.replies)
+    except Exception:  # pylint: disable=broad-exception-caught
+      logging.exception(
+          "Failed to read state of output plugin %d: %s",
+          index,
+          job.delivery_request,
+      )
+    finally:
+      if job.request.timestamp:
+        latency = rdfvalue.RDFDatetime.Now() - job.request.timestamp
+        OUTPUT_PLUGIN_QUEUE_LATENCY.RecordEvent(
+            latency.ToFractional(rdfvalue.SECONDS),
+            fields=[state.plugin_descriptor.plugin_name],
+        )
+
+      with self._lock:
+        job.remaining -= 1
+        finished = not job.remaining
+
+      if finished:
+        self._Finish(job)
+
+  def _Finish(self, job: _Job) -> None:
+    try:
+      data_store.REL_DB.DeleteMessageHandlerRequests(
+          [mig_objects.ToProtoMessageHandlerRequest(job.request)]
+      )
+    finally:
+      self._Release(job)
+
+  def _Release(self, job: _Job) -> None:
+    with self._lock:
+      self._request_ids.discard(job.request.request_id)
+
+
+def _ProcessReplies(
+    delivery_request: rdf_output_plugin.OutputPluginDeliveryRequest,
+    index: int,
+    state: rdf_flow_runner.OutputPluginState,
+    replies: list[rdf_flow_objects.FlowResult],
+) -> None:
+  """Processes replies with a hunt output plugin.
+
+  This mirrors what flows do when processing their replies with hunt output
+  plugins synchronously: failures are recorded in output plugin logs and not
+  retried.
+
+  Args:
+    delivery_request: A request referencing the replies.
+    index: An index of the plugin among output plugins of the hunt.
+    state: A state of the plugin.
+    replies: Replies to process.
+  """
+  plugin_descriptor = state.plugin_descriptor
+  plugin_cls = plugin_descriptor.GetPluginClass()
+  plugin = plugin_cls(
+      source_urn=delivery_request.long_flow_id, args=plugin_descriptor.args
+  )
+
+  def WriteLogEntries(
+      log_entry_type: flows_pb2.FlowOutputPluginLogEntry.LogEntryType.ValueType,
+      plugin_message: str,
+      flow_message: str,
+  ) -> None:
+    data_store.REL_DB.WriteFlowOutputPluginLogEntry(
+        flows_pb2.FlowOutputPluginLogEntry(
+            client_id=delivery_request.client_id,
+            flow_id=delivery_request.flow_id,
+            hunt_id=delivery_request.hunt_id,
+            output_plugin_id="%d" % index,
+            log_entry_type=log_entry_type,
+            message=plugin_message,
+        )
+    )
+    data_store.REL_DB.WriteFlowLogEntry(
+        flows_pb2.FlowLogEntry(
+            client_id=delivery_request.client_id,
+            flow_id=delivery_request.flow_id,
+            hunt_id=delivery_request.hunt_id,
+            message=flow_message,
+        )
+    )
+
+  try:
+    plugin.ProcessResponses(state.plugin_state, replies)
+    plugin.Flush(state.plugin_state)
+
+    # Only do the REL_DB call if the plugin state has actually changed.
+    updated_plugin_state = state.plugin_state.Copy()
+    plugin.UpdateState(updated_plugin_state)
+    if updated_plugin_state != state.plugin_state:
+
+      def UpdateFn(plugin_state):
+        plugin_state_rdf = mig_protodict.ToRDFAttributedDict(plugin_state)
+        plugin.UpdateState(plugin_state_rdf)
+        return mig_protodict.ToProtoAttributedDict(plugin_state_rdf)
+
+      data_store.REL_DB.UpdateHuntOutputPluginState(
+          delivery_request.hunt_id, index, UpdateFn
+      )
+
+    WriteLogEntries(
+        flows_pb2.FlowOutputPluginLogEntry.LogEntryType.LOG,
+        "Processed %d replies." % len(replies),
+        "Plugin %s successfully processed %d flow replies."
+        % (plugin_descriptor, len(replies)),
+    )
+    flow_base.HUNT_RESULTS_RAN_THROUGH_PLUGIN.Increment(
+        len(replies), fields=[plugin_descriptor.plugin_name]
+    )
+  except Exception as e:  # pylint: disable=broad-except
+    logging.exception(
+        "Plugin %s failed to process %d replies.",
+        plugin_descriptor,
+        len(replies),
+    )
+    WriteLogEntries(
+        flows_pb2.FlowOutputPluginLogEntry.LogEntryType.ERROR,
+        "Error while processing %d replies: %s" % (len(replies), str(e)),
+        "Plugin %s failed to process %d replies due to: %s"
+        % (plugin_descriptor, len(replies), e),
+    )
+    flow_base.HUNT_OUTPUT_PLUGIN_ERRORS.Increment(
+        fields=[plugin_descriptor.plugin_name]
+    )
+
+
+_queue: Optional[OutputPluginQueue] = None
+_queue_lock = threading.Lock()
+
+
+def GetQueue() -> OutputPluginQueue:
+  """Returns the process-wide output plugin queue."""
+  global _queue
+
+  with _queue_lock:
+    if _queue is None:
+      _queue = OutputPluginQueue(
+          threads=config.CONFIG["Worker.output_plugin_threads"],
+          max_concurrency=config.CONFIG["Worker.output_plugin_max_concurrency"],
+          max_backlog=config.CONFIG["Worker.output_plugin_max_backlog"],
+      )
+
+    return _queue
+
+
+class OutputPluginDeliveryHandler(message_handlers.MessageHandler):
+  """Hands queued hunt results over to the output plugin queue."""
+
+  handler_name = flow_base.OUTPUT_PLUGIN_DELIVERY_HANDLER_NAME
+  asynchronous = True
+
+  def ProcessMessages(self, msgs):
+    queue = GetQueue()
+
+    rejected = 0
+    for msg in msgs:
+      if not queue.Submit(msg):
+        rejected += 1
+
+    if rejected:
+      logging.warning(
+          "%d batches of hunt results left in the output plugin queue.",
+          rejected,
+      )
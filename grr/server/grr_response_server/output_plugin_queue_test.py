@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""Tests for the asynchronous processing of hunt results."""
+
+import sys
+import threading
+import time
+
+from absl import app
+
+from grr_response_proto import flows_pb2
+from grr_response_server import data_store
+from grr_response_server import flow_base
+from grr_response_server import output_plugin
+from grr_response_server import output_plugin_queue
+from grr_response_server import worker_lib
+from grr_response_server.rdfvalues import mig_objects
+from grr_response_server.rdfvalues import output_plugin as rdf_output_plugin
+from grr.test_lib import hunt_test_lib
+from grr.test_lib import test_lib
+
+
+class ConcurrencyTrackingOutputPlugin(output_plugin.OutputPlugin):
+  """Output plugin recording how many instances process results at once."""
+
+  lock = threading.Lock()
+  running = 0
+  max_running = 0
+  num_calls = 0
+
+  def ProcessResponses(self, state, responses):
+    cls = ConcurrencyTrackingOutputPlugin
+
+    with cls.lock:
+      cls.running += 1
+      cls.max_running = max(cls.max_running, cls.running)
+
+    time.sleep(0.05)
+
+    with cls.lock:
+      cls.running -= 1
+      cls.num_calls += 1
+
+
+class OutputPluginQueueTest(
+    hunt_test_lib.StandardHuntTestMixin, test_lib.GRRBaseTest
+):
+
+  def setUp(self):
+    super().setUp()
+    self.client_ids = self.SetupClients(5)
+
+    config_overrider = test_lib.ConfigOverrider(
+        {"Worker.async_hunt_output_plugins": True}
+    )
+    config_overrider.Start()
+    self.addCleanup(config_overrider.Stop)
+
+  def _StartHuntWithPlugin(self, plugin_cls):
+    descriptor = rdf_output_plugin.OutputPluginDescriptor(
+        plugin_name=plugin_cls.__name__
+    )
+    hunt_id = self.StartHunt(output_plugins=[descriptor])
+    self.RunHunt(failrate=-1)
+    return hunt_id
+
+  def _QueuedRequests(self):
+    return [
+        r
+        for r in data_store.REL_DB.ReadMessageHandlerRequests()
+        if r.handler_name == flow_base.OUTPUT_PLUGIN_DELIVERY_HANDLER_NAME
+    ]
+
+  def _WaitForQueuedRequests(self):
+    deadline = time.time() + 10
+    while self._QueuedRequests():
+      if time.time() > deadline:
+        self.fail("Queued hunt results were not processed in time.")
+      time.sleep(0.01)
+
+  def _ReadPluginLogs(self, hunt_id, with_type):
+    return data_store.REL_DB.ReadHuntOutputPluginLogEntries(
+        hunt_id,
+        output_plugin_id="0",
+        offset=0,
+        count=sys.maxsize,
+        with_type=with_type,
+    )
+
+  def testResultsAreQueuedInsteadOfProcessedByFlows(self):
+    hunt_test_lib.DummyHuntOutputPlugin.num_calls = 0
+    hunt_test_lib.DummyHuntOutputPlugin.num_responses = 0
+
+    self._StartHuntWithPlugin(hunt_test_lib.DummyHuntOutputPlugin)
+
+    self.assertEqual(hunt_test_lib.DummyHuntOutputPlugin.num_calls, 0)
+    self.assertLen(self._QueuedRequests(), 5)
+
+  def testQueuedResultsAreProcessedByWorkers(self):
+    hunt_test_lib.DummyHuntOutputPlugin.num_calls = 0
+    hunt_test_lib.DummyHuntOutputPlugin.num_responses = 0
+
+    hunt_id = self._StartHuntWithPlugin(hunt_test_lib.DummyHuntOutputPlugin)
+
+    worker_lib.ProcessMessageHandlerRequests(self._QueuedRequests())
+    self._WaitForQueuedRequests()
+
+    self.assertEqual(hunt_test_lib.DummyHuntOutputPlugin.num_calls, 5)
+    self.assertEqual(hunt_test_lib.DummyHuntOutputPlugin.num_responses, 5)
+
+    logs = self._ReadPluginLogs(
+        hunt_id, flows_pb2.FlowOutputPluginLogEntry.LogEntryType.LOG
+    )
+    self.assertLen(logs, 5)
+    self.assertCountEqual([l.client_id for l in logs], self.client_ids)
+    for l in logs:
+      self.assertEqual(l.message, "Processed 1 replies.")
+
+  def testPluginStateIsUpdated(self):
+    hunt_test_lib.StatefulDummyHuntOutputPlugin.data = []
+
+    self._StartHuntWithPlugin(hunt_test_lib.StatefulDummyHuntOutputPlugin)
+
+    queue = output_plugin_queue.OutputPluginQueue(
+        threads=4, max_concurrency=1, max_backlog=100
+    )
+    for request in self._QueuedRequests():
+      queue.Submit(mig_objects.ToRDFMessageHandlerRequest(request))
+    self._WaitForQueuedRequests()
+
+    self.assertEqual(
+        hunt_test_lib.StatefulDummyHuntOutputPlugin.data, [0, 1, 2, 3, 4]
+    )
+
+  def testPluginFailuresAreLogged(self):
+    hunt_id = self._StartHuntWithPlugin(
+        hunt_test_lib.FailingDummyHuntOutputPlugin
+    )
+
+    worker_lib.ProcessMessageHandlerRequests(self._QueuedRequests())
+    self._WaitForQueuedRequests()
+
+    errors = self._ReadPluginLogs(
+        hunt_id, flows_pb2.FlowOutputPluginLogEntry.LogEntryType.ERROR
+    )
+    self.assertLen(errors, 5)
+    for e in errors:
+      self.assertEqual(e.message, "Error while processing 1 replies: Oh no!")
+
+  def testConcurrencyOfPluginIsLimited(self):
+    ConcurrencyTrackingOutputPlugin.max_running = 0
+    ConcurrencyTrackingOutputPlugin.num_calls = 0
+
+    self._StartHuntWithPlugin(ConcurrencyTrackingOutputPlugin)
+
+    queue = output_plugin_queue.OutputPluginQueue(
+        threads=4, max_concurrency=2, max_backlog=100
+    )
+    for request in self._QueuedRequests():
+      queue.Submit(mig_objects.ToRDFMessageHandlerRequest(request))
+    self._WaitForQueuedRequests()
+
+    self.assertEqual(ConcurrencyTrackingOutputPlugin.num_calls, 5)
+    self.assertEqual(ConcurrencyTrackingOutputPlugin.max_running, 2)
+
+  def testRequestsBeyondBacklogAreLeftInQueue(self):
+    self._StartHuntWithPlugin(ConcurrencyTrackingOutputPlugin)
+    requests = [
+        mig_objects.ToRDFMessageHandlerRequest(r)
+        for r in self._QueuedRequests()
+    ]
+
+    queue = output_plugin_queue.OutputPluginQueue(
+        threads=1, max_concurrency=1, max_backlog=2
+    )
+    self.assertTrue(queue.Submit(requests[0]))
+    # Requests that are being processed are not accepted twice.
+    self.assertFalse(queue.Submit(requests[0]))
+
+    accepted = [queue.Submit(r) for r in requests[1:]]
+    self.assertEqual(accepted, [True, False, False, False])
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -27,6 +27,10 @@ class CSVInstantOutputPlugin(
 
   ROW_BATCH = 100
 
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    self._csv_columns = {}
+
   def _GetCSVHeader(self, value_class, prefix=""):
     header = []
     for type_info in value_class.type_infos:
@@ -41,18 +45,51 @@ class CSVInstantOutputPlugin(
 
     return header
 
-  def _GetCSVRow(self, value):
-    row = []
-    for type_info in value.__class__.type_infos:
+  def _GetCSVColumns(self, value_class):
+    """Returns fields of the class written to CSV rows and their formatters.
+
+    Columns are computed once per class, so that type infos do not have to be
+    inspected for every exported value.
+
+    Args:
+      value_class: Class of exported values.
+
+    Returns:
+      A list of (field name, format function, nested columns) tuples. Nested
+      columns are set for embedded fields and are None otherwise.
+    """
+    try:
+      return self._csv_columns[value_class]
+    except KeyError:
+      pass
+
+    columns = []
+    for type_info in value_class.type_infos:
       if isinstance(type_info, rdf_structs.ProtoEmbedded):
-        row.extend(self._GetCSVRow(value.Get(type_info.name)))
+        columns.append(
+            (type_info.name, None, self._GetCSVColumns(type_info.type))
+        )
       elif isinstance(type_info, rdf_structs.ProtoBinary):
-        row.append(text.Asciify(value.Get(type_info.name)))
+        columns.append((type_info.name, text.Asciify, None))
       else:
-        row.append(str(value.Get(type_info.name)))
+        columns.append((type_info.name, str, None))
 
+    self._csv_columns[value_class] = columns
+    return columns
+
+  def _GetCSVRow(self, value):
+    row = []
+    self._AppendCSVRow(row, value, self._GetCSVColumns(value.__class__))
     return row
 
+  def _AppendCSVRow(self, row, value, columns):
+    for name, format_fn, nested_columns in columns:
+      field_value = value.Get(name)
+      if nested_columns is not None:
+        self._AppendCSVRow(row, field_value, nested_columns)
+      else:
+        row.append(format_fn(field_value))
+
   @property
   def path_prefix(self):
     prefix, _ = os.path.splitext(self.output_file_name)
@@ -12,21 +12,16 @@ import json
 from typing import Any
 from urllib import parse as urlparse
 
-import requests
-
 from google.protobuf import json_format
 from grr_response_core import config
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_proto import output_plugin_pb2
-from grr_response_server import data_store
-from grr_response_server import export
 from grr_response_server import output_plugin
 from grr_response_server.export_converters import base
 from grr_response_server.gui.api_plugins import flow as api_flow
-from grr_response_server.gui.api_plugins import mig_flow
+from grr_response_server.output_plugins import http_delivery
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
-from grr_response_server.rdfvalues import mig_objects
 
 BULK_OPERATIONS_PATH = "_bulk"
 
@@ -75,6 +70,22 @@ class ElasticsearchOutputPlugin(output_plugin.OutputPlugin):
 
     self._url = urlparse.urljoin(url, BULK_OPERATIONS_PATH)
 
+    headers = {"Content-Type": "application/json"}
+    if self._token:
+      headers["Authorization"] = "Basic {}".format(self._token)
+
+    # https://www.elastic.co/guide/en/elasticsearch/reference/7.1/docs-bulk.html
+    # Bulk requests consist of newline-terminated lines.
+    self._delivery = http_delivery.Delivery(
+        http_delivery.Endpoint(
+            url=self._url,
+            verify_https=self._verify_https,
+            headers=tuple(headers.items()),
+            separator=b"\n",
+            terminator=b"\n",
+        )
+    )
+
   def ProcessResponses(
       self,
       state: rdf_protodict.AttributedDict,
@@ -84,12 +95,16 @@ class ElasticsearchOutputPlugin(output_plugin.OutputPlugin):
     client_id = self._GetClientId(responses)
     flow_id = self._GetFlowId(responses)
 
-    client = self._GetClientMetadata(client_id)
-    flow = self._GetFlowMetadata(client_id, flow_id)
+    client = http_delivery.GetClientMetadata(client_id)
+    flow = http_delivery.GetFlowMetadata(client_id, flow_id)
 
     events = [self._MakeEvent(response, client, flow) for response in responses]
     self._SendEvents(events)
 
+  def Flush(self, state: rdf_protodict.AttributedDict) -> None:
+    """See base class."""
+    self._delivery.Flush()
+
   def _GetClientId(self, responses: list[rdf_flow_objects.FlowResult]) -> str:
     client_ids = {msg.client_id for msg in responses}
     if len(client_ids) > 1:
@@ -112,18 +127,6 @@ class ElasticsearchOutputPlugin(output_plugin.OutputPlugin):
       )
     return flow_ids.pop()
 
-  def _GetClientMetadata(self, client_id: str) -> base.ExportedMetadata:
-    info = data_store.REL_DB.ReadClientFullInfo(client_id)
-    info = mig_objects.ToRDFClientFullInfo(info)
-    metadata = export.GetMetadata(client_id, info)
-    metadata.timestamp = None  # timestamp is sent outside of metadata.
-    return metadata
-
-  def _GetFlowMetadata(self, client_id: str, flow_id: str) -> api_flow.ApiFlow:
-    flow_obj = data_store.REL_DB.ReadFlowObject(client_id, flow_id)
-    proto_api_flow = api_flow.InitApiFlowFromFlowObject(flow_obj)
-    return mig_flow.ToRDFApiFlow(proto_api_flow)
-
   def _MakeEvent(
       self,
       message: rdf_flow_objects.FlowResult,
@@ -144,30 +147,14 @@ class ElasticsearchOutputPlugin(output_plugin.OutputPlugin):
     return event
 
   def _SendEvents(self, events: list[JsonDict]) -> None:
-    """Uses the Elasticsearch bulk API to index all events in a single request."""
-    # https://www.elastic.co/guide/en/elasticsearch/reference/7.1/docs-bulk.html
-
-    if self._token:
-      headers = {
-          "Authorization": "Basic {}".format(self._token),
-          "Content-Type": "application/json",
-      }
-    else:
-      headers = {"Content-Type": "application/json"}
-
+    """Uses the Elasticsearch bulk API to index all events."""
     index_command = json.dumps({"index": {"_index": self._index}}, indent=None)
 
     # Each index operation is two lines, the first defining the index settings,
     # the second is the actual document to be indexed
-    data = (
-        "\n".join([
-            "{}\n{}".format(index_command, json.dumps(event, indent=None))
-            for event in events
-        ])
-        + "\n"
-    )
-
-    response = requests.post(
-        url=self._url, verify=self._verify_https, data=data, headers=headers
-    )
-    response.raise_for_status()
+    self._delivery.Send([
+        "{}\n{}".format(index_command, json.dumps(event, indent=None)).encode(
+            "utf-8"
+        )
+        for event in events
+    ])
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+"""Batched delivery of events sent by HTTP-based output plugins.
+
+HTTP-based output plugins (Splunk, Elasticsearch, Webhook) are instantiated for
+every batch of results of every flow. Sending each such batch in a separate,
+synchronous request on a fresh connection makes output plugin processing the
+bottleneck of workers during large hunts.
+
+This module provides a delivery layer shared by these plugins. Events of all
+flows that go to the same endpoint are coalesced into larger (optionally
+compressed) requests that are sent over a pool of persistent sessions and
+retried on transient errors. Client and flow metadata attached to the events is
+cached for a short time, so that it is not read for every batch.
+
+Configuration values for this module can be found in
+core/grr_response_core/config/output_plugins.py
+"""
+
+from concurrent import futures
+import dataclasses
+import datetime
+import gzip
+import threading
+import time
+from typing import Optional, Sequence
+
+import requests
+
+from grr_response_core import config
+from grr_response_core.lib import rdfvalue
+from grr_response_core.lib import utils
+from grr_response_core.lib.util import retry
+from grr_response_core.stats import metrics
+from grr_response_server import data_store
+from grr_response_server import export
+from grr_response_server.export_converters import base
+from grr_response_server.gui.api_plugins import flow as api_flow
+from grr_response_server.gui.api_plugins import mig_flow
+from grr_response_server.rdfvalues import mig_objects
+
+HTTP_OUTPUT_PLUGIN_REQUESTS = metrics.Counter(
+    "http_output_plugin_requests", fields=[("status", str)]
+)
+HTTP_OUTPUT_PLUGIN_EVENTS_PER_REQUEST = metrics.Event(
+    "http_output_plugin_events_per_request",
+    bins=[2**i for i in range(0, 16)],
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class Endpoint:
+  """An HTTP endpoint events are delivered to.
+
+  Attributes:
+    url: A URL to POST requests with events to.
+    verify_https: Whether to verify certificates of HTTPS connections.
+    headers: Headers to send with every request.
+    separator: Bytes separating consecutive events in a request body.
+    terminator: Bytes terminating every request body.
+  """
+
+  url: str
+  verify_https: bool
+  headers: tuple[tuple[str, str], ...] = ()
+  separator: bytes = b"\n"
+  terminator: bytes = b""
+
+
+@dataclasses.dataclass(frozen=True)
+class _Options:
+  """Options of event delivery read from the configuration."""
+
+  connections: int
+  max_batch_bytes: int
+  max_batch_delay_seconds: float
+  gzip: bool
+  retry_max_attempts: int
+  retry_interval: datetime.timedelta
+  retry_multiplier: float
+  retry_status_codes: tuple[int, ...]
+
+  @classmethod
+  def FromConfig(cls) -> "_Options":
+    return cls(
+        connections=max(1, config.CONFIG["HttpOutputPlugins.connections"]),
+        max_batch_bytes=config.CONFIG["HttpOutputPlugins.max_batch_bytes"],
+        max_batch_delay_seconds=config.CONFIG[
+            "HttpOutputPlugins.max_batch_delay"
+        ].ToFractional(rdfvalue.SECONDS),
+        gzip=config.CONFIG["HttpOutputPlugins.gzip"],
+        retry_max_attempts=max(
+            1, config.CONFIG["HttpOutputPlugins.retry_max_attempts"]
+        ),
+        retry_interval=config.CONFIG[
+            "HttpOutputPlugins.retry_interval"
+        ].AsTimedelta(),
+        retry_multiplier=config.CONFIG["HttpOutputPlugins.retry_multiplier"],
+        retry_status_codes=tuple(
+            config.CONFIG["HttpOutputPlugins.retry_status_codes"]
+        ),
+    )
+
+
+class Batch:
+  """Events delivered to an endpoint in a single request."""
+
+  def __init__(self, deadline: float) -> None:
+    self.events: list[bytes] = []
+    self.size_bytes = 0
+    # A time (as returned by `time.monotonic`) after which the batch is sent
+    # even if it is not full and all the connections are busy.
+    self.deadline = deadline
+    # Set once the batch is sealed: no more events are added to it then.
+    self.future: Optional[futures.Future[None]] = None
+
+
+class Sink:
+  """Delivers events to a single endpoint in batches.
+
+  Events are added to the currently open batch. The batch is sealed and sent
+  once it is full, or once somebody waits for it and either there is an idle
+  connection or the batch has been open for longer than the maximum delay. This
+  way events are sent without additional delay when the endpoint keeps up, and
+  events of concurrently processed flows are coalesced into larger requests
+  when it does not.
+
+  Sinks are shared between all output plugin instances sending to the same
+  endpoint, see `GetSink`.
+  """
+
+  def __init__(self, endpoint: Endpoint, options: _Options) -> None:
+    self._endpoint = endpoint
+    self._options = options
+
+    self._executor = futures.ThreadPoolExecutor(
+        max_workers=options.connections,
+        thread_name_prefix="HttpOutputPluginSink",
+    )
+    # Sessions are not thread-safe, so every thread of the pool keeps its own.
+    self._sessions = threading.local()
+
+    self._cond = threading.Condition()
+    self._batch: Optional[Batch] = None
+    self._in_flight = 0
+
+    self._post = retry.When(
+        requests.RequestException,
+        self._IsErrorRetryable,
+        opts=retry.Opts(
+            attempts=options.retry_max_attempts,
+            init_delay=options.retry_interval,
+            backoff=options.retry_multiplier,
+        ),
+    )(self._Post)
+
+  def Add(self, events: Sequence[bytes]) -> list[Batch]:
+    """Adds events to be delivered to the endpoint.
+
+    Args:
+      events: Serialized events to deliver.
+
+    Returns:
+      Batches the events were added to. These have to be passed to `Wait`.
+    """
+    batches = []
+
+    with self._cond:
+      for event in events:
+        batch = self._batch
+        if batch is not None and (
+            batch.size_bytes + len(event) > self._options.max_batch_bytes
+        ):
+          self._Seal(batch)
+          batch = None
+
+        if batch is None:
+          deadline = time.monotonic() + self._options.max_batch_delay_seconds
+          batch = self._batch = Batch(deadline)
+
+        batch.events.append(event)
+        batch.size_bytes += len(event)
+
+        if not batches or batches[-1] is not batch:
+          batches.append(batch)
+
+    return batches
+
+  def Wait(self, batches: Sequence[Batch]) -> None:
+    """Waits until given batches are delivered.
+
+    Args:
+      batches: Batches returned by `Add`.
+
+    Raises:
+      requests.RequestException: If delivery of any of the batches failed.
+    """
+    with self._cond:
+      for batch in batches:
+        while batch.future is None:
+          now = time.monotonic()
+          if (
+              self._in_flight < self._options.connections
+              or now >= batch.deadline
+          ):
+            self._Seal(batch)
+          else:
+            self._cond.wait(batch.deadline - now)
+
+    for batch in batches:
+      batch.future.result()
+
+  def _Seal(self, batch: Batch) -> None:
+    """Stops adding events to the batch and schedules its delivery."""
+    if self._batch is batch:
+      self._batch = None
+
+    self._in_flight += 1
+    batch.future = self._executor.submit(self._Deliver, batch)
+    batch.future.add_done_callback(self._Delivered)
+
+  def _Delivered(self, future: futures.Future[None]) -> None:
+    del future  # Unused.
+
+    with self._cond:
+      self._in_flight -= 1
+      self._cond.notify_all()
+
+  def _Deliver(self, batch: Batch) -> None:
+    """Sends all events of the batch in a single request."""
+    events, batch.events = batch.events, []
+
+    data = self._endpoint.separator.join(events) + self._endpoint.terminator
+    headers = dict(self._endpoint.headers)
+    if self._options.gzip:
+      data = gzip.compress(data, compresslevel=6)
+      headers["Content-Encoding"] = "gzip"
+
+    HTTP_OUTPUT_PLUGIN_EVENTS_PER_REQUEST.RecordEvent(len(events))
+    self._post(data, headers)
+
+  def _Post(self, data: bytes, headers: dict[str, str]) -> None:
+    session = getattr(self._sessions, "session", None)
+    if session is None:
+      session = self._sessions.session = requests.Session()
+
+    try:
+      response = session.post(
+          url=self._endpoint.url,
+          verify=self._endpoint.verify_https,
+          data=data,
+          headers=headers,
+      )
+    except requests.RequestException:
+      HTTP_OUTPUT_PLUGIN_REQUESTS.Increment(fields=["error"])
+      raise
+
+    HTTP_OUTPUT_PLUGIN_REQUESTS.Increment(fields=[str(response.status_code)])
+    response.raise_for_status()
+
+  def _IsErrorRetryable(self, error: requests.RequestException) -> bool:
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+      return True
+
+    response = error.response
+    if response is None:
+      return False
+
+    return response.status_code in self._options.retry_status_codes
+
+
+_sinks: dict[tuple[Endpoint, _Options], Sink] = {}
+_sinks_lock = threading.Lock()
+
+
+def GetSink(endpoint: Endpoint) -> Sink:
+  """Returns a sink delivering events to the given endpoint."""
+  key = (endpoint, _Options.FromConfig())
+
+  with _sinks_lock:
+    try:
+      return _sinks[key]
+    except KeyError:
+      sink = _sinks[key] = Sink(*key)
+      return sink
+
+
+class Delivery:
+  """Delivers events sent by a single output plugin instance.
+
+  Output plugins should add events of every processed batch of responses with
+  `Send` and wait for their delivery in `Flush`.
+  """
+
+  def __init__(self, endpoint: Endpoint) -> None:
+    self._sink = GetSink(endpoint)
+    self._batches: list[Batch] = []
+    self._lock = threading.Lock()
+
+  def Send(self, events: Sequence[bytes]) -> None:
+    """Schedules delivery of the given serialized events."""
+    batches = self._sink.Add(events)
+
+    with self._lock:
+      self._batches.extend(batches)
+
+  def Flush(self) -> None:
+    """Waits until all the events sent so far are delivered."""
+    with self._lock:
+      batches, self._batches = self._batches, []
+
+    self._sink.Wait(batches)
+
+
+_metadata_caches_lock = threading.Lock()
+_client_metadata_cache: Optional[utils.AgeBasedCache] = None
+_flow_metadata_cache: Optional[utils.AgeBasedCache] = None
+
+
+def _MetadataCaches() -> tuple[utils.AgeBasedCache, utils.AgeBasedCache]:
+  """Returns caches of client and flow metadata, creating them if needed."""
+  global _client_metadata_cache, _flow_metadata_cache
+
+  with _metadata_caches_lock:
+    if _client_metadata_cache is None or _flow_metadata_cache is None:
+      max_size = config.CONFIG["HttpOutputPlugins.metadata_cache_size"]
+      max_age = config.CONFIG["HttpOutputPlugins.metadata_cache_ttl"]
+      max_age = max_age.ToFractional(rdfvalue.SECONDS)
+
+      _client_metadata_cache = utils.AgeBasedCache(max_size, max_age)
+      _flow_metadata_cache = utils.AgeBasedCache(max_size, max_age)
+
+    return _client_metadata_cache, _flow_metadata_cache
+
+
+def FlushMetadataCache() -> None:
+  """Drops all cached client and flow metadata."""
+  for cache in _MetadataCaches():
+    cache.Flush()
+
+
+def GetClientMetadata(client_id: str) -> base.ExportedMetadata:
+  """Returns (possibly cached) metadata of the given client."""
+  cache, _ = _MetadataCaches()
+
+  try:
+    return cache.Get(client_id)
+  except KeyError:
+    pass
+
+  info = data_store.REL_DB.ReadClientFullInfo(client_id)
+  info = mig_objects.ToRDFClientFullInfo(info)
+  metadata = export.GetMetadata(client_id, info)
+  metadata.timestamp = None  # timestamp is sent outside of metadata.
+
+  cache.Put(client_id, metadata)
+  return metadata
+
+
+def GetFlowMetadata(client_id: str, flow_id: str) -> api_flow.ApiFlow:
+  """Returns (possibly cached) metadata of the given flow."""
+  _, cache = _MetadataCaches()
+
+  try:
+    return cache.Get((client_id, flow_id))
+  except KeyError:
+    pass
+
+  flow_obj = data_store.REL_DB.ReadFlowObject(client_id, flow_id)
+  proto_api_flow = api_flow.InitApiFlowFromFlowObject(flow_obj)
+  flow = mig_flow.ToRDFApiFlow(proto_api_flow)
+
+  cache.Put((client_id, flow_id), flow)
+  return flow
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""Tests for the delivery of events sent by HTTP-based output plugins."""
+
+import gzip
+from unittest import mock
+
+from absl import app
+import requests
+
+from grr_response_server import data_store
+from grr_response_server.output_plugins import http_delivery
+from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
+from grr_response_server.rdfvalues import mig_flow_objects
+from grr.test_lib import test_lib
+
+# For a mocked object's `call_args` property, the index of the kwargs dict
+KWARGS = 1
+
+
+def _Response(status_code: int) -> requests.Response:
+  response = requests.Response()
+  response.status_code = status_code
+  return response
+
+
+def _Endpoint(**kwargs) -> http_delivery.Endpoint:
+  return http_delivery.Endpoint(url="http://a", verify_https=True, **kwargs)
+
+
+class DeliveryTest(test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super().setUp()
+
+    config_overrider = test_lib.ConfigOverrider({
+        "HttpOutputPlugins.gzip": False,
+        "HttpOutputPlugins.retry_interval": "0s",
+    })
+    config_overrider.Start()
+    self.addCleanup(config_overrider.Stop)
+
+    post_patcher = mock.patch.object(
+        requests.Session, "post", return_value=_Response(200)
+    )
+    self.post = post_patcher.start()
+    self.addCleanup(post_patcher.stop)
+
+  def _RequestBodies(self) -> list[bytes]:
+    return [call[KWARGS]["data"] for call in self.post.call_args_list]
+
+  def testSendsEvents(self):
+    endpoint = _Endpoint(headers=(("Authorization", "foo"),), terminator=b"\n")
+    delivery = http_delivery.Delivery(endpoint)
+
+    delivery.Send([b"foo", b"bar"])
+    delivery.Flush()
+
+    self.post.assert_called_once()
+    self.assertEqual(self.post.call_args[KWARGS]["url"], "http://a")
+    self.assertTrue(self.post.call_args[KWARGS]["verify"])
+    self.assertEqual(
+        self.post.call_args[KWARGS]["headers"], {"Authorization": "foo"}
+    )
+    self.assertEqual(self._RequestBodies(), [b"foo\nbar\n"])
+
+  def testFlushWithoutEventsDoesNotSendRequests(self):
+    delivery = http_delivery.Delivery(_Endpoint())
+    delivery.Flush()
+
+    self.post.assert_not_called()
+
+  def testBatchesEventsOfMultipleDeliveries(self):
+    first = http_delivery.Delivery(_Endpoint())
+    second = http_delivery.Delivery(_Endpoint())
+
+    first.Send([b"foo"])
+    second.Send([b"bar"])
+    first.Flush()
+    second.Flush()
+
+    self.assertEqual(self._RequestBodies(), [b"foo\nbar"])
+
+  def testSplitsBatchesExceedingMaxBytes(self):
+    with test_lib.ConfigOverrider({"HttpOutputPlugins.max_batch_bytes": 8}):
+      delivery = http_delivery.Delivery(_Endpoint())
+
+    delivery.Send([b"foo", b"bar", b"bazquuxnorf", b"thud"])
+    delivery.Flush()
+
+    self.assertCountEqual(
+        self._RequestBodies(), [b"foo\nbar", b"bazquuxnorf", b"thud"]
+    )
+
+  def testCompressesRequests(self):
+    with test_lib.ConfigOverrider({"HttpOutputPlugins.gzip": True}):
+      delivery = http_delivery.Delivery(_Endpoint())
+
+    delivery.Send([b"foo"])
+    delivery.Flush()
+
+    self.assertEqual(
+        self.post.call_args[KWARGS]["headers"], {"Content-Encoding": "gzip"}
+    )
+    self.assertEqual(gzip.decompress(self._RequestBodies()[0]), b"foo")
+
+  def testRetriesRetryableErrors(self):
+    self.post.side_effect = [
+        _Response(503),
+        requests.exceptions.ConnectionError(),
+        _Response(200),
+    ]
+
+    delivery = http_delivery.Delivery(_Endpoint())
+    delivery.Send([b"foo"])
+    delivery.Flush()
+
+    self.assertEqual(self._RequestBodies(), [b"foo"] * 3)
+
+  def testRaisesAfterMaxAttempts(self):
+    self.post.return_value = _Response(503)
+
+    with test_lib.ConfigOverrider({"HttpOutputPlugins.retry_max_attempts": 2}):
+      delivery = http_delivery.Delivery(_Endpoint())
+
+    delivery.Send([b"foo"])
+    with self.assertRaises(requests.exceptions.HTTPError):
+      delivery.Flush()
+
+    self.assertEqual(self.post.call_count, 2)
+
+  def testDoesNotRetryNonRetryableErrors(self):
+    self.post.return_value = _Response(400)
+
+    delivery = http_delivery.Delivery(_Endpoint())
+    delivery.Send([b"foo"])
+    with self.assertRaises(requests.exceptions.HTTPError):
+      delivery.Flush()
+
+    self.post.assert_called_once()
+
+
+class MetadataTest(test_lib.GRRBaseTest):
+
+  def setUp(self):
+    super().setUp()
+    http_delivery.FlushMetadataCache()
+
+  def testClientMetadataIsCached(self):
+    client_id = self.SetupClient(0, fqdn="foo.example.com")
+
+    metadata = http_delivery.GetClientMetadata(client_id)
+    self.assertEqual(metadata.hostname, "foo.example.com")
+    self.assertIsNone(metadata.timestamp)
+
+    with mock.patch.object(data_store.REL_DB, "ReadClientFullInfo") as read:
+      self.assertEqual(http_delivery.GetClientMetadata(client_id), metadata)
+    read.assert_not_called()
+
+  def testFlowMetadataIsCached(self):
+    client_id = self.SetupClient(0)
+    data_store.REL_DB.WriteFlowObject(
+        mig_flow_objects.ToProtoFlow(
+            rdf_flow_objects.Flow(
+                flow_id="12345678",
+                client_id=client_id,
+                flow_class_name="ClientFileFinder",
+            )
+        )
+    )
+
+    flow = http_delivery.GetFlowMetadata(client_id, "12345678")
+    self.assertEqual(flow.name, "ClientFileFinder")
+
+    with mock.patch.object(data_store.REL_DB, "ReadFlowObject") as read:
+      cached_flow = http_delivery.GetFlowMetadata(client_id, "12345678")
+    self.assertEqual(cached_flow, flow)
+    read.assert_not_called()
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """Tests for Splunk output plugin."""
 
+import gzip
 import json
 from unittest import mock
 
@@ -12,6 +13,7 @@ from grr_response_core.lib.rdfvalues import client as rdf_client
 from grr_response_core.lib.rdfvalues import client_fs as rdf_client_fs
 from grr_response_core.lib.rdfvalues import paths as rdf_paths
 from grr_response_server import data_store
+from grr_response_server.output_plugins import http_delivery
 from grr_response_server.output_plugins import splunk_plugin
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import mig_flow_objects
@@ -26,6 +28,7 @@ class SplunkOutputPluginTest(flow_test_lib.FlowTestsBaseclass):
 
   def setUp(self):
     super().setUp()
+    http_delivery.FlushMetadataCache()
 
     self.client_id = self.SetupClient(0)
     self.flow_id = '12345678'
@@ -60,7 +63,7 @@ class SplunkOutputPluginTest(flow_test_lib.FlowTestsBaseclass):
     )
 
     if patcher is None:
-      patcher = mock.patch.object(requests, 'post')
+      patcher = mock.patch.object(requests.Session, 'post')
 
     with patcher as patched:
       plugin.ProcessResponses(plugin_state, messages)
@@ -69,8 +72,11 @@ class SplunkOutputPluginTest(flow_test_lib.FlowTestsBaseclass):
 
     return patched
 
+  def _RequestData(self, patched):
+    return gzip.decompress(patched.call_args[KWARGS]['data']).decode('utf-8')
+
   def _ParseEvents(self, patched):
-    request = patched.call_args[KWARGS]['data']
+    request = self._RequestData(patched)
     return [json.loads(part) for part in request.split('\n\n')]
 
   def testPopulatesEventCorrectly(self):
@@ -229,7 +235,7 @@ class SplunkOutputPluginTest(flow_test_lib.FlowTestsBaseclass):
         self._CallPlugin(
             plugin_args=splunk_plugin.SplunkOutputPluginArgs(),
             responses=[rdf_client.Process(pid=42)],
-            patcher=mock.patch.object(requests, 'post', post),
+            patcher=mock.patch.object(requests.Session, 'post', post),
         )
 
 
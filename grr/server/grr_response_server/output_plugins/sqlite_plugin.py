@@ -1,9 +1,9 @@
 #!/usr/bin/env python
 """Plugin that exports results as SQLite db scripts."""
 
-import io
+import contextlib
+import itertools
 import os
-import sqlite3
 import zipfile
 
 import yaml
@@ -12,6 +12,7 @@ from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import collection
+from grr_response_core.lib.util import sqlite
 from grr_response_server import instant_output_plugin
 
 
@@ -84,7 +85,7 @@ class SqliteInstantOutputPlugin(
   description = "Output ZIP archive containing SQLite scripts."
   output_file_extension = ".zip"
 
-  ROW_BATCH = 100
+  ROW_BATCH = 1000
 
   def __init__(self, *args, **kwargs):
     super().__init__(*args, **kwargs)
@@ -125,42 +126,23 @@ class SqliteInstantOutputPlugin(
         original_value_type.__name__,
     )
     schema = self._GetSqliteSchema(first_value.__class__)
+    columns = [(k, v.sqlite_type) for k, v in schema.items()]
 
-    # We will buffer the sql statements into an in-memory sql database before
-    # dumping them to the zip archive. We rely on the PySQLite library for
-    # string escaping.
-    db_connection = sqlite3.connect(":memory:")
-    db_cursor = db_connection.cursor()
+    # Rows are rendered into SQL statements by an in-memory SQLite database in
+    # batches. We rely on SQLite for string escaping.
+    with contextlib.closing(sqlite.TableDump(table_name, columns)) as dump:
+      chunk = "BEGIN TRANSACTION;\n%s\n" % dump.create_statement
+      yield self.archive_generator.WriteFileChunk(chunk.encode("utf-8"))
 
-    yield self.archive_generator.WriteFileChunk(
-        "BEGIN TRANSACTION;\n".encode("utf-8")
-    )
+      counter = 0
+      values = itertools.chain([first_value], exported_values)
+      for batch in collection.Batch(values, self.ROW_BATCH):
+        counter += len(batch)
+
+        rows = [self._GetSqlRow(schema, value) for value in batch]
+        chunk = "".join(statement + "\n" for statement in dump.Dump(rows))
+        yield self.archive_generator.WriteFileChunk(chunk.encode("utf-8"))
 
-    with db_connection:
-      buf = io.StringIO()
-      buf.write('CREATE TABLE "%s" (\n  ' % table_name)
-      column_types = [(k, v.sqlite_type) for k, v in schema.items()]
-      buf.write(",\n  ".join(['"%s" %s' % (k, v) for k, v in column_types]))
-      buf.write("\n);")
-      db_cursor.execute(buf.getvalue())
-
-      chunk = (buf.getvalue() + "\n").encode("utf-8")
-      yield self.archive_generator.WriteFileChunk(chunk)
-
-      self._InsertValueIntoDb(table_name, schema, first_value, db_cursor)
-
-    for sql in self._FlushAllRows(db_connection, table_name):
-      yield sql
-    counter = 1
-    for batch in collection.Batch(exported_values, self.ROW_BATCH):
-      counter += len(batch)
-      with db_connection:
-        for value in batch:
-          self._InsertValueIntoDb(table_name, schema, value, db_cursor)
-      for sql in self._FlushAllRows(db_connection, table_name):
-        yield sql
-
-    db_connection.close()
     yield self.archive_generator.WriteFileChunk("COMMIT;\n".encode("utf-8"))
     yield self.archive_generator.WriteFileFooter()
 
@@ -184,14 +166,10 @@ class SqliteInstantOutputPlugin(
         schema[field_name] = Rdf2SqliteAdapter.GetConverter(type_info)
     return schema
 
-  def _InsertValueIntoDb(self, table_name, schema, value, db_cursor):
+  def _GetSqlRow(self, schema, value):
+    """Returns values of all columns of the schema for the given value."""
     sql_dict = self._ConvertToCanonicalSqlDict(schema, value.ToPrimitiveDict())
-    buf = io.StringIO()
-    buf.write('INSERT INTO "%s" (\n  ' % table_name)
-    buf.write(",\n  ".join(['"%s"' % k for k in sql_dict.keys()]))
-    buf.write("\n)")
-    buf.write("VALUES (%s);" % ",".join(["?"] * len(sql_dict)))
-    db_cursor.execute(buf.getvalue(), list(sql_dict.values()))
+    return [sql_dict.get(column) for column in schema]
 
   def _ConvertToCanonicalSqlDict(self, schema, raw_dict, prefix=""):
     """Converts a dict of RDF values into a SQL-ready form."""
@@ -208,22 +186,6 @@ class SqliteInstantOutputPlugin(
         flattened_dict[field_name] = schema[field_name].convert_fn(v)
     return flattened_dict
 
-  def _FlushAllRows(self, db_connection, table_name):
-    """Copies rows from the given db into the output file then deletes them."""
-    for sql in db_connection.iterdump():
-      if (
-          sql.startswith("CREATE TABLE")
-          or sql.startswith("BEGIN TRANSACTION")
-          or sql.startswith("COMMIT")
-      ):
-        # These statements only need to be written once.
-        continue
-      # The archive generator expects strings (not Unicode objects returned by
-      # the pysqlite library).
-      yield self.archive_generator.WriteFileChunk((sql + "\n").encode("utf-8"))
-    with db_connection:
-      db_connection.cursor().execute('DELETE FROM "%s";' % table_name)
-
   def Finish(self):
     manifest = {"export_stats": self.export_counts}
     manifest_bytes = yaml.safe_dump(manifest).encode("utf-8")
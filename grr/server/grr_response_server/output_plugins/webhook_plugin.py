@@ -9,22 +9,17 @@ import json
 from typing import Any
 from urllib.parse import urlparse
 
-import requests
-
 from google.protobuf import json_format
 from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_proto import output_plugin_pb2
-from grr_response_server import data_store
-from grr_response_server import export
 from grr_response_server import output_plugin
 from grr_response_server.export_converters import base
 from grr_response_server.gui.api_plugins import flow as api_flow
-from grr_response_server.gui.api_plugins import mig_flow
+from grr_response_server.output_plugins import http_delivery
 from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
-from grr_response_server.rdfvalues import mig_objects
 
 JsonDict = dict[str, Any]
 
@@ -66,6 +61,14 @@ class WebhookOutputPlugin(output_plugin.OutputPlugin):
       )
 
     self._url = urlparse(url).geturl()
+    self._delivery = http_delivery.Delivery(
+        http_delivery.Endpoint(
+            url=self._url,
+            verify_https=self._verify_https,
+            # Multiple events in one request are separated by two newlines.
+            separator=b"\n\n",
+        )
+    )
 
   def ProcessResponses(
       self,
@@ -76,12 +79,16 @@ class WebhookOutputPlugin(output_plugin.OutputPlugin):
     client_id = self._GetClientId(responses)
     flow_id = self._GetFlowId(responses)
 
-    client = self._GetClientMetadata(client_id)
-    flow = self._GetFlowMetadata(client_id, flow_id)
+    client = http_delivery.GetClientMetadata(client_id)
+    flow = http_delivery.GetFlowMetadata(client_id, flow_id)
 
     events = [self._MakeEvent(response, client, flow) for response in responses]
     self._SendEvents(events)
 
+  def Flush(self, state: rdf_protodict.AttributedDict) -> None:
+    """See base class."""
+    self._delivery.Flush()
+
   def _GetClientId(self, responses: list[rdf_flow_objects.FlowResult]) -> str:
     client_ids = {msg.client_id for msg in responses}
     if len(client_ids) > 1:
@@ -104,19 +111,6 @@ class WebhookOutputPlugin(output_plugin.OutputPlugin):
       )
     return flow_ids.pop()
 
-  def _GetClientMetadata(self, client_id: str) -> base.ExportedMetadata:
-    info = data_store.REL_DB.ReadClientFullInfo(client_id)
-    info = mig_objects.ToRDFClientFullInfo(info)
-    metadata = export.GetMetadata(client_id, info)
-    metadata.timestamp = None  # timestamp is sent outside of metadata.
-    return metadata
-
-  def _GetFlowMetadata(self, client_id: str, flow_id: str) -> api_flow.ApiFlow:
-    flow_obj = data_store.REL_DB.ReadFlowObject(client_id, flow_id)
-    proto_api_flow = api_flow.InitApiFlowFromFlowObject(flow_obj)
-    rdf_api_flow = mig_flow.ToRDFApiFlow(proto_api_flow)
-    return rdf_api_flow
-
   def _MakeEvent(
       self,
       message: rdf_flow_objects.FlowResult,
@@ -146,10 +140,4 @@ class WebhookOutputPlugin(output_plugin.OutputPlugin):
     return event
 
   def _SendEvents(self, events: list[JsonDict]) -> None:
-    # Batch multiple events in one request, separated by two newlines.
-    data = "\n\n".join(json.dumps(event) for event in events)
-
-    response = requests.post(
-        url=self._url, verify=self._verify_https, data=data
-    )
-    response.raise_for_status()
+    self._delivery.Send([json.dumps(event).encode("utf-8") for event in events])
@@ -103,6 +103,8 @@ class FlowStatus(rdf_structs.RDFProtoStruct):
       payload.network_bytes_sent = self.network_bytes_sent
     if self.runtime_us:
       payload.runtime_us = self.runtime_us
+    if self.hash_cache_hits:
+      payload.hash_cache_hits = self.hash_cache_hits
 
     return rdf_flows.GrrMessage(
         session_id="%s/flows/%s" % (self.client_id, self.flow_id),
@@ -276,6 +278,7 @@ def FlowResponseForLegacyResponse(legacy_msg):
         cpu_time_used=legacy_status.cpu_time_used,
         network_bytes_sent=legacy_status.network_bytes_sent,
         runtime_us=legacy_status.runtime_us,
+        hash_cache_hits=legacy_status.hash_cache_hits,
     )
   elif legacy_msg.type == legacy_msg.Type.ITERATOR:
     response = FlowIterator(
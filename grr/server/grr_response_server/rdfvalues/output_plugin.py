@@ -45,3 +45,9 @@ class OutputPluginDescriptor(rdf_structs.RDFProtoStruct):
     if self.args:
       result += " <%r>" % self.args
     return result
+
+
+class OutputPluginDeliveryRequest(rdf_structs.RDFProtoStruct):
+  """A reference to a batch of hunt results queued for output plugins."""
+
+  protobuf = output_plugin_pb2.OutputPluginDeliveryRequest
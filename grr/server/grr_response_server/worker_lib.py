@@ -3,8 +3,9 @@
 
 import logging
 import time
-from typing import Sequence
+from typing import Dict, Optional, Sequence, Tuple, Union
 
+from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_core.lib import registry
 from grr_response_core.lib.util import collection
@@ -18,7 +19,6 @@ from grr_response_server import handler_registry
 from grr_response_server import server_stubs
 # pylint: enable=unused-import
 from grr_response_server.databases import db
-from grr_response_server.rdfvalues import flow_objects as rdf_flow_objects
 from grr_response_server.rdfvalues import mig_flow_objects
 from grr_response_server.rdfvalues import mig_objects
 
@@ -27,6 +27,8 @@ WELL_KNOWN_FLOW_REQUESTS = metrics.Counter(
     "well_known_flow_requests", fields=[("flow", str)]
 )
 
+FLOW_PROCESSING_TIME = rdfvalue.Duration.From(6, rdfvalue.HOURS)
+
 
 class Error(Exception):
   """Base error class."""
@@ -44,6 +46,7 @@ def ProcessMessageHandlerRequests(
       "Leased message handler request ids: %s",
       ",".join(str(r.request_id) for r in requests),
   )
+  asynchronous_handler_names = set()
   grouped_requests = collection.Group(requests, lambda r: r.handler_name)
   for handler_name, requests_for_handler in grouped_requests.items():
     requests_for_handler = [
@@ -54,6 +57,9 @@ def ProcessMessageHandlerRequests(
       logging.error("Unknown message handler: %s", handler_name)
       continue
 
+    if handler_cls.asynchronous:
+      asynchronous_handler_names.add(handler_name)
+
     num_requests = len(requests_for_handler)
     WELL_KNOWN_FLOW_REQUESTS.Increment(
         fields=[handler_name], delta=num_requests
@@ -69,6 +75,11 @@ def ProcessMessageHandlerRequests(
           "Exception while processing message handler %s: %s", handler_name, e
       )
 
+  # Asynchronous handlers delete their requests once they are processed.
+  requests = [
+      r for r in requests if r.handler_name not in asynchronous_handler_names
+  ]
+
   logging.info(
       "Deleting message handler request ids: %s",
       ",".join(str(r.request_id) for r in requests),
@@ -83,10 +94,32 @@ class GRRWorker(object):
   # TODO: Temporarily added flag to prevent worker from picking up
   # work.
   disabled: bool
-
-  def __init__(self, disabled: bool = False):
-    """Constructor."""
+  flow_processing_batch_size: int
+  shard: Optional[db.FlowProcessingShard]
+
+  def __init__(
+      self,
+      disabled: bool = False,
+      flow_processing_batch_size: Optional[int] = None,
+      shard: Optional[db.FlowProcessingShard] = None,
+  ):
+    """Constructor.
+
+    Args:
+      disabled: If True, the worker doesn't pick up any work.
+      flow_processing_batch_size: Number of flow processing requests handled
+        together using bulk database calls. Defaults to the
+        `Worker.flow_processing_batch_size` config option.
+      shard: If set, the worker only processes flows of clients belonging to
+        this shard. Used when multiple worker processes share the load.
+    """
     self.disabled = disabled
+    if flow_processing_batch_size is None:
+      flow_processing_batch_size = config.CONFIG[
+          "Worker.flow_processing_batch_size"
+      ]
+    self.flow_processing_batch_size = flow_processing_batch_size
+    self.shard = shard
     logging.info("Started GRR worker.")
 
   def Shutdown(self) -> None:
@@ -102,7 +135,14 @@ class GRRWorker(object):
           self.message_handler_lease_time,
           limit=100,
       )
-      data_store.REL_DB.RegisterFlowProcessingHandler(self.ProcessFlow)
+      if self.flow_processing_batch_size > 1:
+        data_store.REL_DB.RegisterBatchFlowProcessingHandler(
+            self.ProcessFlows, self.flow_processing_batch_size, shard=self.shard
+        )
+      else:
+        data_store.REL_DB.RegisterFlowProcessingHandler(
+            self.ProcessFlow, shard=self.shard
+        )
 
     try:
       # The main thread just keeps sleeping and listens to keyboard interrupt
@@ -113,8 +153,10 @@ class GRRWorker(object):
       logging.info("Caught interrupt, exiting.")
       self.Shutdown()
 
-  def _ReleaseProcessedFlow(self, flow_obj: rdf_flow_objects.Flow) -> bool:
-    """Release a processed flow if the processing deadline is not exceeded."""
+  def _PrepareFlowForRelease(
+      self, flow_obj: flow_base.FlowBase
+  ) -> flows_pb2.Flow:
+    """Checks the processing deadline and flushes messages of a flow."""
     rdf_flow = flow_obj.rdf_flow
     if rdf_flow.processing_deadline < rdfvalue.RDFDatetime.Now():
       raise flow_base.FlowError(
@@ -127,36 +169,155 @@ class GRRWorker(object):
       )
     flow_obj.FlushQueuedMessages()
 
-    proto_flow = mig_flow_objects.ToProtoFlow(rdf_flow)
+    return mig_flow_objects.ToProtoFlow(rdf_flow)
+
+  def _ReleaseProcessedFlow(self, flow_obj: flow_base.FlowBase) -> bool:
+    """Release a processed flow if the processing deadline is not exceeded."""
+    proto_flow = self._PrepareFlowForRelease(flow_obj)
     return data_store.REL_DB.ReleaseProcessedFlow(proto_flow)
 
   def ProcessFlow(
       self, flow_processing_request: flows_pb2.FlowProcessingRequest
   ) -> None:
     """The callback for the flow processing queue."""
+    data_store.REL_DB.AckFlowProcessingRequests([flow_processing_request])
+    self._ProcessFlow(flow_processing_request)
+
+  def ProcessFlows(
+      self, flow_processing_requests: Sequence[flows_pb2.FlowProcessingRequest]
+  ) -> None:
+    """The callback for the flow processing queue working in batch mode.
+
+    Flows of the whole batch are leased, read and released using bulk database
+    calls. Flows that can't be leased in bulk (e.g. because they are already
+    being processed or their parent hunt is stopped) are processed one by one
+    with the same semantics as `ProcessFlow`.
+
+    Args:
+      flow_processing_requests: Flow processing requests to handle.
+    """
+    data_store.REL_DB.AckFlowProcessingRequests(flow_processing_requests)
+
+    requests_by_key = {}
+    for request in flow_processing_requests:
+      requests_by_key.setdefault((request.client_id, request.flow_id), request)
+
+    leased_flows = data_store.REL_DB.LeaseFlowsForProcessing(
+        list(requests_by_key), processing_time=FLOW_PROCESSING_TIME
+    )
+    request_dicts = data_store.REL_DB.MultiReadFlowRequests(list(leased_flows))
+
+    processed_flows = []
+    for key, flow in leased_flows.items():
+      try:
+        flow_obj = self._StartFlowProcessing(flow, request_dicts.get(key))
+        if flow_obj is not None:
+          processed_flows.append(flow_obj)
+      except Exception as e:  # pylint: disable=broad-except
+        logging.exception("Processing flow %s/%s failed: %s", *key, e)
+
+    to_release = []
+    for flow_obj in processed_flows:
+      try:
+        to_release.append((flow_obj, self._PrepareFlowForRelease(flow_obj)))
+      except Exception as e:  # pylint: disable=broad-except
+        logging.exception(
+            "Releasing flow %s/%s failed: %s",
+            flow_obj.rdf_flow.client_id,
+            flow_obj.rdf_flow.flow_id,
+            e,
+        )
+
+    released = data_store.REL_DB.ReleaseProcessedFlows(
+        [proto_flow for _, proto_flow in to_release]
+    )
+    for flow_obj, _ in to_release:
+      rdf_flow = flow_obj.rdf_flow
+      try:
+        self._FinishFlowProcessing(
+            flow_obj, released[(rdf_flow.client_id, rdf_flow.flow_id)]
+        )
+      except Exception as e:  # pylint: disable=broad-except
+        logging.exception(
+            "Processing flow %s/%s failed: %s",
+            rdf_flow.client_id,
+            rdf_flow.flow_id,
+            e,
+        )
+
+    for key, request in requests_by_key.items():
+      if key in leased_flows:
+        continue
+      try:
+        self._ProcessFlow(request)
+      except Exception as e:  # pylint: disable=broad-except
+        logging.exception("Processing flow %s/%s failed: %s", *key, e)
+
+  def _ProcessFlow(
+      self, flow_processing_request: flows_pb2.FlowProcessingRequest
+  ) -> None:
+    """Leases and processes a single flow."""
     client_id = flow_processing_request.client_id
     flow_id = flow_processing_request.flow_id
 
-    data_store.REL_DB.AckFlowProcessingRequests([flow_processing_request])
-
     try:
       flow = data_store.REL_DB.LeaseFlowForProcessing(
           client_id,
           flow_id,
-          processing_time=rdfvalue.Duration.From(6, rdfvalue.HOURS),
+          processing_time=FLOW_PROCESSING_TIME,
       )
     except db.ParentHuntIsNotRunningError:
       flow_base.TerminateFlow(client_id, flow_id, "Parent hunt stopped.")
       return
 
+    flow_obj = self._StartFlowProcessing(flow)
+    if flow_obj is None:
+      return
+
+    self._FinishFlowProcessing(flow_obj, self._ReleaseProcessedFlow(flow_obj))
+
+  def _StartFlowProcessing(
+      self,
+      flow: flows_pb2.Flow,
+      request_dict: Optional[
+          Dict[
+              int,
+              Tuple[
+                  flows_pb2.FlowRequest,
+                  Sequence[
+                      Union[
+                          flows_pb2.FlowResponse,
+                          flows_pb2.FlowStatus,
+                          flows_pb2.FlowIterator,
+                      ],
+                  ],
+              ],
+          ]
+      ] = None,
+  ) -> Optional[flow_base.FlowBase]:
+    """Processes all ready requests of a leased flow.
+
+    Args:
+      flow: A flow leased for processing.
+      request_dict: Requests of the flow as returned by `ReadFlowRequests`. If
+        not set, the requests are read from the database.
+
+    Returns:
+      The flow object that has to be released or None if the flow is not
+      running.
+
+    Raises:
+      FlowHasNothingToProcessError: If no request could be processed.
+    """
     rdf_flow = mig_flow_objects.ToRDFFlow(flow)
+    client_id = rdf_flow.client_id
+    flow_id = rdf_flow.flow_id
 
-    first_request_to_process = rdf_flow.next_request_to_process
     logging.info(
         "Processing Flow %s/%s/%d (%s).",
         client_id,
         flow_id,
-        first_request_to_process,
+        rdf_flow.next_request_to_process,
         rdf_flow.flow_class_name,
     )
 
@@ -170,38 +331,49 @@ class GRRWorker(object):
           flow_id,
           client_id,
       )
-      return
+      return None
 
-    processed, incrementally_processed = flow_obj.ProcessAllReadyRequests()
+    processed, incrementally_processed = flow_obj.ProcessAllReadyRequests(
+        request_dict
+    )
     if processed == 0 and incrementally_processed == 0:
       raise FlowHasNothingToProcessError(
           "Unable to process any requests for flow %s on client %s."
           % (flow_id, client_id)
       )
 
-    while not self._ReleaseProcessedFlow(flow_obj):
+    return flow_obj
+
+  def _FinishFlowProcessing(
+      self, flow_obj: flow_base.FlowBase, released: bool
+  ) -> None:
+    """Keeps processing a flow until it can be released."""
+    rdf_flow = flow_obj.rdf_flow
+    client_id = rdf_flow.client_id
+    flow_id = rdf_flow.flow_id
+
+    while not released:
       processed, incrementally_processed = flow_obj.ProcessAllReadyRequests()
       if processed == 0 and incrementally_processed == 0:
         raise FlowHasNothingToProcessError(
             "%s/%s: ReleaseProcessedFlow returned false but no "
             "request could be processed (next req: %d)."
-            % (client_id, flow_id, flow_obj.rdf_flow.next_request_to_process)
+            % (client_id, flow_id, rdf_flow.next_request_to_process)
         )
+      released = self._ReleaseProcessedFlow(flow_obj)
 
     if flow_obj.IsRunning():
       logging.info(
-          "Processing Flow %s/%s/%d (%s) done, next request to process: %d.",
+          "Processing Flow %s/%s (%s) done, next request to process: %d.",
           client_id,
           flow_id,
-          first_request_to_process,
           rdf_flow.flow_class_name,
           rdf_flow.next_request_to_process,
       )
     else:
       logging.info(
-          "Processing Flow %s/%s/%d (%s) done, flow is done.",
+          "Processing Flow %s/%s (%s) done, flow is done.",
           client_id,
           flow_id,
-          first_request_to_process,
           rdf_flow.flow_class_name,
       )
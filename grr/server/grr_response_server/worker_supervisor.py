@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""Supervisor running multiple GRR worker processes on a single host."""
+
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from grr_response_server.databases import db
+
+
+def _RunWorkerProcess(
+    target: Callable[[db.FlowProcessingShard], None],
+    shard: db.FlowProcessingShard,
+) -> None:
+  # Forked processes inherit signal handlers of the supervisor process (e.g. a
+  # SIGTERM handler stopping the supervisor), which would make them ignore
+  # `Terminate`.
+  signal.signal(signal.SIGTERM, signal.SIG_DFL)
+  target(shard)
+
+
+class WorkerSupervisor(object):
+  """Runs and monitors a fixed number of worker processes.
+
+  Every worker process is started with a distinct `db.FlowProcessingShard`, so
+  that processes never compete for the same flow processing requests. Worker
+  processes that die are restarted with the same shard.
+
+  Worker processes are forked, so the supervisor has to be started before any
+  threads or database connections are created in the parent process.
+  """
+
+  def __init__(
+      self,
+      num_processes: int,
+      target: Callable[[db.FlowProcessingShard], None],
+      restart_delay: float = 5.0,
+  ):
+    """Constructor.
+
+    Args:
+      num_processes: Number of worker processes to run.
+      target: Function run in every worker process. Gets the shard the process
+        is responsible for.
+      restart_delay: Minimum number of seconds between two starts of the same
+        worker process.
+    """
+    if num_processes < 1:
+      raise ValueError(f"Invalid number of processes: {num_processes}")
+
+    self.num_processes = num_processes
+    self.target = target
+    self.restart_delay = restart_delay
+
+    self._context = multiprocessing.get_context("fork")
+    self._processes: Dict[int, multiprocessing.Process] = {}
+    self._start_times: Dict[int, float] = {}
+    self._stop = threading.Event()
+
+  def _StartProcess(self, index: int) -> None:
+    shard = db.FlowProcessingShard(index=index, count=self.num_processes)
+    process = self._context.Process(
+        name=f"grr_worker_{index}",
+        target=_RunWorkerProcess,
+        args=(self.target, shard),
+    )
+    process.start()
+    logging.info(
+        "Started worker process %d/%d (pid %d).",
+        index,
+        self.num_processes,
+        process.pid,
+    )
+    self._processes[index] = process
+    self._start_times[index] = time.monotonic()
+
+  def Start(self) -> None:
+    """Starts all worker processes."""
+    for index in range(self.num_processes):
+      self._StartProcess(index)
+
+  def CheckProcesses(self) -> None:
+    """Restarts worker processes that are no longer alive."""
+    for index, process in list(self._processes.items()):
+      if process.is_alive():
+        continue
+
+      since_start = time.monotonic() - self._start_times[index]
+      if since_start < self.restart_delay:
+        continue
+
+      logging.error(
+          "Worker process %d (pid %d) died with exit code %s, restarting.",
+          index,
+          process.pid,
+          process.exitcode,
+      )
+      process.join()
+      self._StartProcess(index)
+
+  def Stop(self) -> None:
+    """Makes `Run` return after terminating all worker processes."""
+    self._stop.set()
+
+  def Terminate(self, timeout: Optional[float] = 30.0) -> None:
+    """Terminates all worker processes and waits for them to finish."""
+    for process in self._processes.values():
+      if process.is_alive():
+        process.terminate()
+
+    for process in self._processes.values():
+      process.join(timeout)
+      if process.is_alive():
+        logging.warning(
+            "Worker process %d did not terminate, killing.", process.pid
+        )
+        process.kill()
+        process.join()
+
+    self._processes.clear()
+
+  def Run(self, poll_interval: float = 1.0) -> None:
+    """Starts worker processes and keeps them running until stopped."""
+    self.Start()
+    try:
+      while not self._stop.wait(poll_interval):
+        self.CheckProcesses()
+    except KeyboardInterrupt:
+      logging.info("Caught interrupt, exiting.")
+    finally:
+      self.Terminate()
+
+  @property
+  def processes(self) -> Dict[int, multiprocessing.Process]:
+    return dict(self._processes)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""Tests for the WorkerSupervisor class."""
+
+import os
+import signal
+import time
+
+from absl import app
+from absl.testing import absltest
+
+from grr_response_server import worker_supervisor
+from grr_response_server.databases import db
+from grr.test_lib import test_lib
+
+
+def _WriteShardAndExit(shard: db.FlowProcessingShard, path: str) -> None:
+  with open(os.path.join(path, f"{shard.index}_{time.time_ns()}"), "w") as f:
+    f.write(str(shard.count))
+
+
+def _Sleep(shard: db.FlowProcessingShard) -> None:
+  del shard  # Unused.
+  time.sleep(60)
+
+
+class WorkerSupervisorTest(absltest.TestCase):
+
+  def _WaitForExit(self, supervisor):
+    deadline = time.time() + 10
+    while any(p.is_alive() for p in supervisor.processes.values()):
+      if time.time() > deadline:
+        self.fail("Worker processes did not exit in time.")
+      time.sleep(0.05)
+
+  def testInvalidNumberOfProcessesRaises(self):
+    with self.assertRaises(ValueError):
+      worker_supervisor.WorkerSupervisor(0, _Sleep)
+
+  def testStartsOneProcessPerShard(self):
+    path = self.create_tempdir().full_path
+    supervisor = worker_supervisor.WorkerSupervisor(
+        3, lambda shard: _WriteShardAndExit(shard, path)
+    )
+    supervisor.Start()
+    self.addCleanup(supervisor.Terminate)
+    self._WaitForExit(supervisor)
+
+    files = os.listdir(path)
+    self.assertCountEqual([f.split("_")[0] for f in files], ["0", "1", "2"])
+    for name in files:
+      with open(os.path.join(path, name)) as f:
+        self.assertEqual(f.read(), "3")
+
+  def testRestartsDeadProcesses(self):
+    path = self.create_tempdir().full_path
+    supervisor = worker_supervisor.WorkerSupervisor(
+        2, lambda shard: _WriteShardAndExit(shard, path), restart_delay=0
+    )
+    supervisor.Start()
+    self.addCleanup(supervisor.Terminate)
+    self._WaitForExit(supervisor)
+
+    supervisor.CheckProcesses()
+    self._WaitForExit(supervisor)
+
+    files = os.listdir(path)
+    self.assertCountEqual(
+        [f.split("_")[0] for f in files], ["0", "0", "1", "1"]
+    )
+
+  def testDoesNotRestartBeforeRestartDelay(self):
+    path = self.create_tempdir().full_path
+    supervisor = worker_supervisor.WorkerSupervisor(
+        1, lambda shard: _WriteShardAndExit(shard, path), restart_delay=3600
+    )
+    supervisor.Start()
+    self.addCleanup(supervisor.Terminate)
+    self._WaitForExit(supervisor)
+
+    supervisor.CheckProcesses()
+    self._WaitForExit(supervisor)
+
+    self.assertLen(os.listdir(path), 1)
+
+  def testTerminateStopsProcesses(self):
+    supervisor = worker_supervisor.WorkerSupervisor(2, _Sleep)
+    supervisor.Start()
+    processes = list(supervisor.processes.values())
+    self.assertTrue(all(p.is_alive() for p in processes))
+
+    supervisor.Terminate(timeout=10)
+
+    self.assertFalse(any(p.is_alive() for p in processes))
+    self.assertEmpty(supervisor.processes)
+
+  def testTerminateWithSupervisorSigtermHandler(self):
+    supervisor = worker_supervisor.WorkerSupervisor(2, _Sleep)
+
+    # This is how the worker binary stops the supervisor on SIGTERM.
+    handler = signal.signal(
+        signal.SIGTERM, lambda signum, frame: supervisor.Stop()
+    )
+    self.addCleanup(signal.signal, signal.SIGTERM, handler)
+
+    supervisor.Start()
+    processes = list(supervisor.processes.values())
+
+    supervisor.Terminate(timeout=10)
+
+    # Processes killed after the timeout would have exited with -SIGKILL.
+    for process in processes:
+      self.assertEqual(process.exitcode, -signal.SIGTERM)
+
+
+def main(argv):
+  test_lib.main(argv)
+
+
+if __name__ == "__main__":
+  app.run(main)
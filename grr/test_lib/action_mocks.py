@@ -392,7 +392,9 @@ class FileFinderClientMockWithTimestamps(FileFinderClientMock):
 class ClientFileFinderClientMock(ActionMock):
 
   def __init__(self, *args, **kwargs):
-    super().__init__(file_finder.FileFinderOS, *args, **kwargs)
+    super().__init__(
+        file_finder.FileFinderOS, standard.TransferBuffer, *args, **kwargs
+    )
 
 
 class ListProcessesMock(ClientFileFinderClientMock):
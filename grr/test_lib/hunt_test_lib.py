@@ -37,7 +37,8 @@ class SampleHuntMock(action_mocks.ActionMock):
                data=b"Hello World!",
                user_cpu_time=None,
                system_cpu_time=None,
-               network_bytes_sent=None):
+               network_bytes_sent=None,
+               hash_cache_hits=None):
     super().__init__()
     self.responses = 0
     self.data = data
@@ -47,6 +48,7 @@ class SampleHuntMock(action_mocks.ActionMock):
     self.user_cpu_time = user_cpu_time
     self.system_cpu_time = system_cpu_time
     self.network_bytes_sent = network_bytes_sent
+    self.hash_cache_hits = hash_cache_hits
 
   def FileFinderOS(self, args):
     # TODO: Stop relying on these constants.
@@ -103,6 +105,9 @@ class SampleHuntMock(action_mocks.ActionMock):
       else:
         status.network_bytes_sent = self.network_bytes_sent
 
+      if self.hash_cache_hits is not None:
+        status.hash_cache_hits = self.hash_cache_hits
+
     return rdf_flows.GrrMessage(
         session_id=message.session_id,
         name=message.name,
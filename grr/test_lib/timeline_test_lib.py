@@ -8,12 +8,14 @@ from grr_response_proto import flows_pb2
 from grr_response_proto import timeline_pb2
 from grr_response_server import data_store
 from grr_response_server.flows.general import timeline
+from grr_response_server.flows.general import timeline_columnar
 
 
 def WriteTimeline(
     client_id: str,
     entries: Sequence[timeline_pb2.TimelineEntry],
     hunt_id: Optional[str] = None,
+    columnar: bool = False,
 ) -> str:
   """Writes a timeline to the database (as fake flow result).
 
@@ -21,6 +23,7 @@ def WriteTimeline(
     client_id: An identifier of the client for which the flow ran.
     entries: A sequence of timeline entries produced by the flow run.
     hunt_id: An (optional) identifier of a hunt the flows belong to.
+    columnar: Whether to also write the columnar version of the timeline.
 
   Returns:
     An identifier of the flow.
@@ -36,6 +39,10 @@ def WriteTimeline(
   flow_obj.flow_class_name = timeline.TimelineFlow.__name__
   if hunt_id is not None:
     flow_obj.parent_hunt_id = hunt_id
+  if columnar:
+    store = timeline_pb2.TimelineStore()
+    store.columnar_index_blob_id = bytes(timeline_columnar.Write(entries))
+    flow_obj.store.Pack(store)
   data_store.REL_DB.WriteFlowObject(flow_obj)
 
   blobs = list(rdf_timeline.SerializeTimelineEntryStream(entries))